@@ -3,7 +3,13 @@ from routes.home import home_route
 from routes.user import user_route
 from routes.wallet import wallet_route
 from routes.prediction import prediction_route
+from routes.stats import stats_route
+from routes.metrics import metrics_route
 from database.database import init_db
+from database.session_router import ReadYourWritesMiddleware
+from services.job_events import stop_job_events
+from services.metrics import PrometheusMiddleware
+from services.tracing import TracingMiddleware
 import uvicorn
 import os
 from config.logging_config import api_logger
@@ -18,16 +24,31 @@ app.include_router(home_route)
 app.include_router(user_route, prefix='/auth')
 app.include_router(wallet_route, prefix='/wallet')
 app.include_router(prediction_route)
+app.include_router(stats_route)
+app.include_router(metrics_route)
 
-app.add_middleware(Analytics, api_key=os.getenv('API_ANALITICS'))
+if os.getenv('API_ANALITICS'):
+    app.add_middleware(Analytics, api_key=os.getenv('API_ANALITICS'))
+app.add_middleware(ReadYourWritesMiddleware)
+app.add_middleware(TracingMiddleware)
+app.add_middleware(PrometheusMiddleware)
 
 
 @app.on_event('startup')
 def startup():
     api_logger.info("Запуск приложения...")
-    init_db()
-    api_logger.info("База данных инициализирована..")
+    if os.getenv("API_INIT_DB", "1") == "1":
+        init_db()
+        api_logger.info("База данных инициализирована..")
+
+
+@app.on_event('shutdown')
+def shutdown():
+    stop_job_events()
+    api_logger.info("Приложение остановлено")
 
 if __name__ == '__main__':
-    api_logger.info("Запуск uvicorn сервера на порту 8000")
-    uvicorn.run('api:app', host='0.0.0.0', port=8000, reload=True)
\ No newline at end of file
+    # Режим разработки: один процесс; в контейнере API запускается через gunicorn (gunicorn.conf.py)
+    reload = os.getenv("API_RELOAD", "0") == "1"
+    api_logger.info(f"Запуск uvicorn сервера на порту 8000 (reload={reload})")
+    uvicorn.run('api:app', host='0.0.0.0', port=8000, reload=reload)
@@ -0,0 +1,202 @@
+"""
+Бенчмарк помесячного секционирования transaction на синтетических данных.
+
+Создаёт схему bench с обычной таблицей tx_heap и секционированной tx_part с
+одинаковыми строками (по умолчанию 5 млн за 24 месяца), затем сравнивает
+задержку типовых запросов истории, число прочитанных секций и размер
+индексов, которые должны помещаться в память.
+
+Запуск (нужен PostgreSQL): python -m benchmarks.bench_partitioning --rows 5000000
+"""
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+from sqlalchemy import create_engine, text
+from database.partitioning import add_months, create_default_partition_sql, create_partition_sql, month_ranges
+
+QUERIES: Dict[str, str] = {
+    "latest_page": (
+        "SELECT id FROM {table} WHERE user_id = :user_id "
+        "ORDER BY trans_time DESC, id DESC LIMIT 20"
+    ),
+    "deep_keyset_page": (
+        "SELECT id FROM {table} WHERE user_id = :user_id AND trans_time <= :ts "
+        "AND (trans_time, id) < (:ts, :last_id) ORDER BY trans_time DESC, id DESC LIMIT 20"
+    ),
+    "month_spending": (
+        "SELECT coalesce(sum(amount), 0) FROM {table} "
+        "WHERE user_id = :user_id AND tx_type = 'DEBIT' AND trans_time >= :month_start"
+    ),
+    "month_volume": (
+        "SELECT count(*) FROM {table} WHERE trans_time >= :month_start AND trans_time < :month_end"
+    ),
+}
+
+TABLE_DDL = """
+CREATE TABLE {table} (
+    id bigint NOT NULL,
+    user_id integer NOT NULL,
+    tx_type varchar NOT NULL,
+    amount numeric NOT NULL,
+    trans_time timestamp NOT NULL,
+    balance_after numeric
+) {suffix}
+"""
+
+
+def setup_schema(connection, rows: int, users: int, months: int) -> None:
+    """Схема bench: одинаковые данные в обычной и секционированной таблице"""
+    connection.execute(text("DROP SCHEMA IF EXISTS bench CASCADE"))
+    connection.execute(text("CREATE SCHEMA bench"))
+    connection.execute(text("SET search_path TO bench"))
+
+    connection.execute(text(TABLE_DDL.format(table="tx_heap", suffix="")))
+    connection.execute(text(TABLE_DDL.format(table="tx_part", suffix="PARTITION BY RANGE (trans_time)")))
+    today = date.today()
+    for start, end in month_ranges(add_months(today, -months), add_months(today, 1)):
+        connection.execute(text(create_partition_sql(connection, "tx_part", start, end)))
+    connection.execute(text(create_default_partition_sql(connection, "tx_part")))
+
+    started = time.perf_counter()
+    connection.execute(text(
+        "INSERT INTO tx_heap "
+        "SELECT g, 1 + (random() * (:users - 1))::int, "
+        "CASE WHEN random() < 0.7 THEN 'DEBIT' ELSE 'CREDIT' END, "
+        "round((random() * 100)::numeric, 2), "
+        "now() - random() * make_interval(months => :months), NULL "
+        "FROM generate_series(1, :rows) AS g"
+    ), {"users": users, "months": months, "rows": rows})
+    connection.execute(text("INSERT INTO tx_part SELECT * FROM tx_heap"))
+    for table in ("tx_heap", "tx_part"):
+        connection.execute(text(f"ALTER TABLE {table} ADD PRIMARY KEY (id, trans_time)"))
+        connection.execute(text(f"CREATE INDEX {table}_user_time_id ON {table} (user_id, trans_time, id)"))
+        connection.execute(text(f"CREATE INDEX {table}_user_id_id ON {table} (user_id, id)"))
+    print(f"Загружено {rows} строк в обе таблицы за {time.perf_counter() - started:.1f} с")
+
+
+def vacuum_analyze(engine) -> Dict[str, float]:
+    """VACUUM ANALYZE: всей обычной таблицы и только текущей секции"""
+    timings = {}
+    current_partition = f"tx_part_p{date.today():%Y_%m}"
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.execute(text("SET search_path TO bench"))
+        connection.execute(text("ANALYZE tx_part"))
+        for name, target in (("tx_heap", "tx_heap"), ("current_partition", current_partition)):
+            started = time.perf_counter()
+            connection.execute(text(f"VACUUM ANALYZE {target}"))
+            timings[name] = time.perf_counter() - started
+    return timings
+
+
+def query_params(name: str, users: int, months: int) -> dict:
+    now = datetime.now()
+    month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    params = {"user_id": random.randint(1, users)}
+    if name == "deep_keyset_page":
+        params.update(ts=now - timedelta(days=30 * months // 2), last_id=2 ** 62)
+    elif name == "month_spending":
+        params.update(month_start=month_start)
+    elif name == "month_volume":
+        previous = add_months(month_start.date(), -1)
+        params = {"month_start": datetime.combine(previous, datetime.min.time()), "month_end": month_start}
+    return params
+
+
+def scanned_relations(connection, sql: str, params: dict) -> int:
+    """Сколько таблиц/секций читает план запроса"""
+    plan = connection.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"), params).scalar()
+    plan = plan if isinstance(plan, list) else json.loads(plan)
+    relations, stack = set(), [plan[0]["Plan"]]
+    while stack:
+        node = stack.pop()
+        if "Relation Name" in node:
+            relations.add(node["Relation Name"])
+        stack.extend(node.get("Plans", []))
+    return len(relations)
+
+
+def run_queries(connection, users: int, months: int, repeat: int) -> List[dict]:
+    results = []
+    for name, template in QUERIES.items():
+        for table in ("tx_heap", "tx_part"):
+            sql = template.format(table=table)
+            timings = []
+            for _ in range(repeat):
+                params = query_params(name, users, months)
+                started = time.perf_counter()
+                connection.execute(text(sql), params).all()
+                timings.append((time.perf_counter() - started) * 1000)
+            timings.sort()
+            results.append({
+                "query": name,
+                "table": table,
+                "median_ms": statistics.median(timings),
+                "p95_ms": timings[int(len(timings) * 0.95) - 1],
+                "relations": scanned_relations(connection, sql, query_params(name, users, months)),
+            })
+    return results
+
+
+def index_sizes(connection) -> Dict[str, int]:
+    """Размер индексов: вся обычная таблица против текущей секции"""
+    return {
+        "tx_heap": connection.execute(text("SELECT pg_indexes_size('bench.tx_heap')")).scalar(),
+        "tx_part_total": connection.execute(text(
+            "SELECT coalesce(sum(pg_indexes_size(inhrelid)), 0) FROM pg_inherits "
+            "WHERE inhparent = 'bench.tx_part'::regclass"
+        )).scalar(),
+        "tx_part_current": connection.execute(
+            text("SELECT pg_indexes_size(to_regclass(:partition))"),
+            {"partition": f"bench.tx_part_p{date.today():%Y_%m}"}
+        ).scalar() or 0,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Бенчмарк секционирования transaction")
+    parser.add_argument("--dsn", help="URL базы; по умолчанию из настроек приложения")
+    parser.add_argument("--rows", type=int, default=5_000_000)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--months", type=int, default=24)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--keep", action="store_true", help="Не удалять схему bench после замеров")
+    args = parser.parse_args(argv)
+
+    if args.dsn:
+        dsn = args.dsn
+    else:
+        from database.config import get_settings
+        dsn = get_settings().DATABASE_URL_psycopg
+    engine = create_engine(dsn)
+
+    with engine.begin() as connection:
+        setup_schema(connection, args.rows, args.users, args.months)
+    vacuum = vacuum_analyze(engine)
+
+    with engine.connect() as connection:
+        connection.execute(text("SET search_path TO bench"))
+        results = run_queries(connection, args.users, args.months, args.repeat)
+        sizes = index_sizes(connection)
+
+    print(f"{'query':<18} {'table':<8} {'median ms':>10} {'p95 ms':>10} {'relations':>10}")
+    for row in results:
+        print(f"{row['query']:<18} {row['table']:<8} {row['median_ms']:>10.2f} {row['p95_ms']:>10.2f} {row['relations']:>10}")
+    print(f"VACUUM ANALYZE: tx_heap {vacuum['tx_heap']:.2f} с, текущая секция {vacuum['current_partition']:.2f} с")
+    print(
+        f"Индексы: tx_heap {sizes['tx_heap'] / 2**20:.1f} МБ, все секции {sizes['tx_part_total'] / 2**20:.1f} МБ, "
+        f"текущая секция {sizes['tx_part_current'] / 2**20:.1f} МБ"
+    )
+
+    if not args.keep:
+        with engine.begin() as connection:
+            connection.execute(text("DROP SCHEMA bench CASCADE"))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
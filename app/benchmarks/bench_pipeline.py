@@ -0,0 +1,369 @@
+"""
+Воспроизводимый бенчмарк всего конвейера на синтетических договорах.
+
+Замеры:
+    extraction.<формат>.<размер>  - извлечение текста, МБ/с;
+    predict.*                     - POST /predict через ASGI-приложение, RPS и задержка;
+    worker.*                      - обработка задач MLWorker, задач/с;
+    history.<N>.*                 - страницы истории при N заданиях пользователя, мс.
+
+Внешние сервисы заменены заглушками (benchmarks.stubs): HTTP-сервер вместо
+Hugging Face и брокер в памяти вместо RabbitMQ; БД - файл SQLite во
+временном каталоге. Результат пишется в JSON с коммитом и окружением,
+чтобы сравнивать прогоны разных коммитов.
+
+Запуск:    python -m benchmarks.bench_pipeline run [--quick] [--output DIR]
+Сравнение: python -m benchmarks.bench_pipeline compare OLD.json NEW.json [--threshold 0.1]
+"""
+import os
+
+for _key, _value in {"DB_HOST": "localhost", "DB_PORT": "5432", "DB_USER": "bench", "DB_PASS": "bench",
+                     "DB_NAME": "bench", "SECRET_KEY": "benchmark_secret_key_not_for_production_use",
+                     "HUGGINGFACE_API_TOKEN": "benchmark", "TRACING_EXPORTER": "none"}.items():
+    os.environ.setdefault(_key, _value)
+
+import argparse
+import json
+import logging
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional
+from sqlmodel import Session, SQLModel, create_engine
+from benchmarks.contracts import as_file, contract_of_size, generate_contract
+from benchmarks.load_scenarios import percentile
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+@dataclass
+class Result:
+    name: str
+    value: float
+    unit: str
+    higher_is_better: bool
+    params: Dict[str, object] = field(default_factory=dict)
+
+
+def timed(function: Callable, repeat: int) -> List[float]:
+    """Время каждого из repeat вызовов, мс"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+class BenchEnvironment:
+    """SQLite во временном каталоге, заглушка HF и брокер в памяти, подключённые к приложению"""
+
+    def __init__(self, hf_latency_ms: float):
+        import models.user, models.wallet, models.transaction, models.document, models.mljob  # noqa: F401
+        import models.model, models.riskclause, models.clausefingerprint, models.userdailystats  # noqa: F401
+        import models.walletsnapshot, models.archivedjob, models.jobtiming  # noqa: F401
+        from benchmarks.stubs import InProcessChannel, StubHFServer
+
+        self.directory = tempfile.TemporaryDirectory(prefix="bench_")
+        self.engine = create_engine(
+            f"sqlite:///{self.directory.name}/bench.db", connect_args={"check_same_thread": False}
+        )
+        SQLModel.metadata.create_all(self.engine)
+        self.channel = InProcessChannel()
+        self.hf = StubHFServer(latency_ms=hf_latency_ms).__enter__()
+        self._delivery_tag = 0
+        self._patch()
+        self.model_id = self._create_model()
+
+    def _patch(self) -> None:
+        import ml_worker
+        import services.rabbitmq_config as rabbitmq_config
+        from services.huggingface_service import huggingface_service
+        from services.inference_backend import reset_backends
+
+        ml_worker.engine = self.engine
+        publisher = rabbitmq_config.MLTaskPublisher(rabbitmq_config.RabbitMQConfig())
+        publisher.channel = self.channel
+        rabbitmq_config._publisher = publisher
+        huggingface_service.base_url = self.hf.url
+        reset_backends()
+
+    def _create_model(self) -> int:
+        """Модель по умолчанию, как после первого анализа в рабочей БД"""
+        from services.crud import model as ModelService
+        with Session(self.engine) as session:
+            return ModelService.create_model(name="default_model", session=session, price_per_token=0.001).id
+
+    def create_user(self, email: str, balance: Decimal = Decimal("1000000000")):
+        from services.crud import wallet as WalletService
+        from services.crud.user import create_user
+        with Session(self.engine) as session:
+            user = create_user({"username": email.split("@")[0], "email": email, "password": "benchmark"}, session)
+            WalletService.credit_wallet(user.id, balance, session)
+            return user.id
+
+    def client(self):
+        """TestClient приложения на БД окружения (без startup, чтобы не трогать основную БД)"""
+        from fastapi.testclient import TestClient
+        from api import app
+        from database.database import get_read_session, get_session
+
+        def session_override():
+            with Session(self.engine) as session:
+                yield session
+
+        app.dependency_overrides[get_session] = session_override
+        app.dependency_overrides[get_read_session] = session_override
+        return TestClient(app)
+
+    def worker(self, concurrency: int):
+        """MLWorker, получающий сообщения через consume() вместо RabbitMQ"""
+        from ml_worker import MLWorker
+        worker = MLWorker("bench-worker", concurrency=concurrency)
+        worker.channel = self.channel
+        worker.connection = SimpleNamespace(add_callback_threadsafe=lambda callback: callback())
+        return worker
+
+    def consume(self, worker, messages: List[tuple]) -> None:
+        for body, properties in messages:
+            self._delivery_tag += 1
+            worker.process_ml_task(self.channel, SimpleNamespace(delivery_tag=self._delivery_tag), properties, body)
+
+    def close(self) -> None:
+        from api import app
+        app.dependency_overrides.clear()
+        self.hf.__exit__(None, None, None)
+        self.engine.dispose()
+        self.directory.cleanup()
+
+
+def bench_extraction(sizes_kb: List[int], repeat: int) -> List[Result]:
+    from services.document_processor import DocumentProcessor
+    processor = DocumentProcessor()
+    results = []
+    for size_kb in sizes_kb:
+        text = contract_of_size(size_kb * 1024)
+        for file_format in ("txt", "docx", "pdf"):
+            content = as_file(text, file_format)
+            timings = timed(lambda: processor.process_file(content, f"contract.{file_format}"), repeat)
+            seconds = statistics.median(timings) / 1000
+            results.append(Result(
+                f"extraction.{file_format}.{size_kb}kb", round(len(content) / 2**20 / seconds, 3), "MB/s", True,
+                {"file_bytes": len(content), "median_ms": round(seconds * 1000, 3)}
+            ))
+    return results
+
+
+def bench_predict(env: BenchEnvironment, requests: int, clauses: int) -> List[Result]:
+    from auth.jwt_handler import create_access_token
+
+    user_id = env.create_user("predict@bench.local")
+    token = create_access_token({"user_id": user_id, "email": "predict@bench.local"})
+    client = env.client()
+    headers = {"Authorization": f"Bearer {token}"}
+    payloads = [{"document_text": generate_contract(clauses, seed=i)} for i in range(requests)]
+    client.post("/predict", json=payloads[0], headers=headers)
+
+    timings = []
+    started = time.perf_counter()
+    for payload in payloads:
+        request_started = time.perf_counter()
+        response = client.post("/predict", json=payload, headers=headers)
+        timings.append((time.perf_counter() - request_started) * 1000)
+        if response.status_code != 200:
+            raise RuntimeError(f"/predict вернул {response.status_code}: {response.text}")
+    elapsed = time.perf_counter() - started
+    env.channel.drain()
+
+    params = {"requests": requests, "clauses": clauses}
+    return [
+        Result("predict.rps", round(requests / elapsed, 2), "req/s", True, params),
+        Result("predict.latency_p50", round(percentile(timings, 50), 3), "ms", False, params),
+        Result("predict.latency_p95", round(percentile(timings, 95), 3), "ms", False, params),
+    ]
+
+
+def bench_worker(env: BenchEnvironment, jobs: int, clauses: int, concurrency: int) -> List[Result]:
+    from services.micro_batcher import stop_micro_batchers
+    from services.prediction_service import process_prediction_request
+
+    user_id = env.create_user("worker@bench.local")
+    with Session(env.engine) as session:
+        for i in range(jobs):
+            process_prediction_request(user_id, generate_contract(clauses, seed=10_000 + i), session=session)
+    messages = env.channel.drain()
+
+    worker = env.worker(concurrency)
+    acked_before = env.channel.acked + env.channel.nacked
+    done = threading.Event()
+
+    started = time.perf_counter()
+    env.consume(worker, messages)
+    while env.channel.acked + env.channel.nacked - acked_before < len(messages):
+        done.wait(0.005)
+    elapsed = time.perf_counter() - started
+    if worker.executor:
+        worker.executor.shutdown(wait=True)
+    stop_micro_batchers()
+
+    params = {"jobs": jobs, "clauses": clauses, "concurrency": concurrency, "hf_latency_ms": env.hf.latency * 1000}
+    return [
+        Result("worker.jobs_per_second", round(len(messages) / elapsed, 3), "jobs/s", True, params),
+        Result("worker.failed_jobs", env.channel.nacked, "jobs", False, params),
+    ]
+
+
+def seed_history(env: BenchEnvironment, jobs: int) -> int:
+    """Пользователь с jobs готовыми заданиями за последние два года"""
+    from models.document import Document
+    from models.mljob import MLJob
+
+    user_id = env.create_user(f"history{jobs}@bench.local")
+    now = datetime.now()
+    with Session(env.engine) as session:
+        for start in range(0, jobs, 1000):
+            batch = range(start, min(jobs, start + 1000))
+            documents = [Document(user_id=user_id, filename=f"{i}.txt", raw_text="Договор", token_count=1) for i in batch]
+            session.add_all(documents)
+            session.flush()
+            for i, document in zip(batch, documents):
+                created_at = now - timedelta(minutes=(jobs - i) * 60 * 24 * 730 // jobs)
+                session.add(MLJob(document_id=document.id, model_id=env.model_id, status="DONE", risk_score=0.5,
+                                  summary_text="Конспект", created_at=created_at, started_at=created_at,
+                                  finished_at=created_at + timedelta(seconds=30)))
+            session.commit()
+    return user_id
+
+
+def bench_history(env: BenchEnvironment, sizes: List[int], repeat: int) -> List[Result]:
+    from services.crud import mljob as MLJobService
+    from services.pagination import next_cursor
+
+    results = []
+    for size in sizes:
+        user_id = seed_history(env, size)
+        with Session(env.engine) as session:
+            middle = MLJobService.get_user_jobs(user_id, session, skip=size // 2, limit=20)
+            cursor = next_cursor(middle, 20, "created_at")
+            queries = {
+                "first_page": lambda: MLJobService.get_user_jobs(user_id, session, limit=20),
+                "cursor_page": lambda: MLJobService.get_user_jobs(user_id, session, limit=20, cursor=cursor),
+                "offset_page": lambda: MLJobService.get_user_jobs(user_id, session, skip=size // 2, limit=20),
+                "count": lambda: MLJobService.count_user_jobs(user_id, session),
+            }
+            for name, query in queries.items():
+                timings = timed(query, repeat)
+                params = {"jobs": size, "repeat": repeat}
+                results.append(Result(f"history.{size}.{name}_p50", round(percentile(timings, 50), 3), "ms", False, params))
+                results.append(Result(f"history.{size}.{name}_p95", round(percentile(timings, 95), 3), "ms", False, params))
+    return results
+
+
+def environment_info(quick: bool) -> dict:
+    def git(*args) -> Optional[str]:
+        try:
+            return subprocess.run(["git", *args], capture_output=True, text=True, check=True,
+                                  cwd=os.path.dirname(__file__)).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    return {
+        "commit": git("rev-parse", "HEAD"),
+        "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "quick": quick,
+    }
+
+
+def run(quick: bool = False, hf_latency_ms: float = 20, output: Optional[str] = RESULTS_DIR) -> dict:
+    """Все сценарии; при output - запись JSON в каталог, имя файла по времени и коммиту"""
+    logging.getLogger().setLevel(logging.WARNING)
+    sizes_kb, repeat = ([16], 3) if quick else ([64, 512], 10)
+    history_sizes = [200] if quick else [1_000, 10_000, 50_000]
+
+    env = BenchEnvironment(hf_latency_ms=hf_latency_ms)
+    try:
+        results = bench_extraction(sizes_kb, repeat)
+        results += bench_predict(env, requests=5 if quick else 200, clauses=40)
+        results += bench_worker(env, jobs=3 if quick else 100, clauses=40, concurrency=1 if quick else 4)
+        results += bench_history(env, history_sizes, repeat=5 if quick else 50)
+    finally:
+        env.close()
+
+    report = {"meta": environment_info(quick), "results": [asdict(result) for result in results]}
+    if output:
+        os.makedirs(output, exist_ok=True)
+        commit = (report["meta"]["commit"] or "nogit")[:8]
+        path = os.path.join(output, f"{datetime.now():%Y%m%d_%H%M%S}_{commit}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        report["path"] = path
+    return report
+
+
+def compare(old: dict, new: dict, threshold: float = 0.1) -> List[dict]:
+    """
+    Сравнение двух прогонов по именам замеров. Регрессия - ухудшение больше
+    threshold (доля) с учётом направления метрики.
+    """
+    previous = {result["name"]: result for result in old["results"]}
+    rows = []
+    for result in new["results"]:
+        before = previous.get(result["name"])
+        if before is None or not before["value"]:
+            continue
+        change = (result["value"] - before["value"]) / before["value"]
+        worse = -change if result["higher_is_better"] else change
+        status = "REGRESSION" if worse > threshold else "IMPROVED" if worse < -threshold else "OK"
+        rows.append({"name": result["name"], "old": before["value"], "new": result["value"],
+                     "unit": result["unit"], "change": change, "status": status})
+    return rows
+
+
+def print_results(results: List[dict]) -> None:
+    for result in results:
+        print(f"{result['name']:<36} {result['value']:>12} {result['unit']}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Бенчмарк конвейера анализа договоров")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run")
+    run_parser.add_argument("--quick", action="store_true", help="Малые размеры для быстрой проверки")
+    run_parser.add_argument("--hf-latency-ms", type=float, default=20)
+    run_parser.add_argument("--output", default=RESULTS_DIR)
+    compare_parser = commands.add_parser("compare")
+    compare_parser.add_argument("old")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument("--threshold", type=float, default=0.1)
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        report = run(args.quick, args.hf_latency_ms, args.output)
+        print_results(report["results"])
+        print(f"\nРезультаты: {report.get('path')}")
+        return 0
+
+    with open(args.old, encoding="utf-8") as f:
+        old = json.load(f)
+    with open(args.new, encoding="utf-8") as f:
+        new = json.load(f)
+    rows = compare(old, new, args.threshold)
+    for row in rows:
+        print(f"{row['name']:<36} {row['old']:>12} -> {row['new']:<12} {row['change']:+8.1%}  {row['status']}")
+    return 1 if any(row["status"] == "REGRESSION" for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+"""
+Генератор синтетических договоров на русском языке для бенчмарков.
+
+Одинаковый seed даёт одинаковый текст, поэтому замеры на разных коммитах
+сравнимы. Доля рисковых пунктов (неустойка, одностороннее расторжение,
+ограничение ответственности...) задаётся risk_ratio.
+"""
+import io
+import random
+from typing import List
+
+SUBJECTS = [
+    "Поставщик обязуется передать в собственность Покупателя товар согласно спецификации",
+    "Исполнитель обязуется оказать услуги по техническому обслуживанию оборудования",
+    "Арендодатель предоставляет Арендатору во временное пользование нежилое помещение",
+    "Подрядчик обязуется выполнить работы по ремонту кровли здания",
+]
+NEUTRAL_CLAUSES = [
+    "Стороны обязуются уведомлять друг друга об изменении реквизитов в течение {days} рабочих дней.",
+    "Приёмка товара по количеству и качеству осуществляется в месте передачи.",
+    "Оплата производится путём перечисления денежных средств на расчётный счёт.",
+    "Все изменения и дополнения к договору действительны, если совершены в письменной форме.",
+    "Договор составлен в двух экземплярах, имеющих одинаковую юридическую силу.",
+    "Срок оказания услуг составляет {days} календарных дней с момента подписания акта.",
+    "Споры разрешаются путём переговоров, а при недостижении согласия - в арбитражном суде.",
+    "Стоимость работ по договору составляет {amount} рублей, включая НДС.",
+]
+RISK_CLAUSES = [
+    "За каждый день просрочки Покупатель уплачивает неустойку в размере {percent}% от суммы договора.",
+    "Поставщик вправе в одностороннем порядке расторгнуть договор без объяснения причин.",
+    "Ответственность Исполнителя ограничена суммой {amount} рублей независимо от размера убытков.",
+    "Арендодатель вправе в одностороннем порядке изменить размер арендной платы.",
+    "Предоплата в размере 100% не подлежит возврату ни при каких обстоятельствах.",
+    "Заказчик несёт полную материальную ответственность за сохранность оборудования.",
+    "Договор автоматически пролонгируется на тот же срок, штраф за отказ составляет {amount} рублей.",
+]
+
+
+def generate_clauses(clauses: int, risk_ratio: float = 0.2, seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    result = []
+    for number in range(1, clauses + 1):
+        template = rng.choice(RISK_CLAUSES if rng.random() < risk_ratio else NEUTRAL_CLAUSES)
+        text = template.format(days=rng.randint(3, 60), amount=rng.randint(10, 5000) * 1000,
+                               percent=rng.choice(["0,1", "0,5", "1", "3"]))
+        result.append(f"{number // 10 + 1}.{number % 10 + 1}. {text}")
+    return result
+
+
+def generate_contract(clauses: int = 40, risk_ratio: float = 0.2, seed: int = 0) -> str:
+    """Текст договора из clauses пунктов"""
+    rng = random.Random(seed)
+    header = (
+        f"ДОГОВОР № {rng.randint(1, 999)}/{rng.randint(20, 25)}\n"
+        f"г. Москва\n\n"
+        f"ООО «Альфа», именуемое в дальнейшем Сторона 1, и ООО «Бета», именуемое в дальнейшем "
+        f"Сторона 2, заключили настоящий договор о нижеследующем.\n\n"
+        f"1. ПРЕДМЕТ ДОГОВОРА\n{rng.choice(SUBJECTS)}.\n\n"
+    )
+    return header + "\n".join(generate_clauses(clauses, risk_ratio, seed))
+
+
+def contract_of_size(size_bytes: int, seed: int = 0) -> str:
+    """Договор размером не меньше size_bytes в UTF-8"""
+    clauses = 10
+    text = generate_contract(clauses, seed=seed)
+    while len(text.encode("utf-8")) < size_bytes:
+        clauses *= 2
+        text = generate_contract(clauses, seed=seed)
+    return text
+
+
+def to_docx(text: str) -> bytes:
+    from docx import Document
+    document = Document()
+    for paragraph in text.split("\n"):
+        document.add_paragraph(paragraph)
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+def _pdf_escape(line: str) -> str:
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def to_pdf(text: str, lines_per_page: int = 50) -> bytes:
+    """
+    Минимальный PDF со стандартным шрифтом Helvetica. Без встроенного шрифта
+    кириллица не кодируется, поэтому текст транслитерируется - объём и
+    структура страниц сохраняются, что и важно для замера извлечения.
+    """
+    table = str.maketrans(
+        "абвгдеёжзийклмнопрстуфхцчшщъыьэюяАБВГДЕЁЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯ«»№",
+        "abvgdeezziiklmnoprstufhccss'y'euaABVGDEEZZIIKLMNOPRSTUFHCCSS'Y'EUA\"\"N",
+    )
+    lines = [line.translate(table).encode("latin-1", "replace").decode("latin-1") for line in text.split("\n")]
+    pages = [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)] or [[]]
+
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for page in pages:
+        stream = "BT /F1 9 Tf 40 800 Td 12 TL " + " ".join(f"({_pdf_escape(line)}) '" for line in page) + " ET"
+        objects.append(f"<< /Length {len(stream.encode('latin-1'))} >>\nstream\n{stream}\nendstream")
+        content_id = len(objects)
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_id} 0 R >>"
+        )
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    output = io.BytesIO()
+    output.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(output.tell())
+        output.write(f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1"))
+    xref = output.tell()
+    output.write(f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1"))
+    for offset in offsets:
+        output.write(f"{offset:010d} 00000 n \n".encode("latin-1"))
+    output.write(f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1"))
+    return output.getvalue()
+
+
+def as_file(text: str, file_format: str) -> bytes:
+    """Содержимое файла договора в формате txt, docx или pdf"""
+    if file_format == "txt":
+        return text.encode("utf-8")
+    if file_format == "docx":
+        return to_docx(text)
+    if file_format == "pdf":
+        return to_pdf(text)
+    raise ValueError(f"Unsupported benchmark format: {file_format}")
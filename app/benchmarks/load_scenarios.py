@@ -0,0 +1,315 @@
+"""
+Нагрузочные сценарии, повторяющие пользовательские потоки streamlit-frontend:
+вход, оценка стоимости, загрузка договора с ожиданием результата, история,
+кошелёк. Сценарии общие для встроенного раннера (потоки, один виртуальный
+пользователь на поток) и для locust (benchmarks/locustfile.py).
+
+Цели:
+    --host http://localhost        - запущенный docker-compose (через nginx);
+    без --host                     - приложение в процессе: SQLite, заглушка HF
+                                     и брокер в памяти из bench_pipeline.
+
+Запуск: python -m benchmarks.load_scenarios --users 20 --duration 60 \\
+            --mix estimate=3,upload=1,history=4,wallet=2 [--host URL] [--output FILE]
+"""
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional
+from benchmarks.contracts import as_file, generate_contract
+
+DEFAULT_MIX = {"estimate": 3, "upload": 1, "history": 4, "wallet": 2}
+TERMINAL_STATUSES = {"DONE", "ERROR"}
+PASSWORD = "load-test-password"
+
+
+class FlowError(Exception):
+    pass
+
+
+class VirtualUser:
+    """
+    Состояние одного пользователя и его запросы. request() переопределяется
+    целью: встроенный раннер замеряет время сам, locust - своими средствами.
+    """
+
+    def __init__(self, poll_interval: float = 1.0, job_timeout: float = 120, seed: Optional[int] = None):
+        self.rng = random.Random(seed)
+        self.email = f"load-{uuid.uuid4().hex[:12]}@example.com"
+        self.headers: Dict[str, str] = {}
+        self.poll_interval = poll_interval
+        self.job_timeout = job_timeout
+        self.history_cursor: Optional[str] = None
+
+    def request(self, method: str, path: str, name: str, **kwargs):
+        raise NotImplementedError
+
+    def call(self, method: str, path: str, name: str, expected=(200,), **kwargs) -> dict:
+        response = self.request(method, path, name, headers={**self.headers, **kwargs.pop("headers", {})}, **kwargs)
+        if response.status_code not in expected:
+            raise FlowError(f"{name}: HTTP {response.status_code}")
+        return response.json() if response.content else {}
+
+    def on_start(self) -> None:
+        """Регистрация, вход и пополнение кошелька - как первый визит в интерфейс"""
+        self.call("POST", "/auth/signup", "auth.signup",
+                  json={"username": self.email.split("@")[0], "email": self.email, "password": PASSWORD})
+        self.signin()
+        self.call("POST", "/wallet/topup", "wallet.topup", json={"amount": 100000})
+
+    def signin(self) -> None:
+        token = self.call("POST", "/auth/signin", "auth.signin", json={"email": self.email, "password": PASSWORD})
+        self.headers = {"Authorization": f"Bearer {token['access_token']}"}
+        self.call("GET", "/auth/profile", "auth.profile")
+
+    def estimate(self) -> None:
+        """Страница нового анализа: модели и оценка по тексту"""
+        self.call("GET", "/models", "models")
+        self.call("POST", "/estimate", "estimate",
+                  json={"document_text": generate_contract(self.rng.randint(20, 80), seed=self.rng.random())})
+
+    def upload(self) -> None:
+        """Загрузка файла и ожидание результата опросом статуса"""
+        file_format = self.rng.choice(["txt", "docx", "pdf"])
+        content = as_file(generate_contract(self.rng.randint(20, 80), seed=self.rng.random()), file_format)
+        content_type = {
+            "txt": "text/plain", "pdf": "application/pdf",
+            "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+        }[file_format]
+        job = self.call("POST", "/predict/upload", f"predict.upload.{file_format}",
+                        files={"file": (f"contract.{file_format}", content, content_type)}, data={"language": "RU"})
+
+        deadline = time.monotonic() + self.job_timeout
+        while time.monotonic() < deadline:
+            jobs = self.call("GET", f"/jobs?ids={job['job_id']}&include_clauses=false", "jobs.poll")["jobs"]
+            if jobs and jobs[0]["status"] in TERMINAL_STATUSES:
+                break
+            time.sleep(self.poll_interval)
+        else:
+            raise FlowError(f"job {job['job_id']} not finished in {self.job_timeout}s")
+        self.call("GET", f"/jobs/{job['job_id']}", "jobs.details")
+
+    def history(self) -> None:
+        """Страница истории: статистика и следующая страница списка"""
+        self.call("GET", "/stats", "stats", params={"days": 30})
+        params = {"limit": 10, "cursor": self.history_cursor} if self.history_cursor else {"limit": 10}
+        page = self.call("GET", "/history", "history", params=params)
+        self.history_cursor = page.get("next_cursor")
+
+    def wallet(self) -> None:
+        self.call("GET", "/wallet/wallet", "wallet")
+        self.call("GET", "/wallet/transactions", "wallet.transactions", params={"limit": 10})
+
+
+FLOWS: Dict[str, Callable[[VirtualUser], None]] = {
+    "signin": VirtualUser.signin,
+    "estimate": VirtualUser.estimate,
+    "upload": VirtualUser.upload,
+    "history": VirtualUser.history,
+    "wallet": VirtualUser.wallet,
+}
+
+
+def parse_mix(value: str) -> Dict[str, int]:
+    """"estimate=3,upload=1" -> {"estimate": 3, "upload": 1}"""
+    mix = {}
+    for item in filter(None, value.split(",")):
+        name, _, weight = item.partition("=")
+        if name not in FLOWS:
+            raise argparse.ArgumentTypeError(f"Unknown flow: {name}. Available: {', '.join(FLOWS)}")
+        mix[name] = int(weight or 1)
+    return mix
+
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered) - 1, int(round(q / 100 * len(ordered))) - 1))] if ordered else 0.0
+
+
+class Stats:
+    """Время и ошибки по именам запросов и по сценариям, потокобезопасно"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.timings: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    def add(self, name: str, elapsed_ms: float, ok: bool) -> None:
+        with self._lock:
+            self.timings[name].append(elapsed_ms)
+            if not ok:
+                self.errors[name] += 1
+
+    def report(self, elapsed: float) -> Dict[str, dict]:
+        report = {}
+        for name, timings in sorted(self.timings.items()):
+            report[name] = {
+                "count": len(timings),
+                "errors": self.errors[name],
+                "error_rate": round(self.errors[name] / len(timings), 4),
+                "rps": round(len(timings) / elapsed, 2),
+                "p50_ms": round(percentile(timings, 50), 2),
+                "p95_ms": round(percentile(timings, 95), 2),
+                "p99_ms": round(percentile(timings, 99), 2),
+                "max_ms": round(max(timings), 2),
+            }
+        return report
+
+
+class RecordingUser(VirtualUser):
+    """Виртуальный пользователь встроенного раннера поверх requests.Session или TestClient"""
+
+    def __init__(self, client, base_url: str, stats: Stats, **kwargs):
+        super().__init__(**kwargs)
+        self.client = client
+        self.base_url = base_url
+        self.stats = stats
+
+    def request(self, method: str, path: str, name: str, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = self.client.request(method, self.base_url + path, **kwargs)
+        except Exception:
+            self.stats.add(name, (time.perf_counter() - started) * 1000, ok=False)
+            raise
+        self.stats.add(name, (time.perf_counter() - started) * 1000, ok=response.status_code < 400)
+        return response
+
+
+def run_user(user: VirtualUser, mix: Dict[str, int], stats: Stats, stop: threading.Event, think_time: float) -> None:
+    """Цикл пользователя: сценарий по весам, пауза на чтение страницы"""
+    def flow(name: str, function: Callable[[], None]) -> bool:
+        started = time.perf_counter()
+        try:
+            function()
+            ok = True
+        except Exception:
+            ok = False
+        stats.add(f"flow.{name}", (time.perf_counter() - started) * 1000, ok)
+        return ok
+
+    if not flow("on_start", user.on_start):
+        return
+    names, weights = list(mix), list(mix.values())
+    while not stop.is_set():
+        name = user.rng.choices(names, weights)[0]
+        flow(name, lambda: FLOWS[name](user))
+        stop.wait(user.rng.uniform(0, 2 * think_time))
+
+
+class InProcessStack:
+    """Приложение, worker и заглушки в текущем процессе; worker забирает задачи в фоне"""
+
+    def __init__(self, hf_latency_ms: float, worker_concurrency: int):
+        from benchmarks.bench_pipeline import BenchEnvironment
+        self.env = BenchEnvironment(hf_latency_ms=hf_latency_ms)
+        self.client = self.env.client()
+        self.worker = self.env.worker(worker_concurrency)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._pump, name="load-worker", daemon=True)
+        self._thread.start()
+
+    def _pump(self) -> None:
+        while not self._stop.wait(0.05):
+            self.env.consume(self.worker, self.env.channel.drain(limit=16))
+
+    def close(self) -> None:
+        from services.micro_batcher import stop_micro_batchers
+        self._stop.set()
+        self._thread.join()
+        if self.worker.executor:
+            self.worker.executor.shutdown(wait=True)
+        stop_micro_batchers()
+        self.env.close()
+
+
+def run(users: int, duration: float, mix: Dict[str, int], host: Optional[str] = None, ramp_up: float = 5,
+        think_time: float = 2, poll_interval: float = 1, hf_latency_ms: float = 200, worker_concurrency: int = 4) -> dict:
+    """Нагрузка users пользователей в течение duration секунд; отчёт по запросам и сценариям"""
+    import logging
+    logging.getLogger().setLevel(logging.WARNING)
+
+    stack = None
+    if host:
+        import requests
+        client_factory = requests.Session
+        base_url = host.rstrip("/")
+    else:
+        stack = InProcessStack(hf_latency_ms, worker_concurrency)
+        client_factory = lambda: stack.client
+        base_url = ""
+
+    stats, stop = Stats(), threading.Event()
+    threads = []
+    started = time.perf_counter()
+    try:
+        for number in range(users):
+            user = RecordingUser(client_factory(), base_url, stats, poll_interval=poll_interval, seed=number)
+            thread = threading.Thread(target=run_user, args=(user, mix, stats, stop, think_time),
+                                      name=f"load-user-{number}", daemon=True)
+            thread.start()
+            threads.append(thread)
+            if ramp_up and users > 1:
+                time.sleep(ramp_up / users)
+        stop.wait(max(0.0, duration - (time.perf_counter() - started)))
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        if stack:
+            stack.close()
+
+    requests_total = sum(len(timings) for name, timings in stats.timings.items() if not name.startswith("flow."))
+    errors_total = sum(count for name, count in stats.errors.items() if not name.startswith("flow."))
+    return {
+        "config": {"users": users, "duration": duration, "mix": mix, "host": host or "in-process",
+                   "think_time": think_time, "ramp_up": ramp_up},
+        "summary": {"requests": requests_total, "rps": round(requests_total / elapsed, 2),
+                    "error_rate": round(errors_total / requests_total, 4) if requests_total else 0.0},
+        "endpoints": stats.report(elapsed),
+    }
+
+
+def print_report(report: dict) -> None:
+    print(f"{'name':<28}{'count':>8}{'err%':>8}{'rps':>9}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for name, row in report["endpoints"].items():
+        print(f"{name:<28}{row['count']:>8}{row['error_rate'] * 100:>7.1f}%{row['rps']:>9}"
+              f"{row['p50_ms']:>10}{row['p95_ms']:>10}{row['p99_ms']:>10}")
+    summary = report["summary"]
+    print(f"\nВсего: {summary['requests']} запросов, {summary['rps']} req/s, ошибок {summary['error_rate']:.2%}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Нагрузочные сценарии пользователей интерфейса")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=60, help="Секунды")
+    parser.add_argument("--ramp-up", type=float, default=5, help="Секунды на запуск всех пользователей")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX, help="Веса сценариев: estimate=3,upload=1,...")
+    parser.add_argument("--think-time", type=float, default=2, help="Средняя пауза между сценариями, с")
+    parser.add_argument("--poll-interval", type=float, default=1)
+    parser.add_argument("--host", help="Адрес API; без него - стек в процессе")
+    parser.add_argument("--hf-latency-ms", type=float, default=200, help="Задержка заглушки HF (в процессе)")
+    parser.add_argument("--worker-concurrency", type=int, default=4, help="Потоки worker (в процессе)")
+    parser.add_argument("--max-error-rate", type=float, help="Код выхода 1, если доля ошибок выше")
+    parser.add_argument("--output", help="Файл для JSON-отчёта")
+    args = parser.parse_args(argv)
+
+    report = run(args.users, args.duration, args.mix, args.host, args.ramp_up, args.think_time,
+                 args.poll_interval, args.hf_latency_ms, args.worker_concurrency)
+    print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    if args.max_error_rate is not None and report["summary"]["error_rate"] > args.max_error_rate:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,33 @@
+"""
+Те же сценарии для locust (pip install locust), статистика и веб-интерфейс locust.
+
+Запуск: LOAD_MIX=estimate=3,upload=1,history=4,wallet=2 \\
+        locust -f benchmarks/locustfile.py --host http://localhost -u 50 -r 5
+"""
+import os
+from locust import HttpUser, between, task
+from benchmarks.load_scenarios import DEFAULT_MIX, FLOWS, VirtualUser, parse_mix
+
+MIX = parse_mix(os.environ["LOAD_MIX"]) if os.getenv("LOAD_MIX") else DEFAULT_MIX
+
+
+class LocustVirtualUser(VirtualUser):
+    def __init__(self, client, **kwargs):
+        super().__init__(**kwargs)
+        self.client = client
+
+    def request(self, method: str, path: str, name: str, **kwargs):
+        return self.client.request(method, path, name=name, **kwargs)
+
+
+def _flow_task(flow):
+    return lambda user: flow(user.virtual_user)
+
+
+class FrontendUser(HttpUser):
+    wait_time = between(1, 3)
+    tasks = {_flow_task(FLOWS[name]): weight for name, weight in MIX.items()}
+
+    def on_start(self):
+        self.virtual_user = LocustVirtualUser(self.client, poll_interval=float(os.getenv("LOAD_POLL_INTERVAL", "1")))
+        self.virtual_user.on_start()
@@ -0,0 +1,98 @@
+"""
+Заглушки внешних сервисов для бенчмарков: HTTP-сервер вместо Hugging Face
+Inference API и брокер в памяти процесса вместо RabbitMQ.
+"""
+import json
+import queue
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from typing import List, Optional
+
+
+class StubHFServer:
+    """
+    Отвечает на POST /<модель> так же по форме, как Inference API: по
+    одному summary_text на каждый вход. latency_ms имитирует время модели.
+    """
+
+    def __init__(self, latency_ms: float = 0, host: str = "127.0.0.1", port: int = 0):
+        self.latency = latency_ms / 1000
+        self.requests = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                inputs = payload.get("inputs", [])
+                inputs = inputs if isinstance(inputs, list) else [inputs]
+                stub.requests += 1
+                if stub.latency:
+                    time.sleep(stub.latency)
+                body = json.dumps([
+                    {"summary_text": f"Краткое содержание договора: {text[:80]}"} for text in inputs
+                ]).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, name="stub-hf", daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self) -> "StubHFServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class InProcessChannel:
+    """
+    Подмножество pika-канала, которым пользуются publisher и worker:
+    basic_publish кладёт сообщение в очередь, ack/nack считаются.
+    """
+
+    def __init__(self):
+        self.messages: "queue.Queue" = queue.Queue()
+        self.acked = 0
+        self.nacked = 0
+        self.events = 0
+
+    def basic_publish(self, exchange: str, routing_key: str, body, properties=None) -> None:
+        if routing_key:
+            self.messages.put((body if isinstance(body, bytes) else body.encode("utf-8"), properties))
+        else:
+            self.events += 1
+
+    def basic_ack(self, delivery_tag: int) -> None:
+        self.acked += 1
+
+    def basic_nack(self, delivery_tag: int, requeue: bool = False) -> None:
+        self.nacked += 1
+
+    def queue_declare(self, queue: str, passive: bool = False):
+        return SimpleNamespace(method=SimpleNamespace(message_count=self.messages.qsize(), consumer_count=1))
+
+    def drain(self, limit: Optional[int] = None) -> List[tuple]:
+        """Забрать до limit накопленных сообщений"""
+        result = []
+        while limit is None or len(result) < limit:
+            try:
+                result.append(self.messages.get_nowait())
+            except queue.Empty:
+                break
+        return result
@@ -1,42 +1,151 @@
+import atexit
+import copy
+import json
 import logging
-import sys
-from datetime import datetime
+import logging.handlers
 import os
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+
+LOG_DIR = os.getenv("LOG_DIR", "logs")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "0.1"))
+# SQL-запросы в лог (через очередь, как и остальные записи); echo движков не используется
+DB_ECHO = os.getenv("DB_ECHO", "0") == "1"
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "sample"}
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна запись - одна JSON-строка; поля из extra попадают в объект как есть"""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Пропускает долю rate записей, помеченных extra={"sample": True}.
+    Помечаются только частые INFO/DEBUG-строки горячих путей; WARNING и
+    выше проходят всегда.
+    """
+
+    def __init__(self, rate: float = LOG_SAMPLE_RATE):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or not getattr(record, "sample", False):
+            return True
+        return random.random() < self.rate
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler, который никогда не ждёт: при переполненной очереди запись
+    отбрасывается и учитывается в dropped. Запись и форматирование в файлы
+    выполняет поток QueueListener.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Сообщение подставляется здесь, в потоке вызывающего: аргументы
+        # (в т.ч. ORM-объекты) не должны читаться из другого потока
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def _formatter():
+    if LOG_FORMAT == "json":
+        return JsonFormatter()
+    return logging.Formatter(TEXT_FORMAT, DATE_FORMAT)
+
+
+_listener = None
+
+
+def stop_logging():
+    """Дописать очередь логов и остановить поток QueueListener"""
+    if _listener is not None:
+        _listener.stop()
+
 
 def setup_logging():
     """Настройка системы логирования для приложения"""
-    
-    log_dir = "logs"
-    if not os.path.exists(log_dir):
-        os.makedirs(log_dir)
-    
-
-    log_format = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-    date_format = "%Y-%m-%d %H:%M:%S"
-    
-
-    logging.basicConfig(
-        level=logging.INFO,
-        format=log_format,
-        datefmt=date_format,
-        handlers=[
-            logging.StreamHandler(sys.stdout),
-            logging.FileHandler(
-                f"{log_dir}/app_{datetime.now().strftime('%Y%m%d')}.log",
-                encoding='utf-8'
-            ),
-            logging.FileHandler(
-                f"{log_dir}/errors_{datetime.now().strftime('%Y%m%d')}.log",
-                encoding='utf-8'
-            )
-        ]
+    global _listener
+
+    if not os.path.exists(LOG_DIR):
+        os.makedirs(LOG_DIR)
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(_formatter())
+
+    file_handler = logging.FileHandler(
+        f"{LOG_DIR}/app_{datetime.now().strftime('%Y%m%d')}.log",
+        encoding='utf-8'
     )
-    
+    file_handler.setFormatter(JsonFormatter())
 
-    logging.getLogger("sqlalchemy.engine").setLevel(logging.WARNING)
+    error_handler = logging.FileHandler(
+        f"{LOG_DIR}/errors_{datetime.now().strftime('%Y%m%d')}.log",
+        encoding='utf-8'
+    )
+    error_handler.setLevel(logging.ERROR)
+    error_handler.setFormatter(JsonFormatter())
+
+    queue_handler = NonBlockingQueueHandler(queue.Queue(maxsize=LOG_QUEUE_SIZE))
+    queue_handler.addFilter(SamplingFilter())
+    listener = logging.handlers.QueueListener(
+        queue_handler.queue, stream_handler, file_handler, error_handler, respect_handler_level=True
+    )
+
+    root = logging.getLogger()
+    root.setLevel(logging.INFO)
+    for handler in list(root.handlers):
+        if isinstance(handler, NonBlockingQueueHandler):
+            root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    listener.start()
+    previous, _listener = _listener, listener
+    if previous is not None:
+        previous.stop()
+
+    logging.getLogger("sqlalchemy.engine").setLevel(logging.INFO if DB_ECHO else logging.WARNING)
     logging.getLogger("uvicorn").setLevel(logging.INFO)
     logging.getLogger("fastapi").setLevel(logging.INFO)
-    
 
     loggers = {
         'app': logging.getLogger('app'),
@@ -46,25 +155,24 @@ def setup_logging():
         'wallet': logging.getLogger('wallet'),
         'api': logging.getLogger('api')
     }
-    
 
-    error_handler = logging.FileHandler(
-        f"{log_dir}/errors_{datetime.now().strftime('%Y%m%d')}.log",
-        encoding='utf-8'
-    )
-    error_handler.setLevel(logging.ERROR)
-    error_handler.setFormatter(logging.Formatter(log_format, date_format))
-    
-    for logger in loggers.values():
-        logger.addHandler(error_handler)
-    
     return loggers
 
+def _reset_after_fork():
+    """Поток QueueListener не переживает fork: дочерний процесс заводит свою очередь и поток"""
+    global _listener
+    _listener = None
+    setup_logging()
+
+
 loggers = setup_logging()
+atexit.register(stop_logging)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
 
 app_logger = loggers['app']
-auth_logger = loggers['auth'] 
+auth_logger = loggers['auth']
 database_logger = loggers['database']
 prediction_logger = loggers['prediction']
 wallet_logger = loggers['wallet']
-api_logger = loggers['api']
\ No newline at end of file
+api_logger = loggers['api']
@@ -9,6 +9,8 @@ class Settings(BaseSettings):
     DB_USER: Optional[str] = None
     DB_PASS: Optional[str] = None
     DB_NAME: Optional[str] = None
+    DB_REPLICA_HOST: Optional[str] = None
+    DB_REPLICA_PORT: Optional[int] = None
     SECRET_KEY: Optional[str] = None
     RABBITMQ_HOST: Optional[str] = None
     RABBITMQ_PORT: Optional[int] = None
@@ -28,6 +30,13 @@ class Settings(BaseSettings):
     def DATABASE_URL_psycopg(self):
         return f'postgresql+psycopg://{self.DB_USER}:{self.DB_PASS}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}'
     
+    @property
+    def DATABASE_URL_replica_psycopg(self) -> Optional[str]:
+        if not self.DB_REPLICA_HOST:
+            return None
+        port = self.DB_REPLICA_PORT or self.DB_PORT
+        return f'postgresql+psycopg://{self.DB_USER}:{self.DB_PASS}@{self.DB_REPLICA_HOST}:{port}/{self.DB_NAME}'
+    
     model_config = SettingsConfigDict(env_file='.env')
 
 @lru_cache
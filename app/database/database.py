@@ -1,16 +1,72 @@
+import os
 from sqlmodel import SQLModel, Session, create_engine
 from contextlib import contextmanager
+from fastapi import Request
 from .config import get_settings
+from .session_router import choose_engine
+from services.metrics import register_engine
 from dotenv import load_dotenv
 
 load_dotenv()
 
-engine = create_engine(url=get_settings().DATABASE_URL_psycopg, echo=True, pool_size=5, max_overflow=10)
+
+def make_engine(url: str):
+    """
+    Движок основной БД или реплики. Без echo: он вешает на логгер sqlalchemy.engine
+    свой StreamHandler в stdout в обход очереди логов; SQL в лог включается
+    через DB_ECHO=1 (config/logging_config.py)
+    """
+    return create_engine(url=url, echo=False, pool_size=5, max_overflow=10)
+
+
+engine = make_engine(get_settings().DATABASE_URL_psycopg)
+
+replica_url = get_settings().DATABASE_URL_replica_psycopg
+read_engine = make_engine(replica_url) if replica_url else engine
+
+register_engine("primary", engine)
+if read_engine is not engine:
+    register_engine("replica", read_engine)
+
+
+def _reset_after_fork():
+    """Соединения пула родителя не переиспользуются в дочернем процессе (и не закрываются за него)"""
+    engine.dispose(close=False)
+    if read_engine is not engine:
+        read_engine.dispose(close=False)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
 
 
 def get_session():
     with Session(engine) as session:
         yield session
 
+def get_read_session(request: Request):
+    """Сессия только для чтения: реплика, либо основная БД сразу после записи клиента"""
+    with Session(choose_engine(engine, read_engine, request.cookies)) as session:
+        yield session
+
 def init_db():
-    SQLModel.metadata.create_all(engine)
\ No newline at end of file
+    import models.clausefingerprint
+    import models.userdailystats
+    import models.walletsnapshot
+    import models.archivedjob
+    import models.jobtiming
+    from services.crud import stats as StatsService
+    from database.partitioning import setup_partitioning
+    from database.locks import advisory_xact_lock
+    from database.migrations import upgrade_schema
+    with engine.begin() as connection:
+        advisory_xact_lock(connection)
+        SQLModel.metadata.create_all(connection)
+        # create_all не меняет существующие таблицы: новые колонки добавляются отдельно
+        upgrade_schema(connection)
+    setup_partitioning(engine)
+    with Session(engine) as session:
+        # Реплики стартуют одновременно: первичное заполнение выполняет одна
+        advisory_xact_lock(session, "contract_check:daily_stats")
+        if not StatsService.has_daily_stats(session):
+            StatsService.rebuild_daily_stats(session)
\ No newline at end of file
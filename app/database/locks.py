@@ -0,0 +1,18 @@
+"""
+Advisory-блокировки PostgreSQL для разовых шагов старта.
+
+Несколько процессов (реплики API, мастера gunicorn при --scale app=N)
+стартуют одновременно; шаг под блокировкой выполняет первый, остальные
+ждут конца его транзакции и видят уже готовый результат. Для SQLite и
+других СУБД блокировка не берётся.
+"""
+from sqlalchemy import text
+
+STARTUP_LOCK = "contract_check:startup"
+
+
+def advisory_xact_lock(connection, name: str = STARTUP_LOCK) -> None:
+    """Блокировка до конца текущей транзакции connection (Connection или Session)"""
+    dialect = getattr(connection, "dialect", None) or connection.get_bind().dialect
+    if dialect.name == "postgresql":
+        connection.execute(text("SELECT pg_advisory_xact_lock(hashtext(:name))"), {"name": name})
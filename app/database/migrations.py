@@ -0,0 +1,72 @@
+"""
+Доводка схемы базы, созданной до появления новых колонок.
+
+SQLModel.metadata.create_all создаёт только отсутствующие таблицы и не
+меняет существующие, поэтому колонки, добавленные в модели позже, на старой
+базе появляются здесь: ADD COLUMN IF NOT EXISTS, заполнение уже
+существующих строк и NOT NULL там, где его требует модель; затем создаются
+недостающие индексы моделей. Шаг идемпотентен и выполняется в init_db до
+секционирования, а также перед переводом таблицы командой
+python -m database.partitioning convert.
+"""
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateIndex
+from sqlmodel import SQLModel
+from config.logging_config import app_logger
+
+# Колонки, которых нет в исходной схеме: имя -> выражение для заполнения
+# уже существующих строк (None - остаётся NULL)
+ADDED_COLUMNS: Dict[str, Dict[str, Optional[str]]] = {
+    "document": {"parent_id": None, "version": "1"},
+    "model": {"backend": "'hf_api'", "backend_path": None},
+    "mljob": {"created_at": "COALESCE(started_at, CURRENT_TIMESTAMP)", "previous_job_id": None, "billed_tokens": None},
+    "transaction": {"balance_after": None},
+    "riskclause": {"clause_hash": None, "category": None, "categories": "''"},
+}
+
+
+def _quote(connection, name: str) -> str:
+    return connection.dialect.identifier_preparer.quote(name)
+
+
+def _column_sql(connection, column) -> str:
+    sql = f"{_quote(connection, column.name)} {column.type.compile(dialect=connection.dialect)}"
+    for foreign_key in column.foreign_keys:
+        target = foreign_key.column
+        sql += f" REFERENCES {_quote(connection, target.table.name)} ({_quote(connection, target.name)})"
+    return sql
+
+
+def add_missing_columns(connection, tables: Optional[Iterable[str]] = None) -> List[str]:
+    """Добавить недостающие колонки ADDED_COLUMNS и заполнить их в старых строках"""
+    postgres = connection.dialect.name == "postgresql"
+    inspector = inspect(connection)
+    added = []
+    for table in tables or ADDED_COLUMNS:
+        existing = {column["name"] for column in inspector.get_columns(table)}
+        quoted = _quote(connection, table)
+        for name, backfill in ADDED_COLUMNS.get(table, {}).items():
+            if name in existing:
+                continue
+            column = SQLModel.metadata.tables[table].c[name]
+            # IF NOT EXISTS есть только в PostgreSQL; в SQLite колонку отсекает проверка выше
+            if_not_exists = "IF NOT EXISTS " if postgres else ""
+            connection.execute(text(f"ALTER TABLE {quoted} ADD COLUMN {if_not_exists}{_column_sql(connection, column)}"))
+            if backfill is not None:
+                connection.execute(text(f"UPDATE {quoted} SET {_quote(connection, name)} = {backfill}"))
+            if postgres and not column.nullable:
+                connection.execute(text(f"ALTER TABLE {quoted} ALTER COLUMN {_quote(connection, name)} SET NOT NULL"))
+            added.append(f"{table}.{name}")
+    if added:
+        app_logger.info(f"Добавлены колонки: {', '.join(added)}")
+    return added
+
+
+def upgrade_schema(connection) -> List[str]:
+    """Недостающие колонки и индексы моделей для таблиц исходной схемы"""
+    added = add_missing_columns(connection)
+    for table in ADDED_COLUMNS:
+        for index in SQLModel.metadata.tables[table].indexes:
+            connection.execute(CreateIndex(index, if_not_exists=True))
+    return added
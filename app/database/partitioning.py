@@ -0,0 +1,212 @@
+"""
+Помесячное range-секционирование mljob и transaction в PostgreSQL.
+
+Ключ секционирования входит в первичный ключ (id, <время>), поэтому внешние
+ключи на эти таблицы (riskclause.job_id, mljob.previous_job_id,
+walletsnapshot.transaction_id) при переводе снимаются и проверяются
+приложением; в моделях они тоже не объявлены, чтобы метаданные ORM
+совпадали со схемой. Перевод выполняется под advisory-блокировкой: реплики,
+стартующие одновременно, не конвертируют таблицы параллельно. Для SQLite и
+других СУБД все функции ничего не делают.
+
+Запуск: python -m database.partitioning convert | ensure
+"""
+import argparse
+import os
+import sys
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import text
+from sqlalchemy.schema import AddConstraint, CreateIndex
+from sqlmodel import SQLModel
+from config.logging_config import app_logger
+from database.locks import advisory_xact_lock
+from database.migrations import add_missing_columns
+
+PARTITIONED_TABLES: Dict[str, str] = {
+    "mljob": "created_at",
+    "transaction": "trans_time",
+}
+PARTITION_MONTHS_AHEAD = int(os.getenv("DB_PARTITION_MONTHS_AHEAD", "3"))
+PARTITIONING_LOCK = "contract_check:partitioning"
+
+
+def month_start(value: date) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(value: date, months: int) -> date:
+    month_index = value.year * 12 + value.month - 1 + months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def month_ranges(first: date, last: date) -> List[Tuple[date, date]]:
+    """Границы [начало, начало следующего) для каждого месяца от first до last включительно"""
+    ranges, current = [], month_start(first)
+    while current <= last:
+        following = add_months(current, 1)
+        ranges.append((current, following))
+        current = following
+    return ranges
+
+
+def partition_name(table: str, start: date) -> str:
+    return f"{table}_p{start:%Y_%m}"
+
+
+def _quote(connection, name: str) -> str:
+    return connection.dialect.identifier_preparer.quote(name)
+
+
+def create_partition_sql(connection, table: str, start: date, end: date) -> str:
+    return (
+        f"CREATE TABLE IF NOT EXISTS {_quote(connection, partition_name(table, start))} "
+        f"PARTITION OF {_quote(connection, table)} FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    )
+
+
+def create_default_partition_sql(connection, table: str) -> str:
+    return (
+        f"CREATE TABLE IF NOT EXISTS {_quote(connection, table + '_default')} "
+        f"PARTITION OF {_quote(connection, table)} DEFAULT"
+    )
+
+
+def is_postgres(connection) -> bool:
+    return connection.dialect.name == "postgresql"
+
+
+def is_partitioned(connection, table: str) -> bool:
+    return connection.execute(
+        text("SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:table))"),
+        {"table": _quote(connection, table)}
+    ).scalar()
+
+
+def ensure_partitions(connection, months_ahead: int = PARTITION_MONTHS_AHEAD, today: Optional[date] = None) -> List[str]:
+    """
+    Создать секции с текущего месяца на months_ahead вперёд и секцию по
+    умолчанию. Секции создаются заранее, чтобы новые строки не попадали в
+    DEFAULT (из неё нельзя «вырезать» месяц без переноса данных).
+    """
+    if not is_postgres(connection):
+        return []
+
+    today = today or date.today()
+    created = []
+    for table in PARTITIONED_TABLES:
+        if not is_partitioned(connection, table):
+            continue
+        for start, end in month_ranges(today, add_months(today, months_ahead)):
+            try:
+                with connection.begin_nested():
+                    connection.execute(text(create_partition_sql(connection, table, start, end)))
+                created.append(partition_name(table, start))
+            except Exception as e:
+                app_logger.warning(f"Не удалось создать секцию {partition_name(table, start)}: {e}")
+        connection.execute(text(create_default_partition_sql(connection, table)))
+    return created
+
+
+def convert_to_partitioned(connection, table: str, months_ahead: int = PARTITION_MONTHS_AHEAD) -> None:
+    """
+    Перевести обычную таблицу в секционированную: таблица переименовывается,
+    создаётся родитель PARTITION BY RANGE с секциями на весь диапазон данных,
+    строки копируются, после загрузки строятся первичный ключ, индексы и
+    внешние ключи модели. Таблица исходной схемы сначала получает
+    недостающие колонки, в том числе ключ секционирования created_at.
+    """
+    time_column = PARTITIONED_TABLES[table]
+    model_table = SQLModel.metadata.tables[table]
+    quoted = _quote(connection, table)
+    heap = _quote(connection, f"{table}_heap")
+    add_missing_columns(connection, [table])
+
+    referencing = connection.execute(text(
+        "SELECT conrelid::regclass::text, conname FROM pg_constraint "
+        "WHERE contype = 'f' AND confrelid = to_regclass(:table)"
+    ), {"table": quoted}).all()
+    for owner, constraint in referencing:
+        app_logger.warning(f"Снимается внешний ключ {constraint} на {table}: ключ секции входит в первичный ключ")
+        connection.execute(text(f"ALTER TABLE {owner} DROP CONSTRAINT {_quote(connection, constraint)}"))
+
+    sequence = connection.execute(text("SELECT pg_get_serial_sequence(:table, 'id')"), {"table": quoted}).scalar()
+    bounds = connection.execute(text(f"SELECT min({time_column}), max({time_column}) FROM {quoted}")).one()
+
+    connection.execute(text(f"ALTER TABLE {quoted} RENAME TO {heap}"))
+    connection.execute(text(
+        f"CREATE TABLE {quoted} (LIKE {heap} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+        f"PARTITION BY RANGE ({time_column})"
+    ))
+    if sequence:
+        connection.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY {quoted}.id"))
+
+    today = date.today()
+    first = bounds[0].date() if bounds[0] else today
+    last = max(bounds[1].date() if bounds[1] else today, add_months(today, months_ahead))
+    for start, end in month_ranges(first, last):
+        connection.execute(text(create_partition_sql(connection, table, start, end)))
+    connection.execute(text(create_default_partition_sql(connection, table)))
+
+    connection.execute(text(f"INSERT INTO {quoted} SELECT * FROM {heap}"))
+    connection.execute(text(f"DROP TABLE {heap}"))
+
+    connection.execute(text(f"ALTER TABLE {quoted} ADD PRIMARY KEY (id, {time_column})"))
+    for index in model_table.indexes:
+        connection.execute(CreateIndex(index))
+    for foreign_key in model_table.foreign_key_constraints:
+        if foreign_key.referred_table.name not in PARTITIONED_TABLES:
+            connection.execute(AddConstraint(foreign_key))
+    connection.execute(text(f"ANALYZE {quoted}"))
+    app_logger.info(f"Таблица {table} переведена на помесячные секции ({len(month_ranges(first, last))} шт.)")
+
+
+def setup_partitioning(engine) -> None:
+    """
+    При старте: пустые таблицы сразу переводятся на секции (новая установка),
+    для заполненных перевод выполняется командой convert; затем создаются
+    секции на ближайшие месяцы.
+    """
+    with engine.begin() as connection:
+        if not is_postgres(connection):
+            return
+        advisory_xact_lock(connection, PARTITIONING_LOCK)
+        for table in PARTITIONED_TABLES:
+            if is_partitioned(connection, table):
+                continue
+            has_rows = connection.execute(text(f"SELECT EXISTS (SELECT 1 FROM {_quote(connection, table)})")).scalar()
+            if has_rows:
+                app_logger.warning(
+                    f"Таблица {table} не секционирована и содержит данные: "
+                    f"выполните python -m database.partitioning convert"
+                )
+            else:
+                convert_to_partitioned(connection, table)
+        ensure_partitions(connection)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Помесячные секции mljob и transaction")
+    parser.add_argument("command", choices=["convert", "ensure"])
+    parser.add_argument("--months-ahead", type=int, default=PARTITION_MONTHS_AHEAD)
+    args = parser.parse_args(argv)
+
+    from database.database import engine
+
+    with engine.begin() as connection:
+        if not is_postgres(connection):
+            app_logger.error("Секционирование поддерживается только для PostgreSQL")
+            return 1
+        advisory_xact_lock(connection, PARTITIONING_LOCK)
+        if args.command == "convert":
+            for table in PARTITIONED_TABLES:
+                if not is_partitioned(connection, table):
+                    connection.execute(text(f"LOCK TABLE {_quote(connection, table)} IN ACCESS EXCLUSIVE MODE"))
+                    convert_to_partitioned(connection, table, args.months_ahead)
+        created = ensure_partitions(connection, args.months_ahead)
+    app_logger.info(f"Секции проверены: {len(created)} на {datetime.now():%Y-%m-%d}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
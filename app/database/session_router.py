@@ -0,0 +1,62 @@
+"""
+Маршрутизация чтения между основной БД и репликой.
+
+Чтения идут на реплику, но после собственной записи клиент получает cookie
+db_primary_until и до её истечения читает с основной БД - так ответ не
+отстаёт от только что сделанного изменения (read-your-writes) на время
+задержки репликации.
+"""
+import os
+import time
+from typing import Optional
+from sqlalchemy.engine import Engine
+
+STICKY_COOKIE = "db_primary_until"
+STICKY_SECONDS = float(os.getenv("DB_REPLICA_STICKY_SECONDS", "5"))
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+def prefers_primary(cookies, now: Optional[float] = None) -> bool:
+    """Клиент недавно писал и должен читать с основной БД"""
+    try:
+        return float(cookies.get(STICKY_COOKIE, 0)) > (now or time.time())
+    except (TypeError, ValueError):
+        return False
+
+
+def choose_engine(primary: Engine, replica: Engine, cookies) -> Engine:
+    """Движок для сессии чтения"""
+    if replica is primary or prefers_primary(cookies):
+        return primary
+    return replica
+
+
+def sticky_cookie_header(now: Optional[float] = None, seconds: float = STICKY_SECONDS) -> bytes:
+    until = (now or time.time()) + seconds
+    return f"{STICKY_COOKIE}={until:.3f}; Max-Age={int(seconds) + 1}; Path=/; HttpOnly; SameSite=Lax".encode("latin-1")
+
+
+class ReadYourWritesMiddleware:
+    """
+    ASGI-middleware: к успешным ответам на изменяющие запросы добавляет
+    cookie привязки к основной БД. Чистый ASGI, без буферизации тела -
+    потоковые ответы (SSE, экспорт) не задерживаются.
+    """
+
+    def __init__(self, app, seconds: float = STICKY_SECONDS):
+        self.app = app
+        self.seconds = seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS or self.seconds <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                headers = list(message.get("headers", []))
+                headers.append((b"set-cookie", sticky_cookie_header(seconds=self.seconds)))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
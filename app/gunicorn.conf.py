@@ -0,0 +1,67 @@
+"""
+Боевой запуск API: gunicorn (менеджер процессов) с воркерами uvicorn.
+
+    gunicorn -c gunicorn.conf.py api:app
+
+Настройки через окружение:
+    WEB_CONCURRENCY            - число процессов (по умолчанию 2 * CPU + 1, не больше 8);
+    GUNICORN_WORKER_CLASS      - класс воркера (uvicorn.workers.UvicornWorker);
+    GUNICORN_PRELOAD           - импорт приложения в мастере до fork (1);
+    GUNICORN_KEEPALIVE         - keep-alive, с; больше keepalive_timeout upstream в nginx;
+    GUNICORN_TIMEOUT           - зависший воркер перезапускается через столько секунд;
+    GUNICORN_GRACEFUL_TIMEOUT  - время на завершение запросов при остановке;
+    GUNICORN_MAX_REQUESTS      - перезапуск воркера после N запросов (0 - никогда).
+
+Состояние процесса (пулы БД, соединение с RabbitMQ, фоновые потоки логов,
+трассировки и событий) сбрасывается в дочернем процессе хуками
+os.register_at_fork в модулях-владельцах. Схема БД создаётся один раз в
+мастере, а не каждым воркером (API_INIT_DB=0 - не создавать вовсе).
+"""
+import multiprocessing
+import os
+import shutil
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", min(2 * multiprocessing.cpu_count() + 1, 8)))
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "uvicorn.workers.UvicornWorker")
+preload_app = os.getenv("GUNICORN_PRELOAD", "1") == "1"
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "75"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "0"))
+max_requests_jitter = max_requests // 10
+worker_tmp_dir = "/dev/shm" if os.path.isdir("/dev/shm") else None
+accesslog = None
+errorlog = "-"
+
+init_db_in_master = os.getenv("API_INIT_DB", "1") == "1"
+os.environ["API_INIT_DB"] = "0"
+if workers > 1:
+    os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/prometheus_multiproc")
+
+
+def on_starting(server):
+    """Файлы метрик прошлого запуска не должны попасть в суммы"""
+    directory = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if directory:
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory, exist_ok=True)
+
+
+def when_ready(server):
+    if not init_db_in_master:
+        return
+    from database.database import engine, init_db
+    init_db()
+    engine.dispose()
+    server.log.info("База данных инициализирована")
+
+
+def post_fork(server, worker):
+    server.log.info(f"Воркер {worker.pid} запущен")
+
+
+def child_exit(server, worker):
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -1,29 +1,52 @@
+import gc
 import json
+import os
+import signal
 import time
-import traceback
+import functools
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import pika
-from sqlmodel import Session
+from sqlmodel import Session, select
 from database.database import engine
+from database.partitioning import ensure_partitions
 from models.mljob import MLJob
 from models.document import Document
 from models.model import Model
 from services.rabbitmq_config import RabbitMQConfig
 from services.crud import wallet as WalletService
+from services.crud import mljob as MLJobService
+from services.crud import stats as StatsService
 from config.logging_config import app_logger
 from services.huggingface_service import huggingface_service
+from services.inference_backend import HuggingFaceAPIBackend, get_backend_for_model, preload_backend
+from services.micro_batcher import get_micro_batcher, stop_micro_batchers
+from services.risk_classifier import risk_classifier
+from services.clause_index import ClauseIndex
+from services.profiling import get_job_profiler, install_signal_handlers
+from services.job_timing import StageTimer, current_timer, stage, timing_scope
+from models.jobtiming import JobTiming
+from services.tracing import current_span, extract, inject, set_service_name, start_span
+from services.metrics import QUEUE_DEPTH_INTERVAL, observe_job_finished, start_worker_metrics_server, update_queue_depth
+from services.document_versioning import diff_clauses, merge_risk_clauses
+
+
+PARTITION_CHECK_INTERVAL = 24 * 60 * 60
 
 
 class MLWorker:
     """Worker для обработки ML задач из RabbitMQ"""
     
-    def __init__(self, worker_id: str = "worker-1"):
+    def __init__(self, worker_id: str = "worker-1", concurrency: int = None):
         self.worker_id = worker_id
         self.config = RabbitMQConfig()
         self.connection = None
         self.channel = None
         self.ml_service = huggingface_service
-        app_logger.info(f"Worker {worker_id} использует реальный API сервис Hugging Face")
+        self.profiler = get_job_profiler()
+        self.concurrency = concurrency or int(os.getenv("ML_WORKER_CONCURRENCY", "4"))
+        self.executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix=worker_id) if self.concurrency > 1 else None
+        app_logger.info(f"Worker {worker_id} использует реальный API сервис Hugging Face, параллельных задач: {self.concurrency}")
         
     def connect(self):
         """Подключение к RabbitMQ с повторными попытками"""
@@ -35,8 +58,9 @@ class MLWorker:
             try:
                 self.connection = self.config.get_connection()
                 self.channel = self.config.setup_queue(self.connection)
+                self.config.setup_events_exchange(self.channel)
                 
-                self.channel.basic_qos(prefetch_count=1)
+                self.channel.basic_qos(prefetch_count=self.concurrency)
                 
                 app_logger.info(f"ML Worker {self.worker_id} подключен к RabbitMQ")
                 return
@@ -50,31 +74,60 @@ class MLWorker:
     
     def process_ml_task(self, ch, method, properties, body):
         """Обработчик ML задачи"""
+        if self.executor:
+            self.executor.submit(self._process_ml_task, ch, method.delivery_tag, body, properties.headers)
+        else:
+            self._process_ml_task(ch, method.delivery_tag, body, properties.headers)
+
+    def _ack(self, ch, delivery_tag: int):
+        """Подтверждение сообщения из любого потока"""
+        if self.executor:
+            self.connection.add_callback_threadsafe(functools.partial(ch.basic_ack, delivery_tag=delivery_tag))
+        else:
+            ch.basic_ack(delivery_tag=delivery_tag)
+
+    def _nack(self, ch, delivery_tag: int):
+        """Отклонение сообщения из любого потока"""
+        if self.executor:
+            self.connection.add_callback_threadsafe(functools.partial(ch.basic_nack, delivery_tag=delivery_tag, requeue=False))
+        else:
+            ch.basic_nack(delivery_tag=delivery_tag, requeue=False)
+
+    def _process_ml_task(self, ch, delivery_tag: int, body: bytes, headers: dict = None):
+        """Выполнение ML задачи, в пуле потоков при concurrency > 1"""
+        with start_span("ml_task.process", kind="CONSUMER", parent=extract(headers), root=True, worker=self.worker_id):
+            self._run_ml_task(ch, delivery_tag, body)
+
+    def _run_ml_task(self, ch, delivery_tag: int, body: bytes):
         try:
             task_data = json.loads(body.decode('utf-8'))
             job_id = task_data['job_id']
+            current_span().set_attribute("job_id", job_id)
             document_id = task_data['document_id']
             model_id = task_data['model_id']
             summary_depth = task_data.get('summary_depth', 'BULLET')
+            job_kind = "incremental" if task_data.get('previous_job_id') else "full"
             
-            app_logger.info(f"Worker {self.worker_id} начал обработку задачи {job_id}")
+            app_logger.info("Worker %s начал обработку задачи %s", self.worker_id, job_id, extra={"job_id": job_id})
             
             if not self.validate_task_data(job_id, document_id, model_id):
-                ch.basic_ack(delivery_tag=method.delivery_tag)
+                self._ack(ch, delivery_tag)
                 return
             
-            success = self.execute_ml_prediction(job_id, document_id, model_id, summary_depth)
+            dequeued_at = datetime.now()
+            with timing_scope(StageTimer()) as timer, self.profiler.profile(job_kind, job_id):
+                success = self.execute_ml_prediction(job_id, document_id, model_id, summary_depth)
+            self.save_job_timing(job_id, model_id, task_data, dequeued_at, timer)
             
             if success:
-                app_logger.info(f"Worker {self.worker_id} успешно завершил задачу {job_id}")
+                app_logger.info("Worker %s успешно завершил задачу %s", self.worker_id, job_id, extra={"job_id": job_id})
             else:
-                app_logger.error(f"Worker {self.worker_id} не смог выполнить задачу {job_id}")
+                app_logger.error("Worker %s не смог выполнить задачу %s", self.worker_id, job_id, extra={"job_id": job_id})
             
-            ch.basic_ack(delivery_tag=method.delivery_tag)
+            self._ack(ch, delivery_tag)
             
         except Exception as e:
-            app_logger.error(f"Worker {self.worker_id} ошибка обработки: {e}")
-            app_logger.error(f"Traceback: {traceback.format_exc()}")
+            app_logger.error("Worker %s ошибка обработки: %s", self.worker_id, e, exc_info=True)
             
             try:
                 task_data = json.loads(body.decode('utf-8'))
@@ -84,7 +137,53 @@ class MLWorker:
             except:
                 pass
             
-            ch.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
+            self._nack(ch, delivery_tag)
+    
+    def save_job_timing(self, job_id: int, model_id: int, task_data: dict, dequeued_at: datetime, timer: StageTimer):
+        """Записывает время стадий задачи; ошибка записи не влияет на саму задачу"""
+        try:
+            enqueued_at = datetime.fromisoformat(task_data["timestamp"]) if task_data.get("timestamp") else None
+            with Session(engine) as session:
+                job = session.get(MLJob, job_id)
+                timing = JobTiming(
+                    job_id=job_id,
+                    model_id=model_id,
+                    status=job.status if job else "ERROR",
+                    backend=timer.backend,
+                    enqueued_at=enqueued_at,
+                    dequeued_at=dequeued_at,
+                    queue_wait_ms=(dequeued_at - enqueued_at).total_seconds() * 1000 if enqueued_at else None,
+                    extraction_ms=task_data.get("extraction_ms"),
+                    inference_ms=timer.stages.get("inference", 0.0),
+                    risk_scan_ms=timer.stages.get("risk_scan", 0.0),
+                    commit_ms=timer.stages.get("commit", 0.0),
+                    processing_ms=timer.elapsed_ms(),
+                    cache_hits=timer.cache_hits
+                )
+                StatsService.record_job_timing(timing, session)
+        except Exception as e:
+            app_logger.warning(f"Не удалось сохранить время стадий задачи {job_id}: {e}")
+    
+    def publish_job_event(self, job_id: int, status: str, **fields):
+        """Публикует событие статуса задачи в fanout-exchange для подписчиков API"""
+        if not self.channel:
+            return
+        
+        body = json.dumps({"job_id": job_id, "status": status, **fields}, default=str)
+        publish = functools.partial(
+            self.channel.basic_publish,
+            exchange=self.config.events_exchange_name,
+            routing_key='',
+            body=body,
+            properties=pika.BasicProperties(content_type='application/json', headers=inject())
+        )
+        try:
+            if self.executor:
+                self.connection.add_callback_threadsafe(publish)
+            else:
+                publish()
+        except Exception as e:
+            app_logger.warning(f"Не удалось опубликовать событие задачи {job_id}: {e}")
     
     def validate_task_data(self, job_id: int, document_id: int, model_id: int) -> bool:
         """Валидация данных задачи"""
@@ -112,7 +211,7 @@ class MLWorker:
                     self.update_job_status(job_id, "ERROR", "Документ не содержит текста", refund_money=True)
                     return False
                 
-                app_logger.info(f"Валидация задачи {job_id} прошла успешно")
+                app_logger.info("Валидация задачи %s прошла успешно", job_id, extra={"sample": True})
                 return True
                 
         except Exception as e:
@@ -132,39 +231,65 @@ class MLWorker:
                     return False
                 
                 job.start()
-                app_logger.info(f"Начат ML анализ документа {document.filename} с моделью {model.name}")
+                self.publish_job_event(job_id, job.status)
+                app_logger.info("Начат ML анализ документа %s с моделью %s", document.filename, model.name, extra={"sample": True})
                 
-                analysis_result = self.ml_service.analyze_contract_risks(document.raw_text)
+                backend = self.get_inference_backend(model)
+                clause_index = ClauseIndex(session)
+                timer = current_timer()
+                if timer:
+                    timer.backend = backend.name
+                incremental_result = None
+                if job.previous_job_id:
+                    incremental_result = self.execute_incremental_analysis(session, job, document, backend, clause_index)
                 
-                if analysis_result["processed_successfully"]:
-                    summary_text = analysis_result.get("summary") or "Анализ выполнен успешно"
-                    risk_score = analysis_result.get("risk_score", 0.0)
-                    risk_clauses = analysis_result.get("risk_clauses", [])
+                if incremental_result:
+                    summary_text, risk_score, risk_clauses = incremental_result
+                    app_logger.info("Версия %s документа %s проанализирована инкрементально", document.version, document.filename, extra={"sample": True})
+                else:
+                    with start_span("ml.analyze", backend=backend.name, chars=len(document.raw_text or "")):
+                        analysis_result = self.ml_service.analyze_contract_risks(document.raw_text, backend, clause_index)
+                    
+                    if analysis_result["processed_successfully"]:
+                        summary_text = analysis_result.get("summary") or "Анализ выполнен успешно"
+                        risk_score = analysis_result.get("risk_score", 0.0)
+                        risk_clauses = analysis_result.get("risk_clauses", [])
                     
-                    if analysis_result.get("key_terms"):
-                        key_terms = analysis_result["key_terms"][:5]
-                        summary_text += f"\n\nКлючевые термины: {', '.join(key_terms)}"
+                        if analysis_result.get("key_terms"):
+                            key_terms = analysis_result["key_terms"][:5]
+                            summary_text += f"\n\nКлючевые термины: {', '.join(key_terms)}"
                         
-                    app_logger.info(f"HuggingFace API успешно обработал документ {document.filename}")
-                else:
-                    app_logger.warning(f"HuggingFace API не смог обработать документ {document.filename}: {analysis_result.get('error_message', 'Unknown error')}")
-                    summary_text, risk_score, risk_clauses = self.simulate_ml_analysis_fallback(
-                        document.raw_text, summary_depth, model.name
-                    )
-                
-                used_credits = document.token_count * model.price_per_token
-                job.used_credits = used_credits
-                
-                job.finish_ok(summary_text, risk_score)
-                session.add(job)
+                        app_logger.info("Бэкенд %s успешно обработал документ %s", backend.name, document.filename, extra={"sample": True})
+                    else:
+                        app_logger.warning(f"Бэкенд {backend.name} не смог обработать документ {document.filename}: {analysis_result.get('error_message', 'Unknown error')}")
+                        summary_text, risk_score, risk_clauses = self.simulate_ml_analysis_fallback(
+                            document.raw_text, summary_depth, model.name, clause_index
+                        )
                 
-                if risk_clauses:
-                    from services.crud import mljob as MLJobService
-                    MLJobService.add_risk_clauses_to_job(job.id, risk_clauses, session)
+                with start_span("job.save_result", risk_clauses=len(risk_clauses or [])), stage("commit"):
+                    used_credits = job.billable_tokens(document) * model.price_per_token
+                    job.used_credits = used_credits
+                    
+                    job.finish_ok(summary_text, risk_score)
+                    session.add(job)
+                    
+                    if risk_clauses:
+                        MLJobService.add_risk_clauses_to_job(job.id, risk_clauses, session)
+                    
+                    StatsService.record_job_finished(document.user_id, job, session)
+                    session.commit()
+                observe_job_finished(job)
+                self.publish_job_event(job_id, job.status, risk_score=risk_score, finished_at=job.finished_at)
                 
-                session.commit()
+                try:
+                    saved_clauses = clause_index.save_new()
+                    if timer:
+                        timer.cache_hits = clause_index.reused
+                    app_logger.info("Индекс пунктов job_id=%s: переиспользовано %s, сохранено новых %s", job_id, clause_index.reused, saved_clauses, extra={"sample": True})
+                except Exception as e:
+                    app_logger.warning(f"Не удалось сохранить отпечатки пунктов для job {job_id}: {e}")
                 
-                app_logger.info(f"ML анализ завершен: job_id={job_id}, risk_score={risk_score}, credits={used_credits}")
+                app_logger.info("ML анализ завершен: job_id=%s, risk_score=%s, credits=%s", job_id, risk_score, used_credits, extra={"job_id": job_id})
                 return True
                 
         except Exception as e:
@@ -172,36 +297,69 @@ class MLWorker:
             self.update_job_status(job_id, "ERROR", f"Ошибка ML: {str(e)}", refund_money=True)
             return False
 
-    def simulate_ml_analysis_fallback(self, text: str, depth: str, model_name: str) -> tuple[str, float, list]:
-        """Резервный метод когда HuggingFace API недоступен"""
-        app_logger.warning("HuggingFace API недоступен, используется локальный анализ")
-        time.sleep(1)
+    def execute_incremental_analysis(self, session: Session, job: MLJob, document: Document, backend, clause_index):
+        """
+        Анализ новой версии договора: моделью анализируются только изменённые
+        пункты, неизменённые классифицируются по индексу отпечатков.
+        Возвращает None, если предыдущая версия недоступна.
+        """
+        previous_job = session.get(MLJob, job.previous_job_id)
+        previous_document = session.get(Document, previous_job.document_id) if previous_job else None
+        if not previous_document:
+            app_logger.warning(f"Предыдущая задача {job.previous_job_id} недоступна, выполняется полный анализ job {job.id}")
+            return None
         
-        risk_keywords = {
-            'неустойка': 0.8, 'штраф': 0.7, 'пени': 0.8,
-            'ответственность': 0.6, 'нарушение': 0.7,
-            'расторжение': 0.9, 'односторонний': 0.9,
-            'просрочка': 0.6, 'penalty': 0.7, 'fine': 0.7
-        }
+        diff = diff_clauses(previous_document.raw_text, document.raw_text)
+        app_logger.info("Job %s: изменено пунктов %s, без изменений %s, удалено %s", job.id, len(diff.changed), diff.unchanged, diff.removed, extra={"sample": True})
         
-        found_risks = []
-        risk_score = 0.1
-        text_lower = text.lower()
+        changes_summary, changed_clauses, changed_categories = None, [], []
+        if diff.changed:
+            analysis_result = self.ml_service.analyze_contract_risks(diff.changed_text, backend, clause_index)
+            if analysis_result["processed_successfully"]:
+                changes_summary = analysis_result.get("summary")
+                changed_clauses = analysis_result["risk_clauses"]
+                changed_categories = analysis_result["risk_categories"]
+            else:
+                risk_analysis = risk_classifier.analyze(diff.changed_text, clause_index=clause_index)
+                changed_clauses = risk_analysis["risk_clauses"]
+                changed_categories = risk_analysis["categories"]
+        
+        risk_clauses, risk_score = merge_risk_clauses(diff, changed_clauses, changed_categories, clause_index)
         
-        for keyword, weight in risk_keywords.items():
-            if keyword in text_lower:
-                found_risks.append(keyword)
-                risk_score += weight * 0.1
+        summary_text = (
+            f"Версия {document.version}: изменено пунктов {len(diff.changed)}, "
+            f"без изменений {diff.unchanged}, удалено {diff.removed}."
+        )
+        if changes_summary:
+            summary_text += f"\n\nИзменения:\n{changes_summary}"
+        elif not diff.changed:
+            summary_text += f"\n\n{previous_job.summary_text or ''}".rstrip()
+        
+        return summary_text, risk_score, risk_clauses
+
+    def get_inference_backend(self, model: Model):
+        """Бэкенд модели; при параллельной обработке - через общий микробатчер"""
+        backend = get_backend_for_model(model)
+        if self.concurrency > 1:
+            return get_micro_batcher(backend)
+        return backend
+
+    def simulate_ml_analysis_fallback(self, text: str, depth: str, model_name: str, clause_index=None) -> tuple[str, float, list]:
+        """Резервный метод когда HuggingFace API недоступен"""
+        app_logger.warning("HuggingFace API недоступен, используется локальный анализ")
+        time.sleep(1)
         
-        risk_score = min(risk_score, 0.9) 
+        risk_analysis = risk_classifier.analyze(text, clause_index=clause_index)
+        found_risks = risk_classifier.category_titles(risk_analysis["categories"])
+        risk_score = min(0.1 + risk_analysis["risk_score"], 0.9)
         
         api_notice = "⚠️ ВНИМАНИЕ: Текст не был обработан полноценными ML-моделями."
         
         if depth == "BULLET":
             summary = f"""{api_notice}
-• Выполнен базовый анализ на ключевых словах
-• Найдено рисковых терминов: {len(found_risks)}
-• Ключевые термины: {', '.join(found_risks[:3]) if found_risks else 'не обнаружены'}
+• Выполнен базовый анализ классификатором рисковых пунктов
+• Найдено категорий риска: {len(found_risks)}
+• Категории риска: {', '.join(found_risks[:3]) if found_risks else 'не обнаружены'}
 • Приблизительная оценка риска: {risk_score:.2f}
 • Для точного анализа требуется настройка HuggingFace API"""
         else:
@@ -210,8 +368,8 @@ class MLWorker:
 БАЗОВЫЙ АНАЛИЗ:
 Выполнен упрощенный анализ документа без использования нейронных сетей.
 
-ОБНАРУЖЕННЫЕ РИСКОВЫЕ ТЕРМИНЫ:
-{chr(10).join(f'- {term}' for term in found_risks) if found_risks else '- Значимые рисковые термины не обнаружены'}
+ОБНАРУЖЕННЫЕ КАТЕГОРИИ РИСКА:
+{chr(10).join(f'- {term}' for term in found_risks) if found_risks else '- Значимые категории риска не обнаружены'}
 
 ОГРАНИЧЕНИЯ АНАЛИЗА:
 - Анализ выполнен без ML-моделей HuggingFace
@@ -224,13 +382,7 @@ class MLWorker:
 1. Установить HUGGINGFACE_API_TOKEN в переменные окружения
 2. Убедиться в наличии доступа к интернету"""
         
-        risk_clauses = []
-        if found_risks:
-            risk_clauses.append({
-                'clause_text': f"Обнаружены потенциально рисковые термины: {', '.join(found_risks[:5])}",
-                'risk_level': 'MEDIUM',
-                'explanation': 'Базовый анализ без ML-моделей. Требуется настройка HuggingFace API для точного анализа.'
-            })
+        risk_clauses = risk_analysis["risk_clauses"]
         
         return summary, risk_score, risk_clauses
     
@@ -241,17 +393,22 @@ class MLWorker:
                 job = session.get(MLJob, job_id)
                 if job:
                     if status == "ERROR":
+                        already_finished = job.status in ("DONE", "ERROR")
                         job.finish_error(error_msg)
+                        user_id = job.get_user_id(session)
+                        if user_id and not already_finished:
+                            StatsService.record_job_finished(user_id, job, session)
+                        if not already_finished:
+                            observe_job_finished(job)
                         
                         if refund_money:
                             try:
-                                user_id = job.get_user_id(session)
                                 if user_id:
                                     from decimal import Decimal
                                     document = session.get(Document, job.document_id)
                                     model = session.get(Model, job.model_id)
                                     if document and model:
-                                        refund_amount = Decimal(str(document.token_count * model.price_per_token))
+                                        refund_amount = Decimal(str(job.billable_tokens(document) * model.price_per_token))
                                         WalletService.credit_wallet(user_id, refund_amount, session)
                                         app_logger.info(f"Возвращены средства пользователю {user_id}: {refund_amount} за неудачное предсказание {job_id}")
                                     else:
@@ -264,6 +421,7 @@ class MLWorker:
                         job.status = status
                     session.add(job)
                     session.commit()
+                    self.publish_job_event(job_id, job.status, finished_at=job.finished_at)
         except Exception as e:
             app_logger.error(f"Ошибка обновления статуса job {job_id}: {e}")
     
@@ -276,6 +434,8 @@ class MLWorker:
             queue=self.config.ml_queue_name,
             on_message_callback=self.process_ml_task
         )
+        self.maintain_partitions()
+        self.report_queue_depth()
         
         app_logger.info(f"Worker {self.worker_id} начал ожидание ML задач...")
         
@@ -283,27 +443,101 @@ class MLWorker:
             self.channel.start_consuming()
         except KeyboardInterrupt:
             app_logger.info(f"Worker {self.worker_id} получил сигнал остановки")
-            self.stop_consuming()
+        self.stop_consuming()
     
+    def maintain_partitions(self):
+        """Раз в сутки создаёт месячные секции mljob/transaction на ближайшие месяцы"""
+        try:
+            with engine.begin() as connection:
+                created = ensure_partitions(connection)
+            if created:
+                app_logger.info(f"Секции проверены: {', '.join(created)}")
+        except Exception as e:
+            app_logger.warning(f"Не удалось проверить секции таблиц: {e}")
+        self.connection.call_later(PARTITION_CHECK_INTERVAL, self.maintain_partitions)
+    
+    def report_queue_depth(self):
+        """Периодически обновляет метрику глубины очереди задач"""
+        update_queue_depth(self.channel, self.config.ml_queue_name)
+        self.connection.call_later(QUEUE_DEPTH_INTERVAL, self.report_queue_depth)
+    
+    def request_stop(self):
+        """
+        Плавная остановка (SIGTERM): новые задачи не принимаются, начатые
+        дорабатываются и подтверждаются в stop_consuming. Безопасно из
+        обработчика сигнала и из других потоков.
+        """
+        app_logger.info(f"Worker {self.worker_id} завершает текущие задачи перед остановкой")
+        if self.connection and self.channel:
+            self.connection.add_callback_threadsafe(self.channel.stop_consuming)
+
     def stop_consuming(self):
         """Останавливает потребление сообщений"""
         if self.channel:
             self.channel.stop_consuming()
         
+        if self.executor:
+            self.executor.shutdown(wait=True)
+        stop_micro_batchers()
+        
         if self.connection and not self.connection.is_closed:
+            self.connection.process_data_events(time_limit=0)
             self.connection.close()
         
         app_logger.info(f"Worker {self.worker_id} остановлен")
 
 
-if __name__ == "__main__":
-    import sys
-    
-    worker_id = sys.argv[1] if len(sys.argv) > 1 else "worker-default"
-    
+def preload_shared_assets() -> None:
+    """
+    Загрузка общих read-only ресурсов в родительском процессе пула (worker_supervisor
+    с ML_WORKER_PRELOAD=1): откомпилированные выражения DocumentProcessor и
+    HuggingFaceService, лексикон и центроиды RiskClauseClassifier, токенизаторы
+    локальных моделей. Дочерние процессы наследуют их копированием при записи.
+    """
+    import services.document_processor  # noqa: F401 - выражения компилируются при импорте
+
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+    try:
+        with Session(engine) as session:
+            models = session.exec(
+                select(Model).where(Model.active == True, Model.backend != HuggingFaceAPIBackend.name)
+            ).all()
+    except Exception as e:
+        app_logger.warning(f"Не удалось получить список локальных моделей для предзагрузки: {e}")
+        models = []
+
+    for model in models:
+        try:
+            if preload_backend(model.backend, model.backend_path):
+                app_logger.info(f"Предзагружен токенизатор модели {model.name} ({model.backend})")
+        except Exception as e:
+            app_logger.warning(f"Предзагрузка модели {model.name} не удалась: {e}")
+
+    # Соединения пула БД не делятся между процессами
+    engine.dispose()
+    # Объекты родителя - в постоянное поколение: сборщик мусора в дочерних
+    # не трогает их счётчики и не копирует страницы с ними
+    gc.collect()
+    gc.freeze()
+
+
+def run_worker(worker_id: str) -> int:
+    """Запуск worker до остановки; код выхода процесса"""
+    set_service_name(os.getenv("OTEL_SERVICE_NAME", "ml-worker"))
     worker = MLWorker(worker_id)
+    start_worker_metrics_server(int(os.getenv("ML_WORKER_METRICS_PORT", "9100")))
+    install_signal_handlers(worker.profiler)
+    signal.signal(signal.SIGTERM, lambda signum, frame: worker.request_stop())
     try:
         worker.start_consuming()
     except Exception as e:
         app_logger.error(f"Критическая ошибка worker {worker_id}: {e}")
-        sys.exit(1)
\ No newline at end of file
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    import sys
+    
+    worker_id = sys.argv[1] if len(sys.argv) > 1 else "worker-default"
+    sys.exit(run_worker(worker_id))
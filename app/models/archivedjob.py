@@ -0,0 +1,97 @@
+import json
+import zlib
+from datetime import datetime
+from decimal import Decimal
+from typing import List, Optional
+from sqlalchemy import Column, Index, LargeBinary
+from sqlmodel import SQLModel, Field
+from models.mljob import MLJob
+from models.riskclause import RiskClause
+
+CLAUSE_FIELDS = ("id", "clause_text", "risk_level", "explanation", "clause_hash", "category", "categories")
+
+
+class ArchivedJob(SQLModel, table=True):
+    """
+    Завершённое задание, перенесённое из mljob/riskclause в архив.
+
+    Скалярные поля хранятся колонками (для фильтров и сортировки истории),
+    объёмные - конспект и рисковые пункты - одним сжатым zlib JSON-блоком.
+
+    Attributes:
+        id (int): ID исходного задания (сохраняется при архивации).
+        user_id (int): Владелец документа - история читается без join.
+        archive_month (str): Месяц завершения YYYY-MM - ключ секции архива.
+        payload (bytes): Сжатые summary_text и рисковые пункты.
+        archived_at (datetime): Когда задание перенесено в архив.
+    """
+    model_config = {"protected_namespaces": ()}
+    __table_args__ = (Index("ix_archivedjob_user_created_id", "user_id", "created_at", "id"),)
+    id: int = Field(primary_key=True)
+    user_id: int
+    document_id: int = Field(index=True)
+    model_id: int
+    status: str
+    summary_depth: str
+    used_credits: Decimal = Field(default=Decimal("0"))
+    risk_score: Optional[float] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    previous_job_id: Optional[int] = None
+    billed_tokens: Optional[int] = None
+    archive_month: str = Field(index=True)
+    payload: bytes = Field(sa_column=Column(LargeBinary, nullable=False))
+    archived_at: datetime = Field(default_factory=datetime.now)
+
+    @classmethod
+    def from_job(cls, job: MLJob, user_id: int, risk_clauses: List[RiskClause]) -> "ArchivedJob":
+        """Архивная запись по заданию и его пунктам"""
+        payload = {
+            "summary_text": job.summary_text,
+            "risk_clauses": [{field: getattr(clause, field) for field in CLAUSE_FIELDS} for clause in risk_clauses]
+        }
+        return cls(
+            id=job.id,
+            user_id=user_id,
+            document_id=job.document_id,
+            model_id=job.model_id,
+            status=job.status,
+            summary_depth=job.summary_depth,
+            used_credits=job.used_credits,
+            risk_score=job.risk_score,
+            created_at=job.created_at,
+            started_at=job.started_at,
+            finished_at=job.finished_at,
+            previous_job_id=job.previous_job_id,
+            billed_tokens=job.billed_tokens,
+            archive_month=(job.finished_at or job.created_at).strftime("%Y-%m"),
+            payload=zlib.compress(json.dumps(payload, ensure_ascii=False).encode("utf-8"), 6)
+        )
+
+    def unpack(self) -> dict:
+        return json.loads(zlib.decompress(self.payload).decode("utf-8"))
+
+    def to_job(self) -> MLJob:
+        """
+        Несохраняемый MLJob с данными архива: чтение истории работает с ним
+        как с обычным заданием. Пункты доступны через _archived_clauses.
+        """
+        payload = self.unpack()
+        job = MLJob(
+            id=self.id,
+            document_id=self.document_id,
+            model_id=self.model_id,
+            status=self.status,
+            summary_depth=self.summary_depth,
+            used_credits=self.used_credits,
+            summary_text=payload["summary_text"],
+            risk_score=self.risk_score,
+            created_at=self.created_at,
+            started_at=self.started_at,
+            finished_at=self.finished_at,
+            previous_job_id=self.previous_job_id,
+            billed_tokens=self.billed_tokens
+        )
+        job._archived_clauses = [RiskClause(job_id=self.id, **clause) for clause in payload["risk_clauses"]]
+        return job
@@ -0,0 +1,39 @@
+from datetime import datetime
+from typing import Optional
+from sqlmodel import SQLModel, Field
+
+
+class ClauseFingerprint(SQLModel, table=True):
+    """
+    Отпечаток пункта договора с результатом его анализа.
+
+    Attributes:
+        text_hash (str): SHA1 нормализованного текста пункта.
+        minhash (str): MinHash-сигнатура пункта (hex) для поиска почти-дубликатов.
+        risk_level (Optional[str]): Уровень риска; None - пункт не рисковый.
+        explanation (Optional[str]): Обоснование риска.
+        category (Optional[str]): Основная категория риска.
+        categories (str): Все сработавшие категории через запятую.
+        created_at (datetime): Когда пункт впервые проанализирован.
+    """
+    id: int = Field(default=None, primary_key=True)
+    text_hash: str = Field(index=True, unique=True)
+    minhash: str
+    risk_level: Optional[str] = None
+    explanation: Optional[str] = None
+    category: Optional[str] = None
+    categories: str = Field(default="")
+    created_at: datetime = Field(default_factory=datetime.now)
+
+
+class ClauseBand(SQLModel, table=True):
+    """
+    LSH-полоса MinHash-сигнатуры: пункты с общей полосой - кандидаты в дубликаты.
+
+    Attributes:
+        band_key (str): Номер полосы и хэш её значений.
+        fingerprint_id (int): Отпечаток, которому принадлежит полоса.
+    """
+    id: int = Field(default=None, primary_key=True)
+    band_key: str = Field(index=True)
+    fingerprint_id: int = Field(foreign_key="clausefingerprint.id", index=True)
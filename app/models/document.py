@@ -1,4 +1,6 @@
 from datetime import datetime
+from typing import Optional
+from sqlalchemy import Index
 from sqlmodel import SQLModel, Field
 import re
 
@@ -14,7 +16,10 @@ class Document(SQLModel, table=True):
         token_count (int): Количество токенов (нужно для тарификации).
         language (str): RU (только русский язык).
         uploaded_at (datetime): Время загрузки.
+        parent_id (Optional[int]): Предыдущая версия этого договора.
+        version (int): Номер версии (1 - первая загрузка).
     """
+    __table_args__ = (Index("ix_document_user_uploaded_id", "user_id", "uploaded_at", "id"),)
     id: int = Field(default=None, primary_key=True)
     user_id: int
     filename: str
@@ -22,6 +27,8 @@ class Document(SQLModel, table=True):
     token_count: int
     language: str = "RU"
     uploaded_at: datetime = Field(default_factory=datetime.now)
+    parent_id: Optional[int] = Field(default=None, foreign_key="document.id", index=True)
+    version: int = Field(default=1)
     
     @staticmethod
     def count_tokens(text: str) -> int:
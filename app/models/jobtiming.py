@@ -0,0 +1,45 @@
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import Index
+from sqlmodel import SQLModel, Field
+
+STAGES = ("queue_wait", "extraction", "inference", "risk_scan", "commit", "processing")
+
+
+class JobTiming(SQLModel, table=True):
+    """
+    Время стадий обработки задачи, записывается воркером по завершении.
+
+    Без внешнего ключа на mljob: она секционирована, id задачи уникален
+    только вместе с created_at.
+
+    Attributes:
+        job_id (int): ID задачи.
+        model_id (int): ID модели.
+        status (str): Итоговый статус задачи.
+        backend (Optional[str]): Бэкенд инференса.
+        enqueued_at / dequeued_at / finished_at (datetime): Постановка в
+            очередь, получение воркером, завершение.
+        queue_wait_ms (Optional[float]): Ожидание в очереди.
+        extraction_ms (Optional[float]): Извлечение текста из файла в API.
+        inference_ms / risk_scan_ms / commit_ms (float): Саммаризация,
+            поиск рисковых пунктов, запись результата.
+        processing_ms (float): Всё время работы воркера над задачей.
+        cache_hits (int): Пункты, взятые из индекса отпечатков.
+    """
+    model_config = {"protected_namespaces": ()}
+    __table_args__ = (Index("ix_jobtiming_finished_at_model_id", "finished_at", "model_id"),)
+    job_id: int = Field(primary_key=True, sa_column_kwargs={"autoincrement": False})
+    model_id: int
+    status: str
+    backend: Optional[str] = None
+    enqueued_at: Optional[datetime] = None
+    dequeued_at: datetime
+    finished_at: datetime = Field(default_factory=datetime.now)
+    queue_wait_ms: Optional[float] = None
+    extraction_ms: Optional[float] = None
+    inference_ms: float = Field(default=0.0)
+    risk_scan_ms: float = Field(default=0.0)
+    commit_ms: float = Field(default=0.0)
+    processing_ms: float = Field(default=0.0)
+    cache_hits: int = Field(default=0)
@@ -1,10 +1,10 @@
 from datetime import datetime
 from decimal import Decimal
 from typing import Optional
+from sqlalchemy import Index
 from sqlmodel import SQLModel, Field
 
 class MLJob(SQLModel, table=True):
-    model_config = {"protected_namespaces": ()}
     """
     Задание на ML‑обработку документа.
 
@@ -17,8 +17,16 @@ class MLJob(SQLModel, table=True):
         used_credits (Decimal): Сколько списано за задачу.
         summary_text (Optional[str]): Итоговый конспект.
         risk_score (Optional[float]): Общий «риск‑индекс» договора.
-        started_at / finished_at (datetime): Таймстемпы выполнения.
+        created_at (datetime): Время создания задачи (ключ сортировки истории).
+        started_at / finished_at (datetime): Начало обработки воркером и завершение.
+        previous_job_id (Optional[int]): Задача по предыдущей версии документа,
+            результаты которой переиспользуются для неизменённых пунктов.
+        billed_tokens (Optional[int]): Оплаченные токены, если меньше токенов документа.
     """
+    model_config = {"protected_namespaces": ()}
+    # История пользователя: документы по ix_document_user_uploaded_id, затем
+    # задачи каждого документа уже в порядке ключа курсора (created_at, id)
+    __table_args__ = (Index("ix_mljob_document_created_id", "document_id", "created_at", "id"),)
     id: int = Field(default=None, primary_key=True)
     document_id: int = Field(foreign_key="document.id")
     model_id: int = Field(foreign_key="model.id")
@@ -27,8 +35,12 @@ class MLJob(SQLModel, table=True):
     used_credits: Decimal = Field(default=Decimal("0"))
     summary_text: Optional[str] = None
     risk_score: Optional[float] = None
-    started_at: Optional[datetime] = Field(default_factory=datetime.now)
+    created_at: datetime = Field(default_factory=datetime.now)
+    started_at: Optional[datetime] = None
     finished_at: Optional[datetime] = None
+    # Без внешнего ключа: mljob секционирована, ключ (id, created_at) - см. database/partitioning.py
+    previous_job_id: Optional[int] = None
+    billed_tokens: Optional[int] = None
 
     def start(self) -> None:
         self.status = "RUNNING"
@@ -45,6 +57,10 @@ class MLJob(SQLModel, table=True):
         self.summary_text = f"Error: {msg}"
         self.finished_at = datetime.now()
 
+    def billable_tokens(self, document) -> int:
+        """Токены, за которые списана оплата"""
+        return self.billed_tokens if self.billed_tokens is not None else document.token_count
+
     def get_user_id(self, session) -> int:
         """Получить user_id через связанный документ"""
         from models.document import Document
@@ -1,8 +1,8 @@
+from typing import Optional
 from sqlmodel import SQLModel, Field
 
 
 class Model(SQLModel, table=True):
-    model_config = {"protected_namespaces": ()}
     """
     Метаданные ML‑модели.
 
@@ -10,11 +10,16 @@ class Model(SQLModel, table=True):
         name (str): Название модели.
         price_per_token (float): Стоимость обработки одного токена в кредитах.
         active (bool): Доступна ли модель пользователям.
+        backend (str): Бэкенд инференса: hf_api (HTTP API) или ctranslate2 (локально).
+        backend_path (Optional[str]): Путь к весам для локального бэкенда.
     """
+    model_config = {"protected_namespaces": ()}
     id: int = Field(default=None, primary_key=True)
     name: str
     price_per_token: float = Field(default=0.001)  # 0.001 рубля за токен
     active: bool = Field(default=True)
+    backend: str = Field(default="hf_api")
+    backend_path: Optional[str] = None
 
     def predict(self, text: str) -> str:
         return f"Processed by {self.name}: {text[:50]}..."
@@ -5,13 +5,22 @@ class RiskClause(SQLModel, table=True):
     """
     Пункт договора с указанием уровня риска.
 
+    job_id ссылается на mljob без внешнего ключа: mljob секционирована по
+    created_at (database/partitioning.py), связь проверяется приложением.
+
     Attributes:
         clause_text (str): Сам текст пункта.
         risk_level (RiskLevel): LOW, MEDIUM или HIGH.
         explanation (Optional[str]): Комментарий‑обоснование.
+        clause_hash (Optional[str]): Хэш полного текста пункта (для переиспользования в новых версиях).
+        category (Optional[str]): Основная категория риска.
+        categories (str): Все сработавшие категории через запятую.
     """
     id: int = Field(default=None, primary_key=True)
-    job_id: int = Field(foreign_key="mljob.id")
+    job_id: int
     clause_text: str
     risk_level: str
     explanation: Optional[str] = None
+    clause_hash: Optional[str] = Field(default=None, index=True)
+    category: Optional[str] = None
+    categories: str = Field(default="")
@@ -1,6 +1,8 @@
 from datetime import datetime
 from decimal import Decimal
+from typing import Optional
 # from models.other import TxType
+from sqlalchemy import Index
 from sqlmodel import SQLModel, Field
 # from sqlalchemy import Column, Enum as SQLEnum
 
@@ -15,9 +17,16 @@ class Transaction(SQLModel, table=True):
         tx_type (TxType): CREDIT (зачисление) или DEBIT (списание).
         amount (Decimal): Сумма операции в кредитах (без знака).
         trans_time (datetime): Момент совершения операции.
+        balance_after (Optional[Decimal]): Баланс после операции (нарастающий
+            итог журнала); None у записей, созданных до его появления.
     """
+    __table_args__ = (
+        Index("ix_transaction_user_time_id", "user_id", "trans_time", "id"),
+        Index("ix_transaction_user_id_id", "user_id", "id"),
+    )
     id: int = Field(default=None, primary_key=True)
     user_id: int
     tx_type: str
     amount: Decimal
     trans_time: datetime = Field(default_factory=datetime.now)
+    balance_after: Optional[Decimal] = None
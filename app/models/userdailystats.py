@@ -0,0 +1,34 @@
+from datetime import date
+from decimal import Decimal
+from sqlalchemy import UniqueConstraint
+from sqlmodel import SQLModel, Field
+
+
+class UserDailyStats(SQLModel, table=True):
+    """
+    Счётчики завершённых заданий пользователя за день.
+
+    Обновляются воркером при завершении задания (атомарный upsert),
+    поэтому панель управления читает готовые агрегаты, а не историю.
+
+    Attributes:
+        user_id (int): ID пользователя.
+        day (date): День завершения заданий.
+        done_count (int): Успешно выполненные задания.
+        error_count (int): Задания, завершённые ошибкой.
+        used_credits (Decimal): Списано за успешные задания.
+        risk_score_sum (float): Сумма риск-индексов (для среднего).
+        risk_low / risk_medium / risk_high (int): Задания по диапазонам
+            риск-индекса: < 0.3, 0.3–0.7, >= 0.7.
+    """
+    __table_args__ = (UniqueConstraint("user_id", "day", name="uq_userdailystats_user_day"),)
+    id: int = Field(default=None, primary_key=True)
+    user_id: int = Field(index=True)
+    day: date
+    done_count: int = Field(default=0)
+    error_count: int = Field(default=0)
+    used_credits: Decimal = Field(default=Decimal("0"))
+    risk_score_sum: float = Field(default=0.0)
+    risk_low: int = Field(default=0)
+    risk_medium: int = Field(default=0)
+    risk_high: int = Field(default=0)
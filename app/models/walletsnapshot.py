@@ -0,0 +1,35 @@
+from datetime import datetime
+from decimal import Decimal
+from typing import Optional
+from sqlalchemy import Index
+from sqlmodel import SQLModel, Field
+
+
+class WalletSnapshot(SQLModel, table=True):
+    """
+    Снимок итогов журнала транзакций пользователя.
+
+    Баланс и суммы считаются как последний снимок плюс транзакции после него,
+    поэтому запросы не сканируют всю историю. transaction_id - без внешнего
+    ключа: transaction секционирована по trans_time (database/partitioning.py).
+
+    Attributes:
+        user_id (int): ID пользователя.
+        transaction_id (int): Последняя транзакция, учтённая в снимке.
+        transaction_time (Optional[datetime]): Её trans_time - нижняя граница
+            хвоста журнала по ключу секций. Проводки одного пользователя идут
+            под блокировкой кошелька, поэтому trans_time растёт вместе с id.
+        balance (Decimal): Баланс после этой транзакции.
+        credited_total (Decimal): Сумма всех зачислений до неё включительно.
+        debited_total (Decimal): Сумма всех списаний до неё включительно.
+        created_at (datetime): Когда снимок сделан.
+    """
+    __table_args__ = (Index("ix_walletsnapshot_user_tx", "user_id", "transaction_id"),)
+    id: int = Field(default=None, primary_key=True)
+    user_id: int
+    transaction_id: int
+    transaction_time: Optional[datetime] = None
+    balance: Decimal
+    credited_total: Decimal
+    debited_total: Decimal
+    created_at: datetime = Field(default_factory=datetime.now)
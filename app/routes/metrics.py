@@ -0,0 +1,11 @@
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST
+from services.metrics import render_metrics
+
+metrics_route = APIRouter(tags=['Metrics'])
+
+
+@metrics_route.get('/metrics', include_in_schema=False)
+def metrics():
+    """Метрики в формате Prometheus"""
+    return Response(render_metrics(), media_type=CONTENT_TYPE_LATEST)
@@ -1,11 +1,16 @@
 from fastapi import APIRouter, HTTPException, status, Depends, Query, File, UploadFile, Form
+from fastapi.responses import StreamingResponse
+from datetime import datetime
 from typing import Dict, Any, List, Optional, Union
 from services.crud import document as DocumentService
 from services.crud import mljob as MLJobService
 from services.crud import model as ModelService
 from services.prediction_service import process_prediction_request
 from services.document_processor import document_processor
-from database.database import get_session
+from services.job_events import TERMINAL_STATUSES, format_sse, get_job_event_hub
+from services.history_export import EXPORT_FORMATS, group_history_rows
+from services.pagination import next_cursor
+from database.database import get_session, get_read_session
 from schemas.prediction import (
     PredictionRequest, 
     PredictionJobResponse, 
@@ -13,10 +18,14 @@ from schemas.prediction import (
     PredictionHistoryResponse,
     MLJobResponse,
     RiskClauseResponse,
-    ModelResponse
+    ModelResponse,
+    BulkJobStatusResponse
 )
 from auth.jwt_handler import get_current_user
 import uuid
+import asyncio
+import os
+import time
 from typing import List, Optional
 from config.logging_config import prediction_logger
 
@@ -30,7 +39,7 @@ async def create_prediction(
 ) -> dict:
     """Создать запрос на предсказание/анализ договора"""
     
-    prediction_logger.info(f"Запрос на анализ договора от пользователя {current_user['user_id']}, модель: {data.model_name}")
+    prediction_logger.info("Запрос на анализ договора от пользователя %s, модель: %s", current_user['user_id'], data.model_name, extra={"sample": True})
     
     try:
         result = process_prediction_request(
@@ -40,10 +49,11 @@ async def create_prediction(
             language=data.language,
             model_name=data.model_name,
             summary_depth=data.summary_depth,
-            session=session
+            session=session,
+            previous_document_id=data.previous_document_id
         )
         
-        prediction_logger.info(f"Анализ завершен успешно. Job ID: {result['job_id']}, стоимость: {result['cost']}")
+        prediction_logger.info("Анализ завершен успешно. Job ID: %s, стоимость: %s", result['job_id'], result['cost'])
         
         return {
             "message": result["message"],
@@ -51,7 +61,9 @@ async def create_prediction(
             "document_id": result["document_id"],
             "status": result["status"],
             "cost": result["cost"],
-            "tokens_processed": result["tokens_processed"]
+            "tokens_processed": result["tokens_processed"],
+            "version": result["version"],
+            "changed_clauses": result["changed_clauses"]
         }
         
     except ValueError as e:
@@ -74,6 +86,7 @@ async def create_prediction(
 async def predict_from_file(
     file: UploadFile = File(...),
     language: Optional[str] = Form("RU"),
+    previous_document_id: Optional[int] = Form(None),
     current_user=Depends(get_current_user),
     session=Depends(get_session)
 ) -> dict:
@@ -99,7 +112,9 @@ async def predict_from_file(
                 detail=validation_message
             )
         
+        extraction_started = time.perf_counter()
         text, processed_successfully = document_processor.process_file(contents, file.filename)
+        extraction_ms = (time.perf_counter() - extraction_started) * 1000
         
         if not processed_successfully or not text:
             error_message = "Не удалось обработать файл. "
@@ -122,7 +137,9 @@ async def predict_from_file(
             language=language,
             model_name="default_model",
             summary_depth="BULLET", 
-            session=session
+            session=session,
+            previous_document_id=previous_document_id,
+            extraction_ms=extraction_ms
         )
         
         return {
@@ -132,7 +149,9 @@ async def predict_from_file(
             "document_id": result["document_id"],
             "status": result["status"],
             "cost": result["cost"],
-            "tokens_processed": result["tokens_processed"]
+            "tokens_processed": result["tokens_processed"],
+            "version": result["version"],
+            "changed_clauses": result["changed_clauses"]
         }
         
     except ValueError as e:
@@ -151,50 +170,61 @@ async def predict_from_file(
             detail=f"File processing failed: {str(e)}"
         )
 
+def build_document_response(document) -> DocumentResponse:
+    """Ответ по документу"""
+    return DocumentResponse(
+        id=document.id,
+        user_id=document.user_id,
+        filename=document.filename,
+        token_count=document.token_count,
+        language=document.language,
+        uploaded_at=document.uploaded_at,
+        parent_id=document.parent_id,
+        version=document.version
+    )
+
 @prediction_route.get('/documents')
 async def get_user_documents(
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Курсор следующей страницы (вместо skip)"),
     current_user=Depends(get_current_user),
-    session=Depends(get_session)
+    session=Depends(get_read_session)
 ) -> dict:
     """Получить список документов пользователя"""
     
-    documents = DocumentService.get_user_documents(
-        current_user["user_id"], 
-        session, 
-        skip, 
-        limit
-    )
+    try:
+        documents = DocumentService.get_user_documents(
+            current_user["user_id"], 
+            session, 
+            skip, 
+            limit,
+            cursor
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     
     total_count = DocumentService.count_user_documents(
         current_user["user_id"], 
         session
     )
     
-    document_responses = [
-        DocumentResponse(
-            id=doc.id,
-            user_id=doc.user_id,
-            filename=doc.filename,
-            pages=doc.pages,
-            language=doc.language,
-            uploaded_at=doc.uploaded_at
-        ) for doc in documents
-    ]
-    
     return {
-        "documents": document_responses,
+        "documents": [build_document_response(doc) for doc in documents],
         "total_count": total_count,
         "skip": skip,
-        "limit": limit
+        "limit": limit,
+        "next_cursor": next_cursor(documents, limit, "uploaded_at")
     }
 
 @prediction_route.get('/documents/{document_id}')
 async def get_document_details(
     document_id: int,
     current_user=Depends(get_current_user),
-    session=Depends(get_session)
+    session=Depends(get_read_session)
 ) -> DocumentResponse:
     """Получить детали конкретного документа"""
     
@@ -212,70 +242,97 @@ async def get_document_details(
             detail="Access denied to this document"
         )
     
-    return DocumentResponse(
-        id=document.id,
-        user_id=document.user_id,
-        filename=document.filename,
-        pages=document.pages,
-        language=document.language,
-        uploaded_at=document.uploaded_at
+    return build_document_response(document)
+
+def build_job_response(job, risk_clauses) -> MLJobResponse:
+    """Ответ по заданию вместе с его рискованными пунктами"""
+    return MLJobResponse(
+        id=job.id,
+        document_id=job.document_id,
+        model_id=job.model_id,
+        status=job.status,
+        summary_depth=job.summary_depth,
+        used_credits=job.used_credits,
+        summary_text=job.summary_text,
+        risk_score=job.risk_score,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at,
+        risk_clauses=[
+            RiskClauseResponse(
+                id=clause.id,
+                clause_text=clause.clause_text,
+                risk_level=clause.risk_level,
+                explanation=clause.explanation
+            ) for clause in risk_clauses
+        ]
     )
 
 @prediction_route.get('/history')
 async def get_prediction_history(
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Курсор следующей страницы (вместо skip)"),
+    since: Optional[datetime] = Query(None, description="Начало периода (включительно)"),
+    until: Optional[datetime] = Query(None, description="Конец периода (не включительно)"),
     current_user=Depends(get_current_user),
-    session=Depends(get_session)
+    session=Depends(get_read_session)
 ) -> PredictionHistoryResponse:
     """Получить историю ML заданий пользователя"""
     
-    jobs = MLJobService.get_user_jobs(
-        current_user["user_id"], 
-        session, 
-        skip, 
-        limit
-    )
+    try:
+        jobs = MLJobService.get_user_jobs(
+            current_user["user_id"], 
+            session, 
+            skip, 
+            limit,
+            cursor,
+            since,
+            until
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     
     total_count = MLJobService.count_user_jobs(
         current_user["user_id"], 
         session
     )
     
-    job_responses = []
-    for job in jobs:
-        risk_clauses = MLJobService.get_job_risk_clauses(job.id, session)
-        risk_clause_responses = [
-            RiskClauseResponse(
-                id=clause.id,
-                clause_text=clause.clause_text,
-                risk_level=clause.risk_level,
-                explanation=clause.explanation
-            ) for clause in risk_clauses
-        ]
-        
-        job_responses.append(MLJobResponse(
-            id=job.id,
-            document_id=job.document_id,
-            model_id=job.model_id,
-            status=job.status,
-            summary_depth=job.summary_depth,
-            used_credits=job.used_credits,
-            summary_text=job.summary_text,
-            risk_score=job.risk_score,
-            started_at=job.started_at,
-            finished_at=job.finished_at,
-            risk_clauses=risk_clause_responses
-        ))
+    risk_clauses = MLJobService.get_risk_clauses_for_jobs(jobs, session)
+    job_responses = [build_job_response(job, risk_clauses[job.id]) for job in jobs]
     
     return PredictionHistoryResponse(
         jobs=job_responses,
-        total_count=total_count
+        total_count=total_count,
+        next_cursor=next_cursor(jobs, limit, "created_at")
+    )
+
+@prediction_route.get('/history/export')
+async def export_prediction_history(
+    export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    current_user=Depends(get_current_user),
+    session=Depends(get_read_session)
+) -> StreamingResponse:
+    """Потоковая выгрузка всей истории ML заданий пользователя в NDJSON или CSV"""
+    
+    user_id = current_user["user_id"]
+    prediction_logger.info("Экспорт истории пользователя %s в формате %s", user_id, export_format)
+    
+    exporter, media_type = EXPORT_FORMATS[export_format]
+    rows = MLJobService.iter_user_history(user_id, session)
+    
+    return StreamingResponse(
+        exporter(group_history_rows(rows)),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="history_{user_id}.{export_format}"'}
     )
 
 @prediction_route.get('/models')
 async def get_available_models(
-    session=Depends(get_session)
+    session=Depends(get_read_session)
 ) -> List[ModelResponse]:
     """Получить список доступных ML моделей"""
     
@@ -286,7 +343,8 @@ async def get_available_models(
             id=model.id,
             name=model.name,
             price_per_token=model.price_per_token,
-            active=model.active
+            active=model.active,
+            backend=model.backend
         ) for model in models
     ]
 
@@ -358,15 +416,79 @@ async def estimate_cost(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Estimation failed: {str(e)}")
 
+MAX_BULK_JOB_IDS = 200
+
+def replica_may_lag(session, primary) -> bool:
+    """
+    Статус задачи меняет worker, его записи не ставят клиенту cookie основной
+    БД: незавершённую (или ещё не видную) на реплике задачу надо перечитать
+    с основной, иначе клиент может не увидеть уже опубликованный DONE.
+    """
+    return session.get_bind() is not primary.get_bind()
+
+@prediction_route.get('/jobs')
+async def get_jobs_status(
+    ids: str = Query(..., description="ID заданий через запятую"),
+    include_clauses: bool = Query(True),
+    current_user=Depends(get_current_user),
+    session=Depends(get_read_session),
+    primary=Depends(get_session)
+) -> BulkJobStatusResponse:
+    """Статусы и результаты нескольких ML заданий за постоянное число запросов"""
+    
+    try:
+        job_ids = list(dict.fromkeys(int(value) for value in ids.split(",") if value.strip()))
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="ids must be a comma-separated list of integers"
+        )
+    
+    if not job_ids or len(job_ids) > MAX_BULK_JOB_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Provide from 1 to {MAX_BULK_JOB_IDS} job ids"
+        )
+    
+    jobs = MLJobService.get_user_jobs_by_ids(job_ids, current_user["user_id"], session)
+    found_ids = {job.id for job in jobs}
+    risk_clauses = {}
+    
+    stale_ids = [job.id for job in jobs if job.status not in TERMINAL_STATUSES]
+    stale_ids += [job_id for job_id in job_ids if job_id not in found_ids]
+    if stale_ids and replica_may_lag(session, primary):
+        fresh = MLJobService.get_user_jobs_by_ids(stale_ids, current_user["user_id"], primary)
+        if include_clauses:
+            risk_clauses.update(MLJobService.get_risk_clauses_for_jobs(fresh, primary))
+        fresh_by_id = {job.id: job for job in fresh}
+        jobs = sorted(
+            [fresh_by_id.pop(job.id, job) for job in jobs] + list(fresh_by_id.values()),
+            key=lambda job: job.id
+        )
+        found_ids = {job.id for job in jobs}
+    
+    if include_clauses:
+        replica_jobs = [job for job in jobs if job.id not in risk_clauses]
+        risk_clauses.update(MLJobService.get_risk_clauses_for_jobs(replica_jobs, session))
+    
+    return BulkJobStatusResponse(
+        jobs=[build_job_response(job, risk_clauses.get(job.id, [])) for job in jobs],
+        missing_ids=[job_id for job_id in job_ids if job_id not in found_ids]
+    )
+
 @prediction_route.get('/jobs/{job_id}')
 async def get_job_details(
     job_id: int,
     current_user=Depends(get_current_user),
-    session=Depends(get_session)
+    session=Depends(get_read_session),
+    primary=Depends(get_session)
 ) -> MLJobResponse:
     """Получить детали конкретного ML задания"""
     
-    job = MLJobService.get_job_by_id(job_id, session)
+    job = MLJobService.get_job_by_id(job_id, session) or MLJobService.get_archived_job(job_id, session)
+    if (not job or job.status not in TERMINAL_STATUSES) and replica_may_lag(session, primary):
+        session = primary
+        job = MLJobService.get_job_by_id(job_id, session) or MLJobService.get_archived_job(job_id, session)
     
     if not job:
         raise HTTPException(
@@ -381,7 +503,7 @@ async def get_job_details(
             detail="Access denied to this job"
         )
 
-    risk_clauses = MLJobService.get_job_risk_clauses(job.id, session)
+    risk_clauses = MLJobService.get_risk_clauses_for_jobs([job], session)[job.id]
     risk_clause_responses = [
         RiskClauseResponse(
             id=clause.id,
@@ -403,4 +525,66 @@ async def get_job_details(
         started_at=job.started_at,
         finished_at=job.finished_at,
         risk_clauses=risk_clause_responses
-    )
\ No newline at end of file
+    )
+
+JOB_EVENTS_HEARTBEAT = float(os.getenv("JOB_EVENTS_HEARTBEAT", "15"))
+
+@prediction_route.get('/jobs/{job_id}/events')
+async def stream_job_events(
+    job_id: int,
+    request: FastAPIRequest,
+    current_user=Depends(get_current_user),
+    session=Depends(get_session)
+) -> StreamingResponse:
+    """
+    Поток Server-Sent Events со статусом ML задания до его завершения.
+    Начальный статус читается с основной БД после подписки: на отстающей
+    реплике задача могла бы быть ещё RUNNING, хотя DONE уже опубликован
+    до подписки, и поток ждал бы его вечно.
+    """
+    
+    hub = get_job_event_hub()
+    queue = hub.subscribe(job_id)
+    
+    job = MLJobService.get_user_job(job_id, current_user["user_id"], session)
+    if not job:
+        hub.unsubscribe(job_id, queue)
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+    
+    current_event = {
+        "job_id": job.id,
+        "status": job.status,
+        "risk_score": job.risk_score,
+        "finished_at": job.finished_at
+    }
+    # Зависимость с yield закрывается только после окончания ответа: без явного
+    # закрытия каждый открытый поток держал бы соединение пула до часа
+    session.close()
+    
+    async def event_stream():
+        try:
+            yield format_sse(current_event)
+            if current_event["status"] in TERMINAL_STATUSES:
+                return
+            
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=JOB_EVENTS_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                
+                yield format_sse(event)
+                if event.get("status") in TERMINAL_STATUSES:
+                    break
+        finally:
+            hub.unsubscribe(job_id, queue)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,67 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import List, Optional
+from services.crud import stats as StatsService
+from services.crud import user as UserService
+from database.database import get_read_session
+from schemas.stats import UserStatsResponse, DailyStatsResponse, RiskDistribution, ModelTimingResponse
+from auth.jwt_handler import get_current_user
+from config.logging_config import prediction_logger
+
+stats_route = APIRouter(tags=['Stats'])
+
+
+def average_risk(stats) -> Optional[float]:
+    """Средний риск-индекс по заданиям с оценкой или None, если их нет"""
+    scored = stats["risk_low"] + stats["risk_medium"] + stats["risk_high"]
+    return round(stats["risk_score_sum"] / scored, 4) if scored else None
+
+
+@stats_route.get('/stats')
+async def get_user_stats(
+    days: int = Query(30, ge=1, le=366, description="Сколько последних дней вернуть в daily"),
+    current_user=Depends(get_current_user),
+    session=Depends(get_read_session)
+) -> UserStatsResponse:
+    """Сводная статистика анализов пользователя по готовым дневным агрегатам"""
+    user_id = current_user["user_id"]
+    totals = StatsService.get_user_stats_totals(user_id, session)
+    daily = StatsService.get_user_daily_stats(user_id, session, since=date.today() - timedelta(days=days - 1))
+    prediction_logger.debug(f"Статистика пользователя {user_id}: {len(daily)} дней")
+    
+    return UserStatsResponse(
+        total_jobs=totals["done_count"] + totals["error_count"],
+        done_count=totals["done_count"],
+        error_count=totals["error_count"],
+        used_credits=Decimal(str(totals["used_credits"])),
+        average_risk=average_risk(totals),
+        risk_distribution=RiskDistribution(
+            low=totals["risk_low"], medium=totals["risk_medium"], high=totals["risk_high"]
+        ),
+        daily=[
+            DailyStatsResponse(
+                day=row.day,
+                done_count=row.done_count,
+                error_count=row.error_count,
+                used_credits=row.used_credits,
+                average_risk=average_risk(row.model_dump())
+            )
+            for row in daily
+        ]
+    )
+
+
+@stats_route.get('/stats/timings')
+async def get_stage_timings(
+    days: int = Query(7, ge=1, le=90, description="За сколько последних дней считать"),
+    current_user=Depends(get_current_user),
+    session=Depends(get_read_session)
+) -> List[ModelTimingResponse]:
+    """Перцентили времени стадий обработки задач по моделям (только для администратора)"""
+    user = UserService.get_user_by_id(current_user["user_id"], session)
+    if not user or user.role != "ADMIN":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+    
+    since = datetime.now() - timedelta(days=days)
+    return [ModelTimingResponse(**entry) for entry in StatsService.get_stage_percentiles(session, since)]
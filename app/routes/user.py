@@ -1,7 +1,7 @@
 from fastapi import APIRouter, HTTPException, status, Depends
 from models.user import User
 from services.crud import user as UserService
-from database.database import get_session
+from database.database import get_session, get_read_session
 from schemas.auth import UserRegistrationRequest, UserLoginRequest, TokenResponse, UserResponse, AuthResponse
 from auth.jwt_handler import create_access_token, get_current_user
 from datetime import timedelta
@@ -69,7 +69,7 @@ async def signin(data: UserLoginRequest, session=Depends(get_session)) -> TokenR
 @user_route.get('/profile')
 async def get_profile(
     current_user=Depends(get_current_user),
-    session=Depends(get_session)
+    session=Depends(get_read_session)
 ) -> UserResponse:
     user = UserService.get_user_by_id(current_user["user_id"], session)
     if not user:
@@ -85,7 +85,7 @@ async def get_profile(
 @user_route.get('/get_all_users')
 async def get_all_users(
     current_user=Depends(get_current_user),
-    session=Depends(get_session)
+    session=Depends(get_read_session)
 ):
     user = UserService.get_user_by_id(current_user["user_id"], session)
     if not user or user.role != "ADMIN":
@@ -1,9 +1,11 @@
 from fastapi import APIRouter, HTTPException, status, Depends, Query
 from services.crud import wallet as WalletService
-from database.database import get_session
+from database.database import get_session, get_read_session
 from schemas.wallet import WalletResponse, BalanceResponse, TopUpRequest, TransactionHistoryResponse, TransactionResponse
 from auth.jwt_handler import get_current_user
-from typing import List
+from datetime import datetime
+from typing import List, Optional
+from services.pagination import next_cursor
 from config.logging_config import wallet_logger
 
 wallet_route = APIRouter(tags=['Wallet'])
@@ -65,23 +67,36 @@ async def get_wallet(
         id=wallet.id,
         user_id=wallet.user_id,
         balance=wallet.balance,
-        total_transactions=total_transactions
+        total_transactions=total_transactions,
+        spent_this_month=WalletService.get_month_spending(current_user["user_id"], session)
     )
 
 @wallet_route.get('/transactions')
 async def get_transactions(
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Курсор следующей страницы (вместо skip)"),
+    since: Optional[datetime] = Query(None, description="Начало периода (включительно)"),
+    until: Optional[datetime] = Query(None, description="Конец периода (не включительно)"),
     current_user=Depends(get_current_user),
-    session=Depends(get_session)
+    session=Depends(get_read_session)
 ) -> TransactionHistoryResponse:
     """Получить историю транзакций с пагинацией"""
-    transactions = WalletService.get_user_transactions(
-        current_user["user_id"], 
-        session, 
-        skip, 
-        limit
-    )
+    try:
+        transactions = WalletService.get_user_transactions(
+            current_user["user_id"], 
+            session, 
+            skip, 
+            limit,
+            cursor,
+            since,
+            until
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     
     total_count = WalletService.count_user_transactions(
         current_user["user_id"], 
@@ -94,11 +109,13 @@ async def get_transactions(
             user_id=tx.user_id,
             tx_type=tx.tx_type,
             amount=tx.amount,
-            trans_time=tx.trans_time
+            trans_time=tx.trans_time,
+            balance_after=tx.balance_after
         ) for tx in transactions
     ]
     
     return TransactionHistoryResponse(
         transactions=transaction_responses,
-        total_count=total_count
+        total_count=total_count,
+        next_cursor=next_cursor(transactions, limit, "trans_time")
     )
\ No newline at end of file
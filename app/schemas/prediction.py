@@ -11,6 +11,7 @@ class PredictionRequest(BaseModel):
     language: Optional[str] = Field("RU", pattern="^RU$", description="Язык документа (только русский)")
     model_name: Optional[str] = Field("default_model", max_length=100, description="Название модели")
     summary_depth: Optional[str] = Field("BULLET", pattern="^(BULLET|DETAILED)$", description="Глубина анализа")
+    previous_document_id: Optional[int] = Field(None, description="ID предыдущей версии договора")
 
 class RiskClauseResponse(BaseModel):
     id: int
@@ -29,6 +30,7 @@ class MLJobResponse(BaseModel):
     used_credits: Decimal
     summary_text: Optional[str] = None
     risk_score: Optional[float] = None
+    created_at: Optional[datetime] = None
     started_at: Optional[datetime] = None
     finished_at: Optional[datetime] = None
     risk_clauses: List[RiskClauseResponse] = []
@@ -37,13 +39,20 @@ class DocumentResponse(BaseModel):
     id: int
     user_id: int
     filename: str
-    pages: int 
+    token_count: Optional[int] = None
     language: str
     uploaded_at: datetime
+    parent_id: Optional[int] = None
+    version: int = 1
 
 class PredictionHistoryResponse(BaseModel):
     jobs: List[MLJobResponse]
     total_count: int
+    next_cursor: Optional[str] = None
+
+class BulkJobStatusResponse(BaseModel):
+    jobs: List[MLJobResponse]
+    missing_ids: List[int] = []
 
 class PredictionJobResponse(BaseModel):
     job_id: int
@@ -54,4 +63,5 @@ class ModelResponse(BaseModel):
     id: int
     name: str
     price_per_token: float
-    active: bool
\ No newline at end of file
+    active: bool
+    backend: str = "hf_api"
\ No newline at end of file
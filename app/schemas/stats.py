@@ -0,0 +1,40 @@
+from pydantic import BaseModel
+from decimal import Decimal
+from typing import Dict, List, Optional
+from datetime import date
+
+class RiskDistribution(BaseModel):
+    low: int = 0
+    medium: int = 0
+    high: int = 0
+
+class DailyStatsResponse(BaseModel):
+    day: date
+    done_count: int
+    error_count: int
+    used_credits: Decimal
+    average_risk: Optional[float] = None
+
+class UserStatsResponse(BaseModel):
+    total_jobs: int
+    done_count: int
+    error_count: int
+    used_credits: Decimal
+    average_risk: Optional[float] = None
+    risk_distribution: RiskDistribution
+    daily: List[DailyStatsResponse]
+
+class StagePercentiles(BaseModel):
+    p50: Optional[float] = None
+    p95: Optional[float] = None
+    p99: Optional[float] = None
+
+class ModelTimingResponse(BaseModel):
+    model_config = {"protected_namespaces": ()}
+
+    model_id: int
+    model_name: Optional[str] = None
+    jobs: int
+    errors: int
+    cache_hits: int
+    stages: Dict[str, StagePercentiles]
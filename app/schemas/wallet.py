@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from decimal import Decimal
-from typing import List
+from typing import List, Optional
 from datetime import datetime
 
 class WalletResponse(BaseModel):
@@ -8,6 +8,7 @@ class WalletResponse(BaseModel):
     user_id: int
     balance: Decimal
     total_transactions: int
+    spent_this_month: Decimal = Decimal("0")
 
 class TransactionResponse(BaseModel):
     id: int
@@ -15,6 +16,7 @@ class TransactionResponse(BaseModel):
     tx_type: str
     amount: Decimal
     trans_time: datetime
+    balance_after: Optional[Decimal] = None
 
 class TopUpRequest(BaseModel):
     amount: Decimal
@@ -24,4 +26,5 @@ class BalanceResponse(BaseModel):
 
 class TransactionHistoryResponse(BaseModel):
     transactions: List[TransactionResponse]
-    total_count: int
\ No newline at end of file
+    total_count: int
+    next_cursor: Optional[str] = None
\ No newline at end of file
@@ -0,0 +1,221 @@
+import hashlib
+import zlib
+from typing import Any, Callable, Dict, List, Optional
+import numpy as np
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select
+from models.clausefingerprint import ClauseFingerprint, ClauseBand
+from services.risk_classifier import FINGERPRINT_TOKEN_RE, clause_hash, risk_classifier
+from config.logging_config import prediction_logger
+
+ClassifyFn = Callable[[List[str]], List[Optional[Dict[str, Any]]]]
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64(0xFFFFFFFF)
+
+
+class MinHasher:
+    """MinHash по словесным шинглам для оценки сходства Жаккара между пунктами"""
+
+    def __init__(self, num_perm: int = 64, bands: int = 16, shingle_size: int = 2, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        rng = np.random.RandomState(seed)
+        self.a = rng.randint(1, np.iinfo(np.int32).max, size=num_perm).astype(np.uint64)
+        self.b = rng.randint(0, np.iinfo(np.int32).max, size=num_perm).astype(np.uint64)
+
+    def shingles(self, text: str) -> List[str]:
+        words = FINGERPRINT_TOKEN_RE.findall(text.lower())
+        if len(words) < self.shingle_size:
+            return [" ".join(words)] if words else [""]
+        return [" ".join(words[i:i + self.shingle_size]) for i in range(len(words) - self.shingle_size + 1)]
+
+    def signature(self, text: str) -> np.ndarray:
+        hashes = np.array(
+            [zlib.crc32(shingle.encode("utf-8")) for shingle in set(self.shingles(text))],
+            dtype=np.uint64
+        )
+        permuted = (np.outer(hashes, self.a) + self.b) % _MERSENNE_PRIME & _MAX_HASH
+        return permuted.min(axis=0).astype(np.uint32)
+
+    def band_keys(self, signature: np.ndarray) -> List[str]:
+        keys = []
+        for band in range(self.bands):
+            chunk = signature[band * self.rows:(band + 1) * self.rows].tobytes()
+            keys.append(f"{band}:{hashlib.md5(chunk).hexdigest()[:16]}")
+        return keys
+
+    @staticmethod
+    def similarity(first: np.ndarray, second: np.ndarray) -> float:
+        """Оценка сходства Жаккара по доле совпавших позиций сигнатуры"""
+        return float(np.mean(first == second))
+
+    @staticmethod
+    def encode(signature: np.ndarray) -> str:
+        return signature.astype(">u4").tobytes().hex()
+
+    @staticmethod
+    def decode(value: str) -> np.ndarray:
+        return np.frombuffer(bytes.fromhex(value), dtype=">u4").astype(np.uint32)
+
+
+class ClauseIndex:
+    """
+    Индекс ранее проанализированных пунктов договоров.
+
+    Точные повторы находятся по хэшу нормализованного текста, почти-дубликаты -
+    по LSH-полосам MinHash с проверкой оценки сходства. Новые пункты копятся
+    в памяти и записываются save_new() после коммита результатов задачи.
+    """
+
+    def __init__(self, session: Session, minhasher: MinHasher = None, threshold: float = 0.7):
+        self.session = session
+        self.minhasher = minhasher or MinHasher()
+        self.threshold = threshold
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._pending_bands: Dict[str, List[str]] = {}
+        self.reused = 0
+        self.analyzed = 0
+
+    def lookup(self, clauses: List[str]) -> List[Optional[ClauseFingerprint]]:
+        """Найти сохранённые отпечатки для пунктов (None - пункт не встречался)"""
+        if not clauses:
+            return []
+
+        hashes = [clause_hash(clause) for clause in clauses]
+        statement = select(ClauseFingerprint).where(ClauseFingerprint.text_hash.in_(set(hashes)))
+        exact = {fp.text_hash: fp for fp in self.session.exec(statement).all()}
+        found = [exact.get(key) for key in hashes]
+
+        missing = [i for i, fp in enumerate(found) if fp is None]
+        if not missing:
+            return found
+
+        signatures = {i: self.minhasher.signature(clauses[i]) for i in missing}
+        band_keys = {i: self.minhasher.band_keys(signatures[i]) for i in missing}
+        all_keys = {key for keys in band_keys.values() for key in keys}
+
+        rows = self.session.exec(
+            select(ClauseBand.band_key, ClauseBand.fingerprint_id).where(ClauseBand.band_key.in_(all_keys))
+        ).all()
+        by_band: Dict[str, set] = {}
+        for band_key, fingerprint_id in rows:
+            by_band.setdefault(band_key, set()).add(fingerprint_id)
+
+        candidate_ids = {fid for ids in by_band.values() for fid in ids}
+        candidates = {}
+        if candidate_ids:
+            statement = select(ClauseFingerprint).where(ClauseFingerprint.id.in_(candidate_ids))
+            candidates = {fp.id: fp for fp in self.session.exec(statement).all()}
+
+        for i in missing:
+            best, best_similarity = None, self.threshold
+            for key in band_keys[i]:
+                for fid in by_band.get(key, ()):
+                    fingerprint = candidates.get(fid)
+                    if fingerprint is None:
+                        continue
+                    similarity = self.minhasher.similarity(signatures[i], self.minhasher.decode(fingerprint.minhash))
+                    if similarity >= best_similarity:
+                        best, best_similarity = fingerprint, similarity
+            found[i] = best
+
+        return found
+
+    def classify(self, clauses: List[str], classify_fn: ClassifyFn = None) -> List[Optional[Dict[str, Any]]]:
+        """Результаты по пунктам: из индекса для известных, classify_fn - для новых"""
+        classify_fn = classify_fn or risk_classifier.classify_clauses
+        fingerprints = self.lookup(clauses)
+
+        results: List[Optional[Dict[str, Any]]] = [None] * len(clauses)
+        new_indices = []
+        for i, fingerprint in enumerate(fingerprints):
+            if fingerprint is None:
+                new_indices.append(i)
+            elif fingerprint.risk_level:
+                results[i] = self._result_from_fingerprint(clauses[i], fingerprint)
+
+        if new_indices:
+            new_results = classify_fn([clauses[i] for i in new_indices])
+            for i, result in zip(new_indices, new_results):
+                results[i] = result
+                self._remember(clauses[i], result)
+
+        self.reused += len(clauses) - len(new_indices)
+        self.analyzed += len(new_indices)
+        prediction_logger.info(f"Индекс пунктов: переиспользовано {len(clauses) - len(new_indices)}, новых {len(new_indices)}")
+        return results
+
+    @staticmethod
+    def _result_from_fingerprint(clause: str, fingerprint: ClauseFingerprint) -> Dict[str, Any]:
+        category = risk_classifier.category(fingerprint.category)
+        return {
+            "clause_text": clause[:200],
+            "clause_hash": clause_hash(clause),
+            "risk_level": fingerprint.risk_level,
+            "explanation": fingerprint.explanation,
+            "category": fingerprint.category,
+            "categories": [code for code in fingerprint.categories.split(",") if code],
+            "weight": category.weight if category else 0.0
+        }
+
+    def _remember(self, clause: str, result: Optional[Dict[str, Any]]):
+        key = clause_hash(clause)
+        if key in self._pending:
+            return
+        signature = self.minhasher.signature(clause)
+        self._pending[key] = {
+            "text_hash": key,
+            "minhash": self.minhasher.encode(signature),
+            "risk_level": result["risk_level"] if result else None,
+            "explanation": result["explanation"] if result else None,
+            "category": result["category"] if result else None,
+            "categories": ",".join(result["categories"]) if result else ""
+        }
+        self._pending_bands[key] = self.minhasher.band_keys(signature)
+
+    def _insert(self, keys: List[str]):
+        for key in keys:
+            fingerprint = ClauseFingerprint(**self._pending[key])
+            self.session.add(fingerprint)
+            self.session.flush()
+            for band_key in self._pending_bands[key]:
+                self.session.add(ClauseBand(band_key=band_key, fingerprint_id=fingerprint.id))
+
+    def save_new(self) -> int:
+        """
+        Сохранить отпечатки новых пунктов одной транзакцией.
+
+        Если другой воркер успел записать тот же пункт, вставка повторяется
+        по одному пункту с пропуском дубликатов.
+        """
+        if not self._pending:
+            return 0
+
+        existing = set(self.session.exec(
+            select(ClauseFingerprint.text_hash).where(ClauseFingerprint.text_hash.in_(set(self._pending)))
+        ).all())
+        keys = [key for key in self._pending if key not in existing]
+
+        try:
+            self._insert(keys)
+            self.session.commit()
+            saved = len(keys)
+        except IntegrityError:
+            self.session.rollback()
+            saved = 0
+            for key in keys:
+                try:
+                    self._insert([key])
+                    self.session.commit()
+                    saved += 1
+                except IntegrityError:
+                    self.session.rollback()
+
+        self._pending.clear()
+        self._pending_bands.clear()
+        return saved
@@ -1,5 +1,6 @@
 from models.document import Document
-from sqlmodel import Session, select
+from sqlmodel import Session, select, func
+from services.pagination import paginate
 from typing import List, Optional
 
 def create_document(
@@ -8,15 +9,19 @@ def create_document(
     raw_text: str,
     token_count: int,
     session: Session,
-    language: str = "UNKNOWN"
+    language: str = "UNKNOWN",
+    parent_id: Optional[int] = None,
+    version: int = 1
 ) -> Document:
-    """Создать новый документ"""
+    """Создать новый документ (parent_id - предыдущая версия договора)"""
     document = Document(
         user_id=user_id,
         filename=filename,
         raw_text=raw_text,
         token_count=token_count,
-        language=language
+        language=language,
+        parent_id=parent_id,
+        version=version
     )
     session.add(document)
     session.commit()
@@ -30,11 +35,26 @@ def get_document_by_id(document_id: int, session: Session) -> Optional[Document]
     return result.first()
 
 
+def get_user_documents(
+    user_id: int,
+    session: Session,
+    skip: int = 0,
+    limit: int = 10,
+    cursor: Optional[str] = None
+) -> List[Document]:
+    """Получить документы пользователя с пагинацией (по курсору или OFFSET)"""
+    statement = paginate(
+        select(Document).where(Document.user_id == user_id),
+        Document.uploaded_at, Document.id, limit, cursor, skip
+    )
+    result = session.exec(statement)
+    return list(result.all())
+
+
 def count_user_documents(user_id: int, session: Session) -> int:
     """Подсчитать общее количество документов пользователя"""
-    statement = select(Document).where(Document.user_id == user_id)
-    result = session.exec(statement)
-    return len(list(result.all()))
+    statement = select(func.count(Document.id)).where(Document.user_id == user_id)
+    return session.exec(statement).one()
 
 def delete_document(document_id: int, session: Session) -> bool:
     """Удалить документ по ID"""
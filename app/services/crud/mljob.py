@@ -1,21 +1,29 @@
+import heapq
+from datetime import datetime
 from models.mljob import MLJob
 from models.riskclause import RiskClause
-from sqlmodel import Session, select
-from typing import List, Optional
+from models.archivedjob import ArchivedJob
+from sqlmodel import Session, select, func
+from typing import Dict, List, Optional
 from models.other import JobStatus
+from services.pagination import filter_period, paginate
 
 def create_mljob(
     document_id: int,
     model_id: int,
     session: Session,
-    summary_depth: str = "BULLET"
+    summary_depth: str = "BULLET",
+    previous_job_id: Optional[int] = None,
+    billed_tokens: Optional[int] = None
 ) -> MLJob:
     """Создать новое ML задание"""
     job = MLJob(
         document_id=document_id,
         model_id=model_id,
         status=JobStatus.QUEUED,
-        summary_depth=summary_depth
+        summary_depth=summary_depth,
+        previous_job_id=previous_job_id,
+        billed_tokens=billed_tokens
     )
     session.add(job)
     session.commit()
@@ -29,32 +37,103 @@ def get_job_by_id(job_id: int, session: Session) -> Optional[MLJob]:
     return result.first()
 
 
-def get_user_jobs(user_id: int, session: Session, skip: int = 0, limit: int = 10) -> List[MLJob]:
-    """Получить задания пользователя с пагинацией"""
+def get_user_job(job_id: int, user_id: int, session: Session) -> Optional[MLJob]:
+    """Получить задание, если оно принадлежит пользователю (одним запросом)"""
     from models.document import Document
     
     statement = (
         select(MLJob)
         .join(Document)
-        .where(Document.user_id == user_id)
-        .order_by(MLJob.started_at.desc(), MLJob.id.desc())
-        .offset(skip)
-        .limit(limit)
+        .where(MLJob.id == job_id, Document.user_id == user_id)
     )
-    result = session.exec(statement)
-    return list(result.all())
+    job = session.exec(statement).first()
+    if job:
+        return job
+    archived = session.exec(select(ArchivedJob).where(ArchivedJob.id == job_id, ArchivedJob.user_id == user_id)).first()
+    return archived.to_job() if archived else None
+
+def get_archived_job(job_id: int, session: Session) -> Optional[MLJob]:
+    """Задание из архива (несохраняемый MLJob) или None"""
+    archived = session.get(ArchivedJob, job_id)
+    return archived.to_job() if archived else None
+
+def is_archived(job: MLJob) -> bool:
+    """Задание прочитано из архива"""
+    return getattr(job, "_archived_clauses", None) is not None
+
+def get_user_jobs_by_ids(job_ids: List[int], user_id: int, session: Session) -> List[MLJob]:
+    """Получить задания пользователя по списку ID одним запросом с проверкой владельца"""
+    from models.document import Document
+    
+    if not job_ids:
+        return []
+    
+    statement = (
+        select(MLJob)
+        .join(Document)
+        .where(MLJob.id.in_(job_ids), Document.user_id == user_id)
+        .order_by(MLJob.id)
+    )
+    jobs = list(session.exec(statement).all())
+    
+    missing_ids = set(job_ids) - {job.id for job in jobs}
+    if missing_ids:
+        archived = session.exec(
+            select(ArchivedJob).where(ArchivedJob.id.in_(missing_ids), ArchivedJob.user_id == user_id)
+        ).all()
+        jobs = sorted(jobs + [item.to_job() for item in archived], key=lambda job: job.id)
+    return jobs
+
+def get_latest_done_job(document_id: int, session: Session) -> Optional[MLJob]:
+    """Последнее успешно завершённое задание по документу"""
+    statement = (
+        select(MLJob)
+        .where(MLJob.document_id == document_id, MLJob.status == JobStatus.DONE)
+        .order_by(MLJob.id.desc())
+    )
+    return session.exec(statement).first()
+
+def get_user_jobs(
+    user_id: int,
+    session: Session,
+    skip: int = 0,
+    limit: int = 10,
+    cursor: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None
+) -> List[MLJob]:
+    """
+    Получить задания пользователя с пагинацией (по курсору или OFFSET) за
+    период [since, until). Рабочая таблица и архив читаются одной и той же
+    страницей и сливаются в общем порядке (created_at, id).
+    """
+    from models.document import Document
+    
+    offset = 0 if cursor else skip
+    hot = session.exec(paginate(
+        filter_period(select(MLJob).join(Document).where(Document.user_id == user_id), MLJob.created_at, since, until),
+        MLJob.created_at, MLJob.id, offset + limit, cursor
+    )).all()
+    archived = session.exec(paginate(
+        filter_period(select(ArchivedJob).where(ArchivedJob.user_id == user_id), ArchivedJob.created_at, since, until),
+        ArchivedJob.created_at, ArchivedJob.id, offset + limit, cursor
+    )).all()
+    
+    jobs = heapq.merge(hot, archived, key=lambda job: (job.created_at, job.id), reverse=True)
+    page = list(jobs)[offset:offset + limit]
+    return [job.to_job() if isinstance(job, ArchivedJob) else job for job in page]
 
 def count_user_jobs(user_id: int, session: Session) -> int:
     """Подсчитать общее количество заданий пользователя"""
     from models.document import Document
     
     statement = (
-        select(MLJob)
+        select(func.count(MLJob.id))
         .join(Document)
         .where(Document.user_id == user_id)
     )
-    result = session.exec(statement)
-    return len(list(result.all()))
+    archived = select(func.count(ArchivedJob.id)).where(ArchivedJob.user_id == user_id)
+    return session.exec(statement).one() + session.exec(archived).one()
 
 def update_job_status(
     job_id: int, 
@@ -93,7 +172,10 @@ def complete_job(
             job_id=job.id,
             clause_text=clause_data.get("text", ""),
             risk_level=clause_data.get("risk_level", "LOW"),
-            explanation=clause_data.get("explanation", "")
+            explanation=clause_data.get("explanation", ""),
+            clause_hash=clause_data.get("clause_hash"),
+            category=clause_data.get("category"),
+            categories=",".join(clause_data.get("categories", []))
         )
         session.add(risk_clause)
     
@@ -108,6 +190,57 @@ def get_job_risk_clauses(job_id: int, session: Session) -> List[RiskClause]:
     result = session.exec(statement)
     return list(result.all())
 
+def iter_user_history(user_id: int, session: Session, batch_size: int = 500):
+    """
+    Потоковое чтение истории пользователя: задания, документы и пункты через
+    серверные курсоры - рабочие таблицы одним запросом и архив вторым, с
+    слиянием по ID задания. Пункты одного задания идут подряд.
+    """
+    from models.document import Document
+    
+    statement = (
+        select(MLJob, Document.filename, RiskClause)
+        .join(Document, MLJob.document_id == Document.id)
+        .outerjoin(RiskClause, RiskClause.job_id == MLJob.id)
+        .where(Document.user_id == user_id)
+        .order_by(MLJob.id, RiskClause.id)
+        .execution_options(stream_results=True, yield_per=batch_size)
+    )
+    archived_statement = (
+        select(ArchivedJob, Document.filename)
+        .join(Document, ArchivedJob.document_id == Document.id)
+        .where(ArchivedJob.user_id == user_id)
+        .order_by(ArchivedJob.id)
+        .execution_options(stream_results=True, yield_per=batch_size)
+    )
+    
+    def archived_rows():
+        for archived, filename in session.exec(archived_statement):
+            job = archived.to_job()
+            for clause in job._archived_clauses or [None]:
+                yield job, filename, clause
+    
+    yield from heapq.merge(session.exec(statement), archived_rows(), key=lambda row: row[0].id)
+
+def get_jobs_risk_clauses(job_ids: List[int], session: Session) -> Dict[int, List[RiskClause]]:
+    """Получить рискованные пункты для нескольких заданий одним запросом"""
+    clauses_by_job: Dict[int, List[RiskClause]] = {job_id: [] for job_id in job_ids}
+    if not job_ids:
+        return clauses_by_job
+    
+    statement = select(RiskClause).where(RiskClause.job_id.in_(job_ids)).order_by(RiskClause.id)
+    for clause in session.exec(statement).all():
+        clauses_by_job.setdefault(clause.job_id, []).append(clause)
+    return clauses_by_job
+
+def get_risk_clauses_for_jobs(jobs: List[MLJob], session: Session) -> Dict[int, List[RiskClause]]:
+    """Пункты для заданий из рабочей таблицы (одним запросом) и из архива (из самих заданий)"""
+    clauses_by_job = get_jobs_risk_clauses([job.id for job in jobs if not is_archived(job)], session)
+    for job in jobs:
+        if is_archived(job):
+            clauses_by_job[job.id] = job._archived_clauses
+    return clauses_by_job
+
 def add_risk_clauses_to_job(job_id: int, risk_clauses: List[dict], session: Session):
     """Добавить рискованные пункты к заданию"""
     for clause_data in risk_clauses:
@@ -115,6 +248,9 @@ def add_risk_clauses_to_job(job_id: int, risk_clauses: List[dict], session: Sess
             job_id=job_id,
             clause_text=clause_data.get("clause_text", ""),
             risk_level=clause_data.get("risk_level", "LOW"),
-            explanation=clause_data.get("explanation", "")
+            explanation=clause_data.get("explanation", ""),
+            clause_hash=clause_data.get("clause_hash"),
+            category=clause_data.get("category"),
+            categories=",".join(clause_data.get("categories", []))
         )
         session.add(risk_clause)
\ No newline at end of file
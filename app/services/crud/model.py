@@ -30,13 +30,17 @@ def create_model(
     name: str,
     session: Session,
     price_per_token: float = 0.001,
-    active: bool = True
+    active: bool = True,
+    backend: str = "hf_api",
+    backend_path: Optional[str] = None
 ) -> Model:
     """Создать новую модель"""
     model = Model(
         name=name,
         price_per_token=price_per_token,
-        active=active
+        active=active,
+        backend=backend,
+        backend_path=backend_path
     )
     session.add(model)
     session.commit()
@@ -48,7 +52,9 @@ def update_model(
     session: Session,
     name: str = None,
     price_per_token: float = None,
-    active: bool = None
+    active: bool = None,
+    backend: str = None,
+    backend_path: str = None
 ) -> Optional[Model]:
     """Обновить модель"""
     model = get_model_by_id(model_id, session)
@@ -61,6 +67,10 @@ def update_model(
         model.price_per_token = price_per_token
     if active is not None:
         model.active = active
+    if backend is not None:
+        model.backend = backend
+    if backend_path is not None:
+        model.backend_path = backend_path
     
     session.add(model)
     session.commit()
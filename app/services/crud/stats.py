@@ -0,0 +1,184 @@
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Dict, List, Optional, Sequence
+from sqlalchemy import case, delete
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import Session, select, func
+from models.archivedjob import ArchivedJob
+from models.document import Document
+from models.jobtiming import STAGES, JobTiming
+from models.mljob import MLJob
+from models.model import Model
+from models.userdailystats import UserDailyStats
+
+COUNTER_FIELDS = (
+    "done_count", "error_count", "used_credits", "risk_score_sum", "risk_low", "risk_medium", "risk_high"
+)
+
+
+def risk_bucket(risk_score: float) -> str:
+    """Счётчик диапазона риск-индекса"""
+    if risk_score >= 0.7:
+        return "risk_high"
+    if risk_score >= 0.3:
+        return "risk_medium"
+    return "risk_low"
+
+
+def job_counters(job: MLJob) -> dict:
+    """Приращения счётчиков за одно завершённое задание"""
+    if job.status != "DONE":
+        return {"error_count": 1}
+    counters = {"done_count": 1, "used_credits": Decimal(str(job.used_credits or 0))}
+    if job.risk_score is not None:
+        counters["risk_score_sum"] = job.risk_score
+        counters[risk_bucket(job.risk_score)] = 1
+    return counters
+
+
+def _upsert_daily_stats(user_id: int, day: date, counters: dict, session: Session) -> None:
+    """
+    Атомарное прибавление счётчиков к строке (user_id, day): INSERT ... ON
+    CONFLICT DO UPDATE, без чтения строки - параллельные воркеры не теряют
+    обновления.
+    """
+    insert = postgresql_insert if session.get_bind().dialect.name == "postgresql" else sqlite_insert
+    values = {field: counters.get(field, 0) for field in COUNTER_FIELDS}
+    statement = insert(UserDailyStats).values(user_id=user_id, day=day, **values)
+    columns = UserDailyStats.__table__.c
+    statement = statement.on_conflict_do_update(
+        index_elements=["user_id", "day"],
+        set_={field: columns[field] + statement.excluded[field] for field in counters}
+    )
+    session.execute(statement)
+
+
+def record_job_finished(user_id: int, job: MLJob, session: Session) -> None:
+    """
+    Учесть завершённое задание в дневной статистике пользователя.
+    Не коммитит: вызывается в транзакции, завершающей задание.
+    """
+    day = (job.finished_at or job.started_at or job.created_at).date()
+    _upsert_daily_stats(user_id, day, job_counters(job), session)
+
+
+def _daily_aggregate(job_model, user_column, user_id: Optional[int]):
+    """Дневные счётчики по таблице заданий (рабочей или архивной)"""
+    day = func.date(job_model.finished_at)
+    is_done = job_model.status == "DONE"
+    done_score = case((is_done, job_model.risk_score), else_=None)
+    statement = (
+        select(
+            user_column,
+            day,
+            func.sum(case((is_done, 1), else_=0)),
+            func.sum(case((is_done, 0), else_=1)),
+            func.coalesce(func.sum(case((is_done, job_model.used_credits), else_=0)), 0),
+            func.coalesce(func.sum(done_score), 0.0),
+            func.sum(case((done_score < 0.3, 1), else_=0)),
+            func.sum(case(((done_score >= 0.3) & (done_score < 0.7), 1), else_=0)),
+            func.sum(case((done_score >= 0.7, 1), else_=0)),
+        )
+        .where(job_model.status.in_(("DONE", "ERROR")), job_model.finished_at.is_not(None))
+        .group_by(user_column, day)
+    )
+    if user_id is not None:
+        statement = statement.where(user_column == user_id)
+    return statement
+
+
+def rebuild_daily_stats(session: Session, user_id: Optional[int] = None) -> int:
+    """Пересчитать статистику по истории заданий и архиву (первичное заполнение); возвращает число строк"""
+    statements = [
+        _daily_aggregate(MLJob, Document.user_id, user_id).join(Document, Document.id == MLJob.document_id),
+        _daily_aggregate(ArchivedJob, ArchivedJob.user_id, user_id),
+    ]
+    totals = {}
+    for statement in statements:
+        for row_user_id, row_day, *counters in session.execute(statement).all():
+            key = (row_user_id, row_day if isinstance(row_day, date) else date.fromisoformat(row_day))
+            previous = totals.get(key, [0] * len(COUNTER_FIELDS))
+            totals[key] = [a + b for a, b in zip(previous, counters)]
+
+    cleanup = delete(UserDailyStats)
+    if user_id is not None:
+        cleanup = cleanup.where(UserDailyStats.user_id == user_id)
+    session.execute(cleanup)
+    for (row_user_id, row_day), counters in totals.items():
+        session.add(UserDailyStats(user_id=row_user_id, day=row_day, **dict(zip(COUNTER_FIELDS, counters))))
+    session.commit()
+    return len(totals)
+
+
+def get_user_stats_totals(user_id: int, session: Session) -> dict:
+    """Итоговые счётчики пользователя за всё время (один агрегирующий запрос)"""
+    columns = UserDailyStats.__table__.c
+    statement = select(*(func.coalesce(func.sum(columns[field]), 0) for field in COUNTER_FIELDS)).where(
+        UserDailyStats.user_id == user_id
+    )
+    return dict(zip(COUNTER_FIELDS, session.execute(statement).one()))
+
+
+def get_user_daily_stats(user_id: int, session: Session, since: Optional[date] = None) -> List[UserDailyStats]:
+    """Дневные счётчики пользователя начиная с since, по возрастанию даты"""
+    statement = select(UserDailyStats).where(UserDailyStats.user_id == user_id)
+    if since is not None:
+        statement = statement.where(UserDailyStats.day >= since)
+    return list(session.exec(statement.order_by(UserDailyStats.day)).all())
+
+
+def has_daily_stats(session: Session) -> bool:
+    """Заполнена ли таблица статистики"""
+    return session.exec(select(UserDailyStats.id).limit(1)).first() is not None
+
+
+def record_job_timing(timing: JobTiming, session: Session) -> None:
+    """Сохранить (или перезаписать при повторной обработке) время стадий задачи"""
+    session.merge(timing)
+    session.commit()
+
+
+def percentile(sorted_values: Sequence[float], q: float) -> Optional[float]:
+    """Перцентиль по методу ближайшего ранга для отсортированных значений"""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * q // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def get_stage_percentiles(session: Session, since: datetime, percentiles=(50, 95, 99)) -> List[dict]:
+    """
+    p50/p95/p99 времени стадий по моделям за период. Стадии считаются по
+    успешным задачам, ошибки - только количеством.
+    """
+    columns = [getattr(JobTiming, f"{name}_ms") for name in STAGES]
+    statement = (
+        select(JobTiming.model_id, Model.name, JobTiming.status, JobTiming.cache_hits, *columns)
+        .join(Model, Model.id == JobTiming.model_id, isouter=True)
+        .where(JobTiming.finished_at >= since)
+    )
+    models: Dict[int, dict] = {}
+    for model_id, model_name, status, cache_hits, *values in session.execute(statement):
+        entry = models.setdefault(model_id, {
+            "model_id": model_id, "model_name": model_name, "jobs": 0, "errors": 0, "cache_hits": 0,
+            "values": {name: [] for name in STAGES},
+        })
+        entry["jobs"] += 1
+        entry["cache_hits"] += cache_hits or 0
+        if status != "DONE":
+            entry["errors"] += 1
+            continue
+        for name, value in zip(STAGES, values):
+            if value is not None:
+                entry["values"][name].append(value)
+
+    result = []
+    for entry in sorted(models.values(), key=lambda e: e["model_id"]):
+        values = entry.pop("values")
+        entry["stages"] = {}
+        for name, stage_values in values.items():
+            stage_values.sort()
+            entry["stages"][name] = {f"p{q}": percentile(stage_values, q) for q in percentiles}
+        result.append(entry)
+    return result
@@ -1,8 +1,13 @@
 from models.wallet import Wallet
 from models.transaction import Transaction
-from sqlmodel import Session, select
+from models.walletsnapshot import WalletSnapshot
+from sqlalchemy import case
+from sqlmodel import Session, select, func
 from typing import List, Optional
+from datetime import datetime
 from decimal import Decimal
+from services.metrics import WALLET_OPERATION_SECONDS
+from services.pagination import filter_period, paginate
 
 def get_wallet_by_user_id(user_id: int, session: Session) -> Optional[Wallet]:
     """Получить кошелек пользователя по ID"""
@@ -44,13 +49,15 @@ def create_transaction(
     user_id: int, 
     tx_type: str, 
     amount: Decimal, 
-    session: Session
+    session: Session,
+    balance_after: Optional[Decimal] = None
 ) -> Transaction:
     """Создать новую транзакцию"""
     transaction = Transaction(
         user_id=user_id,
         tx_type=tx_type,
-        amount=amount
+        amount=amount,
+        balance_after=balance_after
     )
     session.add(transaction)
     session.commit()
@@ -61,46 +68,130 @@ def get_user_transactions(
     user_id: int, 
     session: Session, 
     skip: int = 0, 
-    limit: int = 100
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None
 ) -> List[Transaction]:
-    """Получить транзакции пользователя с пагинацией"""
-    statement = (
-        select(Transaction)
-        .where(Transaction.user_id == user_id)
-        .order_by(Transaction.trans_time.desc())
-        .offset(skip)
-        .limit(limit)
+    """Получить транзакции пользователя с пагинацией (по курсору или OFFSET) за период [since, until)"""
+    statement = paginate(
+        filter_period(select(Transaction).where(Transaction.user_id == user_id), Transaction.trans_time, since, until),
+        Transaction.trans_time, Transaction.id, limit, cursor, skip
     )
     result = session.exec(statement)
     return list(result.all())
 
 def count_user_transactions(user_id: int, session: Session) -> int:
     """Подсчитать общее количество транзакций пользователя"""
-    statement = select(Transaction).where(Transaction.user_id == user_id)
-    result = session.exec(statement)
-    return len(list(result.all()))
+    statement = select(func.count(Transaction.id)).where(Transaction.user_id == user_id)
+    return session.exec(statement).one()
+
+def _post_transaction(user_id: int, tx_type: str, amount: Decimal, session: Session) -> Transaction:
+    """
+    Проводка по журналу: запись транзакции с нарастающим балансом и
+    обновление кошелька одним коммитом под блокировкой строки кошелька.
+    При нехватке средств откат транзакции остаётся за вызывающим кодом.
+    """
+    with WALLET_OPERATION_SECONDS.labels(operation=tx_type.lower()).time():
+        wallet_id = get_or_create_wallet(user_id, session).id
+        statement = select(Wallet).where(Wallet.id == wallet_id).with_for_update().execution_options(populate_existing=True)
+        wallet = session.exec(statement).one()
+        
+        if tx_type == "DEBIT":
+            if wallet.balance < amount:
+                raise ValueError(f"Insufficient balance: {wallet.balance} < {amount}")
+            wallet.balance = wallet.balance - amount
+        else:
+            wallet.balance = wallet.balance + amount
+        
+        transaction = Transaction(user_id=user_id, tx_type=tx_type, amount=amount, balance_after=wallet.balance)
+        session.add(wallet)
+        session.add(transaction)
+        session.commit()
+        session.refresh(transaction)
+        return transaction
 
 def credit_wallet(user_id: int, amount: Decimal, session: Session) -> Transaction:
     """Пополнить кошелек пользователя"""
-    wallet = get_or_create_wallet(user_id, session)
-    
-    transaction = create_transaction(user_id, "CREDIT", amount, session)
-    
-    new_balance = wallet.balance + amount
-    update_wallet_balance(wallet.id, new_balance, session)
-    
-    return transaction
+    return _post_transaction(user_id, "CREDIT", amount, session)
 
 def debit_wallet(user_id: int, amount: Decimal, session: Session) -> Transaction:
     """Списать средства с кошелька пользователя"""
-    wallet = get_or_create_wallet(user_id, session)
-    
-    if wallet.balance < amount:
-        raise ValueError(f"Insufficient balance: {wallet.balance} < {amount}")
-    
-    transaction = create_transaction(user_id, "DEBIT", amount, session)
-    
-    new_balance = wallet.balance - amount
-    update_wallet_balance(wallet.id, new_balance, session)
+    return _post_transaction(user_id, "DEBIT", amount, session)
+
+def get_latest_snapshot(user_id: int, session: Session) -> Optional[WalletSnapshot]:
+    """Последний снимок журнала пользователя"""
+    statement = (
+        select(WalletSnapshot)
+        .where(WalletSnapshot.user_id == user_id)
+        .order_by(WalletSnapshot.transaction_id.desc())
+        .limit(1)
+    )
+    return session.exec(statement).first()
+
+def get_transactions_totals(user_id: int, session: Session, after_transaction_id: int = 0, since: Optional[datetime] = None) -> dict:
+    """Суммы зачислений и списаний по хвосту журнала (после транзакции и/или с момента since)"""
+    statement = select(
+        func.coalesce(func.sum(case((Transaction.tx_type == "CREDIT", Transaction.amount), else_=0)), 0),
+        func.coalesce(func.sum(case((Transaction.tx_type == "DEBIT", Transaction.amount), else_=0)), 0),
+        func.count(Transaction.id),
+        func.max(Transaction.id)
+    ).where(Transaction.user_id == user_id, Transaction.id > after_transaction_id)
+    statement = filter_period(statement, Transaction.trans_time, since)
+    credited, debited, count, last_id = session.exec(statement).one()
+    return {
+        "credited": Decimal(str(credited)),
+        "debited": Decimal(str(debited)),
+        "count": count,
+        "last_transaction_id": last_id
+    }
+
+def get_ledger_totals(user_id: int, session: Session) -> dict:
+    """Итоги журнала: последний снимок плюс транзакции после него"""
+    snapshot = get_latest_snapshot(user_id, session)
+    tail = get_transactions_totals(
+        user_id, session,
+        after_transaction_id=snapshot.transaction_id if snapshot else 0,
+        since=snapshot.transaction_time if snapshot else None
+    )
+    credited = (snapshot.credited_total if snapshot else Decimal("0")) + tail["credited"]
+    debited = (snapshot.debited_total if snapshot else Decimal("0")) + tail["debited"]
+    return {
+        "balance": credited - debited,
+        "credited_total": credited,
+        "debited_total": debited,
+        "tail_count": tail["count"],
+        "last_transaction_id": tail["last_transaction_id"] or (snapshot.transaction_id if snapshot else None)
+    }
+
+def get_ledger_balance(user_id: int, session: Session) -> Decimal:
+    """Баланс по журналу транзакций"""
+    return get_ledger_totals(user_id, session)["balance"]
+
+def get_spent_since(user_id: int, since: datetime, session: Session) -> Decimal:
+    """Сколько списано с момента since (диапазон по индексу user_id, trans_time)"""
+    return get_transactions_totals(user_id, session, since=since)["debited"]
+
+def get_month_spending(user_id: int, session: Session, now: Optional[datetime] = None) -> Decimal:
+    """Сколько списано с начала текущего месяца"""
+    month_start = (now or datetime.now()).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    return get_spent_since(user_id, month_start, session)
+
+def take_wallet_snapshot(user_id: int, session: Session, min_tail: int = 1) -> Optional[WalletSnapshot]:
+    """Снимок итогов журнала, если после прошлого снимка накопилось не меньше min_tail транзакций"""
+    totals = get_ledger_totals(user_id, session)
+    if totals["tail_count"] < min_tail or totals["last_transaction_id"] is None:
+        return None
     
-    return transaction
\ No newline at end of file
+    snapshot = WalletSnapshot(
+        user_id=user_id,
+        transaction_id=totals["last_transaction_id"],
+        transaction_time=session.get(Transaction, totals["last_transaction_id"]).trans_time,
+        balance=totals["balance"],
+        credited_total=totals["credited_total"],
+        debited_total=totals["debited_total"]
+    )
+    session.add(snapshot)
+    session.commit()
+    session.refresh(snapshot)
+    return snapshot
@@ -1,7 +1,57 @@
 import io
 import os
+import re
 from typing import Optional, Tuple
 from config.logging_config import prediction_logger
+from services.metrics import EXTRACTION_SECONDS
+from services.tracing import start_span
+
+# Шаблоны разбора старого .doc компилируются при импорте: один раз на процесс
+# (и один раз на пул, если worker запущен через fork от супервизора)
+CONTRACT_MARKER_RES = tuple(re.compile(pattern, re.IGNORECASE) for pattern in (
+    r'договор[а-я]*\s+[а-я]{3,}',
+    r'[а-я]{3,}\s+обязуется',
+    r'стороны\s+[а-я]{3,}',
+    r'исполнитель\s+[а-я]{3,}',
+    r'заказчик\s+[а-я]{3,}',
+    r'ответственность\s+[а-я]{3,}',
+    r'[а-я]{3,}\s+руб[лей]*',
+    r'пункт\s+\d+',
+    r'статья\s+\d+',
+    r'\d+\s+[а-я]{4,}\s+\d{4}\s*г',
+))
+XML_TAG_RE = re.compile(r'<[^>]*>')
+OFFICE_JUNK_RES = tuple(re.compile(pattern, re.IGNORECASE) for pattern in (
+    r'xmlns[:\w]*[=\s]*["\'][^"\']*["\']',
+    r'schemas\.[A-Za-z0-9./-]+',
+    r'openxmlformats\.[A-Za-z0-9./-]*',
+    r'microsoft\.com[A-Za-z0-9./-]*',
+    r'w3\.org[A-Za-z0-9./-]*',
+    r'DocumentLibraryForm[A-Za-z0-9\s]*',
+    r'themeManager\.xml[A-Za-z0-9\s]*',
+    r'rels\.rels[A-Za-z0-9\s]*',
+    r'PK\s*-\s*!\s*[A-Za-z0-9\s]*',
+    r'revisions?\.\s*[A-Za-z\s]*',
+    r'saves?\s+or\s+revisions?',
+    r'application\s+is\s+responsible',
+    r'This\s+value\s+indicates',
+    r'number\s+of\s+saves',
+))
+OFFICE_WORD_RES = tuple(re.compile(rf'\b{re.escape(word)}\b', re.IGNORECASE) for word in (
+    'Document', 'Summary', 'Information', 'officeDocument',
+    'clrMap', 'drawingml', 'DocumentLibraryForm', 'themeManager',
+    'rels', 'theme', 'responsible', 'updating', 'revision',
+    'indicates', 'value', 'saves', 'application'
+))
+PUNCTUATION_RUN_RE = re.compile(r'[!@#$%^&*()_+=\[\]{}|\\:";\'<>?,./`~]{3,}')
+CONTROL_CHARS_RE = re.compile(r'[\x00-\x1f\x7f-\x9f]')
+WHITESPACE_RE = re.compile(r'\s+')
+PUNCTUATION_SPACING_RE = re.compile(r'\s*([.,:;!?])\s*')
+RUSSIAN_PART_RE = re.compile(r'[А-Яа-я][а-я\s\.,!?;:()\-№%]{20,}')
+ENGLISH_PART_RE = re.compile(r'[A-Z][A-Za-z\s\.,!?;:()\-]{20,}')
+NUMERIC_PART_RE = re.compile(r'[а-яА-Я\s]{5,}[\d\s,%]{2,}[а-яА-Я\s]{5,}')
+OFFICE_LEFTOVER_RE = re.compile(r'(PK|xml|rels|theme|Form)', re.IGNORECASE)
+LONG_RUSSIAN_WORD_RE = re.compile(r'[а-яА-Я]{10,}')
 
 class DocumentProcessor:
     """Сервис для обработки различных типов документов"""
@@ -22,7 +72,7 @@ class DocumentProcessor:
                 text += page.extract_text() + "\n"
             
             if text.strip():
-                prediction_logger.info("Текст успешно извлечен из PDF")
+                prediction_logger.info("Текст успешно извлечен из PDF", extra={"sample": True})
                 return text.strip()
             else:
                 prediction_logger.warning("PDF файл не содержит извлекаемого текста")
@@ -54,7 +104,7 @@ class DocumentProcessor:
                     text += "\n"
             
             if text.strip():
-                prediction_logger.info("Текст успешно извлечен из DOCX")
+                prediction_logger.info("Текст успешно извлечен из DOCX", extra={"sample": True})
                 return text.strip()
             else:
                 prediction_logger.warning("DOCX файл не содержит текста")
@@ -76,7 +126,7 @@ class DocumentProcessor:
             text = docx2txt.process(doc_file)
             
             if text and text.strip():
-                prediction_logger.info("Текст успешно извлечен из DOC с помощью docx2txt")
+                prediction_logger.info("Текст успешно извлечен из DOC с помощью docx2txt", extra={"sample": True})
                 return text.strip()
             else:
                 prediction_logger.warning("docx2txt не смог обработать DOC файл")
@@ -87,7 +137,7 @@ class DocumentProcessor:
             prediction_logger.warning(f"docx2txt не смог обработать DOC: {str(e)}")
         
         try:
-            prediction_logger.info("Пробуем python-docx для DOC файла")
+            prediction_logger.debug("Пробуем python-docx для DOC файла")
             text = self.extract_text_from_docx(file_content)
             if text and len(text.strip()) > 50:
                 prediction_logger.info("DOC файл успешно обработан как DOCX")
@@ -107,33 +157,17 @@ class DocumentProcessor:
                 if text:
                     return text
             
-            prediction_logger.info("Пробуем простое декодирование DOC файла")
+            prediction_logger.debug("Пробуем простое декодирование DOC файла")
             
             text_content = file_content.decode('latin-1', errors='ignore')
             
-            import re
-            
-            prediction_logger.info("Ищем маркеры реального содержимого в DOC файле")
+            prediction_logger.debug("Ищем маркеры реального содержимого в DOC файле")
             
-            contract_markers = [
-                r'договор[а-я]*\s+[а-я]{3,}',  
-                r'[а-я]{3,}\s+обязуется',     
-                r'стороны\s+[а-я]{3,}',       
-                r'исполнитель\s+[а-я]{3,}',    
-                r'заказчик\s+[а-я]{3,}',       
-                r'ответственность\s+[а-я]{3,}', 
-                r'[а-я]{3,}\s+руб[лей]*',      
-                r'пункт\s+\d+',                
-                r'статья\s+\d+',               
-                r'\d+\s+[а-я]{4,}\s+\d{4}\s*г', 
-            ]
-            
-
             contract_fragments = []
-            for pattern in contract_markers:
-                matches = re.findall(pattern, text_content, re.IGNORECASE)
+            for marker in CONTRACT_MARKER_RES:
+                matches = marker.findall(text_content)
                 if matches:
-                    prediction_logger.info(f"Найден маркер договора: {pattern}")
+                    prediction_logger.debug("Найден маркер договора: %s", marker.pattern)
                     for match in matches:
                         match_pos = text_content.lower().find(match.lower())
                         if match_pos >= 0:
@@ -144,59 +178,32 @@ class DocumentProcessor:
             
             if contract_fragments:
                 combined_text = ' '.join(contract_fragments)
-                prediction_logger.info(f"Найдено {len(contract_fragments)} фрагментов договора")
+                prediction_logger.debug("Найдено %s фрагментов договора", len(contract_fragments))
             else:
                 combined_text = text_content
-                prediction_logger.info("Маркеры договора не найдены, используем полный текст")
-            
-            text_without_xml = re.sub(r'<[^>]*>', ' ', combined_text)
-            
-            office_junk_patterns = [
-                r'xmlns[:\w]*[=\s]*["\'][^"\']*["\']',
-                r'schemas\.[A-Za-z0-9./-]+',
-                r'openxmlformats\.[A-Za-z0-9./-]*',
-                r'microsoft\.com[A-Za-z0-9./-]*',
-                r'w3\.org[A-Za-z0-9./-]*',
-                r'DocumentLibraryForm[A-Za-z0-9\s]*',
-                r'themeManager\.xml[A-Za-z0-9\s]*',
-                r'rels\.rels[A-Za-z0-9\s]*',
-                r'PK\s*-\s*!\s*[A-Za-z0-9\s]*',
-                r'revisions?\.\s*[A-Za-z\s]*',
-                r'saves?\s+or\s+revisions?',
-                r'application\s+is\s+responsible',
-                r'This\s+value\s+indicates',
-                r'number\s+of\s+saves',
-            ]
-            
-            cleaned_text = text_without_xml
-            for pattern in office_junk_patterns:
-                cleaned_text = re.sub(pattern, ' ', cleaned_text, flags=re.IGNORECASE)
+                prediction_logger.debug("Маркеры договора не найдены, используем полный текст")
             
-            office_words = [
-                'Document', 'Summary', 'Information', 'officeDocument', 
-                'clrMap', 'drawingml', 'DocumentLibraryForm', 'themeManager',
-                'rels', 'theme', 'responsible', 'updating', 'revision',
-                'indicates', 'value', 'saves', 'application'
-            ]
+            cleaned_text = XML_TAG_RE.sub(' ', combined_text)
+            for pattern in OFFICE_JUNK_RES:
+                cleaned_text = pattern.sub(' ', cleaned_text)
+            for pattern in OFFICE_WORD_RES:
+                cleaned_text = pattern.sub(' ', cleaned_text)
             
-            for word in office_words:
-                cleaned_text = re.sub(rf'\b{re.escape(word)}\b', ' ', cleaned_text, flags=re.IGNORECASE)
+            cleaned_text = PUNCTUATION_RUN_RE.sub(' ', cleaned_text)
+            cleaned_text = CONTROL_CHARS_RE.sub(' ', cleaned_text)
             
-            cleaned_text = re.sub(r'[!@#$%^&*()_+=\[\]{}|\\:";\'<>?,./`~]{3,}', ' ', cleaned_text)
-            cleaned_text = re.sub(r'[\x00-\x1f\x7f-\x9f]', ' ', cleaned_text)
-            
-            cleaned_text = re.sub(r'\s+', ' ', cleaned_text)
-            cleaned_text = re.sub(r'\s*([.,:;!?])\s*', r'\1 ', cleaned_text)
+            cleaned_text = WHITESPACE_RE.sub(' ', cleaned_text)
+            cleaned_text = PUNCTUATION_SPACING_RE.sub(r'\1 ', cleaned_text)
             
             meaningful_parts = []
             
-            russian_parts = re.findall(r'[А-Яа-я][а-я\s\.,!?;:()\-№%]{20,}', cleaned_text)
+            russian_parts = RUSSIAN_PART_RE.findall(cleaned_text)
             meaningful_parts.extend(russian_parts)
             
-            english_parts = re.findall(r'[A-Z][A-Za-z\s\.,!?;:()\-]{20,}', cleaned_text)  
+            english_parts = ENGLISH_PART_RE.findall(cleaned_text)
             meaningful_parts.extend(english_parts)
             
-            numeric_parts = re.findall(r'[а-яА-Я\s]{5,}[\d\s,%]{2,}[а-яА-Я\s]{5,}', cleaned_text)
+            numeric_parts = NUMERIC_PART_RE.findall(cleaned_text)
             meaningful_parts.extend(numeric_parts)
             
             if meaningful_parts:
@@ -205,13 +212,13 @@ class DocumentProcessor:
                 unique_parts.sort(key=len, reverse=True)
                 
                 result_text = ' '.join(unique_parts[:5])
-                result_text = re.sub(r'\s+', ' ', result_text).strip()
+                result_text = WHITESPACE_RE.sub(' ', result_text).strip()
 
                 if (len(result_text) > 100 and 
-                    not re.search(r'(PK|xml|rels|theme|Form)', result_text, re.IGNORECASE) and
-                    re.search(r'[а-яА-Я]{10,}', result_text)):
+                    not OFFICE_LEFTOVER_RE.search(result_text) and
+                    LONG_RUSSIAN_WORD_RE.search(result_text)):
                     
-                    prediction_logger.info(f"Качественный текст извлечен из DOC: {len(result_text)} символов")
+                    prediction_logger.debug("Качественный текст извлечен из DOC: %s символов", len(result_text))
                     return result_text
                 else:
                     prediction_logger.warning(f"Извлеченный текст низкого качества: {result_text[:100]}...")
@@ -259,20 +266,23 @@ class DocumentProcessor:
             prediction_logger.error(f"Файл {filename} слишком большой ({len(file_content)} байт)")
             return None, False
         
-        filename_lower = filename.lower()
-        
-        if filename_lower.endswith('.pdf'):
-            text = self.extract_text_from_pdf(file_content)
-        elif filename_lower.endswith('.docx'):
-            text = self.extract_text_from_docx(file_content)
-        elif filename_lower.endswith('.doc'):
-            text = self.extract_text_from_doc(file_content)
-        elif filename_lower.endswith('.txt'):
-            text = self.extract_text_from_txt(file_content)
-        else:
+        extractors = {
+            'pdf': self.extract_text_from_pdf,
+            'docx': self.extract_text_from_docx,
+            'doc': self.extract_text_from_doc,
+            'txt': self.extract_text_from_txt,
+        }
+        file_format = filename.lower().rsplit('.', 1)[-1]
+        if '.' not in filename or file_format not in extractors:
             prediction_logger.error(f"Неподдерживаемый тип файла: {filename}")
             return None, False
         
+        with EXTRACTION_SECONDS.labels(format=file_format).time(), \
+                start_span("document.extract", format=file_format, bytes=len(file_content)) as span:
+            text = extractors[file_format](file_content)
+            if span:
+                span.set_attribute("chars", len(text or ""))
+        
         if text and len(text.strip()) > 10:
             return text, True
         else:
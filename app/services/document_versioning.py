@@ -0,0 +1,96 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Set, Tuple
+from models.document import Document
+from services.risk_classifier import RISK_CLAUSE_KEYS, clause_hash, risk_classifier, segment_clauses
+
+
+@dataclass
+class ClauseDiff:
+    """
+    Результат сравнения двух версий договора по пунктам.
+
+    Attributes:
+        changed (List[str]): Новые и изменённые пункты новой версии.
+        unchanged_hashes (Set[str]): Хэши пунктов, перешедших без изменений.
+        unchanged_clauses (List[str]): Тексты этих пунктов в новой версии.
+        removed (int): Сколько пунктов предыдущей версии удалено или изменено.
+    """
+    changed: List[str] = field(default_factory=list)
+    unchanged_hashes: Set[str] = field(default_factory=set)
+    unchanged_clauses: List[str] = field(default_factory=list)
+    removed: int = 0
+
+    @property
+    def unchanged(self) -> int:
+        return len(self.unchanged_hashes)
+
+    @property
+    def changed_text(self) -> str:
+        return "\n".join(self.changed)
+
+    def changed_token_count(self) -> int:
+        """Токены изменённой части - по ним тарифицируется анализ новой версии"""
+        return Document.count_tokens(self.changed_text)
+
+
+def diff_clauses(old_text: str, new_text: str) -> ClauseDiff:
+    """
+    Сравнение версий по хэшам нормализованных пунктов.
+
+    Перестановка пунктов и правка регистра или пунктуации изменением не
+    считаются; правка слова или числа (сумма, срок, процент) - считается.
+    """
+    old_hashes = {clause_hash(clause) for clause in segment_clauses(old_text)}
+
+    diff = ClauseDiff()
+    new_hashes = set()
+    for clause in segment_clauses(new_text):
+        key = clause_hash(clause)
+        if key in new_hashes:
+            continue
+        new_hashes.add(key)
+        if key in old_hashes:
+            diff.unchanged_hashes.add(key)
+            diff.unchanged_clauses.append(clause)
+        else:
+            diff.changed.append(clause)
+
+    diff.removed = len(old_hashes - new_hashes)
+    return diff
+
+
+def merge_risk_clauses(
+    diff: ClauseDiff,
+    changed_clauses: List[Dict[str, Any]],
+    changed_categories: List[str],
+    clause_index=None,
+    max_clauses: int = 8
+) -> Tuple[List[Dict[str, Any]], float]:
+    """
+    Рисковые пункты новой версии: все неизменённые пункты плюс результаты
+    анализа изменённых.
+
+    Неизменённые пункты классифицируются локально, через clause_index - по
+    сохранённым отпечаткам. Сохранённые RiskClause предыдущей задачи для
+    этого не годятся: в них только max_clauses самых рисковых пунктов, и
+    риск-скор по ним расходился бы с полным анализом.
+
+    Returns:
+        Tuple[List[Dict], float]: Пункты (не больше max_clauses) и риск-скор.
+    """
+    if clause_index is not None:
+        results = clause_index.classify(diff.unchanged_clauses, risk_classifier.classify_clauses)
+    else:
+        results = risk_classifier.classify_clauses(diff.unchanged_clauses)
+    reused = [{key: result[key] for key in RISK_CLAUSE_KEYS} for result in results if result]
+
+    merged = reused + list(changed_clauses)
+    categories = {code for clause in merged for code in clause.get("categories", [])}
+    categories.update(changed_categories)
+
+    def weight(clause: Dict[str, Any]) -> float:
+        category = risk_classifier.category(clause.get("category"))
+        return category.weight if category else 0.0
+
+    merged.sort(key=weight, reverse=True)
+    return merged[:max_clauses], risk_classifier.score_categories(categories)
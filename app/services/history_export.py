@@ -0,0 +1,91 @@
+import csv
+import io
+import json
+from typing import Any, Dict, Iterable, Iterator
+
+CSV_FIELDS = [
+    "job_id", "document_id", "filename", "status", "summary_depth", "used_credits",
+    "risk_score", "started_at", "finished_at", "risk_clauses_count", "high_risk_clauses", "risk_clauses"
+]
+
+
+def group_history_rows(rows: Iterable) -> Iterator[Dict[str, Any]]:
+    """
+    Сборка записей по заданиям из потока строк (задание, имя файла, пункт).
+
+    В памяти держится только текущее задание - строки одного задания
+    идут подряд.
+    """
+    record = None
+    for job, filename, clause in rows:
+        if record is None or record["job_id"] != job.id:
+            if record is not None:
+                yield record
+            record = {
+                "job_id": job.id,
+                "document_id": job.document_id,
+                "filename": filename,
+                "status": job.status,
+                "summary_depth": job.summary_depth,
+                "used_credits": float(job.used_credits or 0),
+                "risk_score": job.risk_score,
+                "summary_text": job.summary_text,
+                "started_at": job.started_at.isoformat() if job.started_at else None,
+                "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+                "risk_clauses": []
+            }
+        if clause is not None:
+            record["risk_clauses"].append({
+                "clause_text": clause.clause_text,
+                "risk_level": clause.risk_level,
+                "explanation": clause.explanation
+            })
+    if record is not None:
+        yield record
+
+
+def _chunked(lines: Iterable[str], chunk_size: int) -> Iterator[str]:
+    buffer = []
+    for line in lines:
+        buffer.append(line)
+        if len(buffer) >= chunk_size:
+            yield "".join(buffer)
+            buffer = []
+    if buffer:
+        yield "".join(buffer)
+
+
+def export_ndjson(records: Iterable[Dict[str, Any]], chunk_size: int = 100) -> Iterator[str]:
+    """NDJSON: одна строка JSON на задание, отдаётся пачками по chunk_size"""
+    lines = (json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+    return _chunked(lines, chunk_size)
+
+
+def export_csv(records: Iterable[Dict[str, Any]], chunk_size: int = 100) -> Iterator[str]:
+    """CSV: одна строка на задание, рисковые пункты через « | »"""
+    def lines():
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=CSV_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+        for record in records:
+            clauses = record["risk_clauses"]
+            writer.writerow({
+                **record,
+                "risk_clauses_count": len(clauses),
+                "high_risk_clauses": sum(1 for clause in clauses if clause["risk_level"] == "HIGH"),
+                "risk_clauses": " | ".join(f"[{clause['risk_level']}] {clause['clause_text']}" for clause in clauses)
+            })
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+
+    return _chunked(lines(), chunk_size)
+
+
+EXPORT_FORMATS = {
+    "ndjson": (export_ndjson, "application/x-ndjson"),
+    "csv": (export_csv, "text/csv; charset=utf-8"),
+}
@@ -1,9 +1,27 @@
 import os
+import re
 import requests
 from typing import Dict, Any, Optional, List
 from config.logging_config import prediction_logger
+from services.risk_classifier import risk_classifier
+from services.metrics import HF_ERRORS, HF_REQUEST_SECONDS
+from services.tracing import start_span
+from services.job_timing import stage
 import time
 
+KEY_TERM_RE = re.compile(r'\b[а-яё]{4,}\b', re.UNICODE)
+CLEANUP_RES = tuple(re.compile(pattern, flags) for pattern, flags in (
+    (r'Russian words?[:\s]*', 0),
+    (r'"[А-Я]{2,5}"[,\s]*', 0),
+    (r'[\'\"]{2,}', 0),
+    (r'[-–—]{2,}', 0),
+    (r'\s+[а-яё]\s+', 0),
+    (r'\d{1,2}\s+г\.\s+\d{1,2}', 0),
+    (r'"[^"]*fool[^"]*"', re.IGNORECASE),
+    (r"'[^']*fool[^']*'", re.IGNORECASE),
+))
+WHITESPACE_RE = re.compile(r'\s+')
+
 class HuggingFaceService:
     """Сервис для работы с Hugging Face API"""
     
@@ -28,9 +46,14 @@ class HuggingFaceService:
         
         for attempt in range(retries):
             try:
-                response = requests.post(url, headers=self.headers, json=payload, timeout=30)
+                with HF_REQUEST_SECONDS.labels(model=model_name).time(), \
+                        start_span("hf.request", kind="CLIENT", model=model_name, attempt=attempt + 1) as span:
+                    response = requests.post(url, headers=self.headers, json=payload, timeout=30)
+                    if span:
+                        span.set_attribute("http.status_code", response.status_code)
                 
                 if response.status_code == 503:
+                    HF_ERRORS.labels(model=model_name, reason="loading").inc()
                     prediction_logger.info(f"Модель {model_name} загружается, ожидание...")
                     time.sleep(10)
                     continue
@@ -38,10 +61,12 @@ class HuggingFaceService:
                 if response.status_code == 200:
                     return response.json()
                 else:
+                    HF_ERRORS.labels(model=model_name, reason=str(response.status_code)).inc()
                     prediction_logger.error(f"Ошибка API HuggingFace: {response.status_code}, {response.text}")
                     return None
                     
             except requests.exceptions.RequestException as e:
+                HF_ERRORS.labels(model=model_name, reason="connection").inc()
                 prediction_logger.error(f"Ошибка соединения с HuggingFace API: {str(e)}")
                 if attempt < retries - 1:
                     time.sleep(5)
@@ -51,62 +76,26 @@ class HuggingFaceService:
         return None
     
     
-    def summarize_russian_text(self, text: str) -> Optional[str]:
-        """Создать краткое изложение русского текста"""
+    def prepare_summary_input(self, text: str) -> str:
+        """Обрезка длинного текста до входа саммаризатора"""
         if len(text) > 2000:
-            text_to_summarize = text[:1500] + " " + text[-500:]
-        else:
-            text_to_summarize = text
-        
-        payload = {
-            "inputs": text_to_summarize,
-            "parameters": {
-                "max_new_tokens": 200,
-                "min_new_tokens": 50,
-                "do_sample": True,
-                "temperature": 0.7,
-                "no_repeat_ngram_size": 4
-            }
-        }
-        
-        result = self._make_request(self.russian_summarization_model, payload)
-        
-        if result and isinstance(result, list) and len(result) > 0:
-            summary = result[0].get('summary_text')
-            if summary and len(summary.strip()) > 10:
-                return summary.strip()
-        
-        prediction_logger.info("Пробуем альтернативную русскую модель FRED-T5")
+            return text[:1500] + " " + text[-500:]
+        return text
 
-        fred_input = f"<LM> Сократи текст.\n{text_to_summarize}"
-        
-        fred_payload = {
-            "inputs": fred_input,
-            "parameters": {
-                "max_new_tokens": 200,
-                "min_new_tokens": 17,
-                "num_beams": 5,
-                "do_sample": True,
-                "no_repeat_ngram_size": 4,
-                "top_p": 0.9
-            }
-        }
-        
-        result = self._make_request(self.alternative_russian_model, fred_payload)
+    def summarize_russian_text(self, text: str, backend=None) -> Optional[str]:
+        """Создать краткое изложение русского текста"""
+        if backend is None:
+            from services.inference_backend import get_backend
+            backend = get_backend()
         
-        if result and isinstance(result, list) and len(result) > 0:
-            summary = result[0].get('generated_text', result[0].get('summary_text', ''))
-            if summary and len(summary.strip()) > 10:
-                return summary.strip()
-            
-        return None
+        with stage("inference"):
+            return backend.summarize(self.prepare_summary_input(text))
     
     def extract_key_terms(self, text: str) -> List[str]:
         """Извлечение ключевых терминов (простая реализация)"""
-        import re
         from collections import Counter
         
-        words = re.findall(r'\b[а-яё]{4,}\b', text.lower(), re.UNICODE)
+        words = KEY_TERM_RE.findall(text.lower())
         
         stop_words = {
             'который', 'которая', 'которое', 'которые', 'этот', 'этого', 'этой', 
@@ -121,28 +110,20 @@ class HuggingFaceService:
     
     def _clean_text_for_analysis(self, text: str) -> str:
         """Дополнительная очистка текста для анализа"""
-        import re
-        
-        cleaned = re.sub(r'Russian words?[:\s]*', ' ', text)
-        cleaned = re.sub(r'"[А-Я]{2,5}"[,\s]*', ' ', cleaned)
-        cleaned = re.sub(r'[\'\"]{2,}', ' ', cleaned) 
-        cleaned = re.sub(r'[-–—]{2,}', ' ', cleaned)
-        cleaned = re.sub(r'\s+[а-яё]\s+', ' ', cleaned)
-        cleaned = re.sub(r'\d{1,2}\s+г\.\s+\d{1,2}', ' ', cleaned) 
+        cleaned = text
+        for pattern in CLEANUP_RES:
+            cleaned = pattern.sub(' ', cleaned)
         
-        cleaned = re.sub(r'"[^"]*fool[^"]*"', ' ', cleaned, flags=re.IGNORECASE)
-        cleaned = re.sub(r"'[^']*fool[^']*'", ' ', cleaned, flags=re.IGNORECASE)
-        
-        cleaned = re.sub(r'\s+', ' ', cleaned).strip()
+        cleaned = WHITESPACE_RE.sub(' ', cleaned).strip()
         
         return cleaned
     
-    def analyze_contract_risks(self, text: str) -> Dict[str, Any]:
+    def analyze_contract_risks(self, text: str, backend=None, clause_index=None) -> Dict[str, Any]:
         """Комплексный анализ рисков договора - фокус на саммаризации и рисках"""
-        prediction_logger.info("Начинаем анализ договора с помощью HuggingFace API")
+        prediction_logger.info("Начинаем анализ договора с помощью HuggingFace API", extra={"sample": True})
         
         clean_text = self._clean_text_for_analysis(text)
-        prediction_logger.info(f"Текст очищен: {len(text)} -> {len(clean_text)} символов")
+        prediction_logger.debug("Текст очищен: %s -> %s символов", len(text), len(clean_text))
         
         results = {
             "processed_successfully": False,
@@ -150,61 +131,27 @@ class HuggingFaceService:
             "key_terms": [],
             "risk_score": 0.0,
             "risk_clauses": [],
+            "risk_categories": [],
             "error_message": None
         }
         
         try:
-            summary = self.summarize_russian_text(clean_text)
+            summary = self.summarize_russian_text(clean_text, backend)
             if summary:
                 results["summary"] = summary
-                prediction_logger.info("Краткое изложение создано с помощью русской модели")
+                prediction_logger.info("Краткое изложение создано с помощью русской модели", extra={"sample": True})
             
             key_terms = self.extract_key_terms(clean_text)
             results["key_terms"] = key_terms
             
-            risk_keywords = {
-                'неустойка': 0.9,
-                'штраф': 0.8,
-                'пеня': 0.8,
-                'ответственность': 0.6,
-                'расторжение': 0.9,
-                'нарушение': 0.7,
-                'просрочка': 0.6,
-                'односторонний': 0.9,
-                'арбитраж': 0.5,
-                'суд': 0.6,
-                'возмещение': 0.7,
-                'ущерб': 0.8,
-                'санкции': 0.8,
-                'обязательство': 0.5,
-                'гарантия': 0.4,
-                'форс-мажор': 0.3 
-            }
-            
-            risk_score = 0.0
-            risk_clauses = []
-            
-            text_lower = clean_text.lower()
-            for keyword, weight in risk_keywords.items():
-                if keyword in text_lower:
-                    risk_score += weight
-                    sentences = clean_text.split('.')
-                    for sentence in sentences:
-                        if keyword in sentence.lower() and len(sentence.strip()) > 20:
-                            risk_level = "HIGH" if weight > 0.7 else "MEDIUM" if weight > 0.4 else "LOW"
-                            risk_clauses.append({
-                                "clause_text": sentence.strip()[:200],
-                                "risk_level": risk_level,
-                                "explanation": f"Обнаружено ключевое слово: '{keyword}' (вес риска: {weight})"
-                            })
-                            break
-            
-            results["risk_score"] = min(1.0, risk_score / 6.0) 
-            results["risk_clauses"] = risk_clauses[:8]
+            risk_analysis = risk_classifier.analyze(text, clause_index=clause_index)
+            results["risk_score"] = risk_analysis["risk_score"]
+            results["risk_clauses"] = risk_analysis["risk_clauses"]
+            results["risk_categories"] = risk_analysis["categories"]
             
             if summary or key_terms:
                 results["processed_successfully"] = True
-                prediction_logger.info("Анализ договора успешно завершен")
+                prediction_logger.info("Анализ договора успешно завершен", extra={"sample": True})
             else:
                 results["error_message"] = "API не смог обработать текст"
                 prediction_logger.warning("API не вернул результатов")
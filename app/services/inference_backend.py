@@ -0,0 +1,255 @@
+import os
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+from config.logging_config import prediction_logger
+
+
+class InferenceBackend:
+    """Базовый интерфейс бэкенда инференса саммаризатора"""
+
+    name = "base"
+    # Можно ли унаследовать загруженный бэкенд в дочернем процессе после fork
+    fork_safe = False
+
+    def summarize_batch(self, texts: List[str]) -> List[Optional[str]]:
+        """Саммаризация пачки текстов, результат в том же порядке"""
+        raise NotImplementedError
+
+    def summarize(self, text: str) -> Optional[str]:
+        """Саммаризация одного текста"""
+        return self.summarize_batch([text])[0]
+
+    def after_fork(self) -> None:
+        """Вызывается в дочернем процессе для унаследованного fork_safe бэкенда"""
+
+
+class HuggingFaceAPIBackend(InferenceBackend):
+    """Бэкенд через HTTP API Hugging Face (api-inference.huggingface.co)"""
+
+    name = "hf_api"
+
+    def __init__(self, client=None):
+        if client is None:
+            from services.huggingface_service import huggingface_service
+            client = huggingface_service
+        self.client = client
+
+    @staticmethod
+    def _extract_summaries(result, count: int, keys: Tuple[str, ...]) -> List[Optional[str]]:
+        """Разбор ответа API: по одному саммари на каждый вход"""
+        summaries: List[Optional[str]] = [None] * count
+        if not isinstance(result, list):
+            return summaries
+
+        for i, item in enumerate(result[:count]):
+            if isinstance(item, list):
+                item = item[0] if item else {}
+            if not isinstance(item, dict):
+                continue
+            for key in keys:
+                summary = item.get(key)
+                if summary and len(summary.strip()) > 10:
+                    summaries[i] = summary.strip()
+                    break
+        return summaries
+
+    def summarize_batch(self, texts: List[str]) -> List[Optional[str]]:
+        if not texts:
+            return []
+
+        payload = {
+            "inputs": texts,
+            "parameters": {
+                "max_new_tokens": 200,
+                "min_new_tokens": 50,
+                "do_sample": True,
+                "temperature": 0.7,
+                "no_repeat_ngram_size": 4
+            }
+        }
+        result = self.client._make_request(self.client.russian_summarization_model, payload)
+        summaries = self._extract_summaries(result, len(texts), ("summary_text",))
+
+        missing = [i for i, summary in enumerate(summaries) if summary is None]
+        if not missing:
+            return summaries
+
+        prediction_logger.info(f"Пробуем альтернативную русскую модель FRED-T5 для {len(missing)} текстов")
+        fred_payload = {
+            "inputs": [f"<LM> Сократи текст.\n{texts[i]}" for i in missing],
+            "parameters": {
+                "max_new_tokens": 200,
+                "min_new_tokens": 17,
+                "num_beams": 5,
+                "do_sample": True,
+                "no_repeat_ngram_size": 4,
+                "top_p": 0.9
+            }
+        }
+        result = self.client._make_request(self.client.alternative_russian_model, fred_payload)
+        fred_summaries = self._extract_summaries(result, len(missing), ("generated_text", "summary_text"))
+        for i, summary in zip(missing, fred_summaries):
+            summaries[i] = summary
+
+        return summaries
+
+
+class CTranslate2Backend(InferenceBackend):
+    """Локальный CPU-инференс seq2seq модели, сконвертированной в CTranslate2"""
+
+    name = "ctranslate2"
+
+    def __init__(self, model_path: str, tokenizer_path: Optional[str] = None, load_translator: bool = True):
+        import transformers
+
+        self.model_path = model_path
+        self.max_input_tokens = int(os.getenv("LOCAL_INFERENCE_MAX_INPUT_TOKENS", "512"))
+        self.max_batch_size = int(os.getenv("LOCAL_INFERENCE_MAX_BATCH", "16"))
+
+        self.tokenizer = transformers.AutoTokenizer.from_pretrained(tokenizer_path or model_path)
+        self.translator = None
+        self._translator_lock = threading.Lock()
+        if load_translator:
+            self._ensure_translator()
+
+    @property
+    def fork_safe(self) -> bool:
+        """Токенизатор переживает fork, пул потоков CTranslate2 - нет"""
+        return self.translator is None
+
+    def after_fork(self) -> None:
+        self._translator_lock = threading.Lock()
+
+    def _ensure_translator(self):
+        """Загрузить веса CTranslate2 в текущем процессе (в дочернем - при первой задаче)"""
+        if self.translator is None:
+            with self._translator_lock:
+                if self.translator is None:
+                    import ctranslate2
+                    self.translator = ctranslate2.Translator(
+                        self.model_path,
+                        device="cpu",
+                        compute_type=os.getenv("LOCAL_INFERENCE_COMPUTE_TYPE", "int8"),
+                        inter_threads=int(os.getenv("LOCAL_INFERENCE_INTER_THREADS", "1")),
+                        intra_threads=int(os.getenv("LOCAL_INFERENCE_INTRA_THREADS", "0"))
+                    )
+                    prediction_logger.info(f"Локальная модель CTranslate2 загружена: {self.model_path}")
+        return self.translator
+
+    def summarize_batch(self, texts: List[str]) -> List[Optional[str]]:
+        if not texts:
+            return []
+        translator = self._ensure_translator()
+
+        source = [
+            self.tokenizer.convert_ids_to_tokens(
+                self.tokenizer.encode(text, truncation=True, max_length=self.max_input_tokens)
+            )
+            for text in texts
+        ]
+        results = translator.translate_batch(
+            source,
+            max_batch_size=self.max_batch_size,
+            beam_size=2,
+            max_decoding_length=200,
+            min_decoding_length=20,
+            no_repeat_ngram_size=4
+        )
+
+        summaries: List[Optional[str]] = []
+        for result in results:
+            tokens = result.hypotheses[0] if result.hypotheses else []
+            summary = self.tokenizer.decode(
+                self.tokenizer.convert_tokens_to_ids(tokens),
+                skip_special_tokens=True
+            ).strip()
+            summaries.append(summary if len(summary) > 10 else None)
+        return summaries
+
+
+BackendFactory = Callable[[Optional[str]], InferenceBackend]
+
+_factories: Dict[str, BackendFactory] = {
+    HuggingFaceAPIBackend.name: lambda path: HuggingFaceAPIBackend(),
+    CTranslate2Backend.name: lambda path: CTranslate2Backend(path, os.getenv("LOCAL_INFERENCE_TOKENIZER")),
+}
+
+_backends: Dict[Tuple[str, Optional[str]], InferenceBackend] = {}
+_backends_lock = threading.Lock()
+
+
+def register_backend(name: str, factory: BackendFactory) -> None:
+    """Зарегистрировать фабрику бэкенда под именем, указываемым в Model.backend"""
+    _factories[name] = factory
+
+
+def get_backend(name: str = HuggingFaceAPIBackend.name, path: Optional[str] = None) -> InferenceBackend:
+    """Возвращает бэкенд, загружая его не более одного раза на процесс"""
+    key = (name, path)
+    backend = _backends.get(key)
+    if backend is not None:
+        return backend
+
+    with _backends_lock:
+        backend = _backends.get(key)
+        if backend is None:
+            factory = _factories.get(name)
+            if factory is None:
+                raise ValueError(f"Unknown inference backend: {name}")
+            backend = factory(path)
+            _backends[key] = backend
+    return backend
+
+
+def preload_backend(name: str, path: Optional[str] = None) -> Optional[InferenceBackend]:
+    """
+    Загрузка в родительском процессе пула: только то, что переживает fork
+    (токенизатор CTranslate2). Нативная часть загружается в каждом дочернем.
+    """
+    if name != CTranslate2Backend.name:
+        return None
+    key = (name, path)
+    with _backends_lock:
+        backend = _backends.get(key)
+        if backend is None:
+            backend = CTranslate2Backend(path, os.getenv("LOCAL_INFERENCE_TOKENIZER"), load_translator=False)
+            _backends[key] = backend
+    return backend
+
+
+def get_backend_for_model(model) -> InferenceBackend:
+    """
+    Бэкенд, выбранный в строке Model; при ошибке загрузки - HTTP API.
+    Замена запоминается под ключом модели, чтобы не загружать сломанный
+    бэкенд на каждой задаче (повторная попытка - после reset_backends).
+    """
+    name = model.backend or HuggingFaceAPIBackend.name
+    path = model.backend_path
+    try:
+        return get_backend(name, path)
+    except Exception as e:
+        prediction_logger.error(f"Не удалось загрузить бэкенд {name} для модели {model.name}: {e}")
+        fallback = get_backend(HuggingFaceAPIBackend.name)
+        with _backends_lock:
+            return _backends.setdefault((name, path), fallback)
+
+
+def reset_backends() -> None:
+    """Сбросить кэш загруженных бэкендов"""
+    with _backends_lock:
+        _backends.clear()
+
+
+def _reset_after_fork():
+    """HTTP-сессии и нативные модели не делятся между процессами: загрузка заново в дочернем"""
+    global _backends_lock
+    inherited = {key: backend for key, backend in _backends.items() if getattr(backend, "fork_safe", False)}
+    _backends.clear()
+    for key, backend in inherited.items():
+        backend.after_fork()
+        _backends[key] = backend
+    _backends_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,95 @@
+"""
+Перенос старых завершённых заданий из mljob/riskclause в архив.
+
+Запуск: python -m services.job_archive [--older-than-days N]
+"""
+import argparse
+import os
+import sys
+from datetime import datetime, timedelta
+from typing import List, Optional
+from sqlalchemy import delete
+from sqlalchemy.orm import aliased
+from sqlmodel import Session, select
+from models.archivedjob import ArchivedJob
+from models.document import Document
+from models.mljob import MLJob
+from models.riskclause import RiskClause
+from services.crud import mljob as MLJobService
+from config.logging_config import app_logger
+
+ARCHIVE_AFTER_DAYS = int(os.getenv("JOB_ARCHIVE_AFTER_DAYS", "180"))
+ARCHIVE_STATUSES = ("DONE", "ERROR")
+
+
+def select_archivable_jobs(session: Session, cutoff: datetime, after_id: int, batch_size: int):
+    """
+    Завершённые до cutoff задания вместе с владельцем. Задания, на которые
+    ссылается previous_job_id другого задания рабочей таблицы, остаются -
+    их пункты нужны для инкрементального анализа новых версий.
+    """
+    referencing = aliased(MLJob)
+    statement = (
+        select(MLJob, Document.user_id)
+        .join(Document, MLJob.document_id == Document.id)
+        .where(
+            MLJob.status.in_(ARCHIVE_STATUSES),
+            MLJob.finished_at < cutoff,
+            MLJob.id > after_id,
+            ~select(referencing.id).where(referencing.previous_job_id == MLJob.id).exists()
+        )
+        .order_by(MLJob.id)
+        .limit(batch_size)
+    )
+    return session.exec(statement).all()
+
+
+def archive_jobs(
+    session: Session,
+    older_than_days: int = ARCHIVE_AFTER_DAYS,
+    batch_size: int = 500,
+    now: Optional[datetime] = None
+) -> int:
+    """
+    Архивировать задания пачками: каждая пачка - одна транзакция, в которой
+    строки пишутся в archivedjob и удаляются из riskclause и mljob.
+    Возвращает число перенесённых заданий.
+    """
+    cutoff = (now or datetime.now()) - timedelta(days=older_than_days)
+    archived, last_id = 0, 0
+    while True:
+        rows = select_archivable_jobs(session, cutoff, last_id, batch_size)
+        if not rows:
+            break
+
+        job_ids: List[int] = [job.id for job, _ in rows]
+        clauses = MLJobService.get_jobs_risk_clauses(job_ids, session)
+        for job, user_id in rows:
+            session.add(ArchivedJob.from_job(job, user_id, clauses[job.id]))
+        session.flush()
+        session.execute(delete(RiskClause).where(RiskClause.job_id.in_(job_ids)))
+        session.execute(delete(MLJob).where(MLJob.id.in_(job_ids)))
+        session.commit()
+
+        archived += len(job_ids)
+        last_id = job_ids[-1]
+        app_logger.info(f"Архивировано заданий: {archived} (до job_id={last_id})")
+    return archived
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Архивация завершённых ML заданий")
+    parser.add_argument("--older-than-days", type=int, default=ARCHIVE_AFTER_DAYS)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args(argv)
+
+    from database.database import engine
+
+    with Session(engine) as session:
+        archived = archive_jobs(session, older_than_days=args.older_than_days, batch_size=args.batch_size)
+    app_logger.info(f"Архивация завершена: перенесено {archived} заданий старше {args.older_than_days} дней")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
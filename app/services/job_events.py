@@ -0,0 +1,159 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Optional, Set, Tuple
+from services.rabbitmq_config import RabbitMQConfig
+from config.logging_config import app_logger
+
+TERMINAL_STATUSES = {"DONE", "ERROR"}
+
+
+def format_sse(event: Dict[str, Any]) -> str:
+    """Событие в формате Server-Sent Events"""
+    return f"event: status\ndata: {json.dumps(event, ensure_ascii=False, default=str)}\n\n"
+
+
+class JobEventHub:
+    """
+    Раздача событий задач SSE-подписчикам внутри процесса API.
+
+    Каждый клиент держит свою asyncio.Queue; publish можно вызывать
+    из любого потока - события передаются в цикл подписчика.
+    """
+
+    def __init__(self):
+        self._subscribers: Dict[int, Set[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]]] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, job_id: int) -> asyncio.Queue:
+        """Подписка на события задачи (вызывается из цикла событий)"""
+        queue: asyncio.Queue = asyncio.Queue()
+        with self._lock:
+            self._subscribers.setdefault(job_id, set()).add((asyncio.get_running_loop(), queue))
+        return queue
+
+    def unsubscribe(self, job_id: int, queue: asyncio.Queue):
+        with self._lock:
+            subscribers = self._subscribers.get(job_id)
+            if not subscribers:
+                return
+            subscribers.difference_update({item for item in subscribers if item[1] is queue})
+            if not subscribers:
+                del self._subscribers[job_id]
+
+    def publish(self, event: Dict[str, Any]) -> int:
+        """Передать событие всем подписчикам задачи; возвращает число подписчиков"""
+        with self._lock:
+            subscribers = list(self._subscribers.get(event.get("job_id"), ()))
+
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, event)
+            except RuntimeError:
+                self.unsubscribe(event.get("job_id"), queue)
+        return len(subscribers)
+
+    def subscriber_count(self, job_id: int = None) -> int:
+        with self._lock:
+            if job_id is not None:
+                return len(self._subscribers.get(job_id, ()))
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+
+class JobEventConsumer:
+    """
+    Единственная подписка процесса API на fanout-exchange событий задач.
+
+    Поток держит эксклюзивную автоудаляемую очередь и переподключается
+    к RabbitMQ при обрыве соединения.
+    """
+
+    def __init__(self, hub: JobEventHub, config: RabbitMQConfig = None, retry_delay: float = 5.0):
+        self.hub = hub
+        self.config = config or RabbitMQConfig()
+        self.retry_delay = retry_delay
+        self._connection = None
+        self._channel = None
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="job-events-consumer", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                self._connection = self.config.get_connection()
+                self._channel = self._connection.channel()
+                self.config.setup_events_exchange(self._channel)
+                queue_name = self._channel.queue_declare(queue='', exclusive=True, auto_delete=True).method.queue
+                self._channel.queue_bind(exchange=self.config.events_exchange_name, queue=queue_name)
+                self._channel.basic_consume(queue=queue_name, on_message_callback=self._on_message, auto_ack=True)
+                app_logger.info("Подписка на события задач установлена")
+                self._channel.start_consuming()
+            except Exception as e:
+                if self._stopped.is_set():
+                    break
+                app_logger.warning(f"Подписка на события задач прервана, повтор через {self.retry_delay}с: {e}")
+                time.sleep(self.retry_delay)
+
+    def _on_message(self, ch, method, properties, body: bytes):
+        try:
+            event = json.loads(body.decode('utf-8'))
+        except ValueError:
+            app_logger.warning("Получено некорректное событие задачи")
+            return
+        self.hub.publish(event)
+
+    def stop(self):
+        self._stopped.set()
+        connection, channel = self._connection, self._channel
+        if connection and not connection.is_closed and channel:
+            try:
+                connection.add_callback_threadsafe(channel.stop_consuming)
+            except Exception as e:
+                app_logger.warning(f"Ошибка остановки подписки на события задач: {e}")
+        if self._thread:
+            self._thread.join(timeout=5)
+
+
+_hub = None
+_consumer = None
+_init_lock = threading.Lock()
+
+
+def get_job_event_hub() -> JobEventHub:
+    """Возвращает общий для процесса хаб; при первом вызове запускает подписку"""
+    global _hub, _consumer
+    if _hub is None:
+        with _init_lock:
+            if _hub is None:
+                _consumer = JobEventConsumer(JobEventHub())
+                _consumer.start()
+                _hub = _consumer.hub
+    return _hub
+
+
+def stop_job_events():
+    """Останавливает подписку процесса на события задач"""
+    global _hub, _consumer
+    with _init_lock:
+        if _consumer is not None:
+            _consumer.stop()
+        _hub, _consumer = None, None
+
+
+def _reset_after_fork():
+    """Поток подписки остался в родителе: дочерний процесс подпишется при первом запросе"""
+    global _hub, _consumer, _init_lock
+    _hub, _consumer, _init_lock = None, None, threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,57 @@
+"""
+Замер стадий задачи воркера без передачи таймера через все вызовы:
+воркер открывает timing_scope, сервисы отмечают участки через stage().
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional
+
+
+class StageTimer:
+    """Накопленное время стадий одной задачи, мс"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self.backend: Optional[str] = None
+        self.cache_hits = 0
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + (time.perf_counter() - started) * 1000
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+
+_current_timer: ContextVar[Optional[StageTimer]] = ContextVar("current_stage_timer", default=None)
+
+
+def current_timer() -> Optional[StageTimer]:
+    return _current_timer.get()
+
+
+@contextmanager
+def timing_scope(timer: StageTimer) -> Iterator[StageTimer]:
+    """Сделать таймер текущим для кода внутри блока"""
+    token = _current_timer.set(timer)
+    try:
+        yield timer
+    finally:
+        _current_timer.reset(token)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Отметить участок как стадию текущей задачи (вне timing_scope - ничего)"""
+    timer = _current_timer.get()
+    if timer is None:
+        yield
+        return
+    with timer.stage(name):
+        yield
@@ -3,6 +3,7 @@ import requests
 import json
 from typing import Tuple
 from config.logging_config import app_logger
+from services.risk_classifier import risk_classifier
 
 class LightweightMLService:
     """Облегченный ML сервис, использует API Hugging Face"""
@@ -93,79 +94,15 @@ class LightweightMLService:
         return self._fallback_risk_analysis(text)
     
     def _fallback_risk_analysis(self, text: str) -> float:
-        """Резервный анализ через ключевые слова"""
-        risk_keywords = [
-            'штраф', 'пеня', 'неустойка', 'ответственность', 
-            'обязательство', 'гарантия', 'возмещение', 'ущерб',
-            'санкции', 'нарушение', 'просрочка',
-            'penalty', 'fine', 'liability', 'damages',
-            'breach', 'default', 'forfeit', 'sanction'
-        ]
-        
-        text_lower = text.lower()
-        risk_count = sum(1 for keyword in risk_keywords if keyword in text_lower)
-        
+        """Резервный анализ классификатором рисковых пунктов"""
         base_risk = 0.2
-        keyword_risk = min(risk_count * 0.1, 0.6)
+        classifier_risk = min(risk_classifier.analyze(text)["risk_score"], 0.6)
         
-        return min(base_risk + keyword_risk, 1.0)
+        return min(base_risk + classifier_risk, 1.0)
     
     def _extract_risk_clauses(self, text: str, risk_score: float) -> list:
         """Извлечение рискованных пунктов из текста"""
-        risk_clauses = []
-        
-        risk_keywords = {
-            'штраф': 'HIGH',
-            'пеня': 'HIGH', 
-            'неустойка': 'HIGH',
-            'ответственность': 'MEDIUM',
-            'обязательство': 'MEDIUM',
-            'гарантия': 'MEDIUM',
-            'возмещение': 'HIGH',
-            'ущерб': 'HIGH',
-            'санкции': 'HIGH',
-            'нарушение': 'MEDIUM',
-            'просрочка': 'MEDIUM',
-            'penalty': 'HIGH',
-            'fine': 'HIGH',
-            'liability': 'MEDIUM',
-            'damages': 'HIGH',
-            'breach': 'MEDIUM',
-            'default': 'HIGH'
-        }
-        
-        sentences = text.split('.')
-        
-        for i, sentence in enumerate(sentences[:10]):
-            sentence = sentence.strip()
-            if len(sentence) < 20:
-                continue
-                
-            found_keywords = []
-            for keyword, level in risk_keywords.items():
-                if keyword.lower() in sentence.lower():
-                    found_keywords.append((keyword, level))
-            
-            if found_keywords:
-                max_risk_level = 'LOW'
-                for _, level in found_keywords:
-                    if level == 'HIGH':
-                        max_risk_level = 'HIGH'
-                        break
-                    elif level == 'MEDIUM' and max_risk_level == 'LOW':
-                        max_risk_level = 'MEDIUM'
-                
-                explanation_map = {
-                    'HIGH': 'Выявлены критические условия, требующие особого внимания',
-                    'MEDIUM': 'Обнаружены потенциальные риски, рекомендуется проверка',
-                    'LOW': 'Стандартные условия с минимальными рисками'
-                }
-                
-                risk_clauses.append({
-                    'clause_text': sentence[:200] + ('...' if len(sentence) > 200 else ''),
-                    'risk_level': max_risk_level,
-                    'explanation': explanation_map[max_risk_level]
-                })
+        risk_clauses = risk_classifier.analyze(text)["risk_clauses"]
         
         if not risk_clauses and risk_score > 0.3:
             if risk_score > 0.7:
@@ -199,7 +136,7 @@ class LightweightMLService:
             Tuple[str, float, list]: (суммаризация, риск-скор, риск-клаузы)
         """
         start_time = time.time()
-        app_logger.info(f"Начат облегченный анализ договора через API")
+        app_logger.info("Начат облегченный анализ договора через API", extra={"sample": True})
         
         api_summary = self._summarize_text(text)
         
@@ -238,7 +175,7 @@ class LightweightMLService:
 ПРИМЕЧАНИЕ: API Hugging Face временно недоступен. Выполнен базовый анализ."""
         
         processing_time = time.time() - start_time
-        app_logger.info(f"Облегченный анализ завершен за {processing_time:.2f}s, найдено {len(risk_clauses)} риск-клауз")
+        app_logger.info("Облегченный анализ завершен за %.2fs, найдено %s риск-клауз", processing_time, len(risk_clauses), extra={"sample": True})
         
         return summary, risk_score, risk_clauses
 
@@ -0,0 +1,184 @@
+"""
+Метрики Prometheus для API и ML worker.
+
+API отдаёт их на GET /metrics, worker - собственным HTTP-сервером на порту
+ML_WORKER_METRICS_PORT. Метки ограничены шаблонами маршрутов, форматами
+файлов и именами моделей, чтобы число временных рядов не росло с данными.
+
+Под gunicorn с несколькими процессами задаётся PROMETHEUS_MULTIPROC_DIR
+(до импорта prometheus_client, см. gunicorn.conf.py): значения пишутся в
+файлы каталога, а /metrics суммирует их по всем процессам.
+"""
+import os
+import time
+from typing import Dict, Optional
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, start_http_server
+from prometheus_client import multiprocess
+from prometheus_client.core import GaugeMetricFamily
+from sqlalchemy.pool import QueuePool
+from config.logging_config import app_logger
+
+WORKER_METRICS_PORT = int(os.getenv("ML_WORKER_METRICS_PORT", "9100"))
+QUEUE_DEPTH_INTERVAL = int(os.getenv("ML_QUEUE_DEPTH_INTERVAL", "15"))
+
+LONG_BUCKETS = (0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "Время обработки HTTP-запроса",
+    ["method", "route", "status"]
+)
+EXTRACTION_SECONDS = Histogram(
+    "document_extraction_duration_seconds", "Время извлечения текста из файла",
+    ["format"]
+)
+HF_REQUEST_SECONDS = Histogram(
+    "hf_request_duration_seconds", "Время запроса к Hugging Face API",
+    ["model"], buckets=LONG_BUCKETS
+)
+HF_ERRORS = Counter(
+    "hf_request_errors_total", "Ошибки запросов к Hugging Face API",
+    ["model", "reason"]
+)
+QUEUE_DEPTH = Gauge(
+    "rabbitmq_queue_messages", "Сообщений в очереди RabbitMQ",
+    ["queue"], multiprocess_mode="livemax"
+)
+QUEUE_CONSUMERS = Gauge(
+    "rabbitmq_queue_consumers", "Потребителей очереди RabbitMQ",
+    ["queue"], multiprocess_mode="livemax"
+)
+ML_WORKER_PROCESSES = Gauge(
+    "ml_worker_processes", "Процессы ML worker под супервизором",
+    ["state"], multiprocess_mode="livemax"
+)
+JOB_SECONDS = Histogram(
+    "ml_job_duration_seconds", "Время задачи от создания до завершения",
+    ["status"], buckets=LONG_BUCKETS
+)
+WALLET_OPERATION_SECONDS = Histogram(
+    "wallet_operation_duration_seconds", "Время проводки по кошельку",
+    ["operation"]
+)
+
+
+class DatabasePoolCollector:
+    """Состояние пулов соединений SQLAlchemy на момент опроса"""
+
+    def __init__(self):
+        self.engines: Dict[str, object] = {}
+
+    def collect(self):
+        family = GaugeMetricFamily("db_pool_connections", "Соединения пула БД", labels=["engine", "state"])
+        for name, engine in self.engines.items():
+            pool = engine.pool
+            if not isinstance(pool, QueuePool):
+                continue
+            family.add_metric([name, "size"], pool.size())
+            family.add_metric([name, "checked_out"], pool.checkedout())
+            family.add_metric([name, "checked_in"], pool.checkedin())
+            family.add_metric([name, "overflow"], pool.overflow())
+        yield family
+
+
+_pool_collector = DatabasePoolCollector()
+REGISTRY.register(_pool_collector)
+
+
+def register_engine(name: str, engine) -> None:
+    """Добавить пул движка в метрики db_pool_connections"""
+    _pool_collector.engines[name] = engine
+
+
+def render_metrics() -> bytes:
+    """
+    Текст метрик. В многопроцессном режиме - сумма по файлам всех процессов;
+    пулы БД при этом показаны для процесса, ответившего на запрос.
+    """
+    if not os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        return generate_latest()
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    registry.register(_pool_collector)
+    return generate_latest(registry)
+
+
+def observe_job_finished(job) -> None:
+    """Полное время задачи: от постановки в очередь до финального статуса"""
+    if job.created_at and job.finished_at:
+        JOB_SECONDS.labels(status=job.status).observe((job.finished_at - job.created_at).total_seconds())
+
+
+def update_queue_depth(channel, queue_name: str) -> Optional[int]:
+    """Глубина очереди через пассивное объявление (очередь не создаётся)"""
+    try:
+        method = channel.queue_declare(queue=queue_name, passive=True).method
+    except Exception as e:
+        app_logger.warning(f"Не удалось получить глубину очереди {queue_name}: {e}")
+        return None
+    QUEUE_DEPTH.labels(queue=queue_name).set(method.message_count)
+    QUEUE_CONSUMERS.labels(queue=queue_name).set(method.consumer_count)
+    return method.message_count
+
+
+def reset_supervisor_metrics() -> None:
+    """
+    Сбросить gauges супервизора в worker, порождённом через fork: иначе его
+    порт метрик отдаёт значения, унаследованные в момент fork. Глубину очереди
+    worker затем обновляет сам (update_queue_depth).
+    """
+    for gauge in (ML_WORKER_PROCESSES, QUEUE_DEPTH, QUEUE_CONSUMERS):
+        gauge.clear()
+
+
+def start_worker_metrics_server(port: int = WORKER_METRICS_PORT) -> bool:
+    """HTTP-сервер метрик worker; порт 0 отключает экспорт"""
+    if not port:
+        return False
+    try:
+        start_http_server(port)
+    except OSError as e:
+        app_logger.warning(f"Сервер метрик на порту {port} не запущен: {e}")
+        return False
+    app_logger.info(f"Метрики worker доступны на порту {port}")
+    return True
+
+
+class PrometheusMiddleware:
+    """
+    ASGI-middleware: гистограмма времени ответа по методу, шаблону маршрута
+    и статусу. Время считается до первого байта ответа, поэтому длинные
+    потоки (SSE) не искажают распределение.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        observed = False
+
+        async def send_and_observe(message):
+            nonlocal observed
+            if message["type"] == "http.response.start" and not observed:
+                observed = True
+                route = scope.get("route")
+                HTTP_REQUEST_SECONDS.labels(
+                    method=scope["method"],
+                    route=getattr(route, "path", "unmatched"),
+                    status=str(message["status"])
+                ).observe(time.perf_counter() - started)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_and_observe)
+        except Exception:
+            if not observed:
+                route = scope.get("route")
+                HTTP_REQUEST_SECONDS.labels(
+                    method=scope["method"], route=getattr(route, "path", "unmatched"), status="500"
+                ).observe(time.perf_counter() - started)
+            raise
@@ -0,0 +1,144 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, List, Optional
+from config.logging_config import prediction_logger
+from services.inference_backend import InferenceBackend
+from services.tracing import start_span
+
+
+class MicroBatcher(InferenceBackend):
+    """
+    Собирает запросы саммаризации от параллельных задач воркера в пачки.
+
+    Первый запрос открывает окно ожидания max_wait_ms; пачка уходит в бэкенд
+    одним вызовом summarize_batch, как только окно закрылось или набралось
+    max_batch_size текстов. Результаты раздаются обратно через Future.
+    """
+
+    def __init__(self, backend: InferenceBackend, max_batch_size: int = 8, max_wait_ms: float = 50,
+                 result_timeout: float = 300):
+        self.backend = backend
+        self.name = backend.name
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000.0
+        self.result_timeout = result_timeout
+        self._queue: "queue.Queue" = queue.Queue()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"micro-batcher-{self.name}", daemon=True)
+        self._thread.start()
+
+    def submit(self, text: str) -> Future:
+        """Поставить текст в очередь на саммаризацию"""
+        if self._stopped.is_set():
+            raise RuntimeError("MicroBatcher is stopped")
+        future: Future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def summarize_batch(self, texts: List[str]) -> List[Optional[str]]:
+        with start_span("micro_batch.wait", backend=self.name, texts=len(texts)):
+            futures = [self.submit(text) for text in texts]
+            deadline = time.monotonic() + self.result_timeout
+            return [future.result(timeout=max(0.0, deadline - time.monotonic())) for future in futures]
+
+    def _collect(self) -> list:
+        """Собрать одну пачку: ждём первый запрос, затем добираем до лимита или таймаута"""
+        first = self._queue.get()
+        if first is None:
+            return []
+
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                self._stopped.set()
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if not batch:
+                break
+
+            texts = [text for text, _ in batch]
+            try:
+                summaries = self.backend.summarize_batch(texts)
+                for (_, future), summary in zip(batch, summaries):
+                    future.set_result(summary)
+                if len(summaries) != len(batch):
+                    error = RuntimeError(
+                        f"Backend {self.name} returned {len(summaries)} summaries for {len(batch)} texts"
+                    )
+                    prediction_logger.error("%s", error)
+                    for _, future in batch[len(summaries):]:
+                        future.set_exception(error)
+                prediction_logger.info("Пачка из %s текстов обработана бэкендом %s", len(batch), self.name, extra={"sample": True})
+            except Exception as e:
+                prediction_logger.error("Ошибка пакетной саммаризации (%s текстов): %s", len(batch), e)
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+            if self._stopped.is_set():
+                break
+
+    def stop(self):
+        """Останавливает поток после обработки уже поставленных запросов"""
+        if not self._stopped.is_set():
+            self._queue.put(None)
+            self._thread.join(timeout=5)
+            self._stopped.set()
+
+
+_batchers: Dict[int, MicroBatcher] = {}
+_batchers_lock = threading.Lock()
+
+
+def get_micro_batcher(backend: InferenceBackend) -> MicroBatcher:
+    """Возвращает общий для процесса батчер поверх бэкенда"""
+    batcher = _batchers.get(id(backend))
+    if batcher is not None:
+        return batcher
+
+    with _batchers_lock:
+        batcher = _batchers.get(id(backend))
+        if batcher is None:
+            batcher = MicroBatcher(
+                backend,
+                max_batch_size=int(os.getenv("SUMMARY_BATCH_MAX_SIZE", "8")),
+                max_wait_ms=float(os.getenv("SUMMARY_BATCH_MAX_WAIT_MS", "50")),
+                result_timeout=float(os.getenv("SUMMARY_BATCH_TIMEOUT", "300"))
+            )
+            _batchers[id(backend)] = batcher
+    return batcher
+
+
+def stop_micro_batchers():
+    """Останавливает все батчеры процесса"""
+    with _batchers_lock:
+        for batcher in _batchers.values():
+            batcher.stop()
+        _batchers.clear()
+
+
+def _reset_after_fork():
+    """Потоки батчеров остались в родителе: дочерний процесс создаст свои"""
+    global _batchers_lock
+    _batchers.clear()
+    _batchers_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
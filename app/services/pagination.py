@@ -0,0 +1,59 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+from sqlalchemy import tuple_
+
+
+def encode_cursor(timestamp: datetime, row_id: int) -> str:
+    """Непрозрачный курсор на позицию (timestamp, id)"""
+    raw = json.dumps([timestamp.isoformat(), row_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Разбор курсора; ValueError для некорректного значения"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        timestamp, row_id = json.loads(raw)
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except (TypeError, ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def paginate(statement, timestamp_column, id_column, limit: int, cursor: Optional[str] = None, skip: int = 0):
+    """
+    Сортировка по (timestamp, id) от новых к старым и выбор страницы.
+
+    С курсором страница начинается сразу после него (keyset - без OFFSET,
+    по составному индексу); без курсора работает прежний OFFSET. Отдельное
+    условие timestamp <= курсора дублирует сравнение кортежей, чтобы
+    PostgreSQL отсекал более новые месячные секции.
+    """
+    statement = statement.order_by(timestamp_column.desc(), id_column.desc())
+    if cursor:
+        timestamp, row_id = decode_cursor(cursor)
+        statement = statement.where(
+            timestamp_column <= timestamp,
+            tuple_(timestamp_column, id_column) < tuple_(timestamp, row_id)
+        )
+    elif skip:
+        statement = statement.offset(skip)
+    return statement.limit(limit)
+
+
+def filter_period(statement, timestamp_column, since: Optional[datetime] = None, until: Optional[datetime] = None):
+    """Ограничение периода [since, until) по ключу секционирования - запрос читает только нужные секции"""
+    if since is not None:
+        statement = statement.where(timestamp_column >= since)
+    if until is not None:
+        statement = statement.where(timestamp_column < until)
+    return statement
+
+
+def next_cursor(items: List[Any], limit: int, timestamp_attr: str) -> Optional[str]:
+    """Курсор следующей страницы или None, если страница неполная"""
+    if not items or len(items) < limit:
+        return None
+    last = items[-1]
+    return encode_cursor(getattr(last, timestamp_attr), last.id)
@@ -7,6 +7,7 @@ from services.crud import wallet as WalletService
 from services.crud import mljob as MLJobService
 from services.crud import model as ModelService
 from services.rabbitmq_config import get_ml_publisher
+from services.document_versioning import diff_clauses
 
 class MockMLService:
     """Сервис имитации ML предсказаний"""
@@ -66,20 +67,30 @@ def process_prediction_request(
     language: str = "UNKNOWN",
     model_name: str = "default_model",
     summary_depth: str = "BULLET",
-    session=None
+    session=None,
+    previous_document_id: int = None,
+    extraction_ms: float = None
 ) -> Dict[str, Any]:
     """Обработка запроса на предсказание - бизнес-логика уровня приложения"""
     
     from models.document import Document
     token_count = Document.count_tokens(document_text)
     
+    parent = None
+    if previous_document_id is not None:
+        parent = DocumentService.get_document_by_id(previous_document_id, session)
+        if not parent or parent.user_id != user_id:
+            raise ValueError(f"Previous document {previous_document_id} not found")
+    
     document = DocumentService.create_document(
         user_id=user_id,
-        filename=filename or f"document_{uuid.uuid4().hex[:8]}.txt",
+        filename=filename or (parent.filename if parent else f"document_{uuid.uuid4().hex[:8]}.txt"),
         raw_text=document_text,
         token_count=token_count,
         session=session,
-        language=language
+        language=language,
+        parent_id=parent.id if parent else None,
+        version=parent.version + 1 if parent else 1
     )
     
     model = ModelService.get_model_by_name(model_name, session)
@@ -91,7 +102,14 @@ def process_prediction_request(
             active=True
         )
     
-    cost = Decimal(str(token_count * model.price_per_token))
+    previous_job, diff = None, None
+    if parent:
+        previous_job = MLJobService.get_latest_done_job(parent.id, session)
+        if previous_job:
+            diff = diff_clauses(parent.raw_text, document_text)
+    
+    billed_tokens = diff.changed_token_count() if diff else token_count
+    cost = Decimal(str(billed_tokens * model.price_per_token))
     
     wallet = WalletService.get_or_create_wallet(user_id, session)
     if wallet.balance < cost:
@@ -101,7 +119,9 @@ def process_prediction_request(
         document_id=document.id,
         model_id=model.id,
         session=session,
-        summary_depth=summary_depth
+        summary_depth=summary_depth,
+        previous_job_id=previous_job.id if previous_job else None,
+        billed_tokens=billed_tokens if previous_job else None
     )
     
     publisher = get_ml_publisher()
@@ -109,7 +129,9 @@ def process_prediction_request(
         job_id=job.id,
         document_id=document.id,
         model_id=model.id,
-        summary_depth=summary_depth
+        summary_depth=summary_depth,
+        extraction_ms=extraction_ms,
+        previous_job_id=job.previous_job_id
     )
     
     if not task_sent:
@@ -126,5 +148,8 @@ def process_prediction_request(
         "status": "queued",
         "message": "Задача отправлена на обработку",
         "cost": float(cost),
-        "tokens_processed": token_count
+        "tokens_processed": billed_tokens,
+        "version": document.version,
+        "changed_clauses": len(diff.changed) if diff else None,
+        "unchanged_clauses": diff.unchanged if diff else None
     }
\ No newline at end of file
@@ -0,0 +1,206 @@
+"""
+Профилирование горячего пути ML worker, по умолчанию выключено.
+
+Режимы (WORKER_PROFILE_MODE):
+    sample   - сэмплирующий профайлер потока задачи; пишет свёрнутые стеки
+               (.folded) для flamegraph.pl / speedscope;
+    cprofile - детерминированный cProfile; пишет .prof для snakeviz / flameprof.
+
+Профилируется каждая WORKER_PROFILE_EVERY-я задача своего типа - полный
+анализ (full) или анализ изменений версии (incremental); 0 - только
+по сигналу. SIGUSR1 - профилировать следующую задачу, SIGUSR2 - снимок
+tracemalloc с разницей относительно предыдущего. WORKER_TRACEMALLOC=1
+включает трассировку памяти с запуска и снимок каждые
+WORKER_TRACEMALLOC_EVERY задач.
+"""
+import cProfile
+import os
+import signal
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterator, Optional
+from config.logging_config import app_logger
+
+PROFILE_MODE = os.getenv("WORKER_PROFILE_MODE", "sample")
+PROFILE_EVERY = int(os.getenv("WORKER_PROFILE_EVERY", "0"))
+PROFILE_DIR = os.getenv("WORKER_PROFILE_DIR", "logs/profiles")
+SAMPLE_INTERVAL = float(os.getenv("WORKER_PROFILE_INTERVAL_MS", "5")) / 1000
+TRACEMALLOC_ENABLED = os.getenv("WORKER_TRACEMALLOC", "0") == "1"
+TRACEMALLOC_EVERY = int(os.getenv("WORKER_TRACEMALLOC_EVERY", "500"))
+TRACEMALLOC_FRAMES = 25
+TRACEMALLOC_TOP = 30
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def folded_stack(frame) -> str:
+    """Стек кадра в свёрнутом формате flamegraph: корень;...;лист"""
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+class StackSampler:
+    """Периодически снимает стек одного потока из отдельного потока"""
+
+    def __init__(self, thread_id: int, interval: float = SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[folded_stack(frame)] += 1
+
+    def start(self) -> "StackSampler":
+        self._thread.start()
+        return self
+
+    def stop(self) -> Counter:
+        self._stopped.set()
+        self._thread.join()
+        return self.stacks
+
+
+class JobProfiler:
+    """Выбор задач для профилирования и запись результатов по типам задач"""
+
+    def __init__(self, mode: str = PROFILE_MODE, every: int = PROFILE_EVERY, output_dir: str = PROFILE_DIR,
+                 tracemalloc_every: int = TRACEMALLOC_EVERY):
+        self.mode = mode
+        self.every = every
+        self.output_dir = output_dir
+        self.tracemalloc_every = tracemalloc_every
+        self._counts: Dict[str, int] = {}
+        self._jobs_since_snapshot = 0
+        self._requested = threading.Event()
+        self._previous_snapshot: Optional[tracemalloc.Snapshot] = None
+        self._lock = threading.Lock()
+
+    def request_profile(self) -> None:
+        """Профилировать следующую задачу независимо от счётчика"""
+        self._requested.set()
+
+    def should_profile(self, job_type: str) -> bool:
+        with self._lock:
+            count = self._counts[job_type] = self._counts.get(job_type, 0) + 1
+        if self._requested.is_set():
+            self._requested.clear()
+            return True
+        return bool(self.every) and count % self.every == 0
+
+    def _path(self, job_type: str, name: str) -> str:
+        directory = os.path.join(self.output_dir, job_type)
+        os.makedirs(directory, exist_ok=True)
+        return os.path.join(directory, f"{datetime.now():%Y%m%d_%H%M%S_%f}_{name}")
+
+    @contextmanager
+    def profile(self, job_type: str, job_id: int) -> Iterator[Optional[str]]:
+        """Профилировать блок, если задача попала в выборку; yield - путь к результату или None"""
+        self._after_job()
+        if not self.should_profile(job_type):
+            yield None
+            return
+
+        started = time.perf_counter()
+        if self.mode == "cprofile":
+            path = self._path(job_type, f"job{job_id}.prof")
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                yield path
+            finally:
+                profiler.disable()
+                profiler.dump_stats(path)
+        else:
+            path = self._path(job_type, f"job{job_id}.folded")
+            sampler = StackSampler(threading.get_ident()).start()
+            try:
+                yield path
+            finally:
+                stacks = sampler.stop()
+                with open(path, "w", encoding="utf-8") as f:
+                    for stack, count in stacks.most_common():
+                        f.write(f"{stack} {count}\n")
+        app_logger.info(f"Профиль задачи {job_id} ({job_type}, {time.perf_counter() - started:.2f}s): {path}")
+
+    def _after_job(self) -> None:
+        """Периодический снимок памяти в режиме tracemalloc"""
+        if not tracemalloc.is_tracing() or not self.tracemalloc_every:
+            return
+        with self._lock:
+            self._jobs_since_snapshot += 1
+            due = self._jobs_since_snapshot >= self.tracemalloc_every
+            if due:
+                self._jobs_since_snapshot = 0
+        if due:
+            self.dump_memory_snapshot()
+
+    def start_tracemalloc(self) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+            app_logger.info("tracemalloc включён")
+
+    def dump_memory_snapshot(self) -> Optional[str]:
+        """
+        Снимок tracemalloc и текстовый отчёт: крупнейшие места выделения и
+        прирост относительно предыдущего снимка. Первый вызов без
+        трассировки только включает её.
+        """
+        if not tracemalloc.is_tracing():
+            self.start_tracemalloc()
+            return None
+
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        path = self._path("memory", "snapshot.txt")
+        snapshot.dump(path.replace(".txt", ".tracemalloc"))
+        current, peak = tracemalloc.get_traced_memory()
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f"traced: {current / 2**20:.1f} MiB, peak: {peak / 2**20:.1f} MiB\n\nTop allocations:\n")
+            for stat in snapshot.statistics("lineno")[:TRACEMALLOC_TOP]:
+                f.write(f"{stat}\n")
+            if self._previous_snapshot is not None:
+                f.write("\nGrowth since previous snapshot:\n")
+                for stat in snapshot.compare_to(self._previous_snapshot, "lineno")[:TRACEMALLOC_TOP]:
+                    f.write(f"{stat}\n")
+        self._previous_snapshot = snapshot
+        app_logger.info(f"Снимок памяти worker: {path}")
+        return path
+
+
+def install_signal_handlers(profiler: JobProfiler) -> None:
+    """SIGUSR1 - профиль следующей задачи, SIGUSR2 - снимок памяти (только главный поток, POSIX)"""
+    if not hasattr(signal, "SIGUSR1"):
+        return
+    signal.signal(signal.SIGUSR1, lambda signum, frame: profiler.request_profile())
+    signal.signal(signal.SIGUSR2, lambda signum, frame: profiler.dump_memory_snapshot())
+
+
+_profiler: Optional[JobProfiler] = None
+
+
+def get_job_profiler() -> JobProfiler:
+    """Возвращает singleton профайлера задач"""
+    global _profiler
+    if _profiler is None:
+        _profiler = JobProfiler()
+        if TRACEMALLOC_ENABLED:
+            _profiler.start_tracemalloc()
+    return _profiler
@@ -4,6 +4,7 @@ import os
 from datetime import datetime
 from typing import Optional
 from config.logging_config import app_logger
+from services.tracing import inject, start_span
 
 
 class RabbitMQConfig:
@@ -19,6 +20,7 @@ class RabbitMQConfig:
         self.ml_queue_name = 'ml_tasks_queue'
         self.exchange_name = 'ml_exchange'
         self.routing_key = 'ml.task'
+        self.events_exchange_name = 'ml_job_events'
 
     def get_connection(self) -> pika.BlockingConnection:
         """Создает подключение к RabbitMQ"""
@@ -57,6 +59,15 @@ class RabbitMQConfig:
         app_logger.info(f"RabbitMQ настроен: exchange={self.exchange_name}, queue={self.ml_queue_name}")
         return channel
 
+    def setup_events_exchange(self, channel):
+        """Объявляет fanout-exchange событий статуса задач"""
+        channel.exchange_declare(
+            exchange=self.events_exchange_name,
+            exchange_type='fanout',
+            durable=True
+        )
+        return channel
+
 
 class MLTaskPublisher:
     """Publisher для отправки ML задач в RabbitMQ"""
@@ -76,7 +87,8 @@ class MLTaskPublisher:
             app_logger.error(f"Ошибка подключения Publisher к RabbitMQ: {e}")
             raise
     
-    def publish_ml_task(self, job_id: int, document_id: int, model_id: int, summary_depth: str = "BULLET"):
+    def publish_ml_task(self, job_id: int, document_id: int, model_id: int, summary_depth: str = "BULLET",
+                        extraction_ms: Optional[float] = None, previous_job_id: Optional[int] = None):
         """Отправляет ML задачу в очередь"""
         if not self.channel:
             self.connect()
@@ -86,19 +98,23 @@ class MLTaskPublisher:
             "document_id": document_id,
             "model_id": model_id,
             "summary_depth": summary_depth,
-            "timestamp": str(datetime.now())
+            "timestamp": str(datetime.now()),
+            "extraction_ms": extraction_ms,
+            "previous_job_id": previous_job_id
         }
         
         try:
-            self.channel.basic_publish(
-                exchange=self.config.exchange_name,
-                routing_key=self.config.routing_key,
-                body=json.dumps(task_data),
-                properties=pika.BasicProperties(
-                    delivery_mode=2, 
-                    content_type='application/json'
+            with start_span("rabbitmq.publish", kind="PRODUCER", job_id=job_id, queue=self.config.ml_queue_name):
+                self.channel.basic_publish(
+                    exchange=self.config.exchange_name,
+                    routing_key=self.config.routing_key,
+                    body=json.dumps(task_data),
+                    properties=pika.BasicProperties(
+                        delivery_mode=2, 
+                        content_type='application/json',
+                        headers=inject()
+                    )
                 )
-            )
             app_logger.info(f"ML задача отправлена в очередь: job_id={job_id}")
             return True
         except Exception as e:
@@ -120,4 +136,14 @@ def get_ml_publisher() -> MLTaskPublisher:
     if _publisher is None:
         config = RabbitMQConfig()
         _publisher = MLTaskPublisher(config)
-    return _publisher
\ No newline at end of file
+    return _publisher
+
+
+def _reset_after_fork():
+    """Соединение pika нельзя делить между процессами: дочерний откроет своё"""
+    global _publisher
+    _publisher = None
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
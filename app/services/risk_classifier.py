@@ -0,0 +1,263 @@
+import hashlib
+import os
+import re
+import threading
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from config.logging_config import prediction_logger
+from services.job_timing import stage
+
+
+CLAUSE_SPLIT_RE = re.compile(r'(?<=[.!?;])\s+|\n+|\s+(?=\d{1,2}\.\d{1,2}\.?\s)')
+WORD_RE = re.compile(r'[а-яёa-z]+', re.UNICODE)
+# Отпечаток пункта различает числа: "штраф 0,1%" и "штраф 50%" - разные пункты
+FINGERPRINT_TOKEN_RE = re.compile(r'[а-яёa-z0-9]+', re.UNICODE)
+RISK_CLAUSE_KEYS = ("clause_text", "clause_hash", "risk_level", "explanation", "category", "categories")
+
+
+@dataclass(frozen=True)
+class RiskCategory:
+    """Категория риска с затравочными терминами для центроида"""
+    code: str
+    title: str
+    weight: float
+    seeds: Tuple[str, ...]
+
+    @property
+    def risk_level(self) -> str:
+        return "HIGH" if self.weight > 0.7 else "MEDIUM" if self.weight > 0.4 else "LOW"
+
+
+RISK_CATEGORIES: Tuple[RiskCategory, ...] = (
+    RiskCategory("PENALTY", "неустойка и штрафы", 0.9,
+                 ("неустойка", "штраф", "штрафные", "пеня", "пени", "penalty", "fine", "forfeit")),
+    RiskCategory("TERMINATION", "расторжение договора", 0.9,
+                 ("расторжение", "расторгнуть", "односторонний", "одностороннем", "termination")),
+    RiskCategory("DAMAGES", "возмещение ущерба", 0.8,
+                 ("ущерб", "убытки", "убытков", "возмещение", "возместить", "damages")),
+    RiskCategory("SANCTIONS", "санкции", 0.8,
+                 ("санкции", "sanction")),
+    RiskCategory("BREACH", "нарушение обязательств", 0.7,
+                 ("нарушение", "нарушить", "breach", "default")),
+    RiskCategory("DELAY", "просрочка исполнения", 0.6,
+                 ("просрочка", "просрочить")),
+    RiskCategory("LIABILITY", "ответственность сторон", 0.6,
+                 ("ответственность", "liability")),
+    RiskCategory("DISPUTE", "судебные споры", 0.6,
+                 ("суд", "суда", "судом", "судебный", "арбитраж", "арбитражный", "иск")),
+    RiskCategory("OBLIGATION", "обязательства", 0.5,
+                 ("обязательство", "обязательства")),
+    RiskCategory("GUARANTEE", "гарантии", 0.4,
+                 ("гарантия", "гарантирует", "поручительство")),
+    RiskCategory("FORCE_MAJEURE", "форс-мажор", 0.3,
+                 ("форс-мажор", "непреодолимой")),
+)
+
+
+def segment_clauses(text: str, min_length: int = 20) -> List[str]:
+    """Разбиение текста договора на пункты/предложения"""
+    clauses = []
+    for part in CLAUSE_SPLIT_RE.split(text):
+        part = part.strip(" .;\t")
+        if len(part) >= min_length:
+            clauses.append(part)
+    return clauses
+
+
+def clause_hash(clause: str) -> str:
+    """Хэш нормализованного текста пункта: регистр и пунктуация не важны, слова и числа - важны"""
+    normalized = " ".join(FINGERPRINT_TOKEN_RE.findall(clause.lower()))
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+class HashingEmbedder:
+    """
+    Разреженные бинарные векторы основ слов (hashing trick), не семантические
+    эмбеддинги: близость векторов означает общие основы, а не общий смысл.
+
+    Основа - префикс слова (6 символов для длинных слов, 5 для средних,
+    4-буквенные без окончания), что покрывает падежные формы без
+    морфологического словаря.
+    """
+
+    def __init__(self, dim: int = 4096):
+        self.dim = dim
+
+    @staticmethod
+    def stems(text: str) -> List[str]:
+        stems = []
+        for word in WORD_RE.findall(text.lower()):
+            if len(word) >= 7:
+                stems.append(word[:6])
+            elif len(word) >= 5:
+                stems.append(word[:5])
+            elif len(word) == 4:
+                stems.append(word[:3])
+            elif len(word) == 3:
+                stems.append(word)
+        return stems
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        rows, cols = [], []
+        for i, text in enumerate(texts):
+            for stem in set(self.stems(text)):
+                rows.append(i)
+                cols.append(zlib.crc32(stem.encode("utf-8")) % self.dim)
+
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        matrix[rows, cols] = 1.0
+        return matrix
+
+
+class RiskClauseClassifier:
+    """
+    Векторизованный поиск рисковых пунктов договора по словарю категорий.
+
+    С HashingEmbedder это сопоставление с лексиконом: оценка пункта по
+    категории - число общих с её затравками основ, и при min_score=1.0
+    пункт попадает в категорию по одному совпавшему термину. Перефразировки
+    без затравочных слов не распознаются. Все пункты векторизуются пачкой,
+    оценки по всем категориям получаются одним умножением на матрицу
+    центроидов; векторы кэшируются по хэшу пункта. Семантическую модель
+    можно подставить через embedder с тем же методом embed(texts).
+    """
+
+    def __init__(self, embedder=None, categories: Tuple[RiskCategory, ...] = RISK_CATEGORIES,
+                 min_score: float = 1.0, cache_size: int = 50000):
+        self.embedder = embedder or HashingEmbedder()
+        self.categories = categories
+        self.min_score = min_score
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, Tuple[np.ndarray, np.ndarray]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.weights = np.array([category.weight for category in categories], dtype=np.float32)
+        self.centroids = self._build_centroids()
+
+    def _build_centroids(self) -> np.ndarray:
+        """Центроид категории - объединение признаков затравок (сумма, обрезанная до 1)"""
+        centroids = []
+        for category in self.categories:
+            seed_matrix = self.embedder.embed(list(category.seeds))
+            centroids.append(np.minimum(seed_matrix.sum(axis=0), 1.0))
+        return np.vstack(centroids).astype(np.float32)
+
+    def embed_clauses(self, clauses: List[str]) -> np.ndarray:
+        """Эмбеддинги пунктов с кэшем по хэшу текста (в кэше - ненулевые координаты)"""
+        hashes = [clause_hash(clause) for clause in clauses]
+        matrix = np.zeros((len(clauses), self.centroids.shape[1]), dtype=np.float32)
+
+        missing = []
+        with self._cache_lock:
+            for i, key in enumerate(hashes):
+                cached = self._cache.get(key)
+                if cached is None:
+                    missing.append(i)
+                else:
+                    self._cache.move_to_end(key)
+                    indices, values = cached
+                    matrix[i, indices] = values
+
+        if missing:
+            embedded = self.embedder.embed([clauses[i] for i in missing])
+            matrix[missing] = embedded
+            with self._cache_lock:
+                for i, vector in zip(missing, embedded):
+                    indices = np.flatnonzero(vector)
+                    self._cache[hashes[i]] = (indices, vector[indices])
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        return matrix
+
+    def score(self, clauses: List[str]) -> np.ndarray:
+        """Матрица оценок пункт x категория"""
+        if not clauses:
+            return np.zeros((0, len(self.categories)), dtype=np.float32)
+        return self.embed_clauses(clauses) @ self.centroids.T
+
+    def classify_clauses(self, clauses: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """Результат по каждому пункту: None или словарь RiskClause"""
+        return self._clause_results(clauses, self.score(clauses))
+
+    def _clause_results(self, clauses: List[str], scores: np.ndarray) -> List[Optional[Dict[str, Any]]]:
+        hits = scores >= self.min_score
+        weighted = np.where(hits, self.weights, 0.0)
+        best = weighted.argmax(axis=1) if len(clauses) else np.array([], dtype=int)
+
+        results: List[Optional[Dict[str, Any]]] = []
+        for i, clause in enumerate(clauses):
+            if not hits[i].any():
+                results.append(None)
+                continue
+            category = self.categories[best[i]]
+            results.append({
+                "clause_text": clause[:200],
+                "clause_hash": clause_hash(clause),
+                "risk_level": category.risk_level,
+                "explanation": f"Категория риска: {category.title} (вес риска: {category.weight})",
+                "category": category.code,
+                "categories": [self.categories[j].code for j in np.flatnonzero(hits[i])],
+                "weight": category.weight
+            })
+        return results
+
+    def analyze(self, text: str, max_clauses: int = 8, clause_index=None) -> Dict[str, Any]:
+        """
+        Анализ текста: интегральный риск-скор и рисковые пункты.
+
+        Если передан clause_index, ранее встречавшиеся пункты берутся из
+        индекса, а классификатор вызывается только для новых.
+        """
+        with stage("risk_scan"):
+            clauses = segment_clauses(text)
+            if clause_index is not None:
+                results = clause_index.classify(clauses, self.classify_clauses)
+            else:
+                results = self.classify_clauses(clauses)
+
+        found = [result for result in results if result]
+        present = {code for result in found for code in result["categories"]}
+        categories = [category.code for category in self.categories if category.code in present]
+        found.sort(key=lambda result: result["weight"], reverse=True)
+
+        prediction_logger.info("Классификатор рисков: %s пунктов, рисковых %s", len(clauses), len(found), extra={"sample": True})
+
+        return {
+            "risk_score": self.score_categories(categories),
+            "risk_clauses": [
+                {key: result[key] for key in RISK_CLAUSE_KEYS}
+                for result in found[:max_clauses]
+            ],
+            "categories": categories
+        }
+
+    def score_categories(self, codes) -> float:
+        """Интегральный риск-скор по набору сработавших категорий"""
+        present = set(codes)
+        total_weight = sum(category.weight for category in self.categories if category.code in present)
+        return min(1.0, total_weight / 6.0)
+
+    def category(self, code: str) -> Optional[RiskCategory]:
+        for category in self.categories:
+            if category.code == code:
+                return category
+        return None
+
+    def category_titles(self, codes: List[str]) -> List[str]:
+        titles = {category.code: category.title for category in self.categories}
+        return [titles[code] for code in codes if code in titles]
+
+
+risk_classifier = RiskClauseClassifier()
+
+
+def _reset_after_fork():
+    """Центроиды и кэш эмбеддингов наследуются копированием при записи, блокировка - новая"""
+    risk_classifier._cache_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
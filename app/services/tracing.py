@@ -0,0 +1,379 @@
+"""
+Сквозная трассировка: от загрузки договора до записи результата воркером.
+
+Спаны в духе OpenTelemetry: контекст передаётся в формате W3C traceparent
+(HTTP-заголовок и заголовки сообщений RabbitMQ), завершённые спаны уходят
+в фоновый поток экспорта - в JSONL-файл или в локальный OTLP/HTTP
+коллектор. Дочерние спаны создаются только внутри уже начатой трассы,
+корневые - у входов: HTTP-запрос и обработка сообщения воркером.
+
+TRACING_EXPORTER: none (по умолчанию) | file | otlp. Файловый экспорт пишет
+каждый спан всех процессов в один TRACE_FILE и предназначен для локальной
+отладки; файл ротируется по размеру TRACE_FILE_MAX_BYTES.
+"""
+import json
+import os
+import queue
+import re
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional
+import requests
+from sqlalchemy import event
+from sqlalchemy.orm import Session as OrmSession
+from config.logging_config import app_logger
+
+TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "none")
+TRACE_FILE = os.getenv("TRACE_FILE", "logs/traces.jsonl")
+TRACE_FILE_MAX_BYTES = int(os.getenv("TRACE_FILE_MAX_BYTES", str(50 * 1024 * 1024)))
+OTLP_ENDPOINT = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", "http://localhost:4318")
+SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "contract-api")
+EXPORT_BATCH_SIZE = 512
+EXPORT_INTERVAL = 2.0
+
+TRACEPARENT = "traceparent"
+_TRACEPARENT_RE = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+
+
+@dataclass
+class SpanContext:
+    trace_id: str
+    span_id: str
+
+
+@dataclass
+class Span:
+    name: str
+    context: SpanContext
+    parent_id: Optional[str] = None
+    kind: str = "INTERNAL"
+    start_ns: int = field(default_factory=time.time_ns)
+    end_ns: Optional[int] = None
+    attributes: Dict[str, object] = field(default_factory=dict)
+    status: str = "OK"
+    error: Optional[str] = None
+
+    def set_attribute(self, key: str, value) -> None:
+        self.attributes[key] = value
+
+    def set_error(self, error) -> None:
+        self.status = "ERROR"
+        self.error = str(error)
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+    def to_dict(self) -> dict:
+        return {
+            "service": SERVICE_NAME,
+            "trace_id": self.context.trace_id,
+            "span_id": self.context.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": round(self.duration_ms, 3),
+            "attributes": self.attributes,
+            "status": self.status,
+            "error": self.error,
+        }
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def set_service_name(name: str) -> None:
+    """Имя сервиса в экспортируемых спанах (API или воркер)"""
+    global SERVICE_NAME
+    SERVICE_NAME = name
+
+
+class FileSpanExporter:
+    """Спаны построчно в JSONL-файл; при превышении max_bytes файл уходит в .1"""
+
+    def __init__(self, path: str = TRACE_FILE, max_bytes: int = TRACE_FILE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+
+    def _rotate(self) -> None:
+        try:
+            if os.path.getsize(self.path) >= self.max_bytes:
+                os.replace(self.path, self.path + ".1")
+        except FileNotFoundError:
+            # файл ещё не создан или его уже ротировал другой процесс
+            pass
+
+    def export(self, spans: List[Span]) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if self.max_bytes:
+            self._rotate()
+        with open(self.path, "a", encoding="utf-8") as f:
+            for span in spans:
+                f.write(json.dumps(span.to_dict(), ensure_ascii=False, default=str) + "\n")
+
+
+class OTLPHttpSpanExporter:
+    """Отправка в OpenTelemetry Collector по OTLP/HTTP (JSON)"""
+
+    KINDS = {"INTERNAL": 1, "SERVER": 2, "CLIENT": 3, "PRODUCER": 4, "CONSUMER": 5}
+
+    def __init__(self, endpoint: str = OTLP_ENDPOINT):
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+
+    def _span(self, span: Span) -> dict:
+        return {
+            "traceId": span.context.trace_id,
+            "spanId": span.context.span_id,
+            "parentSpanId": span.parent_id or "",
+            "name": span.name,
+            "kind": self.KINDS.get(span.kind, 1),
+            "startTimeUnixNano": str(span.start_ns),
+            "endTimeUnixNano": str(span.end_ns),
+            "attributes": [{"key": k, "value": {"stringValue": str(v)}} for k, v in span.attributes.items()],
+            "status": {"code": 2, "message": span.error} if span.status == "ERROR" else {"code": 1},
+        }
+
+    def export(self, spans: List[Span]) -> None:
+        payload = {"resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+            "scopeSpans": [{"scope": {"name": "contract_check"}, "spans": [self._span(s) for s in spans]}],
+        }]}
+        requests.post(self.url, json=payload, timeout=5)
+
+
+class InMemorySpanExporter:
+    """Накопление спанов в памяти (для тестов)"""
+
+    def __init__(self):
+        self.spans: List[Span] = []
+
+    def export(self, spans: List[Span]) -> None:
+        self.spans.extend(spans)
+
+
+class BatchSpanProcessor:
+    """
+    Фоновый экспорт пачками: завершение спана - только put_nowait в очередь,
+    при переполнении спан отбрасывается, запрос не ждёт экспортёр.
+    """
+
+    def __init__(self, exporter, max_queue: int = 10000):
+        self.exporter = exporter
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self.dropped = 0
+        self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+        self._thread.start()
+
+    def on_end(self, span: Span) -> None:
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def force_flush(self, timeout: float = 5) -> None:
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout)
+
+    def _export(self, batch: List[Span]) -> None:
+        if not batch:
+            return
+        try:
+            self.exporter.export(batch)
+        except Exception as e:
+            app_logger.warning(f"Не удалось экспортировать {len(batch)} спанов: {e}")
+
+    def _run(self) -> None:
+        batch: List[Span] = []
+        deadline = time.monotonic() + EXPORT_INTERVAL
+        while True:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                item = None
+            if isinstance(item, Span):
+                batch.append(item)
+            if item is None or isinstance(item, threading.Event) or len(batch) >= EXPORT_BATCH_SIZE:
+                self._export(batch)
+                batch = []
+                deadline = time.monotonic() + EXPORT_INTERVAL
+                if isinstance(item, threading.Event):
+                    item.set()
+
+
+def _default_exporter():
+    if TRACING_EXPORTER == "otlp":
+        return OTLPHttpSpanExporter()
+    if TRACING_EXPORTER == "file":
+        return FileSpanExporter()
+    return None
+
+
+_processor: Optional[BatchSpanProcessor] = None
+_processor_lock = threading.Lock()
+
+
+def get_span_processor() -> Optional[BatchSpanProcessor]:
+    """Возвращает singleton процессора спанов (None, если экспорт выключен)"""
+    global _processor
+    if _processor is None:
+        exporter = _default_exporter()
+        if exporter is None:
+            return None
+        with _processor_lock:
+            if _processor is None:
+                _processor = BatchSpanProcessor(exporter)
+    return _processor
+
+
+def set_span_exporter(exporter) -> BatchSpanProcessor:
+    """Заменить экспортёр (например, на InMemorySpanExporter в тестах)"""
+    global _processor
+    with _processor_lock:
+        _processor = BatchSpanProcessor(exporter)
+    return _processor
+
+
+def _reset_after_fork():
+    """Поток экспорта не переживает fork: тот же экспортёр, новый процессор"""
+    global _processor, _processor_lock
+    _processor_lock = threading.Lock()
+    if _processor is not None:
+        _processor = BatchSpanProcessor(_processor.exporter)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _finish(span: Span) -> None:
+    span.end_ns = span.end_ns or time.time_ns()
+    processor = get_span_processor()
+    if processor:
+        processor.on_end(span)
+
+
+@contextmanager
+def start_span(name: str, kind: str = "INTERNAL", parent: Optional[SpanContext] = None,
+               root: bool = False, **attributes) -> Iterator[Optional[Span]]:
+    """
+    Открыть спан внутри текущей трассы. Без текущего спана и parent дочерний
+    спан не создаётся (yield None), а root=True начинает новую трассу.
+    """
+    current = _current_span.get()
+    parent = parent or (current.context if current else None)
+    if parent is None and not root:
+        yield None
+        return
+
+    span = Span(
+        name=name,
+        context=SpanContext(parent.trace_id if parent else secrets.token_hex(16), secrets.token_hex(8)),
+        parent_id=parent.span_id if parent else None,
+        kind=kind,
+        attributes=dict(attributes),
+    )
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.set_error(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        _finish(span)
+
+
+def record_span(name: str, start_ns: int, end_ns: Optional[int] = None, **attributes) -> Optional[Span]:
+    """Уже завершившийся участок как дочерний спан текущего"""
+    current = _current_span.get()
+    if current is None:
+        return None
+    span = Span(
+        name=name,
+        context=SpanContext(current.context.trace_id, secrets.token_hex(8)),
+        parent_id=current.context.span_id,
+        start_ns=start_ns,
+        end_ns=end_ns or time.time_ns(),
+        attributes=dict(attributes),
+    )
+    _finish(span)
+    return span
+
+
+def inject(headers: Optional[dict] = None) -> dict:
+    """Добавить traceparent текущего спана в заголовки"""
+    headers = dict(headers or {})
+    span = _current_span.get()
+    if span:
+        headers[TRACEPARENT] = f"00-{span.context.trace_id}-{span.context.span_id}-01"
+    return headers
+
+
+def extract(headers) -> Optional[SpanContext]:
+    """Контекст родителя из заголовка traceparent"""
+    value = (headers or {}).get(TRACEPARENT)
+    if isinstance(value, bytes):
+        value = value.decode("latin-1")
+    match = _TRACEPARENT_RE.match(value.strip().lower()) if value else None
+    if not match:
+        return None
+    return SpanContext(match.group(1), match.group(2))
+
+
+@event.listens_for(OrmSession, "before_commit")
+def _commit_started(session):
+    session.info["commit_started_ns"] = time.time_ns()
+
+
+@event.listens_for(OrmSession, "after_commit")
+def _commit_finished(session):
+    started = session.info.pop("commit_started_ns", None)
+    if started:
+        record_span("db.commit", started)
+
+
+class TracingMiddleware:
+    """
+    ASGI-middleware: серверный спан на запрос с продолжением входящего
+    traceparent; идентификатор трассы возвращается в заголовке ответа.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = {k.decode("latin-1"): v.decode("latin-1") for k, v in scope.get("headers", [])}
+        with start_span(f"{scope['method']} {scope['path']}", kind="SERVER", parent=extract(headers),
+                        root=True, **{"http.method": scope["method"]}) as span:
+
+            async def send_with_trace(message):
+                if message["type"] == "http.response.start":
+                    route = scope.get("route")
+                    if route is not None:
+                        span.name = f"{scope['method']} {route.path}"
+                    span.set_attribute("http.status_code", message["status"])
+                    if message["status"] >= 500:
+                        span.status = "ERROR"
+                    message = {**message, "headers": [
+                        *message.get("headers", []), (b"x-trace-id", span.context.trace_id.encode())
+                    ]}
+                await send(message)
+
+            await self.app(scope, receive, send_with_trace)
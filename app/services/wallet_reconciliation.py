@@ -0,0 +1,185 @@
+"""
+Офлайн-сверка журнала транзакций с балансами кошельков и снимками.
+
+Запуск: python -m services.wallet_reconciliation reconcile | snapshot
+"""
+import argparse
+import sys
+from dataclasses import dataclass, field
+from decimal import Decimal
+from itertools import groupby
+from typing import Iterable, Iterator, List, Optional
+from sqlmodel import Session, select
+from models.transaction import Transaction
+from models.wallet import Wallet
+from models.walletsnapshot import WalletSnapshot
+from services.crud import wallet as WalletService
+from config.logging_config import wallet_logger
+
+
+@dataclass
+class Discrepancy:
+    user_id: int
+    kind: str
+    expected: Optional[Decimal] = None
+    actual: Optional[Decimal] = None
+    transaction_id: Optional[int] = None
+
+
+@dataclass
+class ReconciliationReport:
+    users_checked: int = 0
+    transactions_checked: int = 0
+    snapshots_checked: int = 0
+    discrepancies: List[Discrepancy] = field(default_factory=list)
+    discrepancy_count: int = 0
+
+    @property
+    def ok(self) -> bool:
+        return self.discrepancy_count == 0
+
+
+class _Stream:
+    """Итератор с подсмотром текущего элемента (для слияния отсортированных потоков)"""
+
+    def __init__(self, rows: Iterable):
+        self._rows = iter(rows)
+        self.current = next(self._rows, None)
+
+    def advance(self):
+        self.current = next(self._rows, None)
+
+
+def _decimal(value) -> Decimal:
+    return Decimal(str(value)) if value is not None else Decimal("0")
+
+
+def _stream(session: Session, statement, batch_size: int) -> Iterator:
+    return session.execute(statement.execution_options(stream_results=True, yield_per=batch_size))
+
+
+def reconcile_wallets(session: Session, batch_size: int = 10000, max_reported: int = 1000) -> ReconciliationReport:
+    """
+    Сверка за один проход: транзакции, снимки и кошельки читаются
+    потоками, упорядоченными по user_id, и сливаются, так что память не
+    зависит от размера журнала.
+
+    Проверяется, что balance_after каждой транзакции равен нарастающему
+    итогу, что снимки совпадают с итогами на своей транзакции и что
+    Wallet.balance равен итогу журнала.
+    """
+    report = ReconciliationReport()
+
+    def discrepancy(user_id, kind, expected=None, actual=None, transaction_id=None):
+        report.discrepancy_count += 1
+        if len(report.discrepancies) < max_reported:
+            report.discrepancies.append(Discrepancy(user_id, kind, expected, actual, transaction_id))
+
+    transactions = _stream(session, select(
+        Transaction.user_id, Transaction.id, Transaction.tx_type, Transaction.amount, Transaction.balance_after
+    ).order_by(Transaction.user_id, Transaction.id), batch_size)
+    snapshots = _Stream(_stream(session, select(
+        WalletSnapshot.user_id, WalletSnapshot.transaction_id, WalletSnapshot.balance,
+        WalletSnapshot.credited_total, WalletSnapshot.debited_total
+    ).order_by(WalletSnapshot.user_id, WalletSnapshot.transaction_id), batch_size))
+    wallets = _Stream(_stream(session, select(Wallet.user_id, Wallet.balance).order_by(Wallet.user_id), batch_size))
+
+    def skip_snapshots(until_user_id=None):
+        while snapshots.current and (until_user_id is None or snapshots.current.user_id < until_user_id):
+            discrepancy(snapshots.current.user_id, "orphan_snapshot", transaction_id=snapshots.current.transaction_id)
+            snapshots.advance()
+
+    def check_wallets(until_user_id=None):
+        while wallets.current and (until_user_id is None or wallets.current.user_id < until_user_id):
+            report.users_checked += 1
+            if _decimal(wallets.current.balance) != 0:
+                discrepancy(wallets.current.user_id, "wallet_without_ledger", Decimal("0"), _decimal(wallets.current.balance))
+            wallets.advance()
+
+    for user_id, rows in groupby(transactions, key=lambda row: row.user_id):
+        check_wallets(user_id)
+        skip_snapshots(user_id)
+        report.users_checked += 1
+        credited, debited = Decimal("0"), Decimal("0")
+
+        for row in rows:
+            report.transactions_checked += 1
+            if row.tx_type == "DEBIT":
+                debited += _decimal(row.amount)
+            else:
+                credited += _decimal(row.amount)
+            balance = credited - debited
+            if row.balance_after is not None and _decimal(row.balance_after) != balance:
+                discrepancy(user_id, "balance_after", balance, _decimal(row.balance_after), row.id)
+
+            while snapshots.current and snapshots.current.user_id == user_id and snapshots.current.transaction_id <= row.id:
+                snapshot = snapshots.current
+                report.snapshots_checked += 1
+                if snapshot.transaction_id != row.id:
+                    discrepancy(user_id, "orphan_snapshot", transaction_id=snapshot.transaction_id)
+                elif (_decimal(snapshot.credited_total), _decimal(snapshot.debited_total), _decimal(snapshot.balance)) != (credited, debited, balance):
+                    discrepancy(user_id, "snapshot", balance, _decimal(snapshot.balance), row.id)
+                snapshots.advance()
+
+        while snapshots.current and snapshots.current.user_id == user_id:
+            discrepancy(user_id, "orphan_snapshot", transaction_id=snapshots.current.transaction_id)
+            snapshots.advance()
+
+        if wallets.current and wallets.current.user_id == user_id:
+            if _decimal(wallets.current.balance) != balance:
+                discrepancy(user_id, "wallet_balance", balance, _decimal(wallets.current.balance))
+            wallets.advance()
+        else:
+            discrepancy(user_id, "missing_wallet", balance)
+
+    check_wallets()
+    skip_snapshots()
+    return report
+
+
+def take_wallet_snapshots(session: Session, min_tail: int = 1000, batch_size: int = 1000) -> int:
+    """Периодические снимки для пользователей, у которых хвост журнала длиннее min_tail"""
+    created = 0
+    last_user_id = 0
+    while True:
+        user_ids = list(session.exec(
+            select(Wallet.user_id).where(Wallet.user_id > last_user_id).order_by(Wallet.user_id).limit(batch_size)
+        ).all())
+        if not user_ids:
+            return created
+        for user_id in user_ids:
+            if WalletService.take_wallet_snapshot(user_id, session, min_tail=min_tail):
+                created += 1
+        last_user_id = user_ids[-1]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Сверка журнала транзакций и снимки балансов")
+    parser.add_argument("command", choices=["reconcile", "snapshot"])
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument("--min-tail", type=int, default=1000, help="Минимум транзакций после прошлого снимка")
+    args = parser.parse_args(argv)
+
+    from database.database import engine
+
+    with Session(engine) as session:
+        if args.command == "snapshot":
+            created = take_wallet_snapshots(session, min_tail=args.min_tail)
+            wallet_logger.info(f"Создано снимков кошельков: {created}")
+            return 0
+
+        report = reconcile_wallets(session, batch_size=args.batch_size)
+        wallet_logger.info(
+            f"Сверка: пользователей {report.users_checked}, транзакций {report.transactions_checked}, "
+            f"снимков {report.snapshots_checked}, расхождений {report.discrepancy_count}"
+        )
+        for item in report.discrepancies:
+            wallet_logger.error(
+                f"Расхождение {item.kind}: user_id={item.user_id}, transaction_id={item.transaction_id}, "
+                f"ожидалось {item.expected}, в БД {item.actual}"
+            )
+        return 0 if report.ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
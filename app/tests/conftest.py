@@ -25,6 +25,11 @@ import models.document
 import models.mljob
 import models.model
 import models.riskclause
+import models.clausefingerprint
+import models.userdailystats
+import models.walletsnapshot
+import models.archivedjob
+import models.jobtiming
 
 from services.crud.user import create_user
 
@@ -48,12 +53,13 @@ def session():
 def client(session):
     """TestClient для API тестов с переопределенной сессией БД"""
     from api import app
-    from database.database import get_session
+    from database.database import get_session, get_read_session
     
     def get_session_override():
         return session
     
     app.dependency_overrides[get_session] = get_session_override
+    app.dependency_overrides[get_read_session] = get_session_override
     
     with TestClient(app) as client:
         yield client
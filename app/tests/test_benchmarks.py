@@ -0,0 +1,67 @@
+import argparse
+import pytest
+from benchmarks.bench_pipeline import compare
+from benchmarks.contracts import RISK_CLAUSES, as_file, contract_of_size, generate_contract
+from benchmarks.load_scenarios import Stats, parse_mix
+from services.document_processor import DocumentProcessor
+
+
+def report(**values):
+    return {"results": [
+        {"name": name, "value": value, "unit": unit, "higher_is_better": unit.endswith("/s"), "params": {}}
+        for name, (value, unit) in values.items()
+    ]}
+
+
+class TestContracts:
+    def test_same_seed_same_text(self):
+        assert generate_contract(30, seed=5) == generate_contract(30, seed=5)
+        assert generate_contract(30, seed=5) != generate_contract(30, seed=6)
+
+    def test_risk_ratio(self):
+        risky = [template.split("{")[0] for template in RISK_CLAUSES]
+
+        assert not any(prefix in generate_contract(50, risk_ratio=0) for prefix in risky)
+        assert any(prefix in generate_contract(50, risk_ratio=1) for prefix in risky)
+
+    def test_contract_of_size(self):
+        assert len(contract_of_size(20_000).encode("utf-8")) >= 20_000
+
+    def test_formats_are_extractable(self):
+        processor = DocumentProcessor()
+        text = generate_contract(10)
+
+        for file_format in ("txt", "docx", "pdf"):
+            extracted, ok = processor.process_file(as_file(text, file_format), f"contract.{file_format}")
+            assert ok and len(extracted) > len(text) // 2
+
+
+class TestCompare:
+    def test_direction_aware_regressions(self):
+        old = report(rps=(100, "req/s"), latency=(10, "ms"), count=(1, "ms"))
+        new = report(rps=(80, "req/s"), latency=(8, "ms"), count=(1.05, "ms"))
+
+        statuses = {row["name"]: row["status"] for row in compare(old, new, threshold=0.1)}
+
+        assert statuses == {"rps": "REGRESSION", "latency": "IMPROVED", "count": "OK"}
+
+    def test_new_metrics_are_skipped(self):
+        assert compare(report(), report(rps=(1, "req/s"))) == []
+
+
+class TestLoadScenarios:
+    def test_parse_mix(self):
+        assert parse_mix("estimate=3,upload,history=4") == {"estimate": 3, "upload": 1, "history": 4}
+        with pytest.raises(argparse.ArgumentTypeError):
+            parse_mix("checkout=1")
+
+    def test_stats_report(self):
+        stats = Stats()
+        for elapsed in range(1, 101):
+            stats.add("history", elapsed, ok=elapsed <= 95)
+
+        row = stats.report(elapsed=10)["history"]
+
+        assert row["count"] == 100 and row["rps"] == 10
+        assert row["error_rate"] == 0.05
+        assert (row["p50_ms"], row["p95_ms"], row["max_ms"]) == (50, 95, 100)
@@ -0,0 +1,147 @@
+import asyncio
+import shutil
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event
+from sqlmodel import Session, SQLModel, create_engine
+from services.crud import document as DocumentService
+from services.crud import mljob as MLJobService
+from services.crud import model as ModelService
+from routes.prediction import get_job_details, get_jobs_status, MAX_BULK_JOB_IDS
+from services.crud.user import create_user
+
+
+@pytest.fixture
+def user_jobs(session, test_user):
+    model = ModelService.create_model(name="bulk_model", session=session, price_per_token=0.001)
+    jobs = []
+    for i in range(5):
+        document = DocumentService.create_document(test_user.id, f"doc{i}.txt", "текст договора", 4, session)
+        job = MLJobService.create_mljob(document.id, model.id, session)
+        MLJobService.add_risk_clauses_to_job(job.id, [
+            {"clause_text": f"штраф {i}", "risk_level": "HIGH", "explanation": "неустойка"},
+            {"clause_text": f"суд {i}", "risk_level": "MEDIUM", "explanation": "споры"},
+        ], session)
+        jobs.append(job)
+    session.commit()
+
+    other_document = DocumentService.create_document(test_user.id + 1, "other.txt", "чужой договор", 4, session)
+    other_job = MLJobService.create_mljob(other_document.id, model.id, session)
+    return jobs, other_job
+
+
+def count_queries(session):
+    statements = []
+    event.listen(session.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+    return statements
+
+
+class TestBulkJobQueries:
+    def test_only_own_jobs_are_returned(self, session, test_user, user_jobs):
+        jobs, other_job = user_jobs
+        ids = [job.id for job in jobs] + [other_job.id]
+
+        found = MLJobService.get_user_jobs_by_ids(ids, test_user.id, session)
+
+        assert [job.id for job in found] == [job.id for job in jobs]
+
+    def test_clauses_grouped_by_job(self, session, user_jobs):
+        jobs, _ = user_jobs
+
+        clauses = MLJobService.get_jobs_risk_clauses([job.id for job in jobs], session)
+
+        assert set(clauses) == {job.id for job in jobs}
+        assert all(len(items) == 2 for items in clauses.values())
+
+    def test_query_count_does_not_grow(self, session, test_user, user_jobs):
+        jobs, _ = user_jobs
+        ids, user_id = ",".join(str(job.id) for job in jobs), test_user.id
+        session.expire_all()
+        statements = count_queries(session)
+
+        response = asyncio.run(get_jobs_status(
+            ids=ids, include_clauses=True, current_user={"user_id": user_id}, session=session, primary=session
+        ))
+
+        assert len(response.jobs) == 5
+        assert len(statements) == 2
+
+
+class TestBulkJobEndpoint:
+    def call(self, session, user_id, ids, include_clauses=True):
+        return asyncio.run(get_jobs_status(
+            ids=ids, include_clauses=include_clauses, current_user={"user_id": user_id}, session=session, primary=session
+        ))
+
+    def test_missing_and_foreign_ids(self, session, test_user, user_jobs):
+        jobs, other_job = user_jobs
+
+        response = self.call(session, test_user.id, f"{jobs[0].id},{other_job.id},99999")
+
+        assert [job.id for job in response.jobs] == [jobs[0].id]
+        assert response.missing_ids == [other_job.id, 99999]
+        assert len(response.jobs[0].risk_clauses) == 2
+
+    def test_without_clauses(self, session, test_user, user_jobs):
+        jobs, _ = user_jobs
+
+        response = self.call(session, test_user.id, str(jobs[0].id), include_clauses=False)
+
+        assert response.jobs[0].risk_clauses == []
+
+    @pytest.mark.parametrize("ids", ["", "1,abc", ",".join(str(i) for i in range(MAX_BULK_JOB_IDS + 1))])
+    def test_invalid_ids(self, session, test_user, ids):
+        with pytest.raises(HTTPException) as error:
+            self.call(session, test_user.id, ids)
+
+        assert error.value.status_code == 400
+
+
+class TestLaggingReplica:
+    @pytest.fixture
+    def databases(self, tmp_path, sample_user_data):
+        """Основная БД и реплика, на которую не дошло завершение первой задачи и вторая задача"""
+        primary_engine = create_engine(f"sqlite:///{tmp_path / 'primary.db'}")
+        SQLModel.metadata.create_all(primary_engine)
+        with Session(primary_engine) as session:
+            user_id = create_user(sample_user_data, session).id
+            model = ModelService.create_model(name="lag_model", session=session, price_per_token=0.001)
+            document = DocumentService.create_document(user_id, "doc.txt", "текст договора", 4, session)
+            finished_id = MLJobService.create_mljob(document.id, model.id, session).id
+            document_id, model_id = document.id, model.id
+        shutil.copy(tmp_path / "primary.db", tmp_path / "replica.db")
+        with Session(primary_engine) as session:
+            job = MLJobService.get_job_by_id(finished_id, session)
+            job.finish_ok("Готово", 0.4)
+            session.add(job)
+            MLJobService.add_risk_clauses_to_job(finished_id, [{"clause_text": "штраф", "risk_level": "HIGH"}], session)
+            new_id = MLJobService.create_mljob(document_id, model_id, session).id
+            session.commit()
+
+        replica_engine = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+        with Session(replica_engine) as replica, Session(primary_engine) as primary:
+            yield replica, primary, user_id, finished_id, new_id
+        primary_engine.dispose()
+        replica_engine.dispose()
+
+    def test_bulk_status_rechecks_unfinished_jobs_on_primary(self, databases):
+        replica, primary, user_id, finished_id, new_id = databases
+
+        response = asyncio.run(get_jobs_status(
+            ids=f"{finished_id},{new_id}", include_clauses=True, current_user={"user_id": user_id},
+            session=replica, primary=primary
+        ))
+
+        assert [(job.id, job.status) for job in response.jobs] == [(finished_id, "DONE"), (new_id, "QUEUED")]
+        assert len(response.jobs[0].risk_clauses) == 1
+        assert response.missing_ids == []
+
+    def test_job_details_rechecks_unfinished_job_on_primary(self, databases):
+        replica, primary, user_id, finished_id, _ = databases
+
+        job = asyncio.run(get_job_details(
+            job_id=finished_id, current_user={"user_id": user_id}, session=replica, primary=primary
+        ))
+
+        assert job.status == "DONE"
+        assert len(job.risk_clauses) == 1
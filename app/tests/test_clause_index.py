@@ -0,0 +1,122 @@
+import pytest
+from sqlmodel import select
+from models.clausefingerprint import ClauseFingerprint, ClauseBand
+from services.clause_index import ClauseIndex, MinHasher
+from services.risk_classifier import risk_classifier
+
+
+PENALTY_CLAUSE = "В случае просрочки платежа Арендатор обязан уплатить пеню в размере одной десятой процента за каждый день просрочки исполнения обязательства"
+NEUTRAL_CLAUSE = "Арендодатель передает Арендатору помещение по акту приема передачи в течение пяти рабочих дней с момента подписания настоящего договора"
+
+
+class CountingClassifier:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, clauses):
+        self.calls.append(list(clauses))
+        return risk_classifier.classify_clauses(clauses)
+
+
+@pytest.fixture
+def classify():
+    return CountingClassifier()
+
+
+class TestMinHasher:
+    def test_identical_texts(self):
+        hasher = MinHasher()
+        assert hasher.similarity(hasher.signature(PENALTY_CLAUSE), hasher.signature(PENALTY_CLAUSE)) == 1.0
+
+    def test_near_duplicates_are_similar(self):
+        hasher = MinHasher()
+        variant = PENALTY_CLAUSE.replace("Арендатор", "Субарендатор")
+
+        assert hasher.similarity(hasher.signature(PENALTY_CLAUSE), hasher.signature(variant)) >= 0.6
+        assert hasher.similarity(hasher.signature(PENALTY_CLAUSE), hasher.signature(NEUTRAL_CLAUSE)) < 0.3
+
+    def test_signature_roundtrip(self):
+        hasher = MinHasher()
+        signature = hasher.signature(PENALTY_CLAUSE)
+
+        assert (hasher.decode(hasher.encode(signature)) == signature).all()
+        assert len(hasher.band_keys(signature)) == hasher.bands
+
+
+class TestClauseIndex:
+    def test_new_clauses_go_to_model(self, session, classify):
+        index = ClauseIndex(session)
+
+        results = index.classify([PENALTY_CLAUSE, NEUTRAL_CLAUSE], classify)
+
+        assert len(classify.calls) == 1
+        assert results[0]["risk_level"] == "HIGH"
+        assert results[1] is None
+        assert index.analyzed == 2
+
+    def test_saved_clauses_are_reused(self, session, classify):
+        first = ClauseIndex(session)
+        first.classify([PENALTY_CLAUSE, NEUTRAL_CLAUSE], classify)
+        assert first.save_new() == 2
+
+        second = ClauseIndex(session)
+        results = second.classify([PENALTY_CLAUSE, NEUTRAL_CLAUSE], classify)
+
+        assert len(classify.calls) == 1
+        assert second.reused == 2
+        assert results[0]["risk_level"] == "HIGH"
+        assert results[0]["explanation"].startswith("Категория риска")
+        assert results[1] is None
+
+    def test_exact_match_ignores_case(self, session, classify):
+        index = ClauseIndex(session)
+        index.classify(["Штраф за нарушение срока поставки составляет 10 процентов"], classify)
+        index.save_new()
+
+        ClauseIndex(session).classify(["штраф за нарушение срока поставки, составляет 10 процентов."], classify)
+
+        assert len(classify.calls) == 1
+
+    def test_changed_numbers_are_analyzed_again(self, session, classify):
+        index = ClauseIndex(session)
+        index.classify(["Штраф за нарушение срока поставки составляет 0,1 процента"], classify)
+        index.save_new()
+
+        ClauseIndex(session).classify(["Штраф за нарушение срока поставки составляет 50 процентов"], classify)
+
+        assert len(classify.calls) == 2
+
+    def test_near_duplicate_reuses_result(self, session, classify):
+        index = ClauseIndex(session)
+        index.classify([PENALTY_CLAUSE], classify)
+        index.save_new()
+
+        variant = PENALTY_CLAUSE.replace("процента", "процентов")
+        results = ClauseIndex(session).classify([variant], classify)
+
+        assert len(classify.calls) == 1
+        assert results[0]["clause_text"] == variant[:200]
+        assert results[0]["risk_level"] == "HIGH"
+
+    def test_save_skips_already_stored(self, session, classify):
+        first = ClauseIndex(session)
+        second = ClauseIndex(session)
+        first.classify([PENALTY_CLAUSE], classify)
+        second.classify([PENALTY_CLAUSE], classify)
+
+        assert first.save_new() == 1
+        assert second.save_new() == 0
+        assert len(session.exec(select(ClauseFingerprint)).all()) == 1
+        assert len(session.exec(select(ClauseBand)).all()) == MinHasher().bands
+
+    def test_analyze_with_index(self, session, sample_document_text):
+        index = ClauseIndex(session)
+        first = risk_classifier.analyze(sample_document_text, clause_index=index)
+        index.save_new()
+
+        second_index = ClauseIndex(session)
+        second = risk_classifier.analyze(sample_document_text, clause_index=second_index)
+
+        assert second_index.analyzed == 0
+        assert second["risk_score"] == first["risk_score"]
+        assert second["risk_clauses"] == first["risk_clauses"]
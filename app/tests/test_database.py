@@ -312,7 +312,8 @@ class TestMLJobDatabaseOperations:
         assert job.id is not None
         assert job.document_id == document.id
         assert job.status == "PENDING"
-        assert job.started_at is not None
+        assert job.created_at is not None
+        assert job.started_at is None
 
     def test_mljob_status_transitions(self, session, test_user):
         """Test ML job status transitions"""
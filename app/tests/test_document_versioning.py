@@ -0,0 +1,187 @@
+import pytest
+from decimal import Decimal
+from unittest.mock import MagicMock, patch
+from models.document import Document
+from models.mljob import MLJob
+from services.crud import document as DocumentService
+from services.crud import mljob as MLJobService
+from services.crud import wallet as WalletService
+from services.document_versioning import diff_clauses, merge_risk_clauses
+from services.prediction_service import process_prediction_request
+from services.risk_classifier import risk_classifier
+
+
+VERSION_1 = """1.1. Арендодатель передает Арендатору помещение площадью сто квадратных метров.
+2.1. Арендатор вносит арендную плату ежемесячно до десятого числа.
+3.1. В случае просрочки платежа Арендатор уплачивает пеню за каждый день просрочки.
+4.1. Споры разрешаются в арбитражном суде по месту нахождения Арендодателя."""
+
+VERSION_2 = """1.1. Арендодатель передает Арендатору помещение площадью сто квадратных метров.
+2.1. Арендатор вносит арендную плату ежеквартально до пятого числа первого месяца.
+3.1. В случае просрочки платежа Арендатор уплачивает пеню за каждый день просрочки.
+5.1. Арендодатель вправе расторгнуть договор в одностороннем порядке."""
+
+
+@pytest.fixture
+def funded_user(session, test_user):
+    WalletService.credit_wallet(test_user.id, Decimal("1000"), session)
+    return test_user
+
+
+@pytest.fixture
+def publisher():
+    with patch("services.prediction_service.get_ml_publisher") as get_publisher:
+        get_publisher.return_value.publish_ml_task.return_value = True
+        yield get_publisher.return_value
+
+
+class TestClauseDiff:
+    def test_changed_and_unchanged(self):
+        diff = diff_clauses(VERSION_1, VERSION_2)
+
+        assert diff.unchanged == 2
+        assert len(diff.changed) == 2
+        assert diff.removed == 2
+        assert "ежеквартально" in diff.changed[0]
+
+    def test_reordered_clauses_are_unchanged(self):
+        reordered = "\n".join(reversed(VERSION_1.split("\n")))
+
+        diff = diff_clauses(VERSION_1, reordered)
+
+        assert diff.changed == []
+        assert diff.removed == 0
+
+    def test_changed_number_is_a_change(self):
+        revised = VERSION_1.replace("площадью сто", "площадью 100").replace("до десятого числа", "до 10 числа")
+        raised = revised.replace("до 10 числа", "до 25 числа")
+
+        diff = diff_clauses(revised, raised)
+
+        assert diff.changed == ["Арендатор вносит арендную плату ежемесячно до 25 числа"]
+        assert diff.removed == 1
+
+    def test_changed_token_count_is_smaller(self):
+        diff = diff_clauses(VERSION_1, VERSION_2)
+
+        assert diff.changed_token_count() < Document.count_tokens(VERSION_2)
+        assert diff_clauses(VERSION_1, VERSION_1).changed_token_count() == 1
+
+
+class TestMergeRiskClauses:
+    def test_reuses_only_unchanged_clauses(self):
+        changed = [{"clause_text": "расторгнуть", "clause_hash": "x", "risk_level": "HIGH",
+                    "explanation": None, "category": "TERMINATION", "categories": ["TERMINATION"]}]
+
+        clauses, score = merge_risk_clauses(diff_clauses(VERSION_1, VERSION_2), changed, ["TERMINATION"])
+
+        assert [clause["category"] for clause in clauses] == ["PENALTY", "TERMINATION"]
+        assert score == pytest.approx((0.9 + 0.6 + 0.9) / 6.0)
+
+    def test_unchanged_document_keeps_full_score_beyond_clause_cap(self, session):
+        from services.clause_index import ClauseIndex
+
+        risky = [
+            "Арендатор уплачивает штраф за каждый день просрочки платежа",
+            "Стороны несут ответственность за нарушение обязательства",
+            "Арендодатель вправе расторгнуть договор в одностороннем порядке",
+            "Арендатор обязан возместить убытки и ущерб имуществу",
+            "Споры разрешаются в арбитражном суде по месту нахождения",
+            "Стороны освобождаются от ответственности при форс-мажор",
+            "Поставщик гарантирует качество товара в течение года",
+            "Покупатель выплачивает неустойку при просрочке оплаты",
+            "К Арендатору могут быть применены санкции регулятора",
+            "Арендатор несет ответственность за нарушение правил пожарной безопасности",
+        ]
+        text = "\n".join(f"{i + 1}.1. {clause}." for i, clause in enumerate(risky))
+        full = risk_classifier.analyze(text)
+
+        clauses, score = merge_risk_clauses(diff_clauses(text, text), [], [], ClauseIndex(session))
+
+        assert sum(1 for result in risk_classifier.classify_clauses(risky) if result) > 8
+        assert len(clauses) == 8
+        assert score == pytest.approx(full["risk_score"])
+
+
+class TestVersionedPrediction:
+    def test_first_version_pays_full_price(self, session, funded_user, publisher):
+        result = process_prediction_request(funded_user.id, VERSION_1, session=session, language="RU")
+
+        assert result["version"] == 1
+        assert result["changed_clauses"] is None
+        assert result["tokens_processed"] == Document.count_tokens(VERSION_1)
+
+    def test_new_version_pays_for_changes(self, session, funded_user, publisher):
+        first = process_prediction_request(funded_user.id, VERSION_1, session=session, language="RU")
+        first_job = MLJobService.get_job_by_id(first["job_id"], session)
+        first_job.finish_ok("Конспект", 0.3)
+        session.add(first_job)
+        session.commit()
+
+        second = process_prediction_request(
+            funded_user.id, VERSION_2, session=session, language="RU", previous_document_id=first["document_id"]
+        )
+
+        document = DocumentService.get_document_by_id(second["document_id"], session)
+        job = MLJobService.get_job_by_id(second["job_id"], session)
+        assert document.parent_id == first["document_id"]
+        assert document.version == 2
+        assert job.previous_job_id == first_job.id
+        assert publisher.publish_ml_task.call_args.kwargs["previous_job_id"] == first_job.id
+        assert second["changed_clauses"] == 2
+        assert second["cost"] < first["cost"]
+        assert job.billable_tokens(document) == second["tokens_processed"]
+
+    def test_without_finished_job_pays_full_price(self, session, funded_user, publisher):
+        first = process_prediction_request(funded_user.id, VERSION_1, session=session, language="RU")
+
+        second = process_prediction_request(
+            funded_user.id, VERSION_2, session=session, language="RU", previous_document_id=first["document_id"]
+        )
+
+        assert second["version"] == 2
+        assert second["changed_clauses"] is None
+        assert MLJobService.get_job_by_id(second["job_id"], session).previous_job_id is None
+
+    def test_foreign_previous_document(self, session, funded_user, publisher):
+        document = DocumentService.create_document(funded_user.id + 1, "other.txt", VERSION_1, 10, session)
+
+        with pytest.raises(ValueError):
+            process_prediction_request(funded_user.id, VERSION_2, session=session, previous_document_id=document.id)
+
+
+class TestIncrementalWorker:
+    def test_only_changed_clauses_are_analyzed(self, session, funded_user, publisher):
+        from ml_worker import MLWorker
+        from services.clause_index import ClauseIndex
+        from services.risk_classifier import risk_classifier
+
+        first = process_prediction_request(funded_user.id, VERSION_1, session=session, language="RU")
+        first_job = MLJobService.get_job_by_id(first["job_id"], session)
+        first_job.finish_ok("Конспект", 0.3)
+        MLJobService.add_risk_clauses_to_job(first_job.id, risk_classifier.analyze(VERSION_1)["risk_clauses"], session)
+        session.commit()
+        second = process_prediction_request(
+            funded_user.id, VERSION_2, session=session, language="RU", previous_document_id=first["document_id"]
+        )
+
+        worker = MLWorker("test-worker", concurrency=1)
+        worker.ml_service = MagicMock()
+        worker.ml_service.analyze_contract_risks.side_effect = lambda text, backend, index: {
+            "processed_successfully": True,
+            "summary": "Изменены сроки оплаты",
+            "risk_clauses": risk_classifier.analyze(text)["risk_clauses"],
+            "risk_categories": risk_classifier.analyze(text)["categories"],
+        }
+        job = session.get(MLJob, second["job_id"])
+        document = session.get(Document, second["document_id"])
+
+        summary, score, clauses = worker.execute_incremental_analysis(session, job, document, None, ClauseIndex(session))
+
+        analyzed_text = worker.ml_service.analyze_contract_risks.call_args[0][0]
+        assert "ежеквартально" in analyzed_text
+        assert "пеню" not in analyzed_text
+        assert "Изменены сроки оплаты" in summary
+        assert {clause["category"] for clause in clauses} >= {"PENALTY", "TERMINATION"}
+        assert all("арбитражном" not in clause["clause_text"] for clause in clauses)
+        assert score == pytest.approx(risk_classifier.analyze(VERSION_2)["risk_score"])
@@ -0,0 +1,90 @@
+import logging
+import os
+import threading
+import pytest
+import services.inference_backend as inference_backend
+import services.rabbitmq_config as rabbitmq_config
+import services.tracing as tracing
+from config import logging_config
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "fork"), reason="fork доступен только в POSIX")
+
+
+def run_in_child(check) -> int:
+    """Код выхода дочернего процесса: 0 - проверка прошла"""
+    pid = os.fork()
+    if pid == 0:
+        try:
+            os._exit(0 if check() else 1)
+        except BaseException:
+            os._exit(2)
+    _, status = os.waitpid(pid, 0)
+    return os.waitstatus_to_exitcode(status)
+
+
+class TestAfterFork:
+    def test_child_drops_parent_connections_and_threads(self):
+        exporter = tracing.InMemorySpanExporter()
+        parent_processor = tracing.set_span_exporter(exporter)
+        rabbitmq_config._publisher = object()
+        inference_backend._backends[("stub", None)] = object()
+
+        def check():
+            processor = tracing.get_span_processor()
+            return (
+                rabbitmq_config._publisher is None
+                and not inference_backend._backends
+                and processor is not parent_processor
+                and processor.exporter is exporter
+                and processor._thread.is_alive()
+            )
+
+        try:
+            assert run_in_child(check) == 0
+        finally:
+            rabbitmq_config._publisher = None
+            inference_backend.reset_backends()
+
+    def test_child_logging_has_own_listener(self, tmp_path):
+        parent_listener = logging_config._listener
+
+        def check():
+            listener = logging_config._listener
+            handler = logging.FileHandler(tmp_path / "child.log", encoding="utf-8")
+            listener.handlers += (handler,)
+            logging.getLogger("app").warning("из дочернего процесса")
+            listener.stop()
+            return (
+                listener is not parent_listener
+                and "из дочернего процесса" in (tmp_path / "child.log").read_text(encoding="utf-8")
+            )
+
+        assert run_in_child(check) == 0
+        assert parent_listener._thread in threading.enumerate()
+
+    def test_child_keeps_fork_safe_backends(self):
+        class Preloaded(inference_backend.InferenceBackend):
+            fork_safe = True
+
+            def __init__(self):
+                self.forked = False
+
+            def after_fork(self):
+                self.forked = True
+
+        preloaded = Preloaded()
+        inference_backend._backends[("preloaded", None)] = preloaded
+        inference_backend._backends[("stub", None)] = object()
+
+        def check():
+            return (
+                list(inference_backend._backends) == [("preloaded", None)]
+                and inference_backend.get_backend("preloaded") is preloaded
+                and preloaded.forked
+            )
+
+        try:
+            assert run_in_child(check) == 0
+            assert not preloaded.forked
+        finally:
+            inference_backend.reset_backends()
@@ -0,0 +1,75 @@
+import csv
+import io
+import json
+import pytest
+from sqlalchemy import event
+from services.crud import document as DocumentService
+from services.crud import mljob as MLJobService
+from services.crud import model as ModelService
+from services.history_export import export_csv, export_ndjson, group_history_rows
+
+
+@pytest.fixture
+def history(session, test_user):
+    model = ModelService.create_model(name="export_model", session=session, price_per_token=0.001)
+    jobs = []
+    for i in range(3):
+        document = DocumentService.create_document(test_user.id, f"договор_{i}.txt", "текст договора", 4, session)
+        job = MLJobService.create_mljob(document.id, model.id, session)
+        job.finish_ok(f"Конспект {i}", 0.1 * i)
+        session.add(job)
+        if i != 1:
+            MLJobService.add_risk_clauses_to_job(job.id, [
+                {"clause_text": f"штраф {i}", "risk_level": "HIGH", "explanation": "неустойка"},
+                {"clause_text": f"суд {i}", "risk_level": "MEDIUM", "explanation": "споры"},
+            ], session)
+        jobs.append(job)
+    session.commit()
+
+    other = DocumentService.create_document(test_user.id + 1, "чужой.txt", "текст", 1, session)
+    MLJobService.create_mljob(other.id, model.id, session)
+    return jobs
+
+
+def read_records(session, user_id):
+    return list(group_history_rows(MLJobService.iter_user_history(user_id, session, batch_size=2)))
+
+
+class TestHistoryExport:
+    def test_jobs_grouped_with_clauses(self, session, test_user, history):
+        records = read_records(session, test_user.id)
+
+        assert [record["job_id"] for record in records] == [job.id for job in history]
+        assert [len(record["risk_clauses"]) for record in records] == [2, 0, 2]
+        assert records[0]["filename"] == "договор_0.txt"
+        assert records[2]["risk_clauses"][0]["clause_text"] == "штраф 2"
+
+    def test_one_query_per_storage_tier(self, session, test_user, history):
+        user_id = test_user.id
+        session.expire_all()
+        statements = []
+        event.listen(session.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+        read_records(session, user_id)
+
+        assert len(statements) == 2
+
+    def test_ndjson(self, session, test_user, history):
+        chunks = list(export_ndjson(read_records(session, test_user.id), chunk_size=2))
+
+        lines = "".join(chunks).splitlines()
+        assert len(chunks) == 2
+        assert [json.loads(line)["job_id"] for line in lines] == [job.id for job in history]
+
+    def test_csv(self, session, test_user, history):
+        content = "".join(export_csv(read_records(session, test_user.id)))
+
+        rows = list(csv.DictReader(io.StringIO(content)))
+        assert len(rows) == 3
+        assert rows[0]["high_risk_clauses"] == "1"
+        assert rows[0]["risk_clauses"] == "[HIGH] штраф 0 | [MEDIUM] суд 0"
+        assert rows[1]["risk_clauses_count"] == "0"
+
+    def test_empty_history(self, session, test_user):
+        assert list(export_ndjson(read_records(session, test_user.id))) == []
+        assert "".join(export_csv([])).startswith("job_id,document_id")
@@ -0,0 +1,160 @@
+import os
+import pytest
+from unittest.mock import MagicMock
+from models.model import Model
+from services import inference_backend
+from services.huggingface_service import HuggingFaceService
+from services.inference_backend import (
+    InferenceBackend,
+    HuggingFaceAPIBackend,
+    get_backend,
+    get_backend_for_model,
+    reset_backends
+)
+
+
+class TinyBackend(InferenceBackend):
+    """Детерминированный бэкенд для офлайн тестов"""
+
+    name = "tiny"
+    loads = 0
+
+    def __init__(self, path=None):
+        TinyBackend.loads += 1
+        self.path = path
+        self.calls = []
+
+    def summarize_batch(self, texts):
+        self.calls.append(list(texts))
+        return [f"Краткое изложение: {text[:30]}" for text in texts]
+
+
+@pytest.fixture
+def register(monkeypatch):
+    """Регистрация фабрики только на время теста"""
+    return lambda name, factory: monkeypatch.setitem(inference_backend._factories, name, factory)
+
+
+@pytest.fixture(autouse=True)
+def tiny_backend(register):
+    TinyBackend.loads = 0
+    register(TinyBackend.name, lambda path: TinyBackend(path))
+    reset_backends()
+    yield
+    reset_backends()
+
+
+class TestBackendRegistry:
+    def test_backend_loaded_once_per_process(self):
+        first = get_backend("tiny", "/models/tiny")
+        second = get_backend("tiny", "/models/tiny")
+
+        assert first is second
+        assert TinyBackend.loads == 1
+
+    def test_different_paths_are_separate_backends(self):
+        first = get_backend("tiny", "/models/a")
+        second = get_backend("tiny", "/models/b")
+
+        assert first is not second
+        assert TinyBackend.loads == 2
+
+    def test_unknown_backend(self):
+        with pytest.raises(ValueError):
+            get_backend("missing")
+
+    def test_backend_chosen_per_model_row(self):
+        model = Model(name="local", backend="tiny", backend_path="/models/tiny")
+
+        backend = get_backend_for_model(model)
+
+        assert isinstance(backend, TinyBackend)
+        assert backend.path == "/models/tiny"
+
+    def test_model_defaults_to_http_api(self):
+        model = Model(name="default_model")
+
+        assert model.backend == "hf_api"
+        assert isinstance(get_backend_for_model(model), HuggingFaceAPIBackend)
+
+    def test_failed_local_backend_falls_back_to_http_api(self, register):
+        attempts = []
+
+        def broken(path):
+            attempts.append(path)
+            raise RuntimeError("weights not found")
+
+        register("broken", broken)
+        model = Model(name="local", backend="broken", backend_path="/nowhere")
+
+        first = get_backend_for_model(model)
+        second = get_backend_for_model(model)
+
+        assert isinstance(first, HuggingFaceAPIBackend) and second is first
+        assert attempts == ["/nowhere"]
+
+
+class TestHuggingFaceAPIBackend:
+    def test_batched_request(self):
+        client = MagicMock()
+        client.russian_summarization_model = "rut5"
+        client._make_request.return_value = [
+            {"summary_text": "Первое краткое изложение"},
+            {"summary_text": "Второе краткое изложение"}
+        ]
+
+        summaries = HuggingFaceAPIBackend(client).summarize_batch(["первый", "второй"])
+
+        assert summaries == ["Первое краткое изложение", "Второе краткое изложение"]
+        payload = client._make_request.call_args[0][1]
+        assert payload["inputs"] == ["первый", "второй"]
+
+    def test_fallback_only_for_missing_items(self):
+        client = MagicMock()
+        client.russian_summarization_model = "rut5"
+        client.alternative_russian_model = "fred"
+        client._make_request.side_effect = [
+            [{"summary_text": "Первое краткое изложение"}, {"summary_text": ""}],
+            [{"generated_text": "Изложение от FRED-T5"}]
+        ]
+
+        summaries = HuggingFaceAPIBackend(client).summarize_batch(["первый", "второй"])
+
+        assert summaries == ["Первое краткое изложение", "Изложение от FRED-T5"]
+        fred_payload = client._make_request.call_args_list[1][0][1]
+        assert len(fred_payload["inputs"]) == 1
+
+    def test_api_unavailable(self):
+        client = MagicMock()
+        client._make_request.return_value = None
+
+        assert HuggingFaceAPIBackend(client).summarize_batch(["текст"]) == [None]
+
+
+class TestServiceWithBackend:
+    def test_analysis_uses_given_backend(self, sample_document_text):
+        backend = get_backend("tiny")
+
+        result = HuggingFaceService().analyze_contract_risks(sample_document_text, backend)
+
+        assert result["processed_successfully"] is True
+        assert result["summary"].startswith("Краткое изложение")
+        assert len(backend.calls) == 1
+
+    def test_long_text_is_trimmed_before_inference(self):
+        backend = get_backend("tiny")
+
+        HuggingFaceService().summarize_russian_text("а" * 5000, backend)
+
+        assert len(backend.calls[0][0]) == 2001
+
+
+@pytest.mark.skipif(not os.getenv("LOCAL_INFERENCE_TEST_MODEL"), reason="LOCAL_INFERENCE_TEST_MODEL не задан")
+def test_ctranslate2_tiny_model():
+    pytest.importorskip("ctranslate2")
+    pytest.importorskip("transformers")
+
+    backend = get_backend("ctranslate2", os.environ["LOCAL_INFERENCE_TEST_MODEL"])
+    summaries = backend.summarize_batch(["Арендатор обязан вносить арендную плату ежемесячно."] * 2)
+
+    assert len(summaries) == 2
@@ -0,0 +1,125 @@
+import asyncio
+from datetime import datetime, timedelta
+import pytest
+from sqlmodel import select
+from models.archivedjob import ArchivedJob
+from models.mljob import MLJob
+from models.riskclause import RiskClause
+from services.crud import document as DocumentService
+from services.crud import mljob as MLJobService
+from services.crud import model as ModelService
+from services.crud import stats as StatsService
+from services.history_export import group_history_rows
+from services.job_archive import archive_jobs
+from services.pagination import next_cursor
+from routes.prediction import get_job_details, get_jobs_status
+
+
+@pytest.fixture
+def jobs(session, test_user):
+    """Шесть заданий: четыре старых завершённых, одно свежее и одно незавершённое старое"""
+    model = ModelService.create_model(name="archive_model", session=session, price_per_token=0.001)
+    old = datetime.now() - timedelta(days=400)
+    created = []
+    for i in range(6):
+        document = DocumentService.create_document(test_user.id, f"doc{i}.txt", "текст договора", 4, session)
+        job = MLJobService.create_mljob(document.id, model.id, session)
+        job.created_at = old + timedelta(days=i) if i < 5 else datetime.now()
+        if i != 4:
+            job.finish_ok(f"Конспект {i} " + "подробности " * 50, 0.1 * i)
+            job.finished_at = job.created_at + timedelta(hours=1)
+        session.add(job)
+        MLJobService.add_risk_clauses_to_job(job.id, [
+            {"clause_text": f"штраф {i}", "risk_level": "HIGH", "explanation": "неустойка", "categories": ["penalty"]},
+        ], session)
+        created.append(job)
+    session.commit()
+    return created
+
+
+class TestArchiveJob:
+    def test_moves_old_finished_jobs(self, session, jobs):
+        assert archive_jobs(session, older_than_days=180, batch_size=2) == 4
+
+        hot_ids = set(session.exec(select(MLJob.id)).all())
+        assert hot_ids == {jobs[4].id, jobs[5].id}
+        assert set(session.exec(select(RiskClause.job_id)).all()) == hot_ids
+        assert len(session.exec(select(ArchivedJob)).all()) == 4
+
+    def test_payload_roundtrip(self, session, jobs):
+        expected_summary = jobs[1].summary_text
+        archive_jobs(session, older_than_days=180)
+
+        archived = session.get(ArchivedJob, jobs[1].id)
+        job = archived.to_job()
+
+        assert len(archived.payload) < len(expected_summary.encode("utf-8"))
+        assert job.summary_text == expected_summary
+        assert job._archived_clauses[0].clause_text == "штраф 1"
+        assert job._archived_clauses[0].categories == "penalty"
+        assert archived.archive_month == archived.finished_at.strftime("%Y-%m")
+
+    def test_referenced_job_is_kept(self, session, jobs):
+        jobs[5].previous_job_id = jobs[0].id
+        session.add(jobs[5])
+        session.commit()
+
+        archive_jobs(session, older_than_days=180)
+
+        assert session.get(MLJob, jobs[0].id) is not None
+        assert session.get(ArchivedJob, jobs[0].id) is None
+
+
+class TestTransparentReads:
+    def test_history_pages_span_both_tiers(self, session, test_user, jobs):
+        before = [job.id for job in MLJobService.get_user_jobs(test_user.id, session, limit=10)]
+        archive_jobs(session, older_than_days=180)
+
+        pages, cursor = [], None
+        while True:
+            page = MLJobService.get_user_jobs(test_user.id, session, limit=4, cursor=cursor)
+            pages.extend(job.id for job in page)
+            cursor = next_cursor(page, 4, "created_at")
+            if cursor is None:
+                break
+
+        assert pages == before
+        assert [job.id for job in MLJobService.get_user_jobs(test_user.id, session, skip=1, limit=3)] == before[1:4]
+        assert MLJobService.count_user_jobs(test_user.id, session) == 6
+
+    def test_bulk_status_and_details(self, session, test_user, jobs):
+        ids = f"{jobs[0].id},{jobs[5].id}"
+        archived_id = jobs[0].id
+        archive_jobs(session, older_than_days=180)
+        current_user = {"user_id": test_user.id}
+
+        bulk = asyncio.run(get_jobs_status(ids=ids, include_clauses=True, current_user=current_user, session=session, primary=session))
+        details = asyncio.run(get_job_details(job_id=archived_id, current_user=current_user, session=session, primary=session))
+
+        assert [job.id for job in bulk.jobs] == [archived_id, jobs[5].id]
+        assert bulk.missing_ids == []
+        assert all(len(job.risk_clauses) == 1 for job in bulk.jobs)
+        assert details.summary_text.startswith("Конспект 0")
+        assert details.risk_clauses[0].clause_text == "штраф 0"
+
+    def test_foreign_archived_job_is_hidden(self, session, test_user, jobs):
+        archive_jobs(session, older_than_days=180)
+
+        assert MLJobService.get_user_job(jobs[0].id, test_user.id + 1, session) is None
+        assert MLJobService.get_user_job(jobs[0].id, test_user.id, session).status == "DONE"
+
+    def test_export_merges_tiers(self, session, test_user, jobs):
+        job_ids = sorted(job.id for job in jobs)
+        archive_jobs(session, older_than_days=180)
+
+        records = list(group_history_rows(MLJobService.iter_user_history(test_user.id, session, batch_size=2)))
+
+        assert [record["job_id"] for record in records] == job_ids
+        assert all(len(record["risk_clauses"]) == 1 for record in records)
+
+    def test_stats_rebuild_includes_archive(self, session, test_user, jobs):
+        archive_jobs(session, older_than_days=180)
+
+        StatsService.rebuild_daily_stats(session, user_id=test_user.id)
+
+        assert StatsService.get_user_stats_totals(test_user.id, session)["done_count"] == 5
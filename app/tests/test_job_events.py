@@ -0,0 +1,138 @@
+import asyncio
+import json
+import threading
+import pytest
+from unittest.mock import MagicMock
+from sqlmodel import Session, SQLModel, create_engine
+from services.crud import document as DocumentService
+from services.crud import mljob as MLJobService
+from services.crud import model as ModelService
+from services.job_events import JobEventConsumer, JobEventHub, format_sse
+
+
+class TestJobEventHub:
+    def test_event_reaches_subscriber_from_other_thread(self):
+        hub = JobEventHub()
+
+        async def scenario():
+            queue = hub.subscribe(1)
+            threading.Thread(target=hub.publish, args=({"job_id": 1, "status": "DONE"},)).start()
+            return await asyncio.wait_for(queue.get(), timeout=2)
+
+        assert asyncio.run(scenario()) == {"job_id": 1, "status": "DONE"}
+
+    def test_events_of_other_jobs_are_not_delivered(self):
+        hub = JobEventHub()
+
+        async def scenario():
+            queue = hub.subscribe(1)
+            delivered = hub.publish({"job_id": 2, "status": "DONE"})
+            await asyncio.sleep(0)
+            return delivered, queue.qsize()
+
+        assert asyncio.run(scenario()) == (0, 0)
+
+    def test_unsubscribe(self):
+        hub = JobEventHub()
+
+        async def scenario():
+            first = hub.subscribe(1)
+            hub.subscribe(1)
+            hub.unsubscribe(1, first)
+            return hub.subscriber_count(1)
+
+        assert asyncio.run(scenario()) == 1
+
+    def test_consumer_forwards_messages(self):
+        hub = MagicMock()
+        consumer = JobEventConsumer(hub, config=MagicMock())
+
+        consumer._on_message(None, None, None, json.dumps({"job_id": 5, "status": "RUNNING"}).encode())
+        consumer._on_message(None, None, None, b"not json")
+
+        hub.publish.assert_called_once_with({"job_id": 5, "status": "RUNNING"})
+
+    def test_format_sse(self):
+        message = format_sse({"job_id": 1, "status": "DONE"})
+
+        assert message.startswith("event: status\ndata: ")
+        assert message.endswith("\n\n")
+        assert json.loads(message.split("data: ", 1)[1]) == {"job_id": 1, "status": "DONE"}
+
+
+class TestWorkerEvents:
+    def test_worker_publishes_to_events_exchange(self):
+        from ml_worker import MLWorker
+
+        worker = MLWorker("test-worker", concurrency=1)
+        worker.channel = MagicMock()
+
+        worker.publish_job_event(7, "DONE", risk_score=0.5)
+
+        kwargs = worker.channel.basic_publish.call_args.kwargs
+        assert kwargs["exchange"] == worker.config.events_exchange_name
+        assert json.loads(kwargs["body"]) == {"job_id": 7, "status": "DONE", "risk_score": 0.5}
+
+    def test_without_connection_nothing_is_published(self):
+        from ml_worker import MLWorker
+
+        MLWorker("test-worker", concurrency=1).publish_job_event(7, "DONE")
+
+
+class TestGetUserJob:
+    def test_ownership_is_checked(self, session, test_user):
+        document = DocumentService.create_document(test_user.id, "a.txt", "текст договора", 4, session)
+        model = ModelService.create_model(name="m", session=session, price_per_token=0.001)
+        job = MLJobService.create_mljob(document.id, model.id, session)
+
+        assert MLJobService.get_user_job(job.id, test_user.id, session).id == job.id
+        assert MLJobService.get_user_job(job.id, test_user.id + 1, session) is None
+
+
+class TestJobEventsRoute:
+    def test_open_stream_does_not_hold_pool_connection(self, tmp_path, monkeypatch, sample_user_data):
+        from fastapi.testclient import TestClient
+        from api import app
+        from auth.jwt_handler import get_current_user
+        from database.database import get_session
+        from services.crud.user import create_user
+        import routes.prediction as prediction_routes
+
+        engine = create_engine(f"sqlite:///{tmp_path / 'events.db'}", connect_args={"check_same_thread": False})
+        SQLModel.metadata.create_all(engine)
+        with Session(engine) as session:
+            user = create_user(sample_user_data, session)
+            document = DocumentService.create_document(user.id, "a.txt", "текст договора", 4, session)
+            model = ModelService.create_model(name="m", session=session, price_per_token=0.001)
+            job_id = MLJobService.create_mljob(document.id, model.id, session).id
+            user_id = user.id
+
+        checked_out = []
+
+        class SamplingQueue:
+            """Очередь подписчика: фиксирует занятые соединения, пока поток открыт"""
+            async def get(self):
+                checked_out.append(engine.pool.checkedout())
+                return {"job_id": job_id, "status": "DONE"}
+
+        hub = MagicMock()
+        hub.subscribe.return_value = SamplingQueue()
+        monkeypatch.setattr(prediction_routes, "get_job_event_hub", lambda: hub)
+
+        def read_session():
+            with Session(engine) as session:
+                yield session
+
+        monkeypatch.setenv("API_INIT_DB", "0")
+        app.dependency_overrides[get_session] = read_session
+        app.dependency_overrides[get_current_user] = lambda: {"user_id": user_id}
+        try:
+            with TestClient(app) as client:
+                response = client.get(f"/jobs/{job_id}/events")
+        finally:
+            app.dependency_overrides.clear()
+            engine.dispose()
+
+        assert response.status_code == 200
+        assert '"status": "DONE"' in response.text
+        assert checked_out == [0]
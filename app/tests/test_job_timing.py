@@ -0,0 +1,109 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+import pytest
+from fastapi import HTTPException
+import ml_worker
+from models.jobtiming import JobTiming
+from models.mljob import MLJob
+from services.crud import model as ModelService
+from services.crud import stats as StatsService
+from services.job_timing import StageTimer, stage, timing_scope
+from services.risk_classifier import risk_classifier
+from routes.stats import get_stage_timings
+
+
+@pytest.fixture
+def model(session):
+    return ModelService.create_model(name="timing_model", session=session, price_per_token=0.001)
+
+
+def add_timing(session, model, job_id, status="DONE", **fields):
+    timing = JobTiming(
+        job_id=job_id, model_id=model.id, status=status, dequeued_at=datetime.now(),
+        processing_ms=float(job_id), **fields
+    )
+    StatsService.record_job_timing(timing, session)
+
+
+class TestStageTimer:
+    def test_stages_accumulate(self):
+        with timing_scope(StageTimer()) as timer:
+            with stage("inference"):
+                pass
+            with stage("inference"):
+                pass
+            risk_classifier.analyze("Арендатор уплачивает неустойку в размере 1% за каждый день просрочки.")
+
+        assert set(timer.stages) == {"inference", "risk_scan"}
+        assert timer.stages["risk_scan"] > 0
+
+    def test_noop_outside_scope(self):
+        with stage("inference"):
+            pass
+
+    def test_started_at_set_by_worker(self):
+        job = MLJob(document_id=1, model_id=1)
+
+        assert job.started_at is None
+        job.start()
+        assert job.started_at >= job.created_at
+
+
+class TestStagePercentiles:
+    @pytest.mark.parametrize("q, expected", [(50, 50), (95, 95), (99, 99), (100, 100)])
+    def test_nearest_rank(self, q, expected):
+        assert StatsService.percentile(list(range(1, 101)), q) == expected
+
+    def test_per_model(self, session, model):
+        for job_id in range(1, 101):
+            add_timing(session, model, job_id, cache_hits=1, queue_wait_ms=job_id * 10.0)
+        add_timing(session, model, 500, status="ERROR")
+
+        [entry] = StatsService.get_stage_percentiles(session, since=datetime.now() - timedelta(days=1))
+
+        assert entry["model_name"] == "timing_model"
+        assert entry["jobs"] == 101
+        assert entry["errors"] == 1
+        assert entry["cache_hits"] == 100
+        assert entry["stages"]["processing"] == {"p50": 50.0, "p95": 95.0, "p99": 99.0}
+        assert entry["stages"]["queue_wait"]["p95"] == 950.0
+        assert entry["stages"]["extraction"] == {"p50": None, "p95": None, "p99": None}
+
+    def test_rewrite_on_retry(self, session, model):
+        add_timing(session, model, 1, status="ERROR")
+        add_timing(session, model, 1)
+
+        [entry] = StatsService.get_stage_percentiles(session, since=datetime.now() - timedelta(days=1))
+        assert entry["jobs"] == 1
+        assert entry["errors"] == 0
+
+    def test_admin_only(self, session, model, test_user, admin_user):
+        add_timing(session, model, 1)
+
+        with pytest.raises(HTTPException) as error:
+            asyncio.run(get_stage_timings(days=7, current_user={"user_id": test_user.id}, session=session))
+        response = asyncio.run(get_stage_timings(days=7, current_user={"user_id": admin_user.id}, session=session))
+
+        assert error.value.status_code == 403
+        assert response[0].stages["processing"].p50 == 1.0
+
+
+class TestWorkerTiming:
+    def test_save_job_timing(self, session, model, monkeypatch):
+        monkeypatch.setattr(ml_worker, "engine", session.get_bind())
+        worker = ml_worker.MLWorker("worker-test", concurrency=1)
+        enqueued_at = datetime.now() - timedelta(seconds=2)
+        task_data = json.loads(json.dumps({"timestamp": str(enqueued_at), "extraction_ms": 12.5}))
+        timer = StageTimer()
+        timer.backend, timer.cache_hits = "huggingface_api", 3
+        timer.stages = {"inference": 100.0, "risk_scan": 5.0, "commit": 2.0}
+
+        worker.save_job_timing(42, model.id, task_data, datetime.now(), timer)
+
+        timing = session.get(JobTiming, 42)
+        assert timing.status == "ERROR"
+        assert timing.backend == "huggingface_api"
+        assert timing.queue_wait_ms >= 2000
+        assert timing.extraction_ms == 12.5
+        assert (timing.inference_ms, timing.risk_scan_ms, timing.commit_ms, timing.cache_hits) == (100.0, 5.0, 2.0, 3)
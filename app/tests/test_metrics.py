@@ -0,0 +1,80 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+from sqlalchemy import create_engine
+from sqlalchemy.pool import QueuePool
+from routes.metrics import metrics
+from services.crud import wallet as WalletService
+from services.document_processor import DocumentProcessor
+from services.metrics import PrometheusMiddleware, observe_job_finished, register_engine, update_queue_depth
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+class TestHttpMetrics:
+    def test_latency_by_route_template(self):
+        app = FastAPI()
+        app.add_middleware(PrometheusMiddleware)
+
+        @app.get("/items/{item_id}")
+        def item(item_id: int):
+            return {"id": item_id}
+
+        labels = {"method": "GET", "route": "/items/{item_id}", "status": "200"}
+        before = sample("http_request_duration_seconds_count", **labels)
+        client = TestClient(app)
+        client.get("/items/1")
+        client.get("/items/2")
+
+        assert sample("http_request_duration_seconds_count", **labels) == before + 2
+        assert client.get("/missing").status_code == 404
+        assert sample("http_request_duration_seconds_count", method="GET", route="unmatched", status="404") >= 1
+
+    def test_exposition(self):
+        engine = create_engine("sqlite://", poolclass=QueuePool, pool_size=3)
+        register_engine("test", engine)
+        with engine.connect():
+            response = metrics()
+
+        assert response.media_type.startswith("text/plain")
+        assert b"http_request_duration_seconds" in response.body
+        assert b'db_pool_connections{engine="test",state="checked_out"} 1.0' in response.body
+
+
+class TestServiceMetrics:
+    def test_wallet_operation_latency(self, session, test_user):
+        before = sample("wallet_operation_duration_seconds_count", operation="credit")
+
+        WalletService.credit_wallet(test_user.id, Decimal("5"), session)
+
+        assert sample("wallet_operation_duration_seconds_count", operation="credit") == before + 1
+
+    def test_extraction_time_by_format(self):
+        before = sample("document_extraction_duration_seconds_count", format="txt")
+
+        text, ok = DocumentProcessor().process_file("Договор поставки товара".encode("utf-8"), "contract.TXT")
+
+        assert ok
+        assert sample("document_extraction_duration_seconds_count", format="txt") == before + 1
+
+    def test_job_duration(self):
+        before = sample("ml_job_duration_seconds_count", status="DONE")
+        now = datetime.now()
+
+        observe_job_finished(SimpleNamespace(status="DONE", created_at=now - timedelta(seconds=30), finished_at=now))
+
+        assert sample("ml_job_duration_seconds_count", status="DONE") == before + 1
+        assert sample("ml_job_duration_seconds_sum", status="DONE") >= 30
+
+    def test_queue_depth(self):
+        method = SimpleNamespace(message_count=7, consumer_count=3)
+        channel = SimpleNamespace(queue_declare=lambda queue, passive: SimpleNamespace(method=method))
+
+        assert update_queue_depth(channel, "ml_tasks_queue") == 7
+        assert sample("rabbitmq_queue_messages", queue="ml_tasks_queue") == 7
+        assert sample("rabbitmq_queue_consumers", queue="ml_tasks_queue") == 3
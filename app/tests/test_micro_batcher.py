@@ -0,0 +1,119 @@
+import threading
+import time
+import pytest
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from services.inference_backend import InferenceBackend
+from services.micro_batcher import MicroBatcher
+
+
+class RecordingBackend(InferenceBackend):
+    """Бэкенд, запоминающий размеры пачек"""
+
+    name = "recording"
+
+    def __init__(self, delay: float = 0.0, fail: bool = False):
+        self.delay = delay
+        self.fail = fail
+        self.batches = []
+        self.lock = threading.Lock()
+
+    def summarize_batch(self, texts):
+        with self.lock:
+            self.batches.append(list(texts))
+        if self.fail:
+            raise RuntimeError("inference failed")
+        time.sleep(self.delay)
+        return [f"summary:{text}" for text in texts]
+
+
+@pytest.fixture
+def backend():
+    return RecordingBackend()
+
+
+class TestMicroBatcher:
+    def test_single_request(self, backend):
+        batcher = MicroBatcher(backend, max_batch_size=4, max_wait_ms=5)
+        try:
+            assert batcher.summarize("договор") == "summary:договор"
+            assert backend.batches == [["договор"]]
+        finally:
+            batcher.stop()
+
+    def test_concurrent_jobs_are_batched(self, backend):
+        batcher = MicroBatcher(backend, max_batch_size=16, max_wait_ms=200)
+        texts = [f"пункт {i}" for i in range(8)]
+        try:
+            with ThreadPoolExecutor(max_workers=8) as pool:
+                results = list(pool.map(batcher.summarize, texts))
+        finally:
+            batcher.stop()
+
+        assert results == [f"summary:{text}" for text in texts]
+        assert len(backend.batches) < len(texts)
+        assert sorted(t for batch in backend.batches for t in batch) == sorted(texts)
+
+    def test_batch_size_limit(self, backend):
+        batcher = MicroBatcher(backend, max_batch_size=3, max_wait_ms=200)
+        try:
+            futures = [batcher.submit(f"пункт {i}") for i in range(7)]
+            results = [future.result(timeout=5) for future in futures]
+        finally:
+            batcher.stop()
+
+        assert results == [f"summary:пункт {i}" for i in range(7)]
+        assert all(len(batch) <= 3 for batch in backend.batches)
+        assert [len(batch) for batch in backend.batches] == [3, 3, 1]
+
+    def test_summarize_batch_keeps_order(self, backend):
+        batcher = MicroBatcher(backend, max_batch_size=8, max_wait_ms=20)
+        try:
+            assert batcher.summarize_batch(["а", "б", "в"]) == ["summary:а", "summary:б", "summary:в"]
+        finally:
+            batcher.stop()
+
+    def test_errors_fan_out_to_all_callers(self):
+        batcher = MicroBatcher(RecordingBackend(fail=True), max_batch_size=4, max_wait_ms=50)
+        try:
+            futures = [batcher.submit("а"), batcher.submit("б")]
+            for future in futures:
+                with pytest.raises(RuntimeError):
+                    future.result(timeout=5)
+        finally:
+            batcher.stop()
+
+    def test_short_backend_result_fails_leftover_callers(self):
+        class ShortBackend(RecordingBackend):
+            def summarize_batch(self, texts):
+                return super().summarize_batch(texts)[:1]
+
+        batcher = MicroBatcher(ShortBackend(), max_batch_size=4, max_wait_ms=200)
+        try:
+            first, second = batcher.submit("а"), batcher.submit("б")
+            assert first.result(timeout=5) == "summary:а"
+            with pytest.raises(RuntimeError):
+                second.result(timeout=5)
+        finally:
+            batcher.stop()
+
+    def test_summarize_batch_times_out(self):
+        batcher = MicroBatcher(RecordingBackend(delay=1), max_batch_size=4, max_wait_ms=5, result_timeout=0.1)
+        try:
+            with pytest.raises(TimeoutError):
+                batcher.summarize_batch(["а"])
+        finally:
+            batcher.stop()
+
+    def test_submit_after_stop(self, backend):
+        batcher = MicroBatcher(backend)
+        batcher.stop()
+
+        with pytest.raises(RuntimeError):
+            batcher.submit("договор")
+
+    def test_keeps_backend_name(self, backend):
+        batcher = MicroBatcher(backend)
+        try:
+            assert batcher.name == "recording"
+        finally:
+            batcher.stop()
@@ -0,0 +1,84 @@
+from datetime import datetime
+from sqlalchemy import inspect, text
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine, select
+from database.migrations import ADDED_COLUMNS, upgrade_schema
+from models.document import Document
+from models.mljob import MLJob
+from models.model import Model
+from models.riskclause import RiskClause
+
+# Схема до появления версий, бэкендов и секционирования
+BASELINE_SCHEMA = [
+    """CREATE TABLE document (id INTEGER NOT NULL, user_id INTEGER NOT NULL, filename VARCHAR NOT NULL,
+        raw_text VARCHAR NOT NULL, token_count INTEGER NOT NULL, language VARCHAR NOT NULL,
+        uploaded_at DATETIME NOT NULL, PRIMARY KEY (id))""",
+    """CREATE TABLE model (id INTEGER NOT NULL, name VARCHAR NOT NULL, price_per_token FLOAT NOT NULL,
+        active BOOLEAN NOT NULL, PRIMARY KEY (id))""",
+    """CREATE TABLE "transaction" (id INTEGER NOT NULL, user_id INTEGER NOT NULL, tx_type VARCHAR NOT NULL,
+        amount NUMERIC NOT NULL, trans_time DATETIME NOT NULL, PRIMARY KEY (id))""",
+    """CREATE TABLE mljob (id INTEGER NOT NULL, document_id INTEGER NOT NULL, model_id INTEGER NOT NULL,
+        status VARCHAR NOT NULL, summary_depth VARCHAR NOT NULL, used_credits NUMERIC NOT NULL,
+        summary_text VARCHAR, risk_score FLOAT, started_at DATETIME, finished_at DATETIME, PRIMARY KEY (id),
+        FOREIGN KEY(document_id) REFERENCES document (id), FOREIGN KEY(model_id) REFERENCES model (id))""",
+    """CREATE TABLE riskclause (id INTEGER NOT NULL, job_id INTEGER NOT NULL, clause_text VARCHAR NOT NULL,
+        risk_level VARCHAR NOT NULL, explanation VARCHAR, PRIMARY KEY (id),
+        FOREIGN KEY(job_id) REFERENCES mljob (id))""",
+]
+STARTED = datetime(2024, 3, 5, 10, 30)
+
+
+def baseline_engine():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    with engine.begin() as connection:
+        for statement in BASELINE_SCHEMA:
+            connection.execute(text(statement))
+        connection.execute(text(
+            "INSERT INTO document VALUES (1, 1, 'a.txt', 'Договор', 1, 'RU', '2024-03-05 10:00:00.000000')"
+        ))
+        connection.execute(text("INSERT INTO model VALUES (1, 'bart', 0.001, 1)"))
+        connection.execute(text(
+            "INSERT INTO mljob VALUES (1, 1, 1, 'DONE', 'BULLET', 1, 'Конспект', 0.4, :started, NULL)"
+        ), {"started": STARTED})
+        connection.execute(text("INSERT INTO riskclause VALUES (1, 1, 'Неустойка', 'HIGH', NULL)"))
+    return engine
+
+
+def upgrade(engine):
+    with engine.begin() as connection:
+        SQLModel.metadata.create_all(connection)
+        return upgrade_schema(connection)
+
+
+class TestUpgradeSchema:
+    def test_baseline_database_is_readable_by_models(self):
+        engine = baseline_engine()
+
+        added = upgrade(engine)
+
+        assert set(added) == {f"{table}.{name}" for table, columns in ADDED_COLUMNS.items() for name in columns}
+        with Session(engine) as session:
+            job = session.exec(select(MLJob)).one()
+            assert job.created_at == STARTED
+            assert job.previous_job_id is None
+            assert session.exec(select(Document)).one().version == 1
+            assert session.exec(select(Model)).one().backend == "hf_api"
+            assert session.exec(select(RiskClause)).one().categories == ""
+
+    def test_second_run_changes_nothing(self):
+        engine = baseline_engine()
+        upgrade(engine)
+
+        assert upgrade(engine) == []
+
+    def test_model_indexes_are_created(self):
+        engine = baseline_engine()
+
+        upgrade(engine)
+
+        indexes = {index["name"] for index in inspect(engine).get_indexes("mljob")}
+        assert "ix_mljob_document_created_id" in indexes
+
+    def test_fresh_database_needs_nothing(self, session):
+        with session.get_bind().begin() as connection:
+            assert upgrade_schema(connection) == []
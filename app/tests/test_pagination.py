@@ -0,0 +1,105 @@
+import pytest
+from datetime import datetime, timedelta
+from decimal import Decimal
+from sqlmodel import SQLModel
+from services.crud import document as DocumentService
+from services.crud import mljob as MLJobService
+from services.crud import model as ModelService
+from services.crud import wallet as WalletService
+from services.pagination import decode_cursor, encode_cursor, next_cursor
+
+
+def collect_pages(fetch, limit, timestamp_attr):
+    """Пройти все страницы по курсору"""
+    items, cursor = [], None
+    while True:
+        page = fetch(limit=limit, cursor=cursor)
+        items.extend(page)
+        cursor = next_cursor(page, limit, timestamp_attr)
+        if cursor is None:
+            return items
+
+
+class TestCursor:
+    def test_roundtrip(self):
+        timestamp = datetime(2024, 5, 1, 12, 30, 15, 123456)
+
+        assert decode_cursor(encode_cursor(timestamp, 42)) == (timestamp, 42)
+
+    @pytest.mark.parametrize("cursor", ["", "not-a-cursor", encode_cursor(datetime(2024, 1, 1), 1)[:-3]])
+    def test_invalid_cursor(self, cursor):
+        with pytest.raises(ValueError):
+            decode_cursor(cursor)
+
+    def test_no_cursor_for_last_page(self):
+        assert next_cursor([], 10, "trans_time") is None
+
+
+class TestKeysetPagination:
+    def test_jobs_with_equal_timestamps(self, session, test_user):
+        model = ModelService.create_model(name="page_model", session=session, price_per_token=0.001)
+        created_at = datetime(2024, 1, 1)
+        for i in range(7):
+            document = DocumentService.create_document(test_user.id, f"doc{i}.txt", "текст", 1, session)
+            job = MLJobService.create_mljob(document.id, model.id, session)
+            job.created_at = created_at + timedelta(days=i // 3)
+            job.started_at = None
+            session.add(job)
+        session.commit()
+
+        fetch = lambda limit, cursor: MLJobService.get_user_jobs(test_user.id, session, limit=limit, cursor=cursor)
+        jobs = collect_pages(fetch, 3, "created_at")
+
+        assert len(jobs) == 7
+        assert len({job.id for job in jobs}) == 7
+        assert [(job.created_at, job.id) for job in jobs] == sorted(((job.created_at, job.id) for job in jobs), reverse=True)
+        assert jobs == MLJobService.get_user_jobs(test_user.id, session, limit=10)
+
+    def test_cursor_matches_offset(self, session, test_user):
+        for i in range(5):
+            WalletService.credit_wallet(test_user.id, Decimal(i + 1), session)
+
+        by_offset = WalletService.get_user_transactions(test_user.id, session, skip=2, limit=2)
+        first_page = WalletService.get_user_transactions(test_user.id, session, limit=2)
+        by_cursor = WalletService.get_user_transactions(
+            test_user.id, session, limit=2, cursor=next_cursor(first_page, 2, "trans_time")
+        )
+
+        assert [tx.id for tx in by_cursor] == [tx.id for tx in by_offset]
+
+    def test_documents(self, session, test_user):
+        for i in range(5):
+            DocumentService.create_document(test_user.id, f"doc{i}.txt", "текст", 1, session)
+        DocumentService.create_document(test_user.id + 1, "other.txt", "текст", 1, session)
+
+        fetch = lambda limit, cursor: DocumentService.get_user_documents(test_user.id, session, limit=limit, cursor=cursor)
+        documents = collect_pages(fetch, 2, "uploaded_at")
+
+        assert len(documents) == 5
+        assert DocumentService.count_user_documents(test_user.id, session) == 5
+
+    def test_counts(self, session, test_user):
+        WalletService.credit_wallet(test_user.id, Decimal("5"), session)
+        WalletService.debit_wallet(test_user.id, Decimal("1"), session)
+
+        assert WalletService.count_user_transactions(test_user.id, session) == 2
+        assert MLJobService.count_user_jobs(test_user.id, session) == 0
+
+
+class TestPaginationIndexes:
+    @pytest.mark.parametrize("table, columns", [
+        ("mljob", ["document_id", "created_at", "id"]),
+        ("document", ["user_id", "uploaded_at", "id"]),
+        ("transaction", ["user_id", "trans_time", "id"]),
+    ])
+    def test_composite_index(self, table, columns):
+        indexes = SQLModel.metadata.tables[table].indexes
+
+        assert any([column.name for column in index.columns] == columns for index in indexes)
+
+    def test_table_args_do_not_hide_docstrings(self):
+        from models.document import Document
+        from models.mljob import MLJob
+        from models.transaction import Transaction
+
+        assert all(model.__doc__ for model in (Document, MLJob, Transaction))
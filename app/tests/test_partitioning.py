@@ -0,0 +1,141 @@
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+import pytest
+from sqlalchemy.dialects import postgresql
+from sqlmodel import SQLModel, select
+import database.migrations as migrations
+from database.partitioning import (
+    PARTITIONED_TABLES, PARTITIONING_LOCK, add_months, convert_to_partitioned, create_default_partition_sql,
+    create_partition_sql, ensure_partitions, month_ranges, partition_name, setup_partitioning
+)
+from models.transaction import Transaction
+from services.crud import wallet as WalletService
+from services.pagination import encode_cursor, paginate
+
+POSTGRES = SimpleNamespace(dialect=postgresql.dialect())
+BASELINE_MLJOB_COLUMNS = [
+    "id", "document_id", "model_id", "status", "summary_depth", "used_credits",
+    "summary_text", "risk_score", "started_at", "finished_at",
+]
+
+
+class RecordingConnection:
+    """PostgreSQL-соединение, которое только запоминает выполненный SQL"""
+
+    dialect = postgresql.dialect()
+
+    def __init__(self):
+        self.statements = []
+
+    def execute(self, statement, params=None):
+        self.statements.append(str(statement))
+        return SimpleNamespace(all=lambda: [], scalar=lambda: None, one=lambda: (None, None))
+
+    def position(self, fragment: str) -> int:
+        return next(i for i, sql in enumerate(self.statements) if fragment in sql)
+
+
+class TestMonthRanges:
+    @pytest.mark.parametrize("start, months, expected", [
+        (date(2024, 1, 15), 1, date(2024, 2, 1)),
+        (date(2024, 11, 30), 3, date(2025, 2, 1)),
+        (date(2024, 3, 1), -3, date(2023, 12, 1)),
+    ])
+    def test_add_months(self, start, months, expected):
+        assert add_months(start, months) == expected
+
+    def test_ranges_cover_both_ends(self):
+        ranges = month_ranges(date(2023, 11, 20), date(2024, 2, 3))
+
+        assert ranges[0] == (date(2023, 11, 1), date(2023, 12, 1))
+        assert ranges[-1] == (date(2024, 2, 1), date(2024, 3, 1))
+        assert len(ranges) == 4
+
+
+class TestPartitionDDL:
+    def test_month_partition(self):
+        sql = create_partition_sql(POSTGRES, "transaction", date(2024, 5, 1), date(2024, 6, 1))
+
+        assert sql == (
+            "CREATE TABLE IF NOT EXISTS transaction_p2024_05 PARTITION OF transaction "
+            "FOR VALUES FROM ('2024-05-01') TO ('2024-06-01')"
+        )
+
+    def test_default_partition(self):
+        assert create_default_partition_sql(POSTGRES, "mljob") == (
+            "CREATE TABLE IF NOT EXISTS mljob_default PARTITION OF mljob DEFAULT"
+        )
+        assert partition_name("mljob", date(2025, 1, 1)) == "mljob_p2025_01"
+
+    def test_sqlite_is_skipped(self, session):
+        with session.get_bind().connect() as connection:
+            assert ensure_partitions(connection) == []
+
+    def test_conversion_runs_under_advisory_lock(self):
+        engine = MagicMock()
+        connection = engine.begin.return_value.__enter__.return_value
+        connection.dialect = postgresql.dialect()
+
+        setup_partitioning(engine)
+
+        statement, params = connection.execute.call_args_list[0][0]
+        assert "pg_advisory_xact_lock" in str(statement)
+        assert params == {"name": PARTITIONING_LOCK}
+
+    def test_converts_table_with_baseline_layout(self, monkeypatch):
+        columns = [{"name": name} for name in BASELINE_MLJOB_COLUMNS]
+        monkeypatch.setattr(migrations, "inspect", lambda connection: SimpleNamespace(get_columns=lambda table: columns))
+        connection = RecordingConnection()
+
+        convert_to_partitioned(connection, "mljob")
+
+        added = connection.position("ADD COLUMN IF NOT EXISTS created_at")
+        backfilled = connection.position("SET created_at = COALESCE(started_at, CURRENT_TIMESTAMP)")
+        assert added < backfilled < connection.position("min(created_at)")
+        assert backfilled < connection.position("PARTITION BY RANGE (created_at)")
+        assert "ALTER TABLE mljob ALTER COLUMN created_at SET NOT NULL" in connection.statements
+        assert any("ADD COLUMN IF NOT EXISTS previous_job_id" in sql for sql in connection.statements)
+
+    def test_models_declare_no_foreign_keys_to_partitioned_tables(self):
+        referenced = {
+            (table.name, foreign_key.parent.name)
+            for table in SQLModel.metadata.tables.values()
+            for foreign_key in table.foreign_keys
+            if foreign_key.column.table.name in PARTITIONED_TABLES
+        }
+
+        assert referenced == set()
+
+
+class TestPruningAwareQueries:
+    def test_cursor_adds_plain_time_bound(self):
+        cursor = encode_cursor(datetime(2024, 5, 1), 10)
+
+        statement = paginate(select(Transaction), Transaction.trans_time, Transaction.id, 10, cursor)
+
+        sql = str(statement.compile(dialect=postgresql.dialect()))
+        assert "transaction.trans_time <=" in sql
+
+    def test_period_filter(self, session, test_user):
+        for amount in (1, 2, 3):
+            WalletService.credit_wallet(test_user.id, Decimal(amount), session)
+        transactions = WalletService.get_user_transactions(test_user.id, session)
+        transactions[-1].trans_time -= timedelta(days=40)
+        session.add(transactions[-1])
+        session.commit()
+
+        recent = WalletService.get_user_transactions(test_user.id, session, since=datetime.now() - timedelta(days=1))
+        old = WalletService.get_user_transactions(test_user.id, session, until=datetime.now() - timedelta(days=1))
+
+        assert [tx.amount for tx in recent] == [Decimal(3), Decimal(2)]
+        assert [tx.amount for tx in old] == [Decimal(1)]
+
+    def test_snapshot_tail_bounded_by_time(self, session, test_user):
+        WalletService.credit_wallet(test_user.id, Decimal("10"), session)
+        snapshot = WalletService.take_wallet_snapshot(test_user.id, session)
+        WalletService.debit_wallet(test_user.id, Decimal("4"), session)
+
+        assert snapshot.transaction_time is not None
+        assert WalletService.get_ledger_balance(test_user.id, session) == Decimal("6")
@@ -0,0 +1,98 @@
+import os
+import pstats
+import time
+import tracemalloc
+import pytest
+from services.profiling import JobProfiler, StackSampler, folded_stack
+
+
+def busy(seconds=0.05):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        sum(range(1000))
+
+
+@pytest.fixture
+def profiler(tmp_path):
+    return JobProfiler(mode="sample", every=3, output_dir=str(tmp_path), tracemalloc_every=0)
+
+
+class TestSelection:
+    def test_every_nth_job_per_type(self, profiler):
+        picked = [profiler.should_profile("full") for _ in range(6)]
+
+        assert picked == [False, False, True, False, False, True]
+        assert not profiler.should_profile("incremental")
+
+    def test_disabled_unless_requested(self, tmp_path):
+        profiler = JobProfiler(every=0, output_dir=str(tmp_path))
+
+        assert not profiler.should_profile("full")
+        profiler.request_profile()
+        assert profiler.should_profile("full")
+        assert not profiler.should_profile("full")
+
+
+class TestProfiles:
+    def test_sampled_job_writes_folded_stacks(self, profiler):
+        profiler.request_profile()
+
+        with profiler.profile("full", 7) as path:
+            busy()
+
+        lines = open(path, encoding="utf-8").read().splitlines()
+        assert os.path.dirname(path).endswith("full")
+        assert any("busy (test_profiling.py" in line for line in lines)
+        stack, count = lines[0].rsplit(" ", 1)
+        assert int(count) > 0 and ";" in stack
+
+    def test_skipped_job(self, profiler):
+        with profiler.profile("full", 1) as path:
+            pass
+
+        assert path is None
+
+    def test_cprofile_mode(self, tmp_path):
+        profiler = JobProfiler(mode="cprofile", every=1, output_dir=str(tmp_path))
+
+        with profiler.profile("incremental", 8) as path:
+            busy(0.01)
+
+        stats = pstats.Stats(path)
+        assert any(func[2] == "busy" for func in stats.stats)
+
+    def test_folded_stack_order(self):
+        import sys
+        stack = folded_stack(sys._getframe())
+
+        assert stack.endswith(f"test_folded_stack_order ({os.path.basename(__file__)}:{self.test_folded_stack_order.__code__.co_firstlineno})")
+
+    def test_sampler_ignores_unknown_thread(self):
+        sampler = StackSampler(thread_id=-1, interval=0.001).start()
+        time.sleep(0.01)
+
+        assert sampler.stop() == {}
+
+
+class TestMemorySnapshots:
+    def test_first_call_starts_tracing_then_reports_growth(self, profiler):
+        was_tracing = tracemalloc.is_tracing()
+        try:
+            tracemalloc.stop()
+            assert profiler.dump_memory_snapshot() is None
+            assert tracemalloc.is_tracing()
+
+            first = profiler.dump_memory_snapshot()
+            retained = [bytearray(1024) for _ in range(1000)]
+            second = profiler.dump_memory_snapshot()
+
+            report = open(second, encoding="utf-8").read()
+            assert first != second
+            assert "Top allocations" in open(first, encoding="utf-8").read()
+            assert "Growth since previous snapshot" in report
+            assert "test_profiling.py" in report
+            assert os.path.exists(second.replace(".txt", ".tracemalloc"))
+            assert len(retained) == 1000
+        finally:
+            if not was_tracing:
+                tracemalloc.stop()
@@ -0,0 +1,110 @@
+import time
+import numpy as np
+import pytest
+from services.risk_classifier import (
+    RiskClauseClassifier,
+    HashingEmbedder,
+    segment_clauses,
+    clause_hash,
+    risk_classifier
+)
+
+
+@pytest.fixture
+def classifier():
+    return RiskClauseClassifier()
+
+
+class TestSegmentation:
+    def test_splits_sentences_and_lines(self):
+        text = "Арендатор вносит плату ежемесячно. Арендодатель передает помещение по акту.\nДоговор действует один год с момента подписания."
+
+        clauses = segment_clauses(text)
+
+        assert len(clauses) == 3
+        assert clauses[0] == "Арендатор вносит плату ежемесячно"
+
+    def test_short_fragments_skipped(self):
+        assert segment_clauses("1. Итог. Да.") == []
+
+    def test_clause_hash_ignores_case_and_punctuation(self):
+        assert clause_hash("Штраф  составляет 10%.") == clause_hash("штраф составляет 10%")
+        assert clause_hash("штраф составляет 10%") != clause_hash("пеня составляет 10%")
+
+    def test_clause_hash_keeps_numbers(self):
+        assert clause_hash("штраф составляет 0,1%") != clause_hash("штраф составляет 50%")
+
+
+class TestEmbedder:
+    def test_word_forms_share_features(self):
+        embedder = HashingEmbedder()
+        vectors = embedder.embed(["неустойка", "неустойку", "аренда"])
+
+        assert vectors.shape == (3, embedder.dim)
+        assert float(vectors[0] @ vectors[1]) == 1.0
+        assert float(vectors[0] @ vectors[2]) == 0.0
+
+
+class TestClassification:
+    def test_detects_risky_clauses(self, classifier, sample_document_text):
+        result = classifier.analyze(sample_document_text)
+
+        assert result["risk_score"] > 0
+        assert "PENALTY" in result["categories"]
+        assert "DELAY" in result["categories"]
+        penalty = [c for c in result["risk_clauses"] if "пеню" in c["clause_text"]]
+        assert penalty and penalty[0]["risk_level"] == "HIGH"
+
+    def test_neutral_text(self, classifier):
+        result = classifier.analyze("Арендодатель передает помещение площадью сто метров. Стороны подписали акт приема передачи.")
+
+        assert result["risk_score"] == 0.0
+        assert result["risk_clauses"] == []
+
+    def test_result_format_matches_risk_clause(self, classifier):
+        result = classifier.analyze("Исполнитель уплачивает штраф за каждое нарушение сроков поставки товара.")
+
+        assert set(result["risk_clauses"][0]) == {"clause_text", "clause_hash", "risk_level", "explanation", "category", "categories"}
+
+    def test_score_matrix_shape(self, classifier):
+        scores = classifier.score(["штраф за нарушение условий", "стороны подписали договор аренды"])
+
+        assert scores.shape == (2, len(classifier.categories))
+        assert scores[1].max() == 0
+
+    def test_embeddings_cached_per_clause(self, classifier):
+        calls = []
+        original = classifier.embedder.embed
+
+        def counting_embed(texts):
+            calls.append(len(texts))
+            return original(texts)
+
+        classifier.embedder.embed = counting_embed
+        clauses = ["Покупатель уплачивает неустойку за просрочку оплаты", "Поставщик гарантирует качество товара"]
+
+        first = classifier.embed_clauses(clauses)
+        second = classifier.embed_clauses(clauses + ["Новый пункт о расторжении договора сторонами"])
+
+        assert calls == [2, 1]
+        assert np.array_equal(first, second[:2])
+
+    def test_cache_is_bounded(self):
+        classifier = RiskClauseClassifier(cache_size=2)
+
+        classifier.embed_clauses(["первый пункт договора аренды", "второй пункт договора аренды", "третий пункт договора аренды"])
+
+        assert len(classifier._cache) == 2
+
+    def test_thousands_of_clauses_per_second(self, classifier):
+        clauses = [f"Пункт {i}. Покупатель уплачивает неустойку {i}% за каждый день просрочки" for i in range(5000)]
+
+        started = time.perf_counter()
+        results = classifier.classify_clauses(clauses)
+        elapsed = time.perf_counter() - started
+
+        assert all(result and result["risk_level"] == "HIGH" for result in results)
+        assert len(clauses) / elapsed > 1000
+
+    def test_shared_instance(self):
+        assert isinstance(risk_classifier, RiskClauseClassifier)
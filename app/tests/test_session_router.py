@@ -0,0 +1,96 @@
+import time
+import pytest
+from fastapi import Depends, FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine, select, func
+import database.database as database
+from database.database import get_read_session
+from database.session_router import STICKY_COOKIE, ReadYourWritesMiddleware, choose_engine, prefers_primary
+from models.model import Model
+
+
+def sqlite_engine():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    return engine
+
+
+@pytest.fixture
+def engines(monkeypatch):
+    """Основная БД и «отстающая» реплика - две отдельные SQLite базы"""
+    primary, replica = sqlite_engine(), sqlite_engine()
+    monkeypatch.setattr(database, "engine", primary)
+    monkeypatch.setattr(database, "read_engine", replica)
+    return primary, replica
+
+
+@pytest.fixture
+def app(engines):
+    primary, _ = engines
+    app = FastAPI()
+    app.add_middleware(ReadYourWritesMiddleware, seconds=30)
+
+    @app.post("/models")
+    def create_model(name: str):
+        if not name:
+            raise HTTPException(status_code=400, detail="name required")
+        with Session(primary) as session:
+            session.add(Model(name=name, price_per_token=0.001))
+            session.commit()
+        return {"ok": True}
+
+    @app.get("/models/count")
+    def count_models(session=Depends(get_read_session)):
+        return {"count": session.exec(select(func.count(Model.id))).one()}
+
+    return app
+
+
+class TestChooseEngine:
+    def test_replica_by_default(self, engines):
+        primary, replica = engines
+
+        assert choose_engine(primary, replica, {}) is replica
+
+    def test_primary_while_sticky(self, engines):
+        primary, replica = engines
+
+        until = str(time.time() + 60)
+
+        assert choose_engine(primary, replica, {STICKY_COOKIE: until}) is primary
+        assert not prefers_primary({STICKY_COOKIE: "200"}, now=300)
+        assert not prefers_primary({STICKY_COOKIE: "garbage"})
+
+    def test_without_replica(self, engines):
+        primary, _ = engines
+
+        assert choose_engine(primary, primary, {}) is primary
+
+
+class TestReadYourWrites:
+    def test_reads_go_to_replica(self, app):
+        client = TestClient(app)
+
+        response = client.get("/models/count")
+
+        assert response.json() == {"count": 0}
+        assert STICKY_COOKIE not in response.cookies
+
+    def test_writer_reads_own_write(self, app):
+        writer, other = TestClient(app), TestClient(app)
+
+        response = writer.post("/models", params={"name": "fresh"})
+
+        assert STICKY_COOKIE in response.cookies
+        assert writer.get("/models/count").json() == {"count": 1}
+        assert other.get("/models/count").json() == {"count": 0}
+
+    def test_failed_write_is_not_sticky(self, app):
+        client = TestClient(app)
+
+        response = client.post("/models", params={"name": ""})
+
+        assert response.status_code == 400
+        assert STICKY_COOKIE not in response.cookies
+        assert client.get("/models/count").json() == {"count": 0}
@@ -0,0 +1,137 @@
+import json
+from types import SimpleNamespace
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+import services.tracing as tracing
+from models.model import Model
+from services.rabbitmq_config import MLTaskPublisher, RabbitMQConfig
+from services.tracing import (
+    BatchSpanProcessor, FileSpanExporter, InMemorySpanExporter, Span, SpanContext,
+    TracingMiddleware, current_span, extract, inject, start_span
+)
+
+
+@pytest.fixture
+def exporter(monkeypatch):
+    exporter = InMemorySpanExporter()
+    processor = BatchSpanProcessor(exporter)
+    monkeypatch.setattr(tracing, "_processor", processor)
+    exporter.flush = processor.force_flush
+    return exporter
+
+
+def by_name(exporter):
+    exporter.flush()
+    return {span.name: span for span in exporter.spans}
+
+
+class TestPropagation:
+    def test_inject_extract_roundtrip(self, exporter):
+        with start_span("upload", root=True) as span:
+            headers = inject({"content_type": "json"})
+
+        context = extract(headers)
+
+        assert context == SpanContext(span.context.trace_id, span.context.span_id)
+        assert headers["content_type"] == "json"
+
+    @pytest.mark.parametrize("headers", [None, {}, {"traceparent": "garbage"}, {"traceparent": b"00-xyz"}])
+    def test_invalid_context(self, headers):
+        assert extract(headers) is None
+
+    def test_no_child_span_outside_trace(self, exporter):
+        with start_span("orphan") as span:
+            assert span is None
+
+        assert by_name(exporter) == {}
+
+
+class TestSpans:
+    def test_nesting_and_errors(self, exporter):
+        with pytest.raises(ValueError):
+            with start_span("job", root=True):
+                with start_span("hf.request", kind="CLIENT", model="m"):
+                    raise ValueError("timeout")
+
+        spans = by_name(exporter)
+        assert spans["hf.request"].parent_id == spans["job"].context.span_id
+        assert spans["hf.request"].context.trace_id == spans["job"].context.trace_id
+        assert spans["hf.request"].status == "ERROR"
+        assert spans["hf.request"].attributes == {"model": "m"}
+        assert current_span() is None
+
+    def test_db_commit_span(self, exporter, session):
+        with start_span("request", root=True) as root:
+            session.add(Model(name="traced", price_per_token=0.001))
+            session.commit()
+
+        commit = by_name(exporter)["db.commit"]
+        assert commit.parent_id == root.context.span_id
+        assert commit.end_ns >= commit.start_ns
+
+    def test_file_exporter(self, tmp_path):
+        path = tmp_path / "traces.jsonl"
+        span = Span(name="job", context=SpanContext("a" * 32, "b" * 16), end_ns=1)
+
+        FileSpanExporter(str(path)).export([span])
+
+        assert json.loads(path.read_text())["trace_id"] == "a" * 32
+
+    def test_file_exporter_rotates_by_size(self, tmp_path):
+        path = tmp_path / "traces.jsonl"
+        span = Span(name="job", context=SpanContext("a" * 32, "b" * 16), end_ns=1)
+        exporter = FileSpanExporter(str(path), max_bytes=1)
+
+        exporter.export([span])
+        exporter.export([span])
+
+        assert len(path.read_text().splitlines()) == 1
+        assert len((tmp_path / "traces.jsonl.1").read_text().splitlines()) == 1
+
+
+class TestAcrossServices:
+    def test_publish_carries_context(self, exporter):
+        published = {}
+        publisher = MLTaskPublisher(RabbitMQConfig())
+        publisher.channel = SimpleNamespace(basic_publish=lambda **kwargs: published.update(kwargs))
+
+        with start_span("POST /predict/upload", root=True) as root:
+            assert publisher.publish_ml_task(1, 2, 3)
+
+        context = extract(published["properties"].headers)
+        spans = by_name(exporter)
+        assert context.trace_id == root.context.trace_id
+        assert context.span_id == spans["rabbitmq.publish"].context.span_id
+
+    def test_worker_continues_trace(self, exporter, monkeypatch):
+        from ml_worker import MLWorker
+
+        worker = MLWorker("worker-test", concurrency=1)
+        seen = {}
+        monkeypatch.setattr(worker, "_run_ml_task", lambda ch, tag, body: seen.update(span=current_span()))
+        headers = {"traceparent": f"00-{'c' * 32}-{'d' * 16}-01"}
+
+        worker._process_ml_task(None, 1, b"{}", headers)
+
+        assert seen["span"].context.trace_id == "c" * 32
+        assert seen["span"].parent_id == "d" * 16
+        assert by_name(exporter)["ml_task.process"].kind == "CONSUMER"
+
+    def test_http_server_span(self, exporter):
+        app = FastAPI()
+        app.add_middleware(TracingMiddleware)
+
+        @app.get("/jobs/{job_id}")
+        def job(job_id: int):
+            with start_span("db.load"):
+                return {"id": job_id}
+
+        response = TestClient(app).get("/jobs/5", headers={"traceparent": f"00-{'e' * 32}-{'f' * 16}-01"})
+
+        spans = by_name(exporter)
+        server = spans["GET /jobs/{job_id}"]
+        assert response.headers["x-trace-id"] == "e" * 32
+        assert server.kind == "SERVER"
+        assert server.attributes["http.status_code"] == 200
+        assert spans["db.load"].parent_id == server.context.span_id
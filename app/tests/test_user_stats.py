@@ -0,0 +1,133 @@
+import asyncio
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+import pytest
+from unittest.mock import MagicMock
+from services.crud import document as DocumentService
+from services.crud import mljob as MLJobService
+from services.crud import model as ModelService
+from services.crud import stats as StatsService
+from routes.stats import get_user_stats
+
+
+@pytest.fixture
+def finish_job(session, test_user):
+    model = ModelService.create_model(name="stats_model", session=session, price_per_token=0.001)
+
+    def finish(risk_score=None, credits="1.5", error=False, user_id=None, finished_at=None):
+        owner_id = user_id or test_user.id
+        document = DocumentService.create_document(owner_id, "doc.txt", "текст договора", 4, session)
+        job = MLJobService.create_mljob(document.id, model.id, session)
+        if error:
+            job.finish_error("сбой")
+        else:
+            job.used_credits = Decimal(credits)
+            job.finish_ok("Конспект", risk_score)
+        if finished_at:
+            job.finished_at = finished_at
+        session.add(job)
+        StatsService.record_job_finished(owner_id, job, session)
+        session.commit()
+        return job
+
+    return finish
+
+
+class TestDailyStats:
+    def test_counters_accumulate(self, session, test_user, finish_job):
+        finish_job(0.1)
+        finish_job(0.5)
+        finish_job(0.9, credits="2")
+        finish_job(error=True)
+
+        rows = StatsService.get_user_daily_stats(test_user.id, session)
+
+        assert len(rows) == 1
+        row = rows[0]
+        assert (row.done_count, row.error_count) == (3, 1)
+        assert (row.risk_low, row.risk_medium, row.risk_high) == (1, 1, 1)
+        assert Decimal(str(row.used_credits)) == Decimal("5")
+        assert row.risk_score_sum == pytest.approx(1.5)
+
+    def test_rows_per_day_and_user(self, session, test_user, finish_job):
+        yesterday = datetime.now() - timedelta(days=1)
+        finish_job(0.2, finished_at=yesterday)
+        finish_job(0.2)
+        finish_job(0.2, user_id=test_user.id + 1)
+
+        rows = StatsService.get_user_daily_stats(test_user.id, session)
+
+        assert [row.day for row in rows] == [yesterday.date(), date.today()]
+        assert StatsService.get_user_stats_totals(test_user.id, session)["done_count"] == 2
+
+    def test_rebuild_matches_incremental(self, session, test_user, finish_job):
+        finish_job(0.1)
+        finish_job(0.75, credits="3")
+        finish_job(error=True)
+        finish_job(0.4, finished_at=datetime.now() - timedelta(days=3))
+        incremental = StatsService.get_user_stats_totals(test_user.id, session)
+
+        assert StatsService.rebuild_daily_stats(session, user_id=test_user.id) == 2
+
+        rebuilt = StatsService.get_user_stats_totals(test_user.id, session)
+        assert rebuilt["done_count"] == incremental["done_count"] == 3
+        assert rebuilt["error_count"] == 1
+        assert (rebuilt["risk_low"], rebuilt["risk_medium"], rebuilt["risk_high"]) == (1, 1, 1)
+        assert Decimal(str(rebuilt["used_credits"])) == Decimal(str(incremental["used_credits"]))
+
+    def test_empty_totals(self, session, test_user):
+        totals = StatsService.get_user_stats_totals(test_user.id, session)
+
+        assert totals["done_count"] == 0
+        assert not StatsService.has_daily_stats(session)
+
+
+class TestStartupLock:
+    def test_postgres_takes_transaction_lock(self):
+        from database.locks import advisory_xact_lock
+
+        session = MagicMock(spec=["get_bind", "execute"])
+        session.get_bind.return_value.dialect.name = "postgresql"
+
+        advisory_xact_lock(session, "contract_check:daily_stats")
+
+        statement, params = session.execute.call_args[0]
+        assert "pg_advisory_xact_lock" in str(statement)
+        assert params == {"name": "contract_check:daily_stats"}
+
+    def test_other_databases_are_not_locked(self):
+        from database.locks import advisory_xact_lock
+
+        connection = MagicMock(spec=["dialect", "execute"])
+        connection.dialect.name = "sqlite"
+
+        advisory_xact_lock(connection)
+
+        connection.execute.assert_not_called()
+
+
+class TestStatsEndpoint:
+    def call(self, session, user_id, days=30):
+        return asyncio.run(get_user_stats(days=days, current_user={"user_id": user_id}, session=session))
+
+    def test_summary(self, session, test_user, finish_job):
+        finish_job(0.2)
+        finish_job(0.8)
+        finish_job(error=True)
+        finish_job(0.5, finished_at=datetime.now() - timedelta(days=40))
+
+        response = self.call(session, test_user.id)
+
+        assert response.total_jobs == 4
+        assert response.done_count == 3
+        assert response.average_risk == pytest.approx(0.5)
+        assert response.risk_distribution.high == 1
+        assert len(response.daily) == 1
+        assert response.daily[0].error_count == 1
+
+    def test_no_jobs(self, session, test_user):
+        response = self.call(session, test_user.id)
+
+        assert response.total_jobs == 0
+        assert response.average_risk is None
+        assert response.daily == []
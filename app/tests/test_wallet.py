@@ -151,6 +151,20 @@ class TestWalletDebit:
         with pytest.raises(ValueError, match="Insufficient balance"):
             debit_wallet(user.id, debit_amount, session)
 
+    def test_insufficient_debit_keeps_caller_changes(self, session, sample_user_data):
+        user = create_user(sample_user_data, session)
+        credit_wallet(user.id, Decimal("10.00"), session)
+        user.username = "renamed"
+        session.add(user)
+
+        with pytest.raises(ValueError, match="Insufficient balance"):
+            debit_wallet(user.id, Decimal("50.00"), session)
+
+        session.commit()
+        session.expire_all()
+        assert user.username == "renamed"
+        assert get_wallet_by_user_id(user.id, session).balance == Decimal("10.00")
+
     def test_debit_wallet_exact_balance(self, session, sample_user_data):
         user = create_user(sample_user_data, session)
         
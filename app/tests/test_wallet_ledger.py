@@ -0,0 +1,117 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+import pytest
+from sqlalchemy import event
+from models.transaction import Transaction
+from services.crud import wallet as WalletService
+from services.wallet_reconciliation import reconcile_wallets, take_wallet_snapshots
+
+
+def post(session, user_id, *amounts):
+    """Положительные суммы - зачисления, отрицательные - списания"""
+    for amount in amounts:
+        if amount >= 0:
+            WalletService.credit_wallet(user_id, Decimal(str(amount)), session)
+        else:
+            WalletService.debit_wallet(user_id, Decimal(str(-amount)), session)
+
+
+class TestLedger:
+    def test_running_balance(self, session, test_user):
+        post(session, test_user.id, 100, -30, 5)
+
+        transactions = WalletService.get_user_transactions(test_user.id, session)
+
+        assert [tx.balance_after for tx in reversed(transactions)] == [Decimal("100"), Decimal("70"), Decimal("75")]
+        assert WalletService.get_ledger_balance(test_user.id, session) == Decimal("75")
+
+    def test_failed_debit_leaves_no_trace(self, session, test_user):
+        post(session, test_user.id, 10)
+
+        with pytest.raises(ValueError):
+            post(session, test_user.id, -20)
+
+        assert WalletService.count_user_transactions(test_user.id, session) == 1
+        assert WalletService.get_wallet_by_user_id(test_user.id, session).balance == Decimal("10")
+
+    def test_snapshot_plus_tail(self, session, test_user):
+        post(session, test_user.id, 100, -40)
+        snapshot = WalletService.take_wallet_snapshot(test_user.id, session)
+        post(session, test_user.id, 15, -5)
+
+        totals = WalletService.get_ledger_totals(test_user.id, session)
+
+        assert snapshot.balance == Decimal("60")
+        assert totals["balance"] == Decimal("70")
+        assert totals["tail_count"] == 2
+        assert totals["debited_total"] == Decimal("45")
+
+    def test_balance_reads_only_tail(self, session, test_user):
+        post(session, test_user.id, *([1] * 20))
+        WalletService.take_wallet_snapshot(test_user.id, session)
+        post(session, test_user.id, 2)
+        user_id = test_user.id
+        statements = []
+        event.listen(session.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+        assert WalletService.get_ledger_balance(user_id, session) == Decimal("22")
+        assert len(statements) == 2
+
+    def test_snapshot_skipped_for_short_tail(self, session, test_user):
+        post(session, test_user.id, 1, 2)
+
+        assert WalletService.take_wallet_snapshot(test_user.id, session, min_tail=3) is None
+        assert WalletService.take_wallet_snapshot(test_user.id, session, min_tail=2) is not None
+        assert WalletService.take_wallet_snapshot(test_user.id, session) is None
+
+    def test_month_spending(self, session, test_user):
+        post(session, test_user.id, 100, -10, -15)
+        old_debit = WalletService.debit_wallet(test_user.id, Decimal("20"), session)
+        old_debit.trans_time = datetime.now().replace(day=1) - timedelta(days=1)
+        session.add(old_debit)
+        session.commit()
+
+        assert WalletService.get_month_spending(test_user.id, session) == Decimal("25")
+
+
+class TestReconciliation:
+    def test_consistent_ledger(self, session, test_user):
+        post(session, test_user.id, 50, -20)
+        post(session, test_user.id + 1, 7)
+        WalletService.take_wallet_snapshot(test_user.id, session)
+        post(session, test_user.id, -5)
+
+        report = reconcile_wallets(session, batch_size=2)
+
+        assert report.ok
+        assert report.users_checked == 2
+        assert report.transactions_checked == 4
+        assert report.snapshots_checked == 1
+
+    def test_detects_drift(self, session, test_user):
+        post(session, test_user.id, 50, -20)
+        wallet = WalletService.get_wallet_by_user_id(test_user.id, session)
+        WalletService.update_wallet_balance(wallet.id, Decimal("100"), session)
+        session.add(Transaction(user_id=test_user.id, tx_type="CREDIT", amount=Decimal("1"), balance_after=Decimal("99")))
+        session.commit()
+
+        report = reconcile_wallets(session)
+
+        assert {item.kind for item in report.discrepancies} == {"balance_after", "wallet_balance"}
+        wallet_issue = next(item for item in report.discrepancies if item.kind == "wallet_balance")
+        assert (wallet_issue.expected, wallet_issue.actual) == (Decimal("31"), Decimal("100"))
+
+    def test_wallet_without_transactions(self, session, test_user):
+        wallet = WalletService.get_or_create_wallet(test_user.id, session)
+        WalletService.update_wallet_balance(wallet.id, Decimal("5"), session)
+
+        report = reconcile_wallets(session)
+
+        assert [item.kind for item in report.discrepancies] == ["wallet_without_ledger"]
+
+    def test_periodic_snapshots(self, session, test_user):
+        post(session, test_user.id, 1, 1, 1)
+        post(session, test_user.id + 1, 1)
+
+        assert take_wallet_snapshots(session, min_tail=2, batch_size=1) == 1
+        assert reconcile_wallets(session).ok
@@ -0,0 +1,222 @@
+import os
+import signal
+import sys
+import time
+from types import SimpleNamespace
+import pytest
+from prometheus_client import REGISTRY
+from services.metrics import ML_WORKER_PROCESSES, QUEUE_DEPTH
+from worker_supervisor import WORKER_METRICS_BASE_PORT, QueueStats, ScalingPolicy, WorkerSupervisor, fork_worker
+
+# Заменяет ml_worker.py: ждёт SIGTERM, "дорабатывает" задачу и выходит
+FAKE_WORKER = """
+import signal, sys, time
+stop = []
+signal.signal(signal.SIGTERM, lambda *args: stop.append(1))
+while not stop:
+    time.sleep(0.01)
+time.sleep(float(sys.argv[1]))
+"""
+
+
+def fake_worker(drain_seconds: float = 0.0):
+    return lambda worker_id: [sys.executable, "-c", FAKE_WORKER, str(drain_seconds)]
+
+
+# Общий для родителя и дочерних процессов ресурс, загруженный до fork
+SHARED_ASSET = {"lexicon": "предзагружен"}
+
+
+def forked_worker(output_dir):
+    """Цель fork: отчитывается об унаследованных данных и ждёт SIGTERM"""
+    def run(worker_id: str) -> int:
+        stop = []
+        signal.signal(signal.SIGTERM, lambda *args: stop.append(1))
+        report = f"{SHARED_ASSET['lexicon']} {os.environ['ML_WORKER_METRICS_PORT']}"
+        (output_dir / worker_id).write_text(report, encoding="utf-8")
+        while not stop:
+            time.sleep(0.01)
+        return 3
+    return run
+
+
+def wait_for(condition, timeout: float = 5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.02)
+
+
+class StaticSource:
+    def __init__(self, stats=None):
+        self.stats = stats or QueueStats(ready=0, consumers=0)
+
+    def fetch(self):
+        if isinstance(self.stats, Exception):
+            raise self.stats
+        return self.stats
+
+
+@pytest.fixture
+def policy():
+    return ScalingPolicy(min_workers=1, max_workers=4, concurrency=2, backlog_per_slot=1,
+                         scale_down_after=30, scale_down_utilisation=0.5)
+
+
+class TestScalingPolicy:
+    def test_scales_up_with_backlog(self, policy):
+        assert policy.desired(1, QueueStats(ready=10, consumers=1, unacked=2), now=0) == 3
+        assert policy.desired(1, QueueStats(ready=500, consumers=1, unacked=2), now=0) == 4
+
+    def test_keeps_minimum(self, policy):
+        assert policy.desired(0, QueueStats(ready=0, consumers=0, unacked=0), now=0) == 1
+
+    def test_scales_down_one_at_a_time_after_sustained_idle(self, policy):
+        idle = QueueStats(ready=0, consumers=3, unacked=0)
+
+        assert policy.desired(3, idle, now=0) == 3
+        assert policy.desired(3, idle, now=29) == 3
+        assert policy.desired(3, idle, now=30) == 2
+        assert policy.desired(2, idle, now=31) == 2
+        assert policy.desired(2, idle, now=60) == 1
+
+    def test_busy_workers_are_not_retired(self, policy):
+        busy = QueueStats(ready=0, consumers=3, unacked=4)
+
+        for now in (0, 100, 200):
+            assert policy.desired(3, busy, now=now) == 3
+
+    def test_load_resets_idle_timer(self, policy):
+        idle = QueueStats(ready=0, consumers=2, unacked=0)
+
+        policy.desired(2, idle, now=0)
+        policy.desired(2, QueueStats(ready=1, consumers=2, unacked=0), now=20)
+        assert policy.desired(2, idle, now=40) == 2
+        assert policy.desired(2, idle, now=70) == 1
+
+    def test_management_utilisation_without_unacked(self, policy):
+        stats = QueueStats(ready=0, consumers=2, utilisation=0.9)
+
+        assert policy.desired(2, stats, now=0) == 2
+        assert policy.desired(2, stats, now=100) == 2
+
+
+class TestWorkerSupervisor:
+    def test_spawns_drains_and_reuses_slots(self, policy):
+        source = StaticSource(QueueStats(ready=6, consumers=0, unacked=0))
+        supervisor = WorkerSupervisor(source, policy, command=fake_worker(0.2), drain_timeout=5)
+        try:
+            assert supervisor.tick() == 2
+            assert sorted(worker.worker_id for worker in supervisor.active) == ["worker-1", "worker-2"]
+
+            supervisor.scale(1)
+            draining = supervisor.workers[1]
+            assert draining.draining and len(supervisor.active) == 1
+            wait_for(lambda: draining.process.poll() is not None)
+            supervisor.reap()
+            assert list(supervisor.workers) == [0]
+
+            supervisor.scale(2)
+            assert supervisor.workers[1].worker_id == "worker-2"
+        finally:
+            supervisor.shutdown()
+        assert not supervisor.workers
+
+    def test_replaces_crashed_worker(self, policy):
+        supervisor = WorkerSupervisor(StaticSource(), policy, command=fake_worker(), drain_timeout=5)
+        try:
+            supervisor.tick()
+            crashed = supervisor.workers[0].process
+            crashed.kill()
+            crashed.wait()
+
+            supervisor.tick()
+            assert supervisor.workers[0].process is not crashed
+        finally:
+            supervisor.shutdown()
+
+    def test_kills_worker_after_drain_timeout(self, policy):
+        supervisor = WorkerSupervisor(StaticSource(), policy, command=fake_worker(60), drain_timeout=0.1)
+        supervisor.tick()
+        process = supervisor.workers[0].process
+
+        started = time.monotonic()
+        supervisor.shutdown()
+
+        assert process.poll() is not None and time.monotonic() - started < 5
+
+    def test_unavailable_stats_keep_pool(self, policy):
+        supervisor = WorkerSupervisor(StaticSource(ConnectionError("down")), policy, command=fake_worker())
+        try:
+            assert supervisor.tick() == 1
+        finally:
+            supervisor.shutdown()
+
+
+class TestWorkerDrain:
+    def test_request_stop_schedules_cancel_on_connection_thread(self):
+        from ml_worker import MLWorker
+        worker = MLWorker("test-worker", concurrency=1)
+        callbacks = []
+        worker.channel = SimpleNamespace(stop_consuming=lambda: None)
+        worker.connection = SimpleNamespace(add_callback_threadsafe=callbacks.append)
+
+        worker.request_stop()
+
+        assert callbacks == [worker.channel.stop_consuming]
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="fork доступен только в POSIX")
+class TestForkedWorkers:
+    def test_children_inherit_preloaded_assets(self, policy, tmp_path):
+        source = StaticSource(QueueStats(ready=6, consumers=0, unacked=0))
+        supervisor = WorkerSupervisor(source, policy, fork_target=forked_worker(tmp_path), drain_timeout=5)
+        try:
+            supervisor.tick()
+            wait_for(lambda: len(list(tmp_path.iterdir())) == 2)
+            reports = {path.name: path.read_text(encoding="utf-8") for path in tmp_path.iterdir()}
+            ports = [WORKER_METRICS_BASE_PORT + slot if WORKER_METRICS_BASE_PORT else 0 for slot in (0, 1)]
+
+            assert reports == {"worker-1": f"предзагружен {ports[0]}", "worker-2": f"предзагружен {ports[1]}"}
+        finally:
+            supervisor.shutdown()
+        assert not supervisor.workers
+
+    def test_child_drops_supervisor_gauges(self, tmp_path):
+        ML_WORKER_PROCESSES.labels(state="active").set(4)
+        QUEUE_DEPTH.labels(queue="ml_tasks_queue").set(12)
+
+        def report(worker_id: str) -> int:
+            samples = [REGISTRY.get_sample_value("ml_worker_processes", {"state": "active"}),
+                       REGISTRY.get_sample_value("rabbitmq_queue_messages", {"queue": "ml_tasks_queue"})]
+            (tmp_path / worker_id).write_text(repr(samples), encoding="utf-8")
+            return 0
+
+        process = fork_worker(report, "worker-1", {})
+
+        assert process.wait() == 0
+        assert (tmp_path / "worker-1").read_text(encoding="utf-8") == "[None, None]"
+        assert REGISTRY.get_sample_value("ml_worker_processes", {"state": "active"}) == 4
+
+    def test_drained_child_exit_code_is_reaped(self, policy, tmp_path):
+        supervisor = WorkerSupervisor(StaticSource(), policy, fork_target=forked_worker(tmp_path), drain_timeout=5)
+        supervisor.tick()
+        process = supervisor.workers[0].process
+        wait_for(lambda: (tmp_path / "worker-1").exists())
+
+        supervisor.shutdown()
+
+        assert process.returncode == 3
+
+    def test_replaces_crashed_child(self, policy, tmp_path):
+        supervisor = WorkerSupervisor(StaticSource(), policy, fork_target=forked_worker(tmp_path), drain_timeout=5)
+        try:
+            supervisor.tick()
+            crashed = supervisor.workers[0].process
+            crashed.kill()
+            assert crashed.wait() == -signal.SIGKILL
+
+            supervisor.tick()
+            assert supervisor.workers[0].process is not crashed
+        finally:
+            supervisor.shutdown()
@@ -0,0 +1,354 @@
+"""
+Супервизор пула ML worker: одна точка входа вместо фиксированных
+ml-worker-1..3. Следит за глубиной ml_tasks_queue и загрузкой потребителей
+и держит от ML_WORKERS_MIN до ML_WORKERS_MAX процессов ml_worker.py.
+
+Источник статистики (ML_SCALE_SOURCE):
+    management - HTTP API плагина management (RABBITMQ_MANAGEMENT_URL):
+                 готовые и неподтверждённые сообщения, потребители, загрузка;
+    amqp       - пассивное объявление очереди (без плагина): только готовые
+                 сообщения и число потребителей.
+
+Масштабирование вверх - сразу по очереди, вниз - по одному процессу после
+ML_SCALE_DOWN_AFTER секунд низкой нагрузки. Выводимый процесс получает
+SIGTERM: перестаёт брать задачи, дорабатывает и подтверждает начатые; через
+ML_WORKER_DRAIN_TIMEOUT секунд он завершается принудительно, и
+неподтверждённые сообщения RabbitMQ вернёт в очередь.
+
+С ML_WORKER_PRELOAD=1 супервизор один раз загружает общие ресурсы
+(ml_worker.preload_shared_assets) и порождает worker через os.fork вместо
+нового интерпретатора: процессы делят эти страницы памяти копированием при
+записи и стартуют без повторного импорта и загрузки.
+
+Запуск: python worker_supervisor.py [префикс-id]
+"""
+import math
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+from urllib.parse import quote
+import requests
+from config.logging_config import app_logger, stop_logging
+from services.metrics import (
+    ML_WORKER_PROCESSES, QUEUE_CONSUMERS, QUEUE_DEPTH, reset_supervisor_metrics, start_worker_metrics_server
+)
+from services.rabbitmq_config import RabbitMQConfig
+
+WORKERS_MIN = int(os.getenv("ML_WORKERS_MIN", "1"))
+WORKERS_MAX = int(os.getenv("ML_WORKERS_MAX", "4"))
+WORKER_CONCURRENCY = int(os.getenv("ML_WORKER_CONCURRENCY", "4"))
+SCALE_INTERVAL = float(os.getenv("ML_SCALE_INTERVAL", "10"))
+SCALE_BACKLOG_PER_SLOT = float(os.getenv("ML_SCALE_BACKLOG_PER_SLOT", "2"))
+SCALE_DOWN_AFTER = float(os.getenv("ML_SCALE_DOWN_AFTER", "120"))
+SCALE_DOWN_UTILISATION = float(os.getenv("ML_SCALE_DOWN_UTILISATION", "0.5"))
+DRAIN_TIMEOUT = float(os.getenv("ML_WORKER_DRAIN_TIMEOUT", "600"))
+SUPERVISOR_METRICS_PORT = int(os.getenv("ML_SUPERVISOR_METRICS_PORT", "9099"))
+WORKER_METRICS_BASE_PORT = int(os.getenv("ML_WORKER_METRICS_PORT", "9100"))
+WORKER_PRELOAD = os.getenv("ML_WORKER_PRELOAD", "0") == "1"
+
+
+@dataclass
+class QueueStats:
+    ready: int
+    consumers: int
+    unacked: Optional[int] = None
+    utilisation: Optional[float] = None
+
+
+class ManagementQueueStats:
+    """Статистика очереди из HTTP API management (/api/queues/<vhost>/<queue>)"""
+
+    def __init__(self, config: RabbitMQConfig, url: str = None, timeout: float = 5):
+        self.config = config
+        self.url = (url or os.getenv("RABBITMQ_MANAGEMENT_URL") or f"http://{config.host}:15672").rstrip("/")
+        self.timeout = timeout
+
+    def fetch(self) -> QueueStats:
+        response = requests.get(
+            f"{self.url}/api/queues/{quote(self.config.virtual_host, safe='')}/{self.config.ml_queue_name}",
+            auth=(self.config.username, self.config.password),
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+        data = response.json()
+        return QueueStats(
+            ready=data.get("messages_ready", 0),
+            consumers=data.get("consumers", 0),
+            unacked=data.get("messages_unacknowledged", 0),
+            utilisation=data.get("consumer_utilisation")
+        )
+
+
+class AMQPQueueStats:
+    """Статистика через пассивное объявление очереди; соединение открывается заново при обрыве"""
+
+    def __init__(self, config: RabbitMQConfig):
+        self.config = config
+        self.connection = None
+        self.channel = None
+
+    def fetch(self) -> QueueStats:
+        if self.connection is None or self.connection.is_closed:
+            self.connection = self.config.get_connection()
+            self.channel = self.connection.channel()
+        try:
+            method = self.channel.queue_declare(queue=self.config.ml_queue_name, passive=True).method
+        except Exception:
+            self.connection = None
+            raise
+        return QueueStats(ready=method.message_count, consumers=method.consumer_count)
+
+
+def get_queue_stats_source(config: RabbitMQConfig):
+    source = os.getenv("ML_SCALE_SOURCE") or ("management" if os.getenv("RABBITMQ_MANAGEMENT_URL") else "amqp")
+    if source == "management":
+        return ManagementQueueStats(config)
+    return AMQPQueueStats(config)
+
+
+@dataclass
+class ScalingPolicy:
+    """
+    Желаемое число процессов: очередь делится на слоты (concurrency каждого
+    процесса), на слот допускается backlog_per_slot ожидающих задач.
+    """
+    min_workers: int = WORKERS_MIN
+    max_workers: int = WORKERS_MAX
+    concurrency: int = WORKER_CONCURRENCY
+    backlog_per_slot: float = SCALE_BACKLOG_PER_SLOT
+    scale_down_after: float = SCALE_DOWN_AFTER
+    scale_down_utilisation: float = SCALE_DOWN_UTILISATION
+
+    def __post_init__(self):
+        self._low_since: Optional[float] = None
+
+    def clamp(self, workers: int) -> int:
+        return max(self.min_workers, min(self.max_workers, workers))
+
+    def utilisation(self, stats: QueueStats, current: int) -> Optional[float]:
+        """Доля занятых слотов: по неподтверждённым сообщениям, иначе по оценке management"""
+        if stats.unacked is not None and current:
+            return min(1.0, stats.unacked / (current * self.concurrency))
+        return stats.utilisation
+
+    def desired(self, current: int, stats: QueueStats, now: float) -> int:
+        in_flight = stats.unacked or 0
+        wanted = self.clamp(math.ceil((stats.ready + in_flight) / (self.concurrency * (1 + self.backlog_per_slot))))
+        if current < self.min_workers or wanted > current:
+            self._low_since = None
+            return max(wanted, self.clamp(current))
+
+        utilisation = self.utilisation(stats, current)
+        busy = utilisation is not None and utilisation > self.scale_down_utilisation
+        if wanted == current or busy or stats.ready:
+            self._low_since = None
+            return self.clamp(current)
+
+        if self._low_since is None:
+            self._low_since = now
+        if now - self._low_since < self.scale_down_after:
+            return current
+        self._low_since = now
+        return current - 1
+
+
+class ForkedProcess:
+    """Дочерний процесс os.fork с интерфейсом subprocess.Popen, который использует супервизор"""
+
+    def __init__(self, pid: int):
+        self.pid = pid
+        self.returncode: Optional[int] = None
+
+    def poll(self) -> Optional[int]:
+        if self.returncode is None:
+            pid, status = os.waitpid(self.pid, os.WNOHANG)
+            if pid:
+                self.returncode = os.waitstatus_to_exitcode(status)
+        return self.returncode
+
+    def wait(self) -> int:
+        if self.returncode is None:
+            _, status = os.waitpid(self.pid, 0)
+            self.returncode = os.waitstatus_to_exitcode(status)
+        return self.returncode
+
+    def send_signal(self, signum: int) -> None:
+        if self.poll() is None:
+            os.kill(self.pid, signum)
+
+    def kill(self) -> None:
+        self.send_signal(signal.SIGKILL)
+
+
+def fork_worker(target: Callable[[str], int], worker_id: str, env: Dict[str, str]) -> ForkedProcess:
+    """Запустить target(worker_id) в дочернем процессе, унаследовавшем память супервизора"""
+    pid = os.fork()
+    if pid:
+        return ForkedProcess(pid)
+
+    code = 1
+    try:
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        os.environ.update(env)
+        reset_supervisor_metrics()
+        code = target(worker_id) or 0
+    except SystemExit as e:
+        code = e.code if isinstance(e.code, int) else 1
+    except BaseException as e:
+        app_logger.error(f"Критическая ошибка {worker_id}: {e}")
+    finally:
+        stop_logging()
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(code)
+
+
+class WorkerProcess:
+    def __init__(self, slot: int, worker_id: str, process):
+        self.slot = slot
+        self.worker_id = worker_id
+        self.process = process
+        self.drain_deadline: Optional[float] = None
+
+    @property
+    def draining(self) -> bool:
+        return self.drain_deadline is not None
+
+    def drain(self, timeout: float) -> None:
+        if not self.draining:
+            self.drain_deadline = time.monotonic() + timeout
+            self.process.send_signal(signal.SIGTERM)
+
+
+def worker_command(worker_id: str) -> List[str]:
+    return [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "ml_worker.py"), worker_id]
+
+
+class WorkerSupervisor:
+    """Запуск, вывод и перезапуск процессов worker по решению ScalingPolicy"""
+
+    def __init__(self, source, policy: ScalingPolicy = None, prefix: str = "worker",
+                 command: Callable[[str], List[str]] = worker_command, drain_timeout: float = DRAIN_TIMEOUT,
+                 interval: float = SCALE_INTERVAL, fork_target: Optional[Callable[[str], int]] = None):
+        self.source = source
+        self.policy = policy or ScalingPolicy()
+        self.prefix = prefix
+        self.command = command
+        self.drain_timeout = drain_timeout
+        self.interval = interval
+        self.fork_target = fork_target
+        self.workers: Dict[int, WorkerProcess] = {}
+        self._stopping = threading.Event()
+
+    @property
+    def active(self) -> List[WorkerProcess]:
+        return [worker for worker in self.workers.values() if not worker.draining]
+
+    def spawn(self) -> WorkerProcess:
+        """Процесс в наименьшем свободном слоте: слот задаёт id и порт метрик"""
+        slot = next(slot for slot in range(len(self.workers) + 1) if slot not in self.workers)
+        worker_id = f"{self.prefix}-{slot + 1}"
+        env = dict(os.environ, ML_WORKER_METRICS_PORT=str(WORKER_METRICS_BASE_PORT + slot if WORKER_METRICS_BASE_PORT else 0))
+        if self.fork_target is not None:
+            process = fork_worker(self.fork_target, worker_id, {"ML_WORKER_METRICS_PORT": env["ML_WORKER_METRICS_PORT"]})
+        else:
+            process = subprocess.Popen(self.command(worker_id), env=env)
+        self.workers[slot] = WorkerProcess(slot, worker_id, process)
+        app_logger.info(f"Запущен {worker_id} (pid {process.pid})")
+        return self.workers[slot]
+
+    def retire(self) -> Optional[WorkerProcess]:
+        """Вывести процесс с наибольшим слотом"""
+        active = self.active
+        if not active:
+            return None
+        worker = max(active, key=lambda worker: worker.slot)
+        worker.drain(self.drain_timeout)
+        app_logger.info(f"{worker.worker_id} выводится из пула, ожидание завершения задач")
+        return worker
+
+    def reap(self) -> None:
+        """Убрать завершившиеся процессы; задержавшихся при выводе - завершить принудительно"""
+        for slot, worker in list(self.workers.items()):
+            code = worker.process.poll()
+            if code is None:
+                if worker.draining and time.monotonic() > worker.drain_deadline:
+                    app_logger.warning(f"{worker.worker_id} не завершился за {self.drain_timeout:.0f}с, SIGKILL")
+                    worker.process.kill()
+                continue
+            del self.workers[slot]
+            if worker.draining:
+                app_logger.info(f"{worker.worker_id} остановлен (код {code})")
+            else:
+                app_logger.warning(f"{worker.worker_id} неожиданно завершился с кодом {code}, будет перезапущен")
+
+    def scale(self, target: int) -> None:
+        while len(self.active) < target:
+            self.spawn()
+        while len(self.active) > target:
+            self.retire()
+
+    def tick(self) -> int:
+        self.reap()
+        current = len(self.active)
+        try:
+            stats = self.source.fetch()
+        except Exception as e:
+            app_logger.warning(f"Не удалось получить статистику очереди: {e}")
+            target = self.policy.clamp(current)
+        else:
+            QUEUE_DEPTH.labels(queue="ml_tasks_queue").set(stats.ready)
+            QUEUE_CONSUMERS.labels(queue="ml_tasks_queue").set(stats.consumers)
+            target = self.policy.desired(current, stats, time.monotonic())
+            if target != current:
+                app_logger.info(
+                    f"Масштабирование {current} -> {target}: в очереди {stats.ready}, "
+                    f"в работе {stats.unacked}, загрузка {self.policy.utilisation(stats, current)}"
+                )
+        self.scale(target)
+        ML_WORKER_PROCESSES.labels(state="active").set(len(self.active))
+        ML_WORKER_PROCESSES.labels(state="draining").set(len(self.workers) - len(self.active))
+        return target
+
+    def run(self) -> None:
+        app_logger.info(
+            f"Супервизор worker: от {self.policy.min_workers} до {self.policy.max_workers} процессов, "
+            f"по {self.policy.concurrency} задач"
+        )
+        self.tick()
+        while not self._stopping.wait(self.interval):
+            self.tick()
+        self.shutdown()
+
+    def stop(self) -> None:
+        self._stopping.set()
+
+    def shutdown(self) -> None:
+        """Вывести все процессы и дождаться их (не дольше drain_timeout)"""
+        for worker in self.workers.values():
+            worker.drain(self.drain_timeout)
+        while self.workers:
+            self.reap()
+            time.sleep(0.1)
+        app_logger.info("Супервизор worker остановлен")
+
+
+if __name__ == "__main__":
+    prefix = sys.argv[1] if len(sys.argv) > 1 else "worker"
+    config = RabbitMQConfig()
+    fork_target = None
+    if WORKER_PRELOAD:
+        from ml_worker import preload_shared_assets, run_worker
+        preload_shared_assets()
+        fork_target = run_worker
+    supervisor = WorkerSupervisor(get_queue_stats_source(config), prefix=prefix, fork_target=fork_target)
+    signal.signal(signal.SIGTERM, lambda signum, frame: supervisor.stop())
+    signal.signal(signal.SIGINT, lambda signum, frame: supervisor.stop())
+    start_worker_metrics_server(SUPERVISOR_METRICS_PORT)
+    supervisor.run()
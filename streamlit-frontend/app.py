@@ -16,6 +16,9 @@ from services.auth_service import (
 from services.api_client import get_api_client
 from utils.helpers import SessionManager, format_currency
 from utils.style_loader import load_theme
+from components.visualization import (
+    create_stats_status_pie_chart, create_risk_distribution_chart, create_daily_cost_timeline
+)
 import plotly.express as px
  
 st.set_page_config(
@@ -150,19 +153,19 @@ def show_dashboard():
         with st.spinner("📊 Загружаем данные кошелька..."):
             wallet_info = api_client.get_wallet_info()
         
-        recent_jobs = {"jobs": [], "total_count": 0}
+        stats = {"total_jobs": 0, "done_count": 0, "error_count": 0, "average_risk": None, "daily": []}
         try:
-            recent_jobs = api_client.get_prediction_history(limit=10)
+            stats = api_client.get_user_stats(days=30)
         except Exception as e:
             error_msg = str(e)
             if "500" in error_msg:
                 st.warning("⚠️ Сервер временно недоступен. Попробуйте позже.")
             elif "404" in error_msg:
-                st.info("ℹ️ Функция истории анализов временно недоступна.")
+                st.info("ℹ️ Статистика анализов временно недоступна.")
             elif "401" in error_msg or "403" in error_msg:
                 st.error("🔒 Ошибка авторизации. Пожалуйста, войдите в систему заново.")
             else:
-                st.warning(f"⚠️ Не удалось загрузить историю анализов: {error_msg}")
+                st.warning(f"⚠️ Не удалось загрузить статистику анализов: {error_msg}")
             
         st.markdown("### 📈 Основные показатели")
         
@@ -176,31 +179,43 @@ def show_dashboard():
                 delta="Доступно для анализов"
             )
         
+        total_jobs = stats.get('total_jobs', 0)
         with col2:
-            total_jobs = recent_jobs.get('total_count', 0)
             st.metric(
                 "📊 Всего анализов",
                 total_jobs
             )
         
         with col3:
-            jobs = recent_jobs.get('jobs', [])
-            completed_jobs = len([j for j in jobs if j.get('status') == 'DONE'])
             st.metric(
                 "✅ Завершено",
-                completed_jobs,
-                delta=f"из {len(jobs)}" if jobs else "0"
+                stats.get('done_count', 0),
+                delta=f"из {total_jobs}" if total_jobs else "0"
             )
         
         with col4:
-            risk_scores = [j.get('risk_score') for j in jobs if j.get('risk_score') is not None]
-            avg_risk = sum(risk_scores) / len(risk_scores) if risk_scores else 0
+            avg_risk = stats.get('average_risk')
             st.metric(
                 "⚠️ Средний риск",
-                f"{avg_risk*100:.1f}%" if avg_risk > 0 else "N/A",
-                delta="За последние анализы"
+                f"{avg_risk*100:.1f}%" if avg_risk is not None else "N/A",
+                delta="По всем анализам"
             )
         
+        if total_jobs:
+            col1, col2 = st.columns(2)
+            with col1:
+                status_chart = create_stats_status_pie_chart(stats)
+                if status_chart:
+                    st.plotly_chart(status_chart, use_container_width=True)
+            with col2:
+                risk_chart = create_risk_distribution_chart(stats)
+                if risk_chart:
+                    st.plotly_chart(risk_chart, use_container_width=True)
+            
+            cost_chart = create_daily_cost_timeline(stats.get('daily', []))
+            if cost_chart:
+                st.plotly_chart(cost_chart, use_container_width=True)
+        
         st.markdown("### 🚀 Быстрые действия")
         
         col1, col2, col3, col4 = st.columns(4)
@@ -223,7 +238,7 @@ def show_dashboard():
                 st.rerun()
         
         
-        if not jobs:
+        if not total_jobs:
             st.info("📭 У вас пока нет выполненных анализов")
             st.markdown("👆 Создайте свой первый анализ, используя кнопку выше!")
     
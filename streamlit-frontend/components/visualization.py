@@ -67,9 +67,9 @@ def create_cost_timeline(jobs: List[Dict[str, Any]]) -> go.Figure:
     
     timeline_data = []
     for job in jobs:
-        if job.get('started_at') and job.get('used_credits'):
+        if job.get('created_at') and job.get('used_credits'):
             timeline_data.append({
-                'date': job['started_at'][:10],
+                'date': job['created_at'][:10],
                 'cost': float(job['used_credits']),
                 'status': job.get('status', 'UNKNOWN')
             })
@@ -171,6 +171,77 @@ def display_job_metrics(jobs: List[Dict[str, Any]]):
             delta=f"{'Высокий' if avg_risk > 0.7 else 'Средний' if avg_risk > 0.3 else 'Низкий'}" if avg_risk > 0 else None
         )
 
+def create_stats_status_pie_chart(stats: Dict[str, Any]) -> go.Figure:
+    """Круговая диаграмма статусов по сводной статистике /stats"""
+    status_counts = {'DONE': stats.get('done_count', 0), 'ERROR': stats.get('error_count', 0)}
+    if not any(status_counts.values()):
+        return None
+    
+    fig = px.pie(
+        values=list(status_counts.values()),
+        names=list(status_counts.keys()),
+        title="📊 Распределение по статусам",
+        color=list(status_counts.keys()),
+        color_discrete_map={'DONE': '#1a1a1a', 'ERROR': '#666666'}
+    )
+    
+    fig.update_traces(textposition='inside', textinfo='percent+label')
+    fig.update_layout(showlegend=True, height=400)
+    
+    return fig
+
+def create_risk_distribution_chart(stats: Dict[str, Any]) -> go.Figure:
+    """Столбцы по диапазонам риск-индекса из сводной статистики /stats"""
+    distribution = stats.get('risk_distribution') or {}
+    labels = {'low': 'Низкий (<30%)', 'medium': 'Средний (30–70%)', 'high': 'Высокий (≥70%)'}
+    counts = [distribution.get(key, 0) for key in labels]
+    if not any(counts):
+        return None
+    
+    fig = px.bar(
+        x=list(labels.values()),
+        y=counts,
+        title="📈 Распределение риск-индексов",
+        labels={'x': 'Риск-индекс', 'y': 'Количество анализов'},
+        color_discrete_sequence=['#1a1a1a']
+    )
+    
+    fig.update_layout(
+        xaxis_title="Риск-индекс",
+        yaxis_title="Количество",
+        showlegend=False,
+        height=400
+    )
+    
+    return fig
+
+def create_daily_cost_timeline(daily: List[Dict[str, Any]]) -> go.Figure:
+    """Затраты по дням из дневных агрегатов /stats"""
+    if not daily:
+        return None
+    
+    df = pd.DataFrame(daily)
+    df['date'] = pd.to_datetime(df['day'])
+    df['cost'] = pd.to_numeric(df['used_credits'], errors='coerce').fillna(0)
+    
+    fig = px.line(
+        df,
+        x='date',
+        y='cost',
+        title="💰 Затраты по дням",
+        labels={'date': 'Дата', 'cost': 'Затраты (₽)'},
+        markers=True
+    )
+    
+    fig.update_layout(
+        xaxis_title="Дата",
+        yaxis_title="Затраты (₽)",
+        showlegend=False,
+        height=400
+    )
+    
+    return fig
+
 def display_wallet_chart(transactions: List[Dict[str, Any]]):
     """Отобразить график транзакций кошелька"""
     if not transactions:
@@ -96,6 +96,14 @@ with st.spinner("📊 Загружаем историю анализов..."):
 jobs = history_data.get("jobs", [])
 total_count = history_data.get("total_count", 0)
 
+pending_ids = [job['id'] for job in jobs if job.get('status') in ('QUEUED', 'RUNNING', 'PROCESSING')]
+if pending_ids:
+    try:
+        fresh_jobs = {job['id']: job for job in api_client.get_jobs_status(pending_ids).get("jobs", [])}
+        jobs = [fresh_jobs.get(job['id'], job) for job in jobs]
+    except Exception:
+        pass
+
 if not jobs:
     st.info("📭 У вас пока нет выполненных анализов")
     
@@ -131,7 +139,7 @@ for job in filtered_jobs:
         'Риск-индекс': f"{job['risk_score']*100:.1f}%" if job.get('risk_score') is not None else "N/A",
         'Стоимость': format_currency(float(job.get('used_credits', 0))),
         'Глубина': job.get('summary_depth', 'N/A'),
-        'Дата создания': format_datetime(job.get('started_at', '')),
+        'Дата создания': format_datetime(job.get('created_at', '')),
         'Дата завершения': format_datetime(job.get('finished_at', '')) if job.get('finished_at') else "N/A"
     })
 
@@ -207,8 +215,8 @@ if show_details and filtered_jobs:
                 
                 with col3:
                     st.markdown("**📅 Временные метки:**")
-                    if job.get('started_at'):
-                        st.write(f"**Создан:** {format_datetime(job['started_at'])}")
+                    if job.get('created_at'):
+                        st.write(f"**Создан:** {format_datetime(job['created_at'])}")
                     if job.get('finished_at'):
                         st.write(f"**Завершен:** {format_datetime(job['finished_at'])}")
                     
@@ -279,7 +287,21 @@ if filtered_jobs:
             st.rerun()
     
     with col2:
-        st.empty()
+        if st.button("📥 Экспорт всей истории (CSV)", use_container_width=True):
+            try:
+                with st.spinner("📥 Выгружаем историю..."):
+                    st.session_state.history_export = api_client.export_history("csv")
+            except Exception as e:
+                st.error(f"❌ Ошибка экспорта истории: {str(e)}")
+        
+        if st.session_state.get('history_export'):
+            st.download_button(
+                label="💾 Скачать CSV",
+                data=st.session_state.history_export,
+                file_name="history.csv",
+                mime="text/csv",
+                use_container_width=True
+            )
 
 with st.sidebar:
     st.markdown('<h1 class="sidebar-main-title">Платформа для анализа договоров</h1>', unsafe_allow_html=True)
@@ -1,4 +1,5 @@
 import streamlit as st
+import requests
 import sys
 import os
 
@@ -10,7 +11,7 @@ from utils.helpers import (
     calculate_pages_from_text, calculate_tokens_from_text, validate_file_size, is_supported_file,
     format_currency, get_language_name, get_summary_depth_name,
     show_success_message, show_error_message, calculate_pages_from_file_size, 
-    calculate_tokens_from_file_size, get_file_extension
+    calculate_tokens_from_file_size, get_file_extension, format_job_status_text
 )
 from utils.style_loader import load_theme
 
@@ -163,6 +164,14 @@ with st.form("prediction_form", clear_on_submit=False):
             help="Краткий анализ - основные риски, подробный - развернутый отчет"
         )
     
+    previous_document_id = st.number_input(
+        "🔁 ID предыдущей версии документа (опционально):",
+        min_value=0,
+        value=0,
+        step=1,
+        help="Для новой редакции договора будут проанализированы и оплачены только изменённые пункты"
+    )
+    
     if (document_text or uploaded_file) and models:
         try:
             if document_text:
@@ -263,6 +272,8 @@ with st.form("prediction_form", clear_on_submit=False):
                             "model_name": model_name,
                             "summary_depth": summary_depth
                         }
+                        if previous_document_id:
+                            prediction_data["previous_document_id"] = int(previous_document_id)
                         
                         response = api_client.create_prediction(prediction_data)
                     
@@ -271,7 +282,8 @@ with st.form("prediction_form", clear_on_submit=False):
                         response = api_client.upload_file_prediction(
                             file_content, 
                             uploaded_file.name, 
-                            language
+                            language,
+                            previous_document_id=int(previous_document_id) or None
                         )
                 
 
@@ -300,7 +312,10 @@ with st.form("prediction_form", clear_on_submit=False):
                     st.metric("📊 Статус", status_text)
 
                 st.info(f"📝 {response.get('message', 'Задача поставлена в очередь на обработку')}")
-                
+
+                if response.get('changed_clauses') is not None:
+                    st.info(f"🔁 Версия {response['version']}: к анализу {response['changed_clauses']} изменённых пунктов, остальное взято из предыдущего анализа")
+
                 st.session_state.analysis_created = True
                 st.session_state.job_id = response['job_id']
                 
@@ -327,8 +342,17 @@ if st.session_state.get('analysis_created', False):
         
         col1, col2, col3 = st.columns(3)
         with col1:
-            if st.button("🔍 Проверить статус", use_container_width=True, key="check_status"):
+            if st.button("🔍 Дождаться результата", use_container_width=True, key="check_status"):
                 try:
+                    status_placeholder = st.empty()
+                    try:
+                        with st.spinner("⏳ Ожидаем завершения анализа..."):
+                            for event in api_client.stream_job_events(job_id):
+                                status_placeholder.info(f"📡 Статус задачи: {format_job_status_text(event.get('status', 'UNKNOWN'))}")
+                    except requests.RequestException:
+                        pass
+                    status_placeholder.empty()
+                    
                     job_details = api_client.get_job_details(job_id)
                     status = job_details.get('status', 'UNKNOWN')
                     
@@ -436,7 +460,7 @@ if st.session_state.get('analysis_created', False):
                                     if i < len(unique_clauses):
                                         st.markdown("---")
                     
-                    elif status == 'PROCESSING':
+                    elif status in ('PROCESSING', 'RUNNING'):
                         st.info("🔄 Анализ в процессе выполнения...")
                     elif status == 'QUEUED':
                         st.info("⏳ Анализ находится в очереди...")
@@ -93,7 +93,11 @@ if wallet_info:
             st.empty()
     
     with col4:
-        st.empty()
+        st.metric(
+            "🧾 Потрачено в этом месяце",
+            format_currency(float(wallet_info.get('spent_this_month', 0))),
+            help="Сумма списаний с начала месяца"
+        )
 
 if wallet_info:
     balance = float(wallet_info.get('balance', 0))
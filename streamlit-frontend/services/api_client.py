@@ -91,7 +91,8 @@ class APIClient:
         )
         return self._handle_response(response)
     
-    def upload_file_prediction(self, file_content: bytes, filename: str, language: str = "UNKNOWN") -> Dict[str, Any]:
+    def upload_file_prediction(self, file_content: bytes, filename: str, language: str = "UNKNOWN",
+                               previous_document_id: int = None) -> Dict[str, Any]:
         """Загрузить файл для анализа"""
         if not file_content:
             raise ValueError("File content is empty or None")
@@ -112,6 +113,8 @@ class APIClient:
         
         files = {"file": (filename, file_content, content_type)}
         data = {"language": language}
+        if previous_document_id:
+            data["previous_document_id"] = previous_document_id
         
         headers = self._get_auth_headers()
         
@@ -123,14 +126,29 @@ class APIClient:
         )
         return self._handle_response(response)
     
-    def get_prediction_history(self, skip: int = 0, limit: int = 10) -> Dict[str, Any]:
-        """Получить историю предсказаний"""
+    def get_prediction_history(self, skip: int = 0, limit: int = 10, cursor: str = None) -> Dict[str, Any]:
+        """Получить историю предсказаний (cursor - next_cursor предыдущей страницы)"""
+        params = {"limit": limit, "cursor": cursor} if cursor else {"skip": skip, "limit": limit}
         response = self.session.get(
-            f"{self.base_url}/history?skip={skip}&limit={limit}",
+            f"{self.base_url}/history",
+            params=params,
             headers=self._get_auth_headers()
         )
         return self._handle_response(response)
     
+    def export_history(self, export_format: str = "csv") -> bytes:
+        """Выгрузить всю историю анализов (ответ читается потоком)"""
+        response = self.session.get(
+            f"{self.base_url}/history/export?format={export_format}",
+            headers=self._get_auth_headers(),
+            stream=True
+        )
+        if not response.ok:
+            self._handle_response(response)
+        
+        with response:
+            return b"".join(response.iter_content(chunk_size=64 * 1024))
+    
     def get_job_details(self, job_id: int) -> Dict[str, Any]:
         """Получить детали задания"""
         response = self.session.get(
@@ -139,6 +157,33 @@ class APIClient:
         )
         return self._handle_response(response)
     
+    def get_jobs_status(self, job_ids: List[int], include_clauses: bool = True) -> Dict[str, Any]:
+        """Получить статусы нескольких заданий одним запросом"""
+        ids = ",".join(str(job_id) for job_id in job_ids)
+        response = self.session.get(
+            f"{self.base_url}/jobs?ids={ids}&include_clauses={str(include_clauses).lower()}",
+            headers=self._get_auth_headers()
+        )
+        return self._handle_response(response)
+    
+    def stream_job_events(self, job_id: int, timeout: float = 600):
+        """Подписаться на события статуса задания (Server-Sent Events)"""
+        import json
+        
+        response = self.session.get(
+            f"{self.base_url}/jobs/{job_id}/events",
+            headers=self._get_auth_headers(),
+            stream=True,
+            timeout=(10, timeout)
+        )
+        if not response.ok:
+            self._handle_response(response)
+        
+        with response:
+            for line in response.iter_lines(decode_unicode=True):
+                if line and line.startswith("data:"):
+                    yield json.loads(line[len("data:"):].strip())
+    
     def get_available_models(self) -> List[Dict[str, Any]]:
         """Получить доступные модели"""
         response = self.session.get(
@@ -182,10 +227,21 @@ class APIClient:
         
         return self._handle_response(response)
     
-    def get_user_documents(self, skip: int = 0, limit: int = 10) -> Dict[str, Any]:
-        """Получить документы пользователя"""
+    def get_user_documents(self, skip: int = 0, limit: int = 10, cursor: str = None) -> Dict[str, Any]:
+        """Получить документы пользователя (cursor - next_cursor предыдущей страницы)"""
+        params = {"limit": limit, "cursor": cursor} if cursor else {"skip": skip, "limit": limit}
+        response = self.session.get(
+            f"{self.base_url}/documents",
+            params=params,
+            headers=self._get_auth_headers()
+        )
+        return self._handle_response(response)
+    
+    def get_user_stats(self, days: int = 30) -> Dict[str, Any]:
+        """Получить сводную статистику анализов для панели управления"""
         response = self.session.get(
-            f"{self.base_url}/documents?skip={skip}&limit={limit}",
+            f"{self.base_url}/stats",
+            params={"days": days},
             headers=self._get_auth_headers()
         )
         return self._handle_response(response)
@@ -198,10 +254,12 @@ class APIClient:
         )
         return self._handle_response(response)
     
-    def get_transaction_history(self, skip: int = 0, limit: int = 10) -> Dict[str, Any]:
-        """Получить историю транзакций"""
+    def get_transaction_history(self, skip: int = 0, limit: int = 10, cursor: str = None) -> Dict[str, Any]:
+        """Получить историю транзакций (cursor - next_cursor предыдущей страницы)"""
+        params = {"limit": limit, "cursor": cursor} if cursor else {"skip": skip, "limit": limit}
         response = self.session.get(
-            f"{self.base_url}/wallet/transactions?skip={skip}&limit={limit}",
+            f"{self.base_url}/wallet/transactions",
+            params=params,
             headers=self._get_auth_headers()
         )
         return self._handle_response(response)
@@ -102,6 +102,7 @@ def format_job_status_text(status: str) -> str:
         'COMPLETED': 'Завершено',
         'ERROR': 'Ошибка',
         'PROCESSING': 'Обрабатывается',
+        'RUNNING': 'Обрабатывается',
         'QUEUED': 'В очереди'
     }
     return status_texts.get(status, status)
@@ -202,10 +203,10 @@ def filter_jobs_by_status(jobs: List[Dict[str, Any]], status_filter: List[str])
     return [job for job in jobs if job.get('status') in status_filter]
 
 def sort_jobs_by_date(jobs: List[Dict[str, Any]], ascending: bool = False) -> List[Dict[str, Any]]:
-    """Сортировать задания по дате"""
+    """Сортировать задания по дате создания"""
     return sorted(
         jobs, 
-        key=lambda x: x.get('started_at', ''), 
+        key=lambda x: x.get('created_at') or '', 
         reverse=not ascending
     )
 